@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""
+敲磚塊遊戲效能測試套件
+
+包含具名的效能情境與執行器，用來比較程式修改前後的更新與繪製時間。
+"""
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+自動操作測試
+
+分成三部分：
+
+1. 預測：在預設關卡中隨機放很多顆球，比較 TrajectoryPredictor 算出的落點
+   和把球（與磚塊的複本）一幀一幀往後模擬到底板高度的結果，以及兩者的時間
+2. 快取：場上有幾百顆球時，自動操作每一幀的成本（大部分的球沿用快取，
+   只有反彈的球重新計算），和每一幀都把所有球往後模擬相比
+3. 遊玩：由自動操作玩一局，統計過了幾關、漏了幾顆球
+
+預測不準、或自動操作沒有比往後模擬快很多時以非零代碼結束。
+
+使用方式:
+    python benchmarks/autopilot.py                 # 預設 300 顆球
+    python benchmarks/autopilot.py --balls 1000 --frames 600
+    python benchmarks/autopilot.py --endless -o autopilot.json
+"""
+
+######################載入套件######################
+import argparse
+import copy
+import math
+import os
+import random
+import sys
+import time
+
+# 讓腳本可以直接執行：把專案根目錄加入模組搜尋路徑
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# 無視窗模式：必須在 pygame 初始化前設定
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+######################導入設定######################
+from config import FPS
+
+######################導入遊戲模組######################
+from benchmarks.run_benchmarks import save_json, setup_headless, summarize
+from game.autopilot import Autopilot, TrajectoryPredictor
+from game.game_logic import GameState
+from game.objects import Ball, Paddle
+from game.rollback import get_clock
+
+######################全域變數######################
+DEFAULT_BALLS = 300
+DEFAULT_FRAMES = 600
+DEFAULT_PLAY_FRAMES = 20 * 60 * FPS  # 遊玩測試最多 20 分鐘的遊戲時間
+DEFAULT_SEED = 2024
+MIN_EXACT_RATIO = 0.95  # 落點幀數完全相同的比例至少要這麼多
+MIN_SPEEDUP = 10.0  # 自動操作至少要比每幀往後模擬快這麼多倍
+FORWARD_LIMIT = 60 * FPS  # 往後模擬最多幾幀（超過就當作沒有落地）
+
+
+######################定義函式區######################
+
+
+def settled_game(endless, seed):
+    """
+    建立一局並等到磚塊都滑到定位（球還黏在底板上，不會漏掉）\n
+    \n
+    回傳:\n
+    GameState: 遊戲狀態\n
+    """
+    random.seed(seed)
+    clock = get_clock()
+    clock.seek(0)
+    game = GameState(endless=endless, store=None)
+    while not game.bricks_settled:
+        game.update()
+        clock.seek(game.frames)
+    return game
+
+
+def add_balls(game, count, rng):
+    """
+    在磚塊下方隨機放 count 顆往各個方向移動的球\n
+    \n
+    回傳:\n
+    list: 新的球\n
+    """
+    template = game.balls[0]
+    bottom = max((brick.y + brick.height for brick in game.bricks), default=0)
+    balls = []
+    for _ in range(count):
+        ball = Ball(
+            rng.uniform(template.radius, game.world_width - template.radius),
+            rng.uniform(bottom + template.radius, game.paddle.y - 40),
+            template.radius,
+            template.color,
+            template.speed,
+        )
+        ball.stuck = False
+        angle = rng.uniform(-math.pi, math.pi)
+        ball.vx = math.cos(angle) * ball.speed
+        ball.vy = math.sin(angle) * ball.speed
+        balls.append(ball)
+    game.balls.extend(balls)
+    return balls
+
+
+def forward(game, ball, bricks):
+    """
+    把球的複本一幀一幀往後模擬，直到球到達底板的高度\n
+    \n
+    參數:\n
+    bricks (list): 磚塊的複本（模擬會把撞到的磚塊打掉）\n
+    \n
+    回傳:\n
+    tuple: (到達時 game.frames 的值, X 座標)，沒有落地時為 (None, None)\n
+    """
+    clone = copy.copy(ball)
+    # 底板放在場地外面：只要知道球什麼時候到達底板的高度，不讓它反彈
+    paddle = Paddle(-10 * game.world_width, game.paddle.y)
+    for step in range(1, FORWARD_LIMIT + 1):
+        clone.update(paddle, bricks, game.world_width, game.world_height)
+        if clone.y + clone.radius >= paddle.y:
+            return game.frames + step, clone.x
+    return None, None
+
+
+def measure_prediction(balls, seed, endless):
+    """
+    比較預測與往後模擬的落點和時間\n
+    \n
+    回傳:\n
+    dict: 量測結果\n
+    """
+    rng = random.Random(seed)
+    game = settled_game(endless, seed)
+    predictor = TrajectoryPredictor()
+    trace_samples, forward_samples, errors = [], [], []
+    exact = landed = 0
+    for ball in add_balls(game, balls, rng):
+        started = time.perf_counter()
+        prediction = predictor.trace(game, ball)
+        trace_samples.append(time.perf_counter() - started)
+
+        # 只計時模擬本身，不含複製磚塊
+        clone_bricks = [copy.copy(brick) for brick in game.bricks]
+        started = time.perf_counter()
+        frame, x = forward(game, ball, clone_bricks)
+        forward_samples.append(time.perf_counter() - started)
+
+        if frame is None:
+            continue
+        landed += 1
+        if prediction.frame == frame:
+            exact += 1
+            errors.append(abs(prediction.x - x))
+    errors.sort()
+    return {
+        "balls": balls,
+        "landed": landed,
+        "exact_ratio": exact / landed if landed else 0.0,
+        "x_error_p99": errors[int(len(errors) * 0.99)] if errors else 0.0,
+        "trace": summarize(trace_samples),
+        "forward": summarize(forward_samples),
+    }
+
+
+def measure_autopilot(balls, frames, seed, endless, forward_ms):
+    """
+    場上有很多顆球時，量測自動操作每一幀的成本\n
+    \n
+    參數:\n
+    forward_ms (float): 往後模擬一顆球的時間（毫秒），用來估計每一幀把所有\n
+        球往後模擬的成本\n
+    \n
+    回傳:\n
+    dict: 量測結果\n
+    """
+    rng = random.Random(seed)
+    game = settled_game(endless, seed)
+    add_balls(game, balls, rng)
+    autopilot = Autopilot()
+    samples = []
+    ball_counts = []
+    for _ in range(frames):
+        if game.game_over:
+            break
+        # 保持球數，量測的成本才有意義
+        missing = balls - len(game.balls)
+        if missing > 0:
+            add_balls(game, missing, rng)
+        get_clock().seek(game.frames)
+        started = time.perf_counter()
+        autopilot.steer(game)
+        samples.append(time.perf_counter() - started)
+        ball_counts.append(len(game.balls))
+        # 自動操作已經在上面移動過底板，這一幀不再讀鍵盤
+        game.update_explosions()
+        game.update_bricks()
+        game.update_balls()
+        game.update_shards()
+        game.update_eggs()
+        game.dispatch_events()
+        game.frames += 1
+
+    predictor = autopilot.predictor
+    lookups = predictor.traced + predictor.reused
+    steer = summarize(samples)
+    mean_balls = sum(ball_counts) / len(ball_counts) if ball_counts else 0
+    return {
+        "balls": balls,
+        "frames": len(samples),
+        "steer": steer,
+        "reuse_ratio": predictor.reused / lookups if lookups else 0.0,
+        "forward_estimate_ms": forward_ms * mean_balls,
+        "speedup": (forward_ms * mean_balls / steer["mean"]) if steer["mean"] else 0.0,
+    }
+
+
+def play(frames, seed, endless):
+    """
+    由自動操作玩一局（只有一開始的那顆球，和玩家一樣）\n
+    \n
+    回傳:\n
+    dict: 遊玩結果\n
+    """
+    random.seed(seed)
+    clock = get_clock()
+    clock.seek(0)
+    game = GameState(endless=endless, store=None)
+    game.autopilot = Autopilot()
+    lost = 0
+    started_level = game.level
+    for frame in range(frames):
+        if game.game_over:
+            break
+        clock.seek(frame)
+        before = len(game.balls)
+        game.update()
+        # 這一幀少掉的球（多球效果新增的球在事件處理時才加入）
+        lost += max(0, before - len(game.balls))
+    return {
+        "frames": game.frames,
+        "seconds": game.frames / FPS,
+        "levels": game.level - started_level,
+        "score": game.score,
+        "bricks_destroyed": game.bricks_destroyed,
+        "balls_lost": lost,
+        "game_over": game.game_over,
+    }
+
+
+def main(argv=None):
+    """命令列進入點"""
+    parser = argparse.ArgumentParser(description="敲磚塊遊戲自動操作測試")
+    parser.add_argument("--balls", type=int, default=DEFAULT_BALLS, help="球數")
+    parser.add_argument(
+        "--frames", type=int, default=DEFAULT_FRAMES, help="快取測試的幀數"
+    )
+    parser.add_argument(
+        "--play-frames",
+        type=int,
+        default=DEFAULT_PLAY_FRAMES,
+        help="遊玩測試最多幾幀",
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="亂數種子")
+    parser.add_argument("--endless", action="store_true", help="使用無盡模式")
+    parser.add_argument("-o", "--output", help="把結果寫成 JSON")
+    args = parser.parse_args(argv)
+
+    setup_headless()
+    # 遊戲時間由幀數決定（TNT 倒數等計時不受執行速度影響）
+    clock = get_clock()
+    clock.install()
+    try:
+        prediction = measure_prediction(args.balls, args.seed, args.endless)
+        cached = measure_autopilot(
+            args.balls,
+            args.frames,
+            args.seed,
+            args.endless,
+            prediction["forward"]["mean"],
+        )
+        result = play(args.play_frames, args.seed, args.endless)
+    finally:
+        clock.uninstall()
+
+    print(
+        f"預測 {prediction['balls']} 顆球（落地 {prediction['landed']} 顆）："
+        f"幀數完全相同 {prediction['exact_ratio']:.1%}，"
+        f"X 誤差 p99 {prediction['x_error_p99']:.2f} 像素"
+    )
+    print(f"{'項目':<20}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, label, summary in (
+        ("trace", "預測一顆球", prediction["trace"]),
+        ("forward", "往後模擬一顆球", prediction["forward"]),
+        ("steer", f"自動操作一幀（{cached['balls']} 球）", cached["steer"]),
+    ):
+        print(
+            f"{label:<20}{summary['p50']:>10.3f}{summary['p99']:>10.3f}"
+            f"{summary['max']:>10.3f}"
+        )
+    print(
+        f"沿用快取 {cached['reuse_ratio']:.1%}；每幀往後模擬所有球估計 "
+        f"{cached['forward_estimate_ms']:.1f} ms，自動操作快 {cached['speedup']:.0f} 倍"
+    )
+    print(
+        f"\n自動遊玩 {result['seconds']:.0f} 秒：過了 {result['levels']} 關、"
+        f"打掉 {result['bricks_destroyed']} 塊磚、漏了 {result['balls_lost']} 顆球，"
+        f"分數 {result['score']}{'（遊戲結束）' if result['game_over'] else ''}"
+    )
+
+    if args.output:
+        save_json(
+            args.output,
+            {"prediction": prediction, "autopilot": cached, "play": result},
+        )
+        print(f"\n💾 結果已寫入 {args.output}")
+
+    failed = False
+    if prediction["exact_ratio"] < MIN_EXACT_RATIO:
+        print(f"\n❌ 落點幀數完全相同的比例低於 {MIN_EXACT_RATIO:.0%}")
+        failed = True
+    if cached["speedup"] < MIN_SPEEDUP:
+        print(f"\n❌ 自動操作沒有比往後模擬快 {MIN_SPEEDUP:.0f} 倍以上")
+        failed = True
+    if failed:
+        return 1
+    print("\n✅ 預測和往後模擬相同，自動操作的成本遠低於往後模擬")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
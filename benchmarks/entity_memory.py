@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+遊戲物件記憶體測試
+
+每一種遊戲物件（磚塊、碎片、球、彩蛋、爆炸效果）都在全新的 Python 行程中
+一次建立大量實例，量測每個物件平均佔用的位元組數（tracemalloc，包含物件
+本身、屬性值與列表中的指標）與建立前後的常駐記憶體（RSS）增加量；
+最後再量測同時有十萬塊磚與十萬個碎片時整個行程的 RSS。
+
+和儲存的基準比較時會列出每一項的變化，例如改變物件的記憶體配置前先用
+--save-baseline 存下基準，改完後再執行一次就能看到前後差異；
+比基準多用超過門檻時以非零代碼結束。
+
+使用方式:
+    python benchmarks/entity_memory.py                    # 每種物件十萬個並與基準比較
+    python benchmarks/entity_memory.py --count 200000 -o memory.json
+    python benchmarks/entity_memory.py --save-baseline    # 把結果存成基準
+"""
+
+######################載入套件######################
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# 讓腳本可以直接執行：把專案根目錄加入模組搜尋路徑
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+######################導入遊戲模組######################
+from benchmarks.run_benchmarks import load_json, save_json
+from benchmarks.startup import child_environment
+
+######################全域變數######################
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, "benchmarks", "entity_memory_baseline.json")
+DEFAULT_COUNT = 100000
+DEFAULT_THRESHOLD = 0.10  # 比基準多用 10% 以上視為回歸
+
+# 要量測的物件種類：名稱 → 建立 n 個物件的程式碼
+# 特效是實體元件系統中的實體，資料存在 world 的原型欄位中，整批建立
+ENTITY_FACTORIES = {
+    "brick": "[Brick(40 + (i % 500) * 22, 60 + (i // 500) * 12, 20, 10)"
+    " for i in range(n)]",
+    "shard": "create_shards(world, [((i % 800, i % 600, 0, 0), (255, 99, 71), 1)"
+    " for i in range(n)])",
+    "ball": "[Ball(i % 800, i % 600) for i in range(n)]",
+    "egg": "create_eggs(world, [(i % 800, i % 600) for i in range(n)])",
+    "explosion": "create_explosions(world, [(i % 800, i % 600) for i in range(n)])",
+}
+
+# 同時存在的組合（量測整個行程的 RSS）
+MIXED = ("brick", "shard")
+
+# 在子行程中執行的量測程式；{root}、{kinds}、{count}、{trace} 由呼叫端代入
+CHILD_CODE = """
+import gc, json, sys, tracemalloc
+sys.path.insert(0, {root!r})
+import pygame
+from game.objects import Brick, Ball
+from game.ecs import World
+from game.effects import create_shards, create_eggs, create_explosions
+from benchmarks.soak import current_rss
+from benchmarks.entity_memory import ENTITY_FACTORIES
+
+world = World()
+factories = {{
+    kind: eval("lambda n: " + ENTITY_FACTORIES[kind]) for kind in {kinds!r}
+}}
+# 先各建立一個再清掉，讓第一次呼叫才會發生的配置（快取、原型等）不算進去
+warm = [factory(1) for factory in factories.values()]
+world.clear()
+gc.collect()
+if {trace}:
+    tracemalloc.start()
+rss_before = current_rss()
+traced_before = tracemalloc.get_traced_memory()[0]
+kept = {{kind: factory({count}) for kind, factory in factories.items()}}
+gc.collect()
+print(json.dumps({{
+    "bytes": tracemalloc.get_traced_memory()[0] - traced_before,
+    "rss_before": rss_before,
+    "rss_after": current_rss(),
+}}))
+"""
+
+
+######################定義函式區######################
+
+
+def measure(kinds, count, trace):
+    """
+    在全新的行程中建立物件並量測記憶體\n
+    \n
+    參數:\n
+    kinds (tuple): 要同時建立的物件種類\n
+    count (int): 每一種建立幾個\n
+    trace (bool): 是否用 tracemalloc 計算配置的位元組數（會讓 RSS 變大，\n
+        所以 RSS 用另一個沒有開 tracemalloc 的行程量測）\n
+    \n
+    回傳:\n
+    dict: bytes（tracemalloc 配置量）、rss_before 與 rss_after（位元組）\n
+    """
+    code = CHILD_CODE.format(
+        root=ROOT_DIR, kinds=tuple(kinds), count=count, trace=trace
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT_DIR,
+        env=child_environment(),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"量測失敗:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_entity_memory(count=DEFAULT_COUNT):
+    """
+    量測每一種物件與混合情境的記憶體\n
+    \n
+    參數:\n
+    count (int): 每一種物件建立幾個\n
+    \n
+    回傳:\n
+    dict: 每一種物件的 bytes_per_entity 與 rss_delta_mb，以及混合情境的 rss_total_mb\n
+    """
+    entities = {}
+    for kind in ENTITY_FACTORIES:
+        traced = measure((kind,), count, True)
+        plain = measure((kind,), count, False)
+        entities[kind] = {
+            "bytes_per_entity": traced["bytes"] / count,
+            "rss_delta_mb": (plain["rss_after"] - plain["rss_before"]) / 2**20,
+        }
+        print(
+            f"  {kind:<10} 每個 {entities[kind]['bytes_per_entity']:7.1f} bytes，"
+            f"RSS +{entities[kind]['rss_delta_mb']:.1f}MB"
+        )
+
+    mixed = measure(MIXED, count, False)
+    return {
+        "meta": {"python": sys.version.split()[0], "count": count},
+        "entities": entities,
+        "mixed": {
+            "kinds": list(MIXED),
+            "rss_total_mb": mixed["rss_after"] / 2**20,
+            "rss_delta_mb": (mixed["rss_after"] - mixed["rss_before"]) / 2**20,
+        },
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    和基準比較\n
+    \n
+    參數:\n
+    results (dict): run_entity_memory() 的結果\n
+    baseline (dict): 之前儲存的基準結果\n
+    threshold (float): 允許比基準多用的比例\n
+    \n
+    回傳:\n
+    tuple: (比較列表 [(指標, 基準, 這次)], 問題描述列表)\n
+    """
+    rows = []
+    for kind, stats in results["entities"].items():
+        old = baseline.get("entities", {}).get(kind)
+        if old:
+            for metric in ("bytes_per_entity", "rss_delta_mb"):
+                rows.append((f"{kind}.{metric}", old[metric], stats[metric]))
+    old_mixed = baseline.get("mixed")
+    if old_mixed and old_mixed.get("kinds") == results["mixed"]["kinds"]:
+        for metric in ("rss_total_mb", "rss_delta_mb"):
+            rows.append(
+                (f"mixed.{metric}", old_mixed[metric], results["mixed"][metric])
+            )
+
+    problems = []
+    for metric, old, new in rows:
+        if old > 0 and (new - old) / old > threshold:
+            problems.append(
+                f"{metric}: {old:.1f} → {new:.1f} (+{(new - old) / old:.0%})"
+            )
+    return rows, problems
+
+
+def print_report(results):
+    """印出每一種物件與混合情境的結果"""
+    count = results["meta"]["count"]
+    mixed = results["mixed"]
+    names = " + ".join(f"{count:,} {kind}" for kind in mixed["kinds"])
+    print(
+        f"\n🧮 {names}: 行程 RSS {mixed['rss_total_mb']:.1f}MB"
+        f"（物件 +{mixed['rss_delta_mb']:.1f}MB）"
+    )
+
+
+def main(argv=None):
+    """命令列進入點"""
+    parser = argparse.ArgumentParser(description="敲磚塊遊戲物件記憶體測試")
+    parser.add_argument(
+        "--count", type=int, default=DEFAULT_COUNT, help="每一種物件建立幾個"
+    )
+    parser.add_argument("-o", "--output", help="把結果寫成 JSON")
+    parser.add_argument(
+        "--baseline", default=DEFAULT_BASELINE, help="基準結果的 JSON 檔案"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="比基準多用多少比例算回歸",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="把這次的結果存成基準"
+    )
+    args = parser.parse_args(argv)
+
+    print(f"🧮 每種物件建立 {args.count:,} 個")
+    results = run_entity_memory(args.count)
+    print_report(results)
+
+    if args.output:
+        save_json(args.output, results)
+        print(f"\n💾 結果已寫入 {args.output}")
+
+    if args.save_baseline:
+        save_json(args.baseline, results)
+        print(f"📌 已更新基準 {args.baseline}")
+        return 0
+
+    baseline = load_json(args.baseline)
+    if baseline is None:
+        print(f"\nℹ️ 找不到基準檔案 {args.baseline}，略過比較")
+        return 0
+    if baseline.get("meta", {}).get("count") != args.count:
+        print("\nℹ️ 基準的物件數量不同，略過比較")
+        return 0
+
+    rows, problems = compare(results, baseline, args.threshold)
+    print(f"\n{'指標':<32}{'基準':>10}{'這次':>10}{'變化':>9}")
+    for metric, old, new in rows:
+        change = (new - old) / old if old else 0.0
+        print(f"{metric:<32}{old:>10.1f}{new:>10.1f}{change:>+9.0%}")
+    if problems:
+        print("\n❌ 記憶體用量增加:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+
+    print("\n✅ 記憶體用量沒有超過基準")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+輸入延遲測試
+
+模擬一台開啟垂直同步的螢幕（送出畫面時等到下一次螢幕更新），由自動操作
+玩一局，同時在隨機的時間送出按鍵事件（事件帶著送出的時間），分別用
+一般取樣（畫完馬上開始下一幀）與晚取樣（等到畫面快要送出前才開始）
+執行，比較：
+
+1. 真正的延遲：送出按鍵到處理它的那一幀亮起的時間
+2. 遊戲內建的估計（InputLatency 自己記下的時間戳記）和真正的延遲差多少
+
+晚取樣沒有比較快、或內建的估計誤差太大時以非零代碼結束。
+dummy 顯示驅動的 flip 不會等待螢幕，所以這裡自己模擬垂直同步。
+
+使用方式:
+    python benchmarks/input_latency.py                 # 每種模式 10 秒
+    python benchmarks/input_latency.py --seconds 30 --refresh 120
+    python benchmarks/input_latency.py --endless -o latency.json
+"""
+
+######################載入套件######################
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+# 讓腳本可以直接執行：把專案根目錄加入模組搜尋路徑
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# 無視窗模式：必須在 pygame 初始化前設定
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+######################導入設定######################
+from config import COLORS, FPS
+
+######################導入遊戲模組######################
+from benchmarks.run_benchmarks import save_json, setup_headless
+from game.autopilot import Autopilot
+from game.game_logic import GameState
+from game.latency import FramePacer, InputLatency, LatencyHistogram
+
+######################全域變數######################
+DEFAULT_SECONDS = 10.0  # 每種模式執行幾秒
+DEFAULT_RATE = 40.0  # 平均每秒送出幾個按鍵
+DEFAULT_SEED = 2024
+PROBE_KEY = pygame.K_F12  # 遊戲不會處理的按鍵，只用來量測延遲
+MIN_IMPROVEMENT = 0.15  # 晚取樣的平均延遲至少要比一般取樣少這個比例
+MAX_METER_ERROR_MS = 1.0  # 內建估計的平均延遲和真正的平均延遲最多差幾毫秒
+
+
+######################物件類別######################
+
+
+class VsyncDisplay:
+    """
+    模擬垂直同步的螢幕\n
+    \n
+    螢幕每隔固定的時間更新一次，flip() 等到下一次更新才回傳。\n
+    """
+
+    def __init__(self, refresh_hz):
+        """
+        參數:\n
+        refresh_hz (float): 螢幕更新頻率\n
+        """
+        self.period = 1.0 / refresh_hz
+        self.origin = time.perf_counter()
+
+    def flip(self):
+        """等到下一次螢幕更新"""
+        now = time.perf_counter()
+        refreshes = math.floor((now - self.origin) / self.period) + 1
+        target = self.origin + refreshes * self.period
+        while True:
+            remaining = target - time.perf_counter()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+
+class KeyFeeder:
+    """
+    在隨機的時間送出按鍵事件\n
+    \n
+    按鍵到達的時間是預先排好的（卜瓦松過程），release() 把已經到達的\n
+    按鍵放進 pygame 的事件佇列，事件的 posted 屬性是到達的時間。\n
+    遊戲只有在取出事件時才看得到它們，和真的按鍵一樣。\n
+    """
+
+    def __init__(self, rate, rng):
+        """
+        參數:\n
+        rate (float): 平均每秒幾個按鍵\n
+        rng (random.Random): 亂數產生器\n
+        """
+        self.rate = rate
+        self.rng = rng
+        self.next_at = time.perf_counter() + rng.expovariate(rate)
+        self.posted = 0
+
+    def release(self):
+        """送出已經到達的按鍵"""
+        now = time.perf_counter()
+        while self.next_at <= now:
+            pygame.event.post(
+                pygame.event.Event(pygame.KEYDOWN, key=PROBE_KEY, posted=self.next_at)
+            )
+            self.posted += 1
+            self.next_at += self.rng.expovariate(self.rate)
+
+
+######################定義函式區######################
+
+
+def run_mode(late, seconds, refresh, rate, seed, endless, surface):
+    """
+    用一種取樣方式玩 seconds 秒，量測按鍵的延遲\n
+    \n
+    參數:\n
+    late (bool): 是否晚取樣\n
+    \n
+    回傳:\n
+    tuple: (真正的延遲、內建的估計與節奏控制的統計, 內建的延遲直方圖)\n
+    """
+    random.seed(seed)
+    game = GameState(endless=endless, store=None)
+    game.autopilot = Autopilot()
+    pacer = FramePacer(late=late)
+    meter = InputLatency()
+    display = VsyncDisplay(refresh)
+    feeder = KeyFeeder(rate, random.Random(seed))
+    true = LatencyHistogram()
+    pygame.event.clear()
+
+    def poll():
+        feeder.release()
+        meter.collect()
+
+    frames = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pacer.wait(poll)
+        feeder.release()
+        events = meter.take()
+        for event in events:
+            game.handle_events(event)
+        if game.game_over:
+            game.reset_game()
+        game.update()
+        surface.fill(COLORS["BLACK"])
+        game.draw(surface)
+
+        pacer.flipping()
+        display.flip()
+        presented = pacer.presented()
+        meter.presented(presented)
+        shown = presented + meter.display_latency
+        for event in events:
+            if event.type == pygame.KEYDOWN and event.key == PROBE_KEY:
+                true.record((shown - event.posted) * 1000.0)
+        frames += 1
+
+    result = {
+        "late": late,
+        "frames": frames,
+        "keys": feeder.posted,
+        "true": true.to_dict(),
+        "meter": meter.histogram.to_dict(),
+        "meter_error_ms": meter.histogram.summary()["mean"] - true.summary()["mean"],
+        "pacer": pacer.stats(),
+    }
+    return result, meter.histogram
+
+
+def print_mode(name, result):
+    """印出一種取樣方式的結果"""
+    true, meter = result["true"], result["meter"]
+    print(
+        f"{name:<8}{true['p50']:>8.0f}{true['p90']:>8.0f}{true['p99']:>8.0f}"
+        f"{true['mean']:>10.2f}{meter['mean']:>10.2f}{result['meter_error_ms']:>+9.2f}"
+        f"{result['pacer']['missed']:>8}"
+    )
+
+
+def main(argv=None):
+    """命令列進入點"""
+    parser = argparse.ArgumentParser(description="敲磚塊遊戲輸入延遲測試")
+    parser.add_argument(
+        "--seconds", type=float, default=DEFAULT_SECONDS, help="每種模式執行幾秒"
+    )
+    parser.add_argument("--refresh", type=float, default=FPS, help="模擬的螢幕更新頻率")
+    parser.add_argument(
+        "--rate", type=float, default=DEFAULT_RATE, help="平均每秒送出幾個按鍵"
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="亂數種子")
+    parser.add_argument("--endless", action="store_true", help="使用無盡模式")
+    parser.add_argument("-o", "--output", help="把結果寫成 JSON")
+    args = parser.parse_args(argv)
+
+    surface = setup_headless()
+    results, histograms = {}, {}
+    for name, late in (("early", False), ("late", True)):
+        results[name], histograms[name] = run_mode(
+            late,
+            args.seconds,
+            args.refresh,
+            args.rate,
+            args.seed,
+            args.endless,
+            surface,
+        )
+
+    print(
+        f"模擬 {args.refresh:g} Hz 垂直同步的螢幕，"
+        f"延遲包含設定的螢幕延遲（單位 ms）"
+    )
+    print(
+        f"{'取樣':<8}{'p50':>8}{'p90':>8}{'p99':>8}{'平均':>10}"
+        f"{'內建估計':>10}{'誤差':>9}{'晚送出':>8}"
+    )
+    print_mode("一般", results["early"])
+    print_mode("晚取樣", results["late"])
+
+    print("\n晚取樣的內建延遲直方圖:")
+    for line in histograms["late"].format_lines():
+        print(f"  {line}")
+
+    if args.output:
+        save_json(args.output, {"config": vars(args), "results": results})
+        print(f"\n💾 結果已寫入 {args.output}")
+
+    early_mean = results["early"]["true"]["mean"]
+    late_mean = results["late"]["true"]["mean"]
+    failed = False
+    if late_mean > early_mean * (1.0 - MIN_IMPROVEMENT):
+        print(f"\n❌ 晚取樣的平均延遲沒有比一般取樣少 {MIN_IMPROVEMENT:.0%} 以上")
+        failed = True
+    for name, result in results.items():
+        if abs(result["meter_error_ms"]) > MAX_METER_ERROR_MS:
+            print(
+                f"\n❌ {name} 的內建估計和真正的延遲差了 "
+                f"{result['meter_error_ms']:+.2f} ms"
+            )
+            failed = True
+    if failed:
+        return 1
+    print(
+        f"\n✅ 晚取樣的平均延遲從 {early_mean:.1f} ms 降到 {late_mean:.1f} ms，"
+        f"內建估計和真正的延遲相符"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+對戰回溯測試
+
+分成兩部分：
+
+1. 成本：在一場由電腦操作的對戰中，量測快照、恢復快照與模擬一幀的時間，
+   以及最壞情況的回溯（恢復快照後重新模擬 MAX_ROLLBACK 幀，每一幀都要
+   重新建立快照）是否放得進一幀的時間（1000 / FPS 毫秒）
+2. 同步：在同一個行程中建立兩個對戰端，透過本機的 UDP 交換輸入；兩邊都只
+   每隔幾幀送一次封包，並隨機丟掉一部分封包，對手的輸入一定會晚到、預測
+   一定會錯。最後兩邊的狀態必須和用全部的正確輸入從頭模擬一次的結果相同，
+   不同時以非零代碼結束。
+
+使用方式:
+    python benchmarks/rollback.py                     # 預設 1800 幀
+    python benchmarks/rollback.py --frames 3600 --endless
+    python benchmarks/rollback.py --send-every 4 --loss 0.2 -o rollback.json
+"""
+
+######################載入套件######################
+import argparse
+import os
+import random
+import sys
+import time
+
+# 讓腳本可以直接執行：把專案根目錄加入模組搜尋路徑
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# 無視窗模式：必須在 pygame 初始化前設定
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+######################導入設定######################
+from config import FPS, VERSUS_CONFIG
+
+######################導入遊戲模組######################
+from benchmarks.run_benchmarks import save_json, setup_headless, summarize
+from game.netplay import NetplayPeer
+from game.rollback import RollbackSession, get_clock
+from game.versus import VersusMatch, INPUT_LEFT, INPUT_RIGHT, INPUT_LAUNCH
+
+######################全域變數######################
+DEFAULT_FRAMES = 1800
+DEFAULT_SEED = 2024
+
+
+######################物件類別######################
+
+
+class Bot:
+    """
+    電腦玩家：把底板移向最快落地的球，偶爾亂按一下\n
+    \n
+    亂按讓輸入常常改變，對手的預測（沿用最後一個輸入）才會經常猜錯。\n
+    """
+
+    def __init__(self, seed, jitter=0.15):
+        """
+        參數:\n
+        seed (int): 亂數種子（使用自己的產生器，不影響對戰的亂數）\n
+        jitter (float): 每一幀亂按的機率\n
+        """
+        self.rng = random.Random(seed)
+        self.jitter = jitter
+
+    def input(self, game):
+        """
+        回傳這一幀的輸入\n
+        \n
+        參數:\n
+        game (GameState): 這個玩家的一局遊戲\n
+        """
+        if self.rng.random() < self.jitter:
+            return self.rng.choice((0, INPUT_LEFT, INPUT_RIGHT))
+        bits = 0
+        target = None
+        for ball in game.balls:
+            if ball.stuck:
+                bits |= INPUT_LAUNCH
+            elif ball.vy > 0 and (target is None or ball.y > target.y):
+                target = ball
+        if target is not None:
+            center = game.paddle.x + game.paddle.width / 2
+            if target.x < center - 8:
+                bits |= INPUT_LEFT
+            elif target.x > center + 8:
+                bits |= INPUT_RIGHT
+        return bits
+
+
+######################定義函式區######################
+
+
+def measure_cost(frames, seed, endless):
+    """
+    量測快照、恢復與最壞情況回溯的時間\n
+    \n
+    回傳:\n
+    dict: 量測結果\n
+    """
+    depth = VERSUS_CONFIG["MAX_ROLLBACK"]
+    match = VersusMatch(seed, endless)
+    bots = [Bot(seed + player) for player in range(2)]
+    history = []  # 每一幀之前的快照與輸入，最多保留 depth 幀
+    save_samples, load_samples, step_samples, rollback_samples = [], [], [], []
+
+    for _ in range(frames):
+        if match.finished:
+            break
+        inputs = tuple(bot.input(game) for bot, game in zip(bots, match.players))
+
+        started = time.perf_counter()
+        state = match.save()
+        save_samples.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        match.step(inputs)
+        step_samples.append(time.perf_counter() - started)
+
+        history.append((state, inputs))
+        if len(history) > depth:
+            del history[0]
+        if len(history) < depth:
+            continue
+
+        # 最壞情況：倒回 depth 幀之前，每一幀重新建立快照並模擬
+        started = time.perf_counter()
+        match.load(history[0][0])
+        load_samples.append(time.perf_counter() - started)
+        for index, (_, replay) in enumerate(history):
+            history[index] = (match.save(), replay)
+            match.step(replay)
+        rollback_samples.append(time.perf_counter() - started)
+
+    return {
+        "frames": match.frame,
+        "depth": depth,
+        "bricks": [len(game.bricks) for game in match.players],
+        "save": summarize(save_samples),
+        "load": summarize(load_samples),
+        "step": summarize(step_samples),
+        "rollback": summarize(rollback_samples),
+        "budget_ms": 1000.0 / FPS,
+    }
+
+
+def run_sync(frames, seed, endless, send_every, loss):
+    """
+    兩個對戰端透過本機 UDP 對戰，比較兩邊與從頭重新模擬的結果\n
+    \n
+    回傳:\n
+    dict: 量測結果\n
+    """
+    host = NetplayPeer(("127.0.0.1", 0), host=True, endless=endless)
+    if not host.start():
+        raise SystemExit(1)
+    host.address = host.sock.getsockname()
+    guest = NetplayPeer(host.address)
+    guest.start()
+    peers = (host, guest)
+    sessions = [None, None]
+    bots = [Bot(seed + player) for player in range(2)]
+    drop = random.Random(seed)
+    advance_samples = []
+
+    # 連線：加入的一方送出 HELLO，開對戰的一方回覆這一場的設定
+    deadline = time.monotonic() + 5.0
+    while guest.state != "playing" or host.state != "playing":
+        if time.monotonic() > deadline:
+            print("❌ 無法在本機建立對戰連線")
+            raise SystemExit(1)
+        for peer in peers:
+            peer.poll()
+        time.sleep(0.001)
+    for index, peer in enumerate(peers):
+        match = VersusMatch(peer.seed, peer.endless)
+        sessions[index] = RollbackSession(
+            match, peer.local, delay=peer.delay, max_rollback=peer.max_rollback
+        )
+
+    tick = 0
+    while min(session.frame for session in sessions) < frames:
+        tick += 1
+        for peer, session, bot in zip(peers, sessions, bots):
+            peer.poll(session)
+            if session.frame < frames:
+                game = session.simulation.players[peer.local]
+                started = time.perf_counter()
+                if session.advance(bot.input(game)):
+                    advance_samples.append(time.perf_counter() - started)
+            # 只每隔幾幀送一次，並隨機丟掉封包：對手的輸入一定會晚到
+            if tick % send_every == 0 and drop.random() >= loss:
+                peer.send_inputs(session)
+        if tick > frames * 20:
+            print("❌ 對戰卡住了（輸入一直沒有送到）")
+            raise SystemExit(1)
+
+    # 把最後幾幀的輸入送完，兩邊都用正確的輸入重新模擬到同一幀
+    deadline = time.monotonic() + 5.0
+    while any(session.confirmed < frames for session in sessions):
+        if time.monotonic() > deadline:
+            print("❌ 最後幾幀的輸入沒有送到")
+            raise SystemExit(1)
+        for peer, session in zip(peers, sessions):
+            peer.send_inputs(session)
+        for peer, session in zip(peers, sessions):
+            peer.poll(session)
+    for session in sessions:
+        session.rollback()
+
+    # 用全部的正確輸入從頭模擬一次
+    reference = VersusMatch(host.seed, host.endless)
+    logs = sessions[0].inputs
+    for frame in range(frames):
+        reference.step((logs[0][frame], logs[1][frame]))
+    expected = reference.checksum()
+    checksums = [session.simulation.checksum() for session in sessions]
+
+    for peer in peers:
+        peer.close()
+    return {
+        "frames": frames,
+        "send_every": send_every,
+        "loss": loss,
+        "advance": summarize(advance_samples),
+        "sessions": [session.stats() for session in sessions],
+        "peers": [peer.stats() for peer in peers],
+        "scores": [game.score for game in reference.players],
+        "in_sync": all(checksum == expected for checksum in checksums)
+        and [known[:frames] for known in logs]
+        == [known[:frames] for known in sessions[1].inputs]
+        and not any(session.desyncs for session in sessions),
+    }
+
+
+def main(argv=None):
+    """命令列進入點"""
+    parser = argparse.ArgumentParser(description="敲磚塊遊戲對戰回溯測試")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES, help="幀數")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="亂數種子")
+    parser.add_argument("--endless", action="store_true", help="使用無盡模式")
+    parser.add_argument(
+        "--send-every", type=int, default=3, help="同步測試每隔幾幀送一次封包"
+    )
+    parser.add_argument(
+        "--loss", type=float, default=0.1, help="同步測試丟掉封包的比例"
+    )
+    parser.add_argument("-o", "--output", help="把結果寫成 JSON")
+    args = parser.parse_args(argv)
+
+    setup_headless()
+    clock = get_clock()
+    clock.install()
+    try:
+        cost = measure_cost(args.frames, args.seed, args.endless)
+        sync = run_sync(
+            args.frames, args.seed, args.endless, args.send_every, args.loss
+        )
+    finally:
+        clock.uninstall()
+
+    budget = cost["budget_ms"]
+    print(f"對戰 {cost['frames']} 幀，磚塊 {cost['bricks']}")
+    print(f"{'項目':<20}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, label in (
+        ("save", "建立快照（兩局）"),
+        ("load", "恢復快照（兩局）"),
+        ("step", "模擬一幀（兩局）"),
+        ("rollback", f"回溯 {cost['depth']} 幀"),
+    ):
+        summary = cost[name]
+        print(
+            f"{label:<20}{summary['p50']:>10.3f}{summary['p99']:>10.3f}"
+            f"{summary['max']:>10.3f}"
+        )
+    print(f"一幀的時間 {budget:.1f} ms")
+
+    print(
+        f"\n本機 UDP 對戰 {sync['frames']} 幀"
+        f"（每 {sync['send_every']} 幀送一次，丟掉 {sync['loss']:.0%} 的封包）"
+    )
+    for index, stats in enumerate(sync["sessions"]):
+        peer = sync["peers"][index]
+        print(
+            f"  玩家 {index}: 回溯 {stats['rollbacks']} 次"
+            f"（共 {stats['rollback_frames']} 幀，最久 {stats['max_rollback_ms']:.2f} ms），"
+            f"暫停 {stats['stalls']} 幀，送出 {peer['packets_sent']} 個封包"
+            f"（{peer['bytes_sent'] / 1024:.1f} KB）"
+        )
+    print(
+        f"  每幀 advance p50 {sync['advance']['p50']:.3f} ms，"
+        f"p99 {sync['advance']['p99']:.3f} ms；分數 {sync['scores']}"
+    )
+
+    if args.output:
+        save_json(args.output, {"cost": cost, "sync": sync})
+        print(f"\n💾 結果已寫入 {args.output}")
+
+    failed = False
+    if cost["rollback"]["p99"] > budget:
+        print(f"\n❌ 回溯 {cost['depth']} 幀超過一幀的時間")
+        failed = True
+    if not sync["in_sync"]:
+        print("\n❌ 兩邊的模擬和正確的結果不同")
+        failed = True
+    if failed:
+        return 1
+    print("\n✅ 回溯放得進一幀的時間，兩邊的模擬完全相同")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
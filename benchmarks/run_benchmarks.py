@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+"""
+效能測試執行器
+
+在無視窗模式下執行所有具名情境，分別量測 GameState.update 與
+GameState.draw（畫到離屏 Surface）的時間，輸出 JSON 結果，
+並可與儲存的基準結果比較，超過回歸門檻時以非零代碼結束。
+
+使用方式:
+    python benchmarks/run_benchmarks.py                     # 執行全部情境
+    python benchmarks/run_benchmarks.py -s balls_1000       # 只執行指定情境
+    python benchmarks/run_benchmarks.py --save-baseline     # 把結果存成新的基準
+    python benchmarks/run_benchmarks.py --threshold 0.1     # 慢 10% 以上就算回歸
+    python benchmarks/run_benchmarks.py --memory            # 另外量測每幀記憶體配置
+    python benchmarks/run_benchmarks.py --baseline base.json --require-baseline  # CI：沒有基準就失敗
+"""
+
+######################載入套件######################
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+# 讓腳本可以直接執行：把專案根目錄加入模組搜尋路徑
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# 無視窗模式：必須在 pygame 初始化前設定
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+######################導入設定######################
+from config import WINDOW_WIDTH, WINDOW_HEIGHT
+
+######################導入遊戲模組######################
+from game.profiler import count_entities
+
+######################全域變數######################
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, "benchmarks", "baseline.json")
+DEFAULT_THRESHOLD = 0.20  # 比基準慢 20% 以上視為回歸
+DEFAULT_RETRIES = 2  # 發現回歸時重新執行那些情境幾次，排除偶發的雜訊
+MIN_DELTA_MS = 0.05  # 時間指標至少要慢這麼多毫秒才算回歸（太短的時間雜訊比例很大）
+PERCENTILES = (50, 90, 99)
+
+# 與基準比較的指標：(區段, 統計值)，記憶體指標只有在使用 --memory 時才會出現
+COMPARED_METRICS = [
+    ("update", "p50"),
+    ("update", "p90"),
+    ("draw", "p50"),
+    ("draw", "p90"),
+    ("memory", "frame_peak_kb_p90"),
+    ("memory", "frame_blocks_p90"),
+]
+
+
+######################定義函式區######################
+
+
+def setup_headless():
+    """
+    初始化無視窗環境\n
+    \n
+    只初始化顯示（鍵盤狀態需要）與字體模組，\n
+    繪製目標是一個和視窗同大小的離屏 Surface。\n
+    \n
+    回傳:\n
+    pygame.Surface: 離屏繪製目標\n
+    """
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode((1, 1))
+    return pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+
+
+def percentile(sorted_values, pct):
+    """以線性內插計算已排序數列的百分位數"""
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    frac = rank - low
+    return sorted_values[low] * (1 - frac) + sorted_values[high] * frac
+
+
+def summarize(samples):
+    """
+    計算一組時間樣本（秒）的統計值\n
+    \n
+    回傳:\n
+    dict: mean、min、max 與各百分位數，單位皆為毫秒\n
+    """
+    values = sorted(sample * 1000.0 for sample in samples)
+    summary = {
+        "samples": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "min": values[0] if values else 0.0,
+        "max": values[-1] if values else 0.0,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}"] = percentile(values, pct)
+    return summary
+
+
+def run_scenario(scenario, surface, seed=0, warmup=3):
+    """
+    執行單一情境並量測每幀的更新與繪製時間\n
+    \n
+    參數:\n
+    scenario (Scenario): 要執行的情境\n
+    surface (pygame.Surface): 離屏繪製目標\n
+    seed (int): 亂數種子，讓每次執行的情境內容相同\n
+    warmup (int): 正式量測前先跑的幀數\n
+    \n
+    回傳:\n
+    dict: 該情境的量測結果\n
+    """
+    random.seed(seed)
+    state = scenario.build()
+    initial = count_entities(state)
+
+    update_samples = []
+    draw_samples = []
+    clock = time.perf_counter
+
+    for frame in range(warmup + scenario.frames):
+        # 補充物件或重建狀態（不計入時間）
+        if scenario.refresh is not None:
+            state = scenario.refresh(state) or state
+
+        start = clock()
+        state.update()
+        middle = clock()
+        state.draw(surface)
+        end = clock()
+
+        if frame >= warmup:
+            update_samples.append(middle - start)
+            draw_samples.append(end - middle)
+
+    return {
+        "description": scenario.description,
+        "frames": scenario.frames,
+        "entities": {"initial": initial, "final": count_entities(state)},
+        "update": summarize(update_samples),
+        "draw": summarize(draw_samples),
+    }
+
+
+def run_memory_scenario(scenario, surface, seed=0, warmup=3):
+    """
+    以 tracemalloc 重新執行情境，量測每幀的記憶體配置\n
+    \n
+    記憶體追蹤會拖慢執行速度，所以和計時分開跑。\n
+    \n
+    參數:\n
+    scenario (Scenario): 要執行的情境\n
+    surface (pygame.Surface): 離屏繪製目標\n
+    seed (int): 亂數種子\n
+    warmup (int): 正式量測前先跑的幀數\n
+    \n
+    回傳:\n
+    dict: 每幀記憶體配置的統計與各子系統的平均配置\n
+    """
+    from game.memtrack import MemoryTracker
+
+    random.seed(seed)
+    state = scenario.build()
+    tracker = MemoryTracker(history_frames=scenario.frames)
+    tracker.start()
+    tracker.attach(state)
+    try:
+        for frame in range(warmup + scenario.frames):
+            if scenario.refresh is not None:
+                new_state = scenario.refresh(state) or state
+                if new_state is not state:
+                    tracker.detach()
+                    tracker.attach(new_state)
+                    state = new_state
+
+            if frame == warmup:
+                tracker.reset()  # 暖身結束，清掉暖身期間的統計
+
+            # 先回收換掉的狀態與上一幀的暫存物件，免得它們的釋放混進
+            # 這一幀的量測
+            gc.collect()
+
+            tracker.begin_frame()
+            state.update()
+            state.draw(surface)
+            tracker.end_frame()
+    finally:
+        tracker.stop()
+
+    summary = tracker.summary()
+    result = {"subsystems": summary["subsystems"]}
+    for key in ("frame_peak_kb", "frame_net_kb", "frame_blocks"):
+        for stat, value in summary[key].items():
+            result[f"{key}_{stat}"] = value
+    return result
+
+
+def collect_metadata():
+    """收集執行環境資訊，方便判斷結果是否可比較"""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    和基準結果比較，找出變慢超過門檻的指標\n
+    \n
+    參數:\n
+    results (dict): 本次結果\n
+    baseline (dict): 基準結果\n
+    threshold (float): 允許的變慢比例，0.2 表示 20%\n
+    \n
+    回傳:\n
+    list: 每個元素為 (情境, 指標, 基準值, 本次值, 變化比例)，\n
+    只包含超過門檻的項目\n
+    """
+    regressions = []
+    base_scenarios = baseline.get("scenarios", {})
+    for name, current in results.get("scenarios", {}).items():
+        base = base_scenarios.get(name)
+        if base is None:
+            continue
+        for section, stat in COMPARED_METRICS:
+            try:
+                old = base[section][stat]
+                new = current[section][stat]
+            except KeyError:
+                continue
+            if old <= 0:
+                continue
+            if section in ("update", "draw") and new - old < MIN_DELTA_MS:
+                continue
+            change = (new - old) / old
+            if change > threshold:
+                regressions.append((name, f"{section}.{stat}", old, new, change))
+    return regressions
+
+
+def keep_best(results, rerun):
+    """
+    把重新執行的結果併入本次結果，每個比較的指標保留較快（較小）的一次\n
+    \n
+    參數:\n
+    results (dict): 本次結果（會被修改）\n
+    rerun (dict): 重新執行部分情境的結果\n
+    """
+    for name, current in rerun["scenarios"].items():
+        best = results["scenarios"].get(name)
+        if best is None:
+            results["scenarios"][name] = current
+            continue
+        for section, stat in COMPARED_METRICS:
+            try:
+                best[section][stat] = min(best[section][stat], current[section][stat])
+            except KeyError:
+                continue
+
+
+def print_report(results):
+    """在終端機印出結果摘要"""
+    header = f"{'情境':<20}{'update p50':>12}{'p99':>10}{'draw p50':>12}{'p99':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results["scenarios"].items():
+        update = result["update"]
+        draw = result["draw"]
+        print(
+            f"{name:<20}{update['p50']:>10.3f}ms{update['p99']:>8.3f}ms"
+            f"{draw['p50']:>10.3f}ms{draw['p99']:>8.3f}ms"
+        )
+        memory = result.get("memory")
+        if memory:
+            print(
+                f"{'':<20}記憶體: 每幀峰值 p90 {memory['frame_peak_kb_p90']:.1f}KB，"
+                f"淨增區塊 p90 {memory['frame_blocks_p90']}"
+            )
+
+
+def run_all(names=None, seed=0, memory=False):
+    """
+    執行指定（或全部）情境並回傳完整結果\n
+    \n
+    參數:\n
+    names (list): 情境名稱列表，None 表示全部\n
+    seed (int): 亂數種子\n
+    memory (bool): 是否另外量測每幀的記憶體配置\n
+    """
+    from benchmarks.scenarios import get_scenarios
+
+    surface = setup_headless()
+    results = {"meta": collect_metadata(), "scenarios": {}}
+    for scenario in get_scenarios(names):
+        print(f"▶ {scenario.name}: {scenario.description}")
+        result = run_scenario(scenario, surface, seed)
+        if memory:
+            result["memory"] = run_memory_scenario(scenario, surface, seed)
+        results["scenarios"][scenario.name] = result
+    return results
+
+
+def load_json(path):
+    """讀取 JSON 檔案，檔案不存在時回傳 None"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(path, data):
+    """把資料寫成 JSON 檔案"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def main(argv=None):
+    """
+    效能測試主程式\n
+    \n
+    回傳:\n
+    int: 0 表示沒有回歸，1 表示有指標超過門檻\n
+    """
+    parser = argparse.ArgumentParser(description="敲磚塊遊戲效能測試")
+    parser.add_argument("-s", "--scenario", action="append", help="只執行指定情境")
+    parser.add_argument("-o", "--output", help="把結果寫到指定 JSON 檔案")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基準結果檔案")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD, help="回歸門檻比例"
+    )
+    parser.add_argument("--save-baseline", action="store_true", help="把結果存成基準")
+    parser.add_argument(
+        "--require-baseline",
+        action="store_true",
+        help="找不到基準檔案時視為失敗（CI 使用，不會略過回歸比較）",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        help="發現回歸時重新執行那些情境幾次（每個指標取最快的一次）",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="亂數種子")
+    parser.add_argument(
+        "--memory", action="store_true", help="另外以 tracemalloc 量測每幀記憶體配置"
+    )
+    args = parser.parse_args(argv)
+
+    results = run_all(args.scenario, args.seed, args.memory)
+    print()
+    print_report(results)
+
+    if args.save_baseline:
+        if args.output:
+            save_json(args.output, results)
+            print(f"\n💾 結果已寫入 {args.output}")
+        save_json(args.baseline, results)
+        print(f"📌 已更新基準 {args.baseline}")
+        return 0
+
+    baseline = load_json(args.baseline)
+    if baseline is None:
+        if args.output:
+            save_json(args.output, results)
+            print(f"\n💾 結果已寫入 {args.output}")
+        if args.require_baseline:
+            print(f"\n❌ 找不到基準檔案 {args.baseline}，無法進行回歸比較")
+            return 1
+        print(f"\nℹ️ 找不到基準檔案 {args.baseline}，略過回歸比較")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    # 偶發的雜訊（例如其他行程搶 CPU）不該讓測試失敗：只重新執行變慢的情境，
+    # 每個指標取最快的一次，真正的回歸每次都會變慢
+    for attempt in range(args.retries):
+        if not regressions:
+            break
+        names = sorted({name for name, *_ in regressions})
+        print(f"\n🔁 重新執行 {', '.join(names)} 確認回歸（第 {attempt + 1} 次）")
+        keep_best(results, run_all(names, args.seed, args.memory))
+        regressions = compare(results, baseline, args.threshold)
+
+    if args.output:
+        save_json(args.output, results)
+        print(f"\n💾 結果已寫入 {args.output}")
+
+    if not regressions:
+        print(f"\n✅ 沒有超過 {args.threshold:.0%} 的效能回歸")
+        return 0
+
+    print(f"\n❌ 發現 {len(regressions)} 項效能回歸（門檻 {args.threshold:.0%}）:")
+    for name, metric, old, new, change in regressions:
+        print(f"  {name} {metric}: {old:.3f} → {new:.3f} (+{change:.0%})")
+    return 1
+
+
+######################主程式######################
+
+if __name__ == "__main__":
+    sys.exit(main())
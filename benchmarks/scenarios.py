@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+效能測試情境模組
+
+每個情境都會建立一個特定狀態的 GameState，例如超大磚塊陣列、
+上千顆球或兩萬個碎片，讓效能測試可以重現各種極端狀況。
+"""
+
+######################載入套件######################
+import math
+import random
+
+######################導入設定######################
+from config import (
+    WINDOW_WIDTH,
+    WINDOW_HEIGHT,
+    BRICK_CONFIG,
+    ROW_COLORS,
+    COLORS,
+)
+
+######################導入遊戲模組######################
+from game.objects import Brick, Ball
+from game.effects import create_shards
+from game.game_logic import GameState
+from game import levels, prefetch
+
+######################物件類別######################
+
+
+class Scenario:
+    """
+    一個具名的效能測試情境\n
+    \n
+    屬性:\n
+    name (str): 情境名稱（用於輸出與基準比較）\n
+    description (str): 情境說明\n
+    build (callable): 建立並回傳 GameState 的函數\n
+    frames (int): 要量測的幀數\n
+    refresh (callable): 每幀量測前呼叫（不計時），可補充物件或回傳新的狀態\n
+    """
+
+    def __init__(self, name, description, build, frames=120, refresh=None):
+        self.name = name
+        self.description = description
+        self.build = build
+        self.frames = frames
+        self.refresh = refresh
+
+
+######################定義函式區######################
+
+
+def build_grid(rows, cols, tnt_ratio=0.0, blinking_ratio=0.0, alive_ratio=1.0):
+    """
+    建立填滿磚塊區域的磚塊陣列\n
+    \n
+    磚塊會縮小尺寸以塞進預設的磚塊區域（視窗上半部），\n
+    所以不論行列數多少都能畫在同一個畫面上。\n
+    \n
+    參數:\n
+    rows (int): 行數\n
+    cols (int): 列數\n
+    tnt_ratio (float): TNT 磚塊比例，範圍 0 到 1\n
+    blinking_ratio (float): 閃爍磚塊比例，範圍 0 到 1\n
+    alive_ratio (float): 尚未被打掉的磚塊比例，範圍 0 到 1\n
+    \n
+    回傳:\n
+    list: 磚塊列表\n
+    """
+    margin = BRICK_CONFIG["MARGIN_LEFT"]
+    area_width = WINDOW_WIDTH - 2 * margin
+    area_height = WINDOW_HEIGHT // 2 - BRICK_CONFIG["MARGIN_TOP"]
+    cell_w = area_width / cols
+    cell_h = area_height / rows
+    width = max(1, int(cell_w * 0.9))
+    height = max(1, int(cell_h * 0.9))
+
+    bricks = []
+    for row in range(rows):
+        for col in range(cols):
+            x = int(margin + col * cell_w)
+            y = int(BRICK_CONFIG["MARGIN_TOP"] + row * cell_h)
+            color = ROW_COLORS[row % len(ROW_COLORS)]
+            brick = Brick(x, y, width, height, color)
+            if random.random() < tnt_ratio:
+                brick.is_tnt = True
+                brick.color = COLORS["BRICK_TNT"]
+            elif random.random() < blinking_ratio:
+                brick.is_blinking = True
+            if random.random() >= alive_ratio:
+                brick.hit = True
+            bricks.append(brick)
+    return bricks
+
+
+def launch_balls(state, count):
+    """在畫面中央補充指定數量、方向隨機且已發射的球"""
+    template = state.balls[0] if state.balls else Ball(0, 0)
+    for _ in range(count):
+        ball = Ball(
+            random.uniform(100, WINDOW_WIDTH - 100),
+            random.uniform(WINDOW_HEIGHT // 2, WINDOW_HEIGHT - 150),
+            template.radius,
+            template.color,
+            template.speed,
+        )
+        ball.stuck = False
+        angle = random.uniform(-math.pi, 0)
+        ball.vx = math.cos(angle) * ball.speed
+        ball.vy = math.sin(angle) * ball.speed
+        state.balls.append(ball)
+
+
+def widen_paddle(state):
+    """把底板拉到整個畫面寬，讓球不會掉落而提早結束遊戲"""
+    state.paddle.x = 0
+    state.paddle.width = WINDOW_WIDTH
+
+
+def new_state(bricks=None):
+    """建立一個球已發射、底板加寬的遊戲狀態"""
+    state = GameState()
+    if bricks is not None:
+        state.bricks = bricks
+    for ball in state.balls:
+        ball.launch()
+    widen_paddle(state)
+    return state
+
+
+######################情境定義######################
+
+
+def _build_default():
+    return new_state()
+
+
+def _build_large_board():
+    return new_state(build_grid(100, 100, tnt_ratio=0.01, blinking_ratio=0.01))
+
+
+def _build_huge_board():
+    # 500x500 的超大場地：攝影機只看得到其中一小塊，碰撞用空間索引
+    state = new_state()
+    level = levels.load_level("mega")
+    state.level_map = level
+    state.bricks, state.brick_layer, state.board = prefetch.build_level(level)
+    state.fit_world(state.board.width, state.board.height)
+    for ball in state.balls:
+        ball.launch()
+    state.paddle.x = 0
+    state.paddle.width = state.world_width
+    return state
+
+
+def _build_many_balls():
+    state = new_state()
+    launch_balls(state, 1000 - len(state.balls))
+    return state
+
+
+def _build_tnt_chain():
+    state = new_state(build_grid(20, 40, tnt_ratio=1.0))
+    # 讓第一顆 TNT 的倒數已經結束，下一次更新就會引爆整片連鎖
+    first = state.bricks[0]
+    first.start_priming()
+    first.tnt_primed_start -= first.tnt_blink_duration * 2 * first.tnt_blink_repeats
+    return state
+
+
+def _refresh_tnt_chain(state):
+    # 每一幀都重新布置一整片 TNT，讓每個樣本都量到完整連鎖
+    return _build_tnt_chain()
+
+
+SHARD_TARGET = 20000
+
+
+def _top_up_shards(state):
+    colors = COLORS["SHARD_COLORS"]
+    missing = SHARD_TARGET - state.effect_counts()["shards"]
+    area = (0, 0, WINDOW_WIDTH, WINDOW_HEIGHT // 2)
+    create_shards(
+        state.world, [(area, random.choice(colors), 1) for _ in range(missing)]
+    )
+    return state
+
+
+def _build_many_shards():
+    return _top_up_shards(new_state())
+
+
+def _build_sparse_late_level():
+    state = new_state(
+        build_grid(
+            BRICK_CONFIG["ROWS"] * 4,
+            BRICK_CONFIG["COLS"] * 2,
+            tnt_ratio=0.05,
+            blinking_ratio=0.05,
+            alive_ratio=0.05,
+        )
+    )
+    state.level = 25
+    state.score = 250000
+    return state
+
+
+SCENARIOS = [
+    Scenario("default_board", "預設 10x5 磚塊陣列、一顆球", _build_default),
+    Scenario("board_100x100", "100x100 磚塊陣列（一萬塊磚）", _build_large_board, 30),
+    Scenario(
+        "board_500x500", "500x500 超大場地（二十五萬塊磚）", _build_huge_board, 120
+    ),
+    Scenario("balls_1000", "預設磚塊陣列、一千顆球", _build_many_balls, 60),
+    Scenario(
+        "tnt_chain_all",
+        "20x40 全 TNT 陣列的完整連鎖爆炸",
+        _build_tnt_chain,
+        10,
+        refresh=_refresh_tnt_chain,
+    ),
+    Scenario(
+        "shards_20k",
+        "畫面上維持兩萬個碎片",
+        _build_many_shards,
+        60,
+        refresh=_top_up_shards,
+    ),
+    Scenario(
+        "late_level_sparse",
+        "後期關卡、只剩 5% 磚塊的稀疏陣列",
+        _build_sparse_late_level,
+    ),
+]
+
+
+def get_scenarios(names=None):
+    """
+    取得要執行的情境\n
+    \n
+    參數:\n
+    names (list): 情境名稱列表，None 表示全部\n
+    \n
+    回傳:\n
+    list: Scenario 物件列表\n
+    """
+    if not names:
+        return list(SCENARIOS)
+    by_name = {scenario.name: scenario for scenario in SCENARIOS}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise KeyError(f"未知的情境: {', '.join(unknown)}")
+    return [by_name[name] for name in names]
@@ -0,0 +1,576 @@
+# -*- coding: utf-8 -*-
+"""
+長時間穩定性測試（soak test）
+
+在無視窗模式下用自動操作的底板連續玩上千關，中間會不斷經過
+create_new_bricks（過關）與 reset_game（遊戲結束或定期重開），
+每隔一段遊戲時間取樣一次 RSS、垃圾回收各代計數、物件列表長度
+與幀時間百分位數，最後檢查是否有持續成長（記憶體洩漏）或幀時間
+逐漸變慢的情況，有的話以代碼 1 結束。
+
+預設使用壓縮時間：遊戲時鐘每幀固定前進 1/FPS 秒，不等待真實時間，
+並且只每隔幾幀繪製一次，所以 24 小時的遊戲時間可以在幾分鐘內跑完。
+
+使用方式:
+    python benchmarks/soak.py                        # 壓縮時間跑 24 小時的遊戲量
+    python benchmarks/soak.py --hours 2 --sample-interval 60
+    python benchmarks/soak.py --realtime --hours 8   # 以真實速度執行（機台實測）
+    python benchmarks/soak.py -o soak.json --growth-tolerance 0.05
+    python benchmarks/soak.py --endless --hours 4      # 無盡模式（磚塊行持續回收）
+    python benchmarks/soak.py --autopilot --hours 2    # 底板由自動操作移動（預測落點）
+"""
+
+######################載入套件######################
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+
+# 讓腳本可以直接執行：把專案根目錄加入模組搜尋路徑
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# 無視窗模式：必須在 pygame 初始化前設定
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+######################導入設定######################
+from config import WINDOW_WIDTH, FPS, GC_CONFIG
+
+######################導入遊戲模組######################
+from benchmarks.run_benchmarks import setup_headless, summarize, save_json
+from game.autopilot import Autopilot
+from game.game_logic import GameState
+from game.gcpolicy import GCPolicy
+from game.profiler import count_entities
+
+######################全域變數######################
+DEFAULT_HOURS = 24.0  # 要跑幾小時的遊戲時間
+DEFAULT_SAMPLE_INTERVAL = 300.0  # 每隔幾秒（遊戲時間）取樣一次
+DEFAULT_DRAW_EVERY = 120  # 壓縮時間時每幾幀繪製一次
+DEFAULT_MAX_LEVEL_SECONDS = 30.0  # 一關最多玩幾秒，超過就直接清空磚塊進入下一關
+DEFAULT_RESET_EVERY = 50  # 每過幾關就 reset_game 一次
+DEFAULT_MAX_BALLS = 3  # 多球超過這個數量時，多出來的球視為漏接
+DEFAULT_GROWTH_TOLERANCE = 0.10  # 最後四分之一比最前四分之一多 10% 以上算成長
+DEFAULT_DRIFT_TOLERANCE = 0.25  # 幀時間 p90 變慢 25% 以上算漂移
+WARMUP_FRACTION = 0.1  # 分析時略過最前面的樣本（快取與配置器暖身）
+
+# 檢查持續成長的指標：(指標名稱, 可忽略的絕對變化量)
+GROWTH_METRICS = (
+    ("rss_mb", 2.0),
+    ("gc_objects", 2000),
+    ("balls", 20),
+    ("shards", 500),
+    ("eggs", 20),
+    ("explosions", 20),
+)
+
+# 檢查幀時間漂移的指標：(指標名稱, 可忽略的絕對變化量，毫秒)
+DRIFT_METRICS = (
+    ("update_p90", 0.05),
+    ("draw_p90", 0.5),
+)
+
+
+######################物件類別######################
+
+
+class VirtualClock:
+    """
+    壓縮時間用的遊戲時鐘\n
+    \n
+    install() 之後 pygame.time.get_ticks() 會回傳虛擬時間，\n
+    每次 advance() 固定前進一幀，所以 TNT 倒數等以毫秒計時的\n
+    機制在不等待真實時間的情況下也會照正常節奏運作。\n
+    \n
+    使用範例:\n
+    clock = VirtualClock(FPS)\n
+    clock.install()\n
+    clock.advance()  # 每幀呼叫\n
+    clock.uninstall()\n
+    """
+
+    def __init__(self, fps=FPS):
+        self.frame_ms = 1000.0 / fps
+        self.ms = 0.0
+        self._original = None
+
+    def get_ticks(self):
+        """回傳目前的虛擬時間（毫秒）"""
+        return int(self.ms)
+
+    def advance(self):
+        """前進一幀"""
+        self.ms += self.frame_ms
+
+    def install(self):
+        """讓 pygame.time.get_ticks 改用虛擬時間"""
+        if self._original is None:
+            self._original = pygame.time.get_ticks
+            pygame.time.get_ticks = self.get_ticks
+
+    def uninstall(self):
+        """恢復原本的 pygame.time.get_ticks"""
+        if self._original is not None:
+            pygame.time.get_ticks = self._original
+            self._original = None
+
+
+######################定義函式區######################
+
+
+def autoplay(state, max_balls=DEFAULT_MAX_BALLS):
+    """
+    自動操作底板\n
+    \n
+    發射所有黏在底板上的球，並把底板移到最快落地的那顆球正下方。\n
+    多球時底板只追一顆，所以仍然會漏球，遊戲結束流程也會被測到。\n
+    \n
+    自動操作過關很快，閃爍磚塊產生的球會一關一關累積到幾百顆，\n
+    真人玩家早就漏接了，所以超過 max_balls 的球直接移除。\n
+    \n
+    遊戲開啟輔助模式（state.autopilot）時只移除多出來的球，底板由\n
+    Autopilot 依照預測的落點移動，和玩家一樣每幀只移動一步。\n
+    \n
+    參數:\n
+    state (GameState): 遊戲狀態\n
+    max_balls (int): 最多保留幾顆球，0 表示不限制\n
+    """
+    if max_balls and len(state.balls) > max_balls:
+        del state.balls[max_balls:]
+    if state.autopilot is not None:
+        return
+
+    target = None
+    for ball in state.balls:
+        if ball.stuck:
+            ball.launch()
+        elif ball.vy > 0 and (target is None or ball.y > target.y):
+            target = ball
+    if target is None:
+        return
+
+    paddle = state.paddle
+    x = target.x - paddle.width / 2 + random.uniform(-0.3, 0.3) * paddle.width
+    paddle.x = int(max(0, min(WINDOW_WIDTH - paddle.width, x)))
+
+
+def current_rss():
+    """
+    回傳目前行程的常駐記憶體（RSS，位元組）\n
+    \n
+    Linux 讀取 /proc/self/statm；其他平台退回 resource 模組的\n
+    最高 RSS（只會增加，仍可看出成長），都沒有時回傳 None。\n
+    """
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def take_sample(state, stats, update_times, draw_times, started, policy):
+    """
+    取樣一次目前的資源使用狀況\n
+    \n
+    參數:\n
+    state (GameState): 遊戲狀態\n
+    stats (dict): 到目前為止的遊戲時間、幀數、關卡數等統計\n
+    update_times (list): 這段期間每幀 update 的時間（秒）\n
+    draw_times (list): 這段期間每次 draw 的時間（秒）\n
+    started (float): 開始執行時的 time.perf_counter()\n
+    policy (GCPolicy): 垃圾回收策略（記錄了每次回收的暫停時間）\n
+    \n
+    回傳:\n
+    dict: 一筆取樣資料\n
+    """
+    rss = current_rss()
+    update = summarize(update_times)
+    draw = summarize(draw_times)
+    sample = {
+        "game_seconds": round(stats["frames"] / FPS, 1),
+        "wall_seconds": round(time.perf_counter() - started, 1),
+        "frames": stats["frames"],
+        "levels": stats["levels"],
+        "resets": stats["resets"],
+        "rss_mb": rss / (1024 * 1024) if rss is not None else None,
+        "gc_counts": list(gc.get_count()),
+        "gc_collections": [gen["collections"] for gen in gc.get_stats()],
+        # GCPolicy 載入關卡後會 gc.freeze()，get_objects() 看不到凍結的物件，要另外加上
+        "gc_objects": len(gc.get_objects()) + gc.get_freeze_count(),
+        "gc_midplay_pauses": policy.midplay_pauses,
+        "gc_max_midplay_ms": policy.max_midplay_ms,
+        "update_p50": update["p50"],
+        "update_p90": update["p90"],
+        "update_p99": update["p99"],
+        "update_max": update["max"],
+        "draw_p50": draw["p50"],
+        "draw_p90": draw["p90"],
+        "draw_max": draw["max"],
+    }
+    sample.update(count_entities(state))
+    return sample
+
+
+def run_soak(
+    hours=DEFAULT_HOURS,
+    sample_interval=DEFAULT_SAMPLE_INTERVAL,
+    draw_every=DEFAULT_DRAW_EVERY,
+    max_level_seconds=DEFAULT_MAX_LEVEL_SECONDS,
+    reset_every=DEFAULT_RESET_EVERY,
+    max_balls=DEFAULT_MAX_BALLS,
+    gc_mode=None,
+    realtime=False,
+    endless=False,
+    autopilot=False,
+    seed=0,
+    progress=True,
+):
+    """
+    執行一次長時間穩定性測試\n
+    \n
+    參數:\n
+    hours (float): 要跑幾小時的遊戲時間\n
+    sample_interval (float): 每隔幾秒（遊戲時間）取樣一次\n
+    draw_every (int): 每幾幀繪製一次（真實時間模式一律每幀繪製）\n
+    max_level_seconds (float): 一關最多玩幾秒，超過就清空剩下的磚塊\n
+    reset_every (int): 每過幾關呼叫一次 reset_game，0 表示不定期重開\n
+    max_balls (int): 自動操作最多保留幾顆球，0 表示不限制\n
+    gc_mode (str): 垃圾回收策略模式，預設使用設定檔中的值\n
+    realtime (bool): 是否以真實速度（FPS）執行\n
+    endless (bool): 是否以無盡模式執行（一直補充磚塊行，不會換關重建）\n
+    autopilot (bool): 是否由 Autopilot 移動底板（預設直接把底板放到球的下方）\n
+    seed (int): 亂數種子\n
+    progress (bool): 是否在每次取樣時印出進度\n
+    \n
+    回傳:\n
+    dict: 設定、所有取樣資料與分析結果\n
+    """
+    random.seed(seed)
+    surface = setup_headless()
+    total_frames = int(hours * 3600 * FPS)
+    sample_frames = max(1, int(sample_interval * FPS))
+    max_level_frames = max(1, int(max_level_seconds * FPS))
+    draw_every = 1 if realtime else max(1, draw_every)
+
+    clock = None if realtime else VirtualClock(FPS)
+    pacer = pygame.time.Clock() if realtime else None
+    if clock is not None:
+        clock.install()
+
+    stats = {"frames": 0, "levels": 0, "resets": 0}
+    samples = []
+    update_times = []
+    draw_times = []
+    perf = time.perf_counter
+    started = perf()
+    policy = GCPolicy(gc_mode)
+    try:
+        state = GameState(endless=endless)
+        if autopilot:
+            state.autopilot = Autopilot()
+        policy.attach(state)
+        policy.start()
+        level = state.level
+        level_frame = 0
+        game_over_frames = 0
+
+        for frame in range(total_frames):
+            policy.begin_frame()
+            autoplay(state, max_balls)
+
+            t0 = perf()
+            state.update()
+            t1 = perf()
+            update_times.append(t1 - t0)
+            if frame % draw_every == 0:
+                state.draw(surface)
+                draw_times.append(perf() - t1)
+
+            # 關卡與重開的流程控制（相當於玩家的操作）
+            if state.level != level:
+                level = state.level
+                level_frame = frame
+                stats["levels"] += 1
+                if reset_every and stats["levels"] % reset_every == 0:
+                    state.reset_game()
+                    level = state.level
+                    stats["resets"] += 1
+            elif state.game_over:
+                # 停在遊戲結束畫面一秒再按 R 重開
+                game_over_frames += 1
+                if game_over_frames >= FPS:
+                    state.reset_game()
+                    level = state.level
+                    level_frame = frame
+                    game_over_frames = 0
+                    stats["resets"] += 1
+            elif frame - level_frame >= max_level_frames:
+                # 卡太久的關卡直接清空，下一次更新就會產生新磚塊
+                for brick in state.bricks:
+                    brick.hit = True
+
+            policy.end_frame()
+            stats["frames"] = frame + 1
+            if clock is not None:
+                clock.advance()
+            else:
+                pacer.tick(FPS)
+
+            if stats["frames"] % sample_frames == 0:
+                sample = take_sample(
+                    state, stats, update_times, draw_times, started, policy
+                )
+                samples.append(sample)
+                update_times = []
+                draw_times = []
+                if progress:
+                    print_sample(sample)
+    finally:
+        policy.stop()
+        if clock is not None:
+            clock.uninstall()
+
+    return {
+        "config": {
+            "hours": hours,
+            "sample_interval": sample_interval,
+            "draw_every": draw_every,
+            "max_level_seconds": max_level_seconds,
+            "reset_every": reset_every,
+            "max_balls": max_balls,
+            "gc_mode": policy.mode,
+            "realtime": realtime,
+            "endless": endless,
+            "autopilot": autopilot,
+            "seed": seed,
+        },
+        "totals": dict(stats, wall_seconds=round(perf() - started, 1)),
+        "samples": samples,
+        "gc": policy.summary(),
+    }
+
+
+def _median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def check_trend(samples, metric, tolerance, slack, monotonic):
+    """
+    比較最前四分之一與最後四分之一的取樣，判斷指標是否持續上升\n
+    \n
+    參數:\n
+    samples (list): 取樣資料\n
+    metric (str): 指標名稱\n
+    tolerance (float): 允許的相對成長比例\n
+    slack (float): 可忽略的絕對變化量（避免很小的數值被放大）\n
+    monotonic (bool): 是否另外要求大部分相鄰取樣都在上升\n
+    \n
+    回傳:\n
+    dict: 前後中位數、變化比例與是否被標記，資料不足時回傳 None\n
+    """
+    values = [s[metric] for s in samples if s.get(metric) is not None]
+    values = values[int(len(values) * WARMUP_FRACTION) :]
+    if len(values) < 8:
+        return None
+
+    quarter = len(values) // 4
+    first = _median(values[:quarter])
+    last = _median(values[-quarter:])
+    change = (last - first) / first if first > 0 else 0.0
+    flagged = last - first > slack and last > first * (1 + tolerance)
+
+    if monotonic and flagged:
+        # 洩漏會穩定往上爬；只是偶爾跳高一次的不算
+        steps = [b - a for a, b in zip(values, values[1:]) if b != a]
+        rising = sum(1 for step in steps if step > 0)
+        flagged = bool(steps) and rising / len(steps) >= 0.5
+
+    return {
+        "metric": metric,
+        "first": first,
+        "last": last,
+        "change": change,
+        "flagged": flagged,
+    }
+
+
+def analyze(
+    samples,
+    growth_tolerance=DEFAULT_GROWTH_TOLERANCE,
+    drift_tolerance=DEFAULT_DRIFT_TOLERANCE,
+):
+    """
+    分析取樣資料，找出持續成長的資源與變慢的幀時間\n
+    \n
+    回傳:\n
+    dict: growth 與 drift 兩組檢查結果，以及 flagged 總結\n
+    """
+    growth = [
+        check_trend(samples, metric, growth_tolerance, slack, monotonic=True)
+        for metric, slack in GROWTH_METRICS
+    ]
+    drift = [
+        check_trend(samples, metric, drift_tolerance, slack, monotonic=False)
+        for metric, slack in DRIFT_METRICS
+    ]
+    growth = [result for result in growth if result is not None]
+    drift = [result for result in drift if result is not None]
+    return {
+        "growth": growth,
+        "drift": drift,
+        "flagged": [r["metric"] for r in growth + drift if r["flagged"]],
+    }
+
+
+def print_sample(sample):
+    """印出一筆取樣的摘要"""
+    rss = f"{sample['rss_mb']:.1f}MB" if sample["rss_mb"] is not None else "n/a"
+    print(
+        f"[{sample['game_seconds'] / 3600:6.2f}h 遊戲時間 / "
+        f"{sample['wall_seconds']:7.1f}s] 關卡 {sample['levels']:>5} "
+        f"重開 {sample['resets']:>4} RSS {rss} "
+        f"物件 {sample['gc_objects']} 球 {sample['balls']} 碎片 {sample['shards']} "
+        f"update p90 {sample['update_p90']:.3f}ms draw p90 {sample['draw_p90']:.3f}ms"
+    )
+
+
+def print_analysis(analysis):
+    """印出分析結果"""
+    print("\n📈 趨勢分析（最前四分之一 → 最後四分之一的中位數）")
+    for result in analysis["growth"] + analysis["drift"]:
+        mark = "⚠️ " if result["flagged"] else "  "
+        print(
+            f"{mark}{result['metric']:<12} {result['first']:>12.3f} → "
+            f"{result['last']:>12.3f} ({result['change']:+.1%})"
+        )
+    if analysis["flagged"]:
+        print(f"\n❌ 發現持續成長或變慢: {', '.join(analysis['flagged'])}")
+    else:
+        print("\n✅ 沒有發現持續成長或幀時間漂移")
+
+
+def main(argv=None):
+    """命令列進入點"""
+    parser = argparse.ArgumentParser(description="敲磚塊遊戲長時間穩定性測試")
+    parser.add_argument(
+        "--hours", type=float, default=DEFAULT_HOURS, help="要跑幾小時的遊戲時間"
+    )
+    parser.add_argument(
+        "--sample-interval",
+        type=float,
+        default=DEFAULT_SAMPLE_INTERVAL,
+        help="每隔幾秒（遊戲時間）取樣一次",
+    )
+    parser.add_argument(
+        "--draw-every",
+        type=int,
+        default=DEFAULT_DRAW_EVERY,
+        help="壓縮時間時每幾幀繪製一次",
+    )
+    parser.add_argument(
+        "--max-level-seconds",
+        type=float,
+        default=DEFAULT_MAX_LEVEL_SECONDS,
+        help="一關最多玩幾秒，超過就清空磚塊進入下一關",
+    )
+    parser.add_argument(
+        "--reset-every",
+        type=int,
+        default=DEFAULT_RESET_EVERY,
+        help="每過幾關呼叫一次 reset_game（0 表示不定期重開）",
+    )
+    parser.add_argument(
+        "--max-balls",
+        type=int,
+        default=DEFAULT_MAX_BALLS,
+        help="自動操作最多保留幾顆球（0 表示不限制）",
+    )
+    parser.add_argument(
+        "--gc-mode",
+        choices=("disable", "raise", "off"),
+        default=GC_CONFIG["MODE"],
+        help="垃圾回收策略模式（off 表示維持 Python 預設的自動回收）",
+    )
+    parser.add_argument(
+        "--realtime", action="store_true", help="以真實速度執行，不壓縮時間"
+    )
+    parser.add_argument(
+        "--endless", action="store_true", help="以無盡模式執行（磚塊行持續補充）"
+    )
+    parser.add_argument(
+        "--autopilot",
+        action="store_true",
+        help="由自動操作依照預測的落點移動底板（不直接把底板放到球下方）",
+    )
+    parser.add_argument(
+        "--growth-tolerance",
+        type=float,
+        default=DEFAULT_GROWTH_TOLERANCE,
+        help="資源成長超過多少比例算異常",
+    )
+    parser.add_argument(
+        "--drift-tolerance",
+        type=float,
+        default=DEFAULT_DRIFT_TOLERANCE,
+        help="幀時間 p90 變慢超過多少比例算異常",
+    )
+    parser.add_argument("-o", "--output", help="把取樣與分析結果寫成 JSON")
+    parser.add_argument("--seed", type=int, default=0, help="亂數種子")
+    args = parser.parse_args(argv)
+
+    results = run_soak(
+        hours=args.hours,
+        sample_interval=args.sample_interval,
+        draw_every=args.draw_every,
+        max_level_seconds=args.max_level_seconds,
+        reset_every=args.reset_every,
+        max_balls=args.max_balls,
+        gc_mode=args.gc_mode,
+        realtime=args.realtime,
+        endless=args.endless,
+        autopilot=args.autopilot,
+        seed=args.seed,
+    )
+    results["analysis"] = analyze(
+        results["samples"], args.growth_tolerance, args.drift_tolerance
+    )
+
+    totals = results["totals"]
+    print(
+        f"\n🏁 共 {totals['frames']} 幀、{totals['levels']} 關、"
+        f"{totals['resets']} 次重開，耗時 {totals['wall_seconds']}s"
+    )
+    gc_summary = results["gc"]
+    print(
+        f"♻️ 垃圾回收（{gc_summary['mode']}）：遊戲中途自動回收 "
+        f"{gc_summary['midplay_pauses']} 次，最長 {gc_summary['max_midplay_ms']:.2f}ms"
+    )
+    print_analysis(results["analysis"])
+
+    if args.output:
+        save_json(args.output, results)
+        print(f"\n💾 結果已寫入 {args.output}")
+
+    return 1 if results["analysis"]["flagged"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+觀戰串流測試
+
+在同一個行程中執行效能測試情境，每一幀把遊戲狀態編碼成差異幀、
+壓縮後交給觀戰端重建，量測：
+
+- 遊戲執行緒編碼差異幀的時間（觀戰串流加在每一幀上的成本）
+- 每一幀壓縮前與壓縮後的位元組數（頻寬）
+- 關鍵幀在遊戲執行緒記下狀態的時間、在背景執行緒編碼的時間與大小
+  （觀戰程式中途加入時的成本）
+- 觀戰端套用每一幀的時間
+
+關鍵幀和真正的串流一樣晚幾幀才編碼（背景執行緒還在忙的情況），這段期間
+遊戲照常進行。最後比較觀戰端重建的狀態和遊戲本身是否一致，不一致、或遊戲
+執行緒花在關鍵幀的時間超過上限時以非零代碼結束。
+
+使用方式:
+    python benchmarks/spectator_stream.py                  # 預設情境
+    python benchmarks/spectator_stream.py -s balls_1000    # 只執行指定情境
+    python benchmarks/spectator_stream.py -o stream.json   # 另外把結果寫成 JSON
+"""
+
+######################載入套件######################
+import argparse
+import os
+import random
+import sys
+import time
+import zlib
+
+# 讓腳本可以直接執行：把專案根目錄加入模組搜尋路徑
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# 無視窗模式：必須在 pygame 初始化前設定
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+######################導入設定######################
+from config import SPECTATOR_CONFIG
+
+######################導入遊戲模組######################
+from benchmarks.run_benchmarks import save_json, setup_headless, summarize
+from benchmarks.scenarios import get_scenarios
+from game.effects import EGG
+from game.spectator import StreamEncoder, SpectatorView, encode_keyframe
+
+######################全域變數######################
+# 預設情境：這些情境的磚塊都是由關卡建立的，觀戰端可以從關鍵幀重建
+DEFAULT_SCENARIOS = ("default_board", "balls_1000", "shards_20k", "board_500x500")
+KEYFRAME_LAG = 5  # 關鍵幀記下狀態之後過幾幀才編碼
+MAX_KEYFRAME_MS = 8.0  # 遊戲執行緒記下關鍵幀最多花幾毫秒（半幀）
+
+######################定義函式區######################
+
+
+def mismatches(game, mirror, scale):
+    """
+    比較觀戰端重建的狀態和遊戲本身\n
+    \n
+    回傳:\n
+    list: 不一致的項目說明\n
+    """
+    problems = []
+    if (game.score, game.level) != (mirror.score, mirror.level):
+        problems.append("分數或關卡不同")
+    if len(game.bricks) != len(mirror.bricks):
+        problems.append("磚塊數量不同")
+    else:
+        for index, (brick, copy) in enumerate(zip(game.bricks, mirror.bricks)):
+            if (brick.hit, brick.tnt_primed, int(brick.x), int(brick.y)) != (
+                copy.hit,
+                copy.tnt_primed,
+                int(copy.x),
+                int(copy.y),
+            ):
+                problems.append(f"第 {index} 塊磚的狀態不同")
+                break
+    if len(game.balls) != len(mirror.balls):
+        problems.append("球的數量不同")
+    else:
+        tolerance = 0.5 / scale + 1e-9
+        for ball, copy in zip(game.balls, mirror.balls):
+            if abs(ball.x - copy.x) > tolerance or abs(ball.y - copy.y) > tolerance:
+                problems.append("球的位置超過量化誤差")
+                break
+    if len(game.world.archetype(EGG)) != len(mirror.world.archetype(EGG)):
+        problems.append("彩蛋數量不同")
+    return problems
+
+
+def pack_keyframe(snapshot, level):
+    """
+    在「背景執行緒」編碼並壓縮關鍵幀\n
+    \n
+    回傳:\n
+    tuple: (壓縮後的關鍵幀, 編碼與壓縮花的毫秒數)\n
+    """
+    started = time.perf_counter()
+    packed = zlib.compress(encode_keyframe(snapshot), level)
+    return packed, (time.perf_counter() - started) * 1000
+
+
+def apply_keyframe(view, packed, pending):
+    """
+    觀戰端套用關鍵幀，再依序套用等待中的差異幀\n
+    \n
+    回傳:\n
+    list: 清空的等待列表\n
+    """
+    # 觀戰端自己產生碎片會用到亂數，不能影響遊戲這一端
+    rng = random.getstate()
+    view.apply(zlib.decompress(packed))
+    for data in pending:
+        view.apply(zlib.decompress(data))
+    random.setstate(rng)
+    return []
+
+
+def run_stream(scenario, seed=0):
+    """
+    執行一個情境並量測觀戰串流\n
+    \n
+    參數:\n
+    scenario (Scenario): 效能測試情境\n
+    seed (int): 亂數種子\n
+    \n
+    回傳:\n
+    dict: 量測結果\n
+    """
+    level = SPECTATOR_CONFIG["COMPRESS_LEVEL"]
+    random.seed(seed)
+    state = scenario.build()
+    encoder = StreamEncoder()
+    encoder.attach(state)
+    view = SpectatorView()
+
+    started = time.perf_counter()
+    snapshot = encoder.snapshot(state)
+    keyframe_ms = (time.perf_counter() - started) * 1000
+    keyframe_packed = None
+    serialize_ms = 0.0
+    pending = []  # 關鍵幀編碼之前產生的差異幀，編碼之後依序套用
+
+    encode_samples = []
+    apply_samples = []
+    raw_bytes = packed_bytes = 0
+    for frame in range(scenario.frames):
+        if frame == KEYFRAME_LAG:
+            keyframe_packed, serialize_ms = pack_keyframe(snapshot, level)
+            pending = apply_keyframe(view, keyframe_packed, pending)
+        if scenario.refresh is not None:
+            refreshed = scenario.refresh(state) or state
+            if refreshed is not state:
+                break  # 換成新狀態的情境不適合量測串流
+        state.update()
+
+        started = time.perf_counter()
+        data = encoder.delta(state)
+        encode_samples.append(time.perf_counter() - started)
+        packed = zlib.compress(data, level)
+        raw_bytes += len(data)
+        packed_bytes += len(packed)
+        if keyframe_packed is None:
+            pending.append(packed)
+            continue
+
+        rng = random.getstate()
+        started = time.perf_counter()
+        view.apply(zlib.decompress(packed))
+        apply_samples.append(time.perf_counter() - started)
+        random.setstate(rng)
+
+    if keyframe_packed is None:
+        keyframe_packed, serialize_ms = pack_keyframe(snapshot, level)
+        apply_keyframe(view, keyframe_packed, pending)
+
+    frames = len(encode_samples)
+    return {
+        "description": scenario.description,
+        "frames": frames,
+        "bricks": len(state.bricks),
+        "balls": len(state.balls),
+        "effects": state.effect_counts(),
+        "encode": summarize(encode_samples),
+        "apply": summarize(apply_samples),
+        "raw_bytes_per_frame": raw_bytes / frames if frames else 0.0,
+        "sent_bytes_per_frame": packed_bytes / frames if frames else 0.0,
+        "keyframe_ms": keyframe_ms,
+        "keyframe_serialize_ms": serialize_ms,
+        "keyframe_bytes": len(keyframe_packed),
+        "mismatches": mismatches(state, view.game, encoder.scale),
+    }
+
+
+def main(argv=None):
+    """命令列進入點"""
+    parser = argparse.ArgumentParser(description="敲磚塊遊戲觀戰串流測試")
+    parser.add_argument(
+        "-s",
+        "--scenario",
+        action="append",
+        help="只執行指定的情境（可重複指定）",
+    )
+    parser.add_argument("-o", "--output", help="把結果寫成 JSON")
+    args = parser.parse_args(argv)
+
+    setup_headless()
+    results = {}
+    failed = False
+    print(
+        f"{'情境':<16}{'編碼 p50':>10}{'編碼 p90':>10}{'套用 p50':>10}"
+        f"{'原始 B/幀':>11}{'送出 B/幀':>11}{'關鍵幀 ms':>11}{'背景 ms':>10}"
+        f"{'關鍵幀 KB':>11}"
+    )
+    for scenario in get_scenarios(args.scenario or list(DEFAULT_SCENARIOS)):
+        result = run_stream(scenario)
+        results[scenario.name] = result
+        print(
+            f"{scenario.name:<16}"
+            f"{result['encode']['p50']:>10.3f}{result['encode']['p90']:>10.3f}"
+            f"{result['apply']['p50']:>10.3f}"
+            f"{result['raw_bytes_per_frame']:>11.0f}"
+            f"{result['sent_bytes_per_frame']:>11.0f}"
+            f"{result['keyframe_ms']:>11.1f}"
+            f"{result['keyframe_serialize_ms']:>10.1f}"
+            f"{result['keyframe_bytes'] / 1024:>11.1f}"
+        )
+        for problem in result["mismatches"]:
+            print(f"  ❌ {problem}")
+            failed = True
+        if result["keyframe_ms"] > MAX_KEYFRAME_MS:
+            print(
+                f"  ❌ 遊戲執行緒記下關鍵幀花了 {result['keyframe_ms']:.1f} ms"
+                f"（上限 {MAX_KEYFRAME_MS:g} ms）"
+            )
+            failed = True
+
+    if args.output:
+        save_json(args.output, results)
+        print(f"\n💾 結果已寫入 {args.output}")
+
+    if failed:
+        print("\n❌ 觀戰端重建的狀態和遊戲不一致，或關鍵幀占用遊戲執行緒太久")
+        return 1
+    print("\n✅ 觀戰端重建的狀態和遊戲一致，關鍵幀不會拖慢遊戲執行緒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+啟動效能測試
+
+每次都用一個全新的 Python 行程（冷啟動）匯入 main_new、建立
+BreakoutGame 並執行第一幀，量測匯入時間、初始化時間與從行程啟動
+到第一幀畫完的時間，取多次執行的中位數。超過時間預算或比基準
+慢超過門檻時以非零代碼結束，可以直接放在 CI 中執行。
+
+使用方式:
+    python benchmarks/startup.py                       # 執行 5 次並與基準比較
+    python benchmarks/startup.py --runs 10 -o startup.json
+    python benchmarks/startup.py --budget-ms 1500      # 第一幀超過 1.5 秒就失敗
+    python benchmarks/startup.py --importtime          # 列出最花時間的匯入模組
+    python benchmarks/startup.py --save-baseline
+"""
+
+######################載入套件######################
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# 讓腳本可以直接執行：把專案根目錄加入模組搜尋路徑
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+######################導入遊戲模組######################
+from benchmarks.run_benchmarks import load_json, save_json, percentile
+
+######################全域變數######################
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, "benchmarks", "startup_baseline.json")
+DEFAULT_RUNS = 5
+DEFAULT_THRESHOLD = 0.30  # 啟動時間受磁碟快取影響較大，門檻比幀時間寬鬆
+
+# 回報的指標（毫秒）
+METRICS = (
+    "interpreter_ms",  # 行程啟動到開始執行程式（Python 直譯器本身）
+    "import_ms",  # 匯入 main_new（連帶匯入 pygame 與遊戲模組）
+    "init_ms",  # 建立 BreakoutGame（子系統、視窗、遊戲狀態）
+    "first_frame_ms",  # 第一幀的事件處理、更新與繪製
+    "time_to_first_frame_ms",  # 行程啟動到第一幀畫完
+    "audio_ready_ms",  # 行程啟動到背景音效載入完成
+)
+
+# 與基準比較的指標
+COMPARED_METRICS = ("import_ms", "init_ms", "time_to_first_frame_ms")
+
+# 在子行程中執行的量測程式；{root} 會換成專案根目錄
+CHILD_CODE = """
+import time
+wall_start = time.time()
+t0 = time.perf_counter()
+import json, sys
+sys.path.insert(0, {root!r})
+import main_new
+t_import = time.perf_counter()
+game = main_new.BreakoutGame()
+t_init = time.perf_counter()
+game.handle_events()
+game.update()
+game.draw()
+t_frame = time.perf_counter()
+from game import audio
+audio.wait_ready(30)
+t_audio = time.perf_counter()
+print(json.dumps({{
+    "wall_start": wall_start,
+    "import": t_import - t0,
+    "init": t_init - t_import,
+    "first_frame": t_frame - t_init,
+    "frame_done": t_frame - t0,
+    "audio_ready": t_audio - t0,
+}}))
+"""
+
+
+######################定義函式區######################
+
+
+def child_environment():
+    """子行程的環境變數：無視窗模式，並隱藏 pygame 的歡迎訊息"""
+    env = dict(os.environ)
+    env.setdefault("SDL_VIDEODRIVER", "dummy")
+    env.setdefault("SDL_AUDIODRIVER", "dummy")
+    env["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    return env
+
+
+def measure_once(importtime=False):
+    """
+    用全新的行程量測一次啟動\n
+    \n
+    參數:\n
+    importtime (bool): 是否加上 -X importtime 收集各模組的匯入時間\n
+    \n
+    回傳:\n
+    tuple: (各指標的毫秒數, -X importtime 的輸出或 None)\n
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", CHILD_CODE.format(root=ROOT_DIR)]
+
+    spawned = time.time()
+    completed = subprocess.run(
+        command,
+        cwd=ROOT_DIR,
+        env=child_environment(),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"啟動失敗:\n{completed.stderr}")
+
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    interpreter = max(0.0, report["wall_start"] - spawned)
+    metrics = {
+        "interpreter_ms": interpreter * 1000.0,
+        "import_ms": report["import"] * 1000.0,
+        "init_ms": report["init"] * 1000.0,
+        "first_frame_ms": report["first_frame"] * 1000.0,
+        "time_to_first_frame_ms": (interpreter + report["frame_done"]) * 1000.0,
+        "audio_ready_ms": (interpreter + report["audio_ready"]) * 1000.0,
+    }
+    return metrics, completed.stderr if importtime else None
+
+
+def slowest_imports(importtime_output, top=15):
+    """
+    整理 -X importtime 的輸出\n
+    \n
+    參數:\n
+    importtime_output (str): 子行程的標準錯誤輸出\n
+    top (int): 列出幾個\n
+    \n
+    回傳:\n
+    list: (模組名稱, 自身毫秒, 累計毫秒)，依累計時間排序\n
+    """
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:") :].split("|")]
+        if not parts[0].isdigit():
+            continue  # 標題列
+        rows.append((parts[2], int(parts[0]) / 1000.0, int(parts[1]) / 1000.0))
+    rows.sort(key=lambda row: -row[2])
+    return rows[:top]
+
+
+def run_startup(runs=DEFAULT_RUNS):
+    """
+    量測多次冷啟動並整理結果\n
+    \n
+    參數:\n
+    runs (int): 執行次數\n
+    \n
+    回傳:\n
+    dict: 各指標的中位數、最小值與最大值，以及每一次的原始資料\n
+    """
+    samples = []
+    for index in range(runs):
+        metrics, _ = measure_once()
+        samples.append(metrics)
+        print(
+            f"  第 {index + 1} 次: 匯入 {metrics['import_ms']:.1f}ms，"
+            f"第一幀 {metrics['time_to_first_frame_ms']:.1f}ms"
+        )
+
+    summary = {}
+    for metric in METRICS:
+        values = sorted(sample[metric] for sample in samples)
+        summary[metric] = {
+            "median": percentile(values, 50),
+            "min": values[0],
+            "max": values[-1],
+        }
+    return {
+        "meta": {"python": sys.version.split()[0], "runs": runs},
+        "metrics": summary,
+        "samples": samples,
+    }
+
+
+def check(results, baseline=None, threshold=DEFAULT_THRESHOLD, budget_ms=None):
+    """
+    檢查啟動時間是否超過預算或比基準慢\n
+    \n
+    參數:\n
+    results (dict): run_startup() 的結果\n
+    baseline (dict): 之前儲存的基準結果，None 表示不比較\n
+    threshold (float): 允許比基準慢的比例\n
+    budget_ms (float): 第一幀的絕對時間預算（毫秒），None 表示不檢查\n
+    \n
+    回傳:\n
+    list: 問題描述列表，空列表表示通過\n
+    """
+    problems = []
+    metrics = results["metrics"]
+    if budget_ms is not None:
+        first_frame = metrics["time_to_first_frame_ms"]["median"]
+        if first_frame > budget_ms:
+            problems.append(
+                f"time_to_first_frame_ms: {first_frame:.1f}ms 超過預算 {budget_ms:.0f}ms"
+            )
+
+    if baseline:
+        for metric in COMPARED_METRICS:
+            old = baseline.get("metrics", {}).get(metric, {}).get("median")
+            new = metrics[metric]["median"]
+            if not old or old <= 0:
+                continue
+            change = (new - old) / old
+            if change > threshold:
+                problems.append(f"{metric}: {old:.1f}ms → {new:.1f}ms (+{change:.0%})")
+    return problems
+
+
+def print_report(results):
+    """印出各指標的中位數與範圍"""
+    print(f"\n{'指標':<26}{'中位數':>10}{'最小':>10}{'最大':>10}")
+    for metric in METRICS:
+        stats = results["metrics"][metric]
+        print(
+            f"{metric:<26}{stats['median']:>9.1f}ms{stats['min']:>9.1f}ms"
+            f"{stats['max']:>9.1f}ms"
+        )
+
+
+def main(argv=None):
+    """命令列進入點"""
+    parser = argparse.ArgumentParser(description="敲磚塊遊戲啟動效能測試")
+    parser.add_argument(
+        "--runs", type=int, default=DEFAULT_RUNS, help="冷啟動的執行次數"
+    )
+    parser.add_argument("-o", "--output", help="把結果寫成 JSON")
+    parser.add_argument(
+        "--baseline", default=DEFAULT_BASELINE, help="基準結果的 JSON 檔案"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="比基準慢多少比例算回歸",
+    )
+    parser.add_argument(
+        "--budget-ms", type=float, help="行程啟動到第一幀的時間預算（毫秒）"
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="把這次的結果存成基準"
+    )
+    parser.add_argument(
+        "--importtime", action="store_true", help="另外列出最花時間的匯入模組"
+    )
+    args = parser.parse_args(argv)
+
+    print(f"🚀 冷啟動量測 {args.runs} 次")
+    results = run_startup(args.runs)
+    print_report(results)
+
+    if args.importtime:
+        _, output = measure_once(importtime=True)
+        results["imports"] = slowest_imports(output)
+        print(f"\n{'模組':<40}{'自身':>10}{'累計':>10}")
+        for name, self_ms, cumulative_ms in results["imports"]:
+            print(f"{name:<40}{self_ms:>9.1f}ms{cumulative_ms:>9.1f}ms")
+
+    if args.output:
+        save_json(args.output, results)
+        print(f"\n💾 結果已寫入 {args.output}")
+
+    if args.save_baseline:
+        save_json(args.baseline, results)
+        print(f"📌 已更新基準 {args.baseline}")
+        return 0
+
+    baseline = load_json(args.baseline)
+    if baseline is None:
+        print(f"\nℹ️ 找不到基準檔案 {args.baseline}，只檢查時間預算")
+    problems = check(results, baseline, args.threshold, args.budget_ms)
+    if problems:
+        print("\n❌ 啟動變慢:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+
+    print("\n✅ 啟動時間在預算內")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -123,6 +123,78 @@ FONT_CONFIG = {
     "DEFAULT_SIZE": 36,  # 一般文字的字體大小
     "LARGE_SIZE": 74,  # 大標題的字體大小
     "TNT_TEXT_SIZE": 24,  # TNT 磚塊上文字的大小
+    "FILE": None,  # 字體的資源名稱（例如 "fonts/game_font.ttf"），None 使用內建字體
+}
+
+######################音效設定######################
+# 混音器初始化與音效載入在背景執行緒進行，不拖慢遊戲啟動；
+# 播放也交給音效執行緒，同一個音效短時間內的多次要求會合併成一次
+AUDIO_CONFIG = {
+    "ENABLED": True,  # 是否啟用音效
+    "BACKGROUND_LOAD": True,  # 是否在背景執行緒初始化混音器並載入音效
+    "SOUNDS": {  # 音效名稱與資源名稱（相對於 assets/ 資料夾）
+        "explosion": "sounds/explosion.wav",
+    },
+    "CHANNELS": 16,  # 聲道池的聲道數量
+    "MAX_VOICES": {  # 每個音效同時播放的上限
+        "explosion": 4,
+    },
+    "DEFAULT_MAX_VOICES": 2,  # 沒有列在 MAX_VOICES 的音效的同時播放上限
+    "COALESCE_MS": 30,  # 同一個音效在這段時間內的要求合併成一次播放
+    "BASE_VOLUME": 0.6,  # 單次播放的音量
+    "COALESCE_VOLUME_STEP": 0.15,  # 每多合併一次要求，音量提高的比例
+    "MAX_VOLUME": 1.0,  # 合併後的最大音量
+}
+
+######################資源設定######################
+# 資源管理器：啟動時建立索引並在背景執行緒預載，遊戲中途不讀檔
+ASSET_CONFIG = {
+    "ROOT": "assets",  # 資源資料夾（相對於專案根目錄）
+    "MEMORY_BUDGET_MB": 64,  # 超過這個大小就釋放沒人使用的資源
+    "PRELOAD_KINDS": ("font", "image"),  # 啟動時預載的種類（音效等混音器準備好才載入）
+    "CONVERT_MS_PER_FRAME": 2,  # 每幀最多花幾毫秒轉換圖片的像素格式
+}
+
+######################關卡設定######################
+# 關卡檔案（levels/*.json）第一次載入時編譯成二進位快取檔，之後直接 mmap 載入
+LEVEL_CONFIG = {
+    "ENABLED": True,  # 是否使用關卡檔案（關閉時使用程式內建的磚塊排列）
+    "DIR": "levels",  # 關卡檔案資料夾（相對於專案根目錄）
+    "CACHE_DIR": ".cache/levels",  # 編譯後的快取檔資料夾
+    # 依序使用的關卡，全部玩完後從頭開始；預設只有和內建排列相同的 classic，
+    # 其他關卡（例如 "fortress"）要加進這個列表才會出現
+    "SEQUENCE": ["classic"],
+    "PRERENDER_MAX_PIXELS": 4_000_000,  # 預先繪製圖層的最大像素數，超過就不建立圖層
+    "PREFETCH": True,  # 玩目前這一關時先準備好下一關，過關時直接換上
+    "PREFETCH_BACKGROUND": True,  # 在背景執行緒準備（關閉時過關那一幀才建立）
+}
+
+######################超大場地設定######################
+# 關卡比視窗大時使用的攝影機、空間索引與區塊圖層（見 game/board.py）
+BOARD_CONFIG = {
+    "PLAY_AREA_HEIGHT": 320,  # 最下面一排磚塊到場地底部的距離
+    "INDEX_CELL": 64,  # 碰撞用空間索引的格子邊長（場地像素）
+    "CHUNK_SIZE": 256,  # 區塊圖層的區塊邊長（場地像素）
+    "CACHED_CHUNKS": 160,  # 最多保留幾個區塊的快取表面
+    "CHUNK_RENDERS_PER_FRAME": 2,  # 每一幀最多新畫幾個區塊，其餘留到下一幀
+    "ENTITY_MARGIN": 64,  # 畫面外多遠的球、碎片等物件還要畫
+    "FOLLOW_LERP": 0.12,  # 攝影機跟著球移動的平滑程度（0 到 1，越大越快）
+    "PAN_SPEED": 14,  # 手動捲動每幀移動的畫面像素
+    "ZOOM_STEP": 1.25,  # 每次縮放的倍率
+    "MIN_ZOOM": 0.25,  # 最小縮放倍率
+    "MAX_ZOOM": 2.0,  # 最大縮放倍率
+}
+
+######################無盡模式設定######################
+# 磚塊區持續往下移動、新的磚塊行從上方補進來，磚塊碰到警戒線就遊戲結束
+ENDLESS_CONFIG = {
+    "ENABLED": False,  # 是否以無盡模式開始遊戲
+    "DESCENT_SPEED": 0.15,  # 磚塊區每幀往下移動的像素數
+    "SPEEDUP_PER_LEVEL": 0.15,  # 每升一級移動速度增加的比例
+    "ROWS_PER_LEVEL": 5,  # 每清空幾行升一級
+    "DANGER_MARGIN": 60,  # 警戒線在底板上方多少像素
+    "TNT_CHANCE": 0.08,  # 新補進來的磚塊是 TNT 的機率
+    "BLINKING_CHANCE": 0.08,  # 新補進來的磚塊是閃爍磚塊的機率
 }
 
 ######################物理設定######################
@@ -137,7 +209,151 @@ PHYSICS_CONFIG = {
 GAME_CONFIG = {
     "TOTAL_BRICKS": BRICK_CONFIG["COLS"] * BRICK_CONFIG["ROWS"],  # 總磚塊數量
     "AUTO_RESTART": False,  # 遊戲結束後是否自動重新開始
-    "SHOW_DEBUG_INFO": False,  # 是否顯示除錯資訊（邊界框等）
+    "SHOW_DEBUG_INFO": False,  # 是否顯示除錯資訊（各階段耗時、幀時間圖、物件數量）
+}
+
+######################除錯資訊設定######################
+# SHOW_DEBUG_INFO 開啟時的效能分析覆蓋層設定
+DEBUG_CONFIG = {
+    "AVERAGE_FRAMES": 60,  # 各階段耗時取最近幾幀的平均
+    "HISTORY_FRAMES": 180,  # 幀時間圖保留最近幾幀
+    "TEXT_REFRESH_FRAMES": 15,  # 每幾幀重新產生一次文字（文字繪製很花時間）
+    "FONT_SIZE": 20,  # 覆蓋層文字大小
+    "GRAPH_HEIGHT": 60,  # 幀時間圖高度（像素）
+    "BACKGROUND_ALPHA": 170,  # 覆蓋層背景透明度（0 到 255）
+}
+
+######################效能分析擷取設定######################
+# 按 F9（或設定環境變數）後，用 cProfile 記錄接下來 N 幀的完整效能資料
+PROFILE_CONFIG = {
+    "CAPTURE_FRAMES": 300,  # 每次擷取涵蓋的幀數
+    "OUTPUT_DIR": "profiles",  # .pstats 與文字摘要的輸出資料夾
+    "TOP_N": 30,  # 文字摘要中列出的函數數量
+    "ENV_VAR": "BREAKOUT_PROFILE_FRAMES",  # 啟動時就開始擷取的環境變數（值為幀數）
+}
+
+######################時間軸追蹤設定######################
+# 輸出 Chrome Trace Event JSON（可用 chrome://tracing 或 Perfetto 開啟）
+TRACE_CONFIG = {
+    "ENABLED": False,  # 是否記錄時間軸
+    "OUTPUT_DIR": "traces",  # 輸出資料夾
+    "CHUNK_EVENTS": 4096,  # 累積幾個事件後交給背景執行緒寫檔
+}
+
+######################慢幀監視設定######################
+# 某一幀超過時間預算時，自動記錄當下的耗時明細、物件數量與呼叫堆疊
+WATCHDOG_CONFIG = {
+    "ENABLED": False,  # 是否啟用慢幀監視
+    "BUDGET_FACTOR": 2.0,  # 時間預算 = 倍數 x 一幀的時間（1 / FPS）
+    "SAMPLE_INTERVAL_MS": 5,  # 監視執行緒檢查的間隔（毫秒）
+    "LOG_PATH": "logs/slow_frames.log",  # 記錄檔路徑
+    "MAX_BYTES": 1024 * 1024,  # 單一記錄檔的大小上限，超過就輪替
+    "BACKUP_COUNT": 5,  # 保留幾個舊的記錄檔
+}
+
+######################記憶體追蹤設定######################
+# 使用 tracemalloc 逐幀統計記憶體配置（會明顯拖慢遊戲，只在分析時開啟）
+MEMTRACK_CONFIG = {
+    "ENABLED": False,  # 是否啟用記憶體追蹤
+    "OUTPUT_DIR": "memory",  # 結果輸出資料夾
+    "HISTORY_FRAMES": 3600,  # 保留最近幾幀的詳細記錄
+    "TRACEBACK_FRAMES": 1,  # tracemalloc 每筆配置保留的呼叫堆疊層數
+}
+
+######################垃圾回收設定######################
+# 遊戲進行中關閉（或調高）自動垃圾回收，改在換關、遊戲結束與空閒的幀主動回收
+GC_CONFIG = {
+    "ENABLED": True,  # 是否啟用回收策略
+    "MODE": "disable",  # "disable" 關閉自動回收、"raise" 調高門檻、"off" 只記錄
+    "PLAY_THRESHOLDS": (50000, 20, 100),  # "raise" 模式使用的自動回收門檻
+    "SPARE_BUDGET_MS": 4,  # 幀結束時至少還剩幾毫秒才趁空回收
+    "SPARE_MIN_OBJECTS": 2000,  # 年輕世代累積多少物件才值得趁空回收
+    "GEN1_EVERY": 10,  # 每幾次年輕世代回收順便回收中間世代
+    "EMERGENCY_OBJECTS": 200000,  # 一直沒有空閒時，累積到這個數量就強制回收
+    "HISTORY": 1000,  # 保留最近幾次回收的記錄
+}
+
+######################錄影設定######################
+# 遊戲畫面錄製（QA 回放用），在背景執行緒中編碼，不拖慢主迴圈
+RECORDER_CONFIG = {
+    "ENABLED": False,  # 是否錄製遊戲畫面
+    "OUTPUT_DIR": "recordings",  # 輸出資料夾（每次錄影會建立一個子資料夾）
+    "FORMAT": "auto",  # 輸出格式："auto"、"ffmpeg"、"png" 或 "raw"
+    "ENCODER": "ffmpeg",  # 外部編碼程式名稱，"auto" 時若找得到就使用
+    "QUEUE_SIZE": 120,  # 等待編碼的最大幀數，滿了就丟棄新幀
+    "FRAME_STEP": 1,  # 每幾幀錄一幀（2 表示只錄一半的幀）
+}
+
+######################分數紀錄設定######################
+# 每局的分數與統計存在本機的 SQLite 資料庫（WAL 模式），由背景執行緒整批寫入
+SCORES_CONFIG = {
+    "ENABLED": True,  # 是否記錄分數與每局統計
+    "PATH": "data/scores.sqlite3",  # 資料庫檔案路徑
+    "BATCH_SIZE": 32,  # 一次交易最多寫入幾局
+    "FLUSH_INTERVAL_MS": 2000,  # 有待寫入的資料時，最多等多久就寫入
+    "BUSY_TIMEOUT_MS": 5000,  # 資料庫被其他程式鎖住時最多等多久
+    "TOP_N": 10,  # 記憶體中保留的排行榜名次
+    "SHOW_TOP": 5,  # 遊戲結束畫面顯示的名次
+}
+
+######################存檔設定######################
+# 進行中的一局存成二進位檔（見 game/savegame.py），F5 存檔、F8 讀檔
+SAVE_CONFIG = {
+    "PATH": "data/savegame.bin",  # 存檔路徑
+    "SAVE_ON_QUIT": True,  # 遊戲進行中關閉時自動存檔
+    "RESUME_ON_START": True,  # 啟動時有存檔就從存檔繼續
+}
+
+######################觀戰設定######################
+# 機台旁的觀戰螢幕透過本機 socket 接收每一幀的變化（見 game/spectator.py），
+# 觀戰程式為 spectator.py
+SPECTATOR_CONFIG = {
+    "ENABLED": False,  # 是否開放觀戰程式連線
+    "HOST": "127.0.0.1",  # TCP 只接受本機連線
+    "PORT": 47046,  # TCP 連接埠
+    "UNIX_PATH": None,  # 設定路徑時改用 Unix socket（系統支援時）
+    "MAX_CLIENTS": 4,  # 同時連線的觀戰程式上限
+    "CLIENT_BUFFER_BYTES": 4 * 1024 * 1024,  # 觀戰程式累積超過這麼多沒收走時重新同步
+    "COMPRESS_LEVEL": 1,  # zlib 壓縮等級（背景執行緒壓縮）
+    "POSITION_SCALE": 4,  # 球與彩蛋的位置量化成 1/4 像素
+    "RECONNECT_MS": 1000,  # 觀戰程式斷線後多久重新連線
+}
+
+######################對戰設定######################
+# 兩台電腦各自模擬同一場對戰，只透過 UDP 交換輸入（見 game/rollback.py）
+VERSUS_CONFIG = {
+    "HOST": "127.0.0.1",  # 加入對戰時預設連線的主機
+    "PORT": 47048,  # 開對戰的一方等待連線的 UDP 連接埠
+    "INPUT_DELAY": 2,  # 本機輸入延後幾幀生效（對手的輸入在這之內送到就不用回溯）
+    "MAX_ROLLBACK": 8,  # 最多預測幾幀，對手的輸入落後更多時暫停等待
+    "CHECKSUM_INTERVAL": 60,  # 每隔幾幀和對手比對一次檢查碼
+    "MAX_INPUTS_PER_PACKET": 64,  # 一個封包最多帶幾幀的輸入（沒收到的會一直重送）
+    "HELLO_INTERVAL_MS": 200,  # 等待對手回應時多久重送一次連線要求
+    "DISCONNECT_MS": 3000,  # 多久沒收到對手的封包就當作斷線
+}
+
+######################自動操作設定######################
+# 電腦自動移動底板（待機示範、長時間測試與輔助模式，見 game/autopilot.py）
+AUTOPILOT_CONFIG = {
+    "ASSIST": False,  # 遊戲開始時是否由電腦幫忙移動底板（遊戲中按 F6 切換）
+    "MAX_BOUNCES": 32,  # 預測落點時最多計算幾次反彈，超過就當作不知道落點
+    "AIM_ANGLE": 0.6,  # 瞄準磚塊時最多使用底板最大反彈角度的多少比例
+}
+
+######################輸入設定######################
+# 輸入取樣時機與輸入到畫面的延遲量測（見 game/latency.py）
+INPUT_CONFIG = {
+    "LATE_SAMPLING": True,  # 等到畫面快要送出前才讀取輸入（關閉時畫完馬上開始下一幀）
+    "WORK_PERCENTILE": 90,  # 用最近幾幀工作時間的這個百分位數預估下一幀要多久
+    "WORK_HISTORY": 120,  # 預估工作時間時參考最近幾幀
+    "HEADROOM_MS": 2.0,  # 在預估的工作時間之外多留的時間，避免趕不上
+    "POLL_INTERVAL_MS": 1.0,  # 等待下一幀時每隔多久取出一次事件並記下時間
+    "VSYNC": False,  # 是否讓畫面送出與螢幕更新同步（晚取樣在同步時效果最明顯）
+    "DISPLAY_LATENCY_MS": 8.0,  # 畫面送出後到螢幕真正亮起的估計時間（依機台螢幕調整）
+    "HISTOGRAM_BUCKET_MS": 1.0,  # 延遲直方圖每一格的寬度
+    "HISTOGRAM_MAX_MS": 100.0,  # 超過的延遲都算在最後一格
+    "MOUSE_CONTROL": None,  # None：不用滑鼠；"absolute"：底板跟著游標；"relative"：依照移動量（軌跡球、旋鈕）
+    "MOUSE_SENSITIVITY": 1.0,  # relative 模式下滑鼠每移動 1 像素底板移動幾像素
 }
 
 
@@ -5,10 +5,6 @@
 包含遊戲的所有核心功能，包括遊戲物件、特效系統、遊戲邏輯和工具函數。
 """
 
-from .objects import Brick, Paddle, Ball
-from .effects import Explosion, Shard, Egg
-from .utils import explode_tnt, spawn_shards, spawn_eggs_from_bricks
-
 __version__ = "2.1.0"
 __author__ = "遊戲開發者"
 
@@ -19,7 +15,39 @@ __all__ = [
     "Explosion",
     "Shard",
     "Egg",
+    "create_explosions",
+    "create_shards",
+    "create_eggs",
     "explode_tnt",
     "spawn_shards",
     "spawn_eggs_from_bricks",
 ]
+
+# 對外提供的名稱與所在的子模組；子模組在第一次用到時才載入，
+# 所以只匯入 game.trace 之類的小模組時不會連帶載入遊戲物件與特效
+_EXPORTS = {
+    "Brick": "objects",
+    "Paddle": "objects",
+    "Ball": "objects",
+    "Explosion": "effects",  # 舊版的單一特效物件，保留相容用
+    "Shard": "effects",
+    "Egg": "effects",
+    "create_explosions": "effects",
+    "create_shards": "effects",
+    "create_eggs": "effects",
+    "explode_tnt": "utils",
+    "spawn_shards": "utils",
+    "spawn_eggs_from_bricks": "utils",
+}
+
+
+def __getattr__(name):
+    """第一次存取 game.Brick 等名稱時才載入對應的子模組"""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,516 @@
+# -*- coding: utf-8 -*-
+"""
+資源管理模組
+
+集中管理 assets/ 底下的圖片、音效與字體：啟動時建立索引，在背景
+執行緒預先讀檔與解碼，圖片在主執行緒轉成和視窗相同的像素格式，
+使用中的資源以參照計數保護，沒人使用的資源在超過記憶體預算時依
+最久未使用的順序釋放。遊戲主迴圈只拿已經載入好的資源，不會讀檔。
+"""
+
+######################載入套件######################
+import io
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import pygame
+
+######################導入設定######################
+from config import ASSET_CONFIG
+
+######################全域變數######################
+# 專案根目錄，資源資料夾以此為基準，不受目前工作目錄影響
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# pygame 內建字體的資源名稱（沒有設定自訂字體時使用）
+DEFAULT_FONT_KEY = "fonts/default"
+
+# 副檔名與資源種類
+KIND_BY_EXTENSION = {
+    ".png": "image",
+    ".jpg": "image",
+    ".jpeg": "image",
+    ".bmp": "image",
+    ".gif": "image",
+    ".wav": "sound",
+    ".ogg": "sound",
+    ".mp3": "sound",
+    ".ttf": "font",
+    ".otf": "font",
+}
+
+# 背景預載時各種類的先後順序（第一幀就會用到字體）
+KIND_PRIORITY = {"font": 0, "image": 1, "sound": 2}
+
+_manager = None
+_manager_lock = threading.Lock()  # 遊戲主執行緒與音效執行緒可能同時取得管理器
+
+
+######################物件類別######################
+
+
+class AssetHandle:
+    """
+    資源控制代碼\n
+    \n
+    同一個資源永遠回傳同一個控制代碼。acquire() 會增加參照計數，\n
+    release() 會減少；參照計數大於 0 的資源不會因為記憶體預算被釋放。\n
+    \n
+    屬性:\n
+    key (str): 資源名稱（相對於 assets/ 的路徑，例如 "sounds/explosion.wav"）\n
+    kind (str): 資源種類（"image"、"sound"、"font"）\n
+    path (str): 檔案路徑\n
+    value: 載入好的資源（Surface、Sound 或字體檔內容），還沒載入時為 None\n
+    state (str): "indexed"、"queued"、"loading"、"loaded"、"failed"\n
+    refcount (int): 參照計數\n
+    size (int): 估計佔用的記憶體（位元組）\n
+    """
+
+    def __init__(self, key, kind, path):
+        self.key = key
+        self.kind = kind
+        self.path = path
+        self.value = None
+        self.state = "indexed"
+        self.refcount = 0
+        self.size = 0
+        self.converted = False
+        self.error = None
+        self.ready = threading.Event()  # 載入成功或失敗後設定
+
+    @property
+    def loaded(self):
+        """資源是否已經可以使用"""
+        return self.state == "loaded"
+
+    def __repr__(self):
+        return f"<AssetHandle {self.key} {self.state} refs={self.refcount}>"
+
+
+class AssetManager:
+    """
+    資源管理器\n
+    \n
+    讀檔與解碼都在背景執行緒完成；主執行緒只在 pump() 中把新載入的\n
+    圖片轉成視窗的像素格式（每幀有時間上限）。\n
+    \n
+    在主迴圈中以 frame hook 使用（begin_frame / end_frame），\n
+    幀進行中如果發生同步讀檔會被計入 frame_path_loads，方便抓出\n
+    不小心在遊戲中途讀檔的程式。\n
+    \n
+    屬性:\n
+    root (str): 資源資料夾\n
+    budget (int): 記憶體預算（位元組）\n
+    assets (dict): 資源名稱 → AssetHandle\n
+    \n
+    使用範例:\n
+    manager = AssetManager()\n
+    manager.index()\n
+    manager.start()  # 背景預載\n
+    handle = manager.acquire("images/ball.png")\n
+    if handle.loaded:\n
+        screen.blit(handle.value, (x, y))\n
+    manager.release(handle)\n
+    """
+
+    def __init__(self, root=None, budget_mb=None):
+        """
+        初始化資源管理器\n
+        \n
+        參數:\n
+        root (str): 資源資料夾，預設使用設定檔中的值（相對於專案根目錄）\n
+        budget_mb (float): 記憶體預算（MB），預設使用設定檔中的值\n
+        """
+        root = root or ASSET_CONFIG["ROOT"]
+        if not os.path.isabs(root):
+            root = os.path.join(ROOT_DIR, root)
+        self.root = root
+        self.budget = int((budget_mb or ASSET_CONFIG["MEMORY_BUDGET_MB"]) * 1024**2)
+
+        self.assets = {}
+        self.used_bytes = 0
+        self._lru = OrderedDict()  # 已載入的資源，最久未使用的在最前面
+        self._lock = threading.RLock()
+
+        # 背景載入執行緒
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._to_convert = deque()
+
+        # 統計資訊
+        self.in_frame = False
+        self.loads = 0
+        self.evictions = 0
+        self.stalls = 0
+        self.sync_loads = 0
+        self.frame_path_loads = 0
+
+    ######################索引與預載######################
+
+    def index(self):
+        """
+        掃描資源資料夾，建立資源索引（只讀目錄，不讀檔案內容）\n
+        \n
+        回傳:\n
+        int: 索引到的資源數量\n
+        """
+        with self._lock:
+            for directory, _dirs, files in os.walk(self.root):
+                for filename in files:
+                    kind = KIND_BY_EXTENSION.get(os.path.splitext(filename)[1].lower())
+                    if kind is None:
+                        continue
+                    path = os.path.join(directory, filename)
+                    key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                    self.register(key, path, kind)
+
+            # pygame 內建字體也由管理器讀取，讓字體同樣不在遊戲中途讀檔
+            default_font = os.path.join(
+                os.path.dirname(pygame.__file__), pygame.font.get_default_font()
+            )
+            if os.path.exists(default_font):
+                self.register(DEFAULT_FONT_KEY, default_font, "font")
+            return len(self.assets)
+
+    def register(self, key, path, kind):
+        """
+        加入一個資源到索引中\n
+        \n
+        參數:\n
+        key (str): 資源名稱\n
+        path (str): 檔案路徑\n
+        kind (str): 資源種類\n
+        \n
+        回傳:\n
+        AssetHandle: 這個資源的控制代碼\n
+        """
+        with self._lock:
+            handle = self.assets.get(key)
+            if handle is None:
+                handle = AssetHandle(key, kind, path)
+                self.assets[key] = handle
+            return handle
+
+    def start(self, kinds=None):
+        """
+        啟動背景執行緒並預載資源\n
+        \n
+        參數:\n
+        kinds (tuple): 要預載的資源種類，預設使用設定檔中的值\n
+        """
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._worker, name="AssetLoader", daemon=True
+            )
+            self._thread.start()
+        self.preload(kinds=kinds or ASSET_CONFIG["PRELOAD_KINDS"])
+
+    def preload(self, keys=None, kinds=None):
+        """
+        把資源排進背景載入佇列\n
+        \n
+        參數:\n
+        keys (list): 資源名稱，None 表示索引中的全部資源\n
+        kinds (tuple): 只預載這些種類\n
+        """
+        with self._lock:
+            handles = (
+                [self.assets[key] for key in keys] if keys else self.assets.values()
+            )
+            handles = [
+                handle for handle in handles if kinds is None or handle.kind in kinds
+            ]
+            handles.sort(key=lambda handle: KIND_PRIORITY.get(handle.kind, 9))
+            for handle in handles:
+                self._enqueue(handle)
+
+    def stop(self):
+        """停止背景執行緒"""
+        if self._thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+
+    ######################取得資源######################
+
+    def acquire(self, key):
+        """
+        取得資源並增加參照計數（不會等待，也不會讀檔）\n
+        \n
+        還沒載入的資源會排進背景載入佇列，控制代碼的 value 在載入\n
+        完成前是 None。\n
+        \n
+        參數:\n
+        key (str): 資源名稱\n
+        \n
+        回傳:\n
+        AssetHandle: 資源控制代碼，索引中沒有這個資源時回傳 None\n
+        """
+        with self._lock:
+            handle = self.assets.get(key)
+            if handle is None:
+                return None
+            handle.refcount += 1
+            self._touch(handle)
+            if handle.state == "indexed":
+                self._enqueue(handle)
+            return handle
+
+    def release(self, handle):
+        """
+        減少參照計數，計數歸零的資源可以被記憶體預算釋放\n
+        \n
+        參數:\n
+        handle (AssetHandle): acquire() 取得的控制代碼\n
+        """
+        with self._lock:
+            if handle.refcount > 0:
+                handle.refcount -= 1
+            if handle.refcount == 0:
+                self._evict_over_budget()
+
+    def get(self, key):
+        """
+        取得已經載入的資源（不增加參照計數、不等待、不讀檔）\n
+        \n
+        回傳:\n
+        已載入的資源，還沒載入或沒有這個資源時回傳 None\n
+        """
+        handle = self.assets.get(key)
+        if handle is None or handle.state != "loaded":
+            return None
+        with self._lock:
+            self._touch(handle)
+        return handle.value
+
+    def require(self, key):
+        """
+        取得資源，還沒載入就在目前的執行緒載入這一個資源\n
+        \n
+        不會排在背景執行緒的預載佇列後面等待：還沒輪到的資源直接在\n
+        目前的執行緒讀檔（只讀這一個檔案，成本有上限），背景執行緒之後\n
+        遇到時會略過。只有背景執行緒正好在讀這個資源時才等它讀完，\n
+        等待的時間不會比自己讀更久。\n
+        \n
+        參數:\n
+        key (str): 資源名稱\n
+        \n
+        回傳:\n
+        已載入的資源，失敗時回傳 None\n
+        """
+        handle = self.assets.get(key)
+        if handle is None:
+            return None
+        if handle.state == "loaded":
+            with self._lock:
+                self._touch(handle)
+            return handle.value
+
+        if self._claim(handle):
+            self.sync_loads += 1
+            if self.in_frame:
+                self.frame_path_loads += 1
+            self._load(handle)
+        elif handle.state == "loading":
+            self.stalls += 1
+            handle.ready.wait()
+        return handle.value if handle.state == "loaded" else None
+
+    ######################幀生命週期（主執行緒）######################
+
+    def begin_frame(self):
+        """在每一幀開始時呼叫"""
+        self.in_frame = True
+
+    def end_frame(self, game=None):
+        """
+        在每一幀結束時呼叫，把新載入的圖片轉成視窗的像素格式\n
+        \n
+        參數:\n
+        game (BreakoutGame): 遊戲主物件（不需要，只是為了符合 frame hook 介面）\n
+        """
+        self.in_frame = False
+        self.pump()
+
+    def pump(self, max_ms=None):
+        """
+        在主執行緒處理新載入的圖片（轉換像素格式），有時間上限\n
+        \n
+        參數:\n
+        max_ms (float): 最多花幾毫秒，預設使用設定檔中的值\n
+        """
+        if not self._to_convert or pygame.display.get_surface() is None:
+            return
+        limit = ASSET_CONFIG["CONVERT_MS_PER_FRAME"] if max_ms is None else max_ms
+        deadline = time.perf_counter() + limit / 1000.0
+        while self._to_convert and time.perf_counter() < deadline:
+            handle = self._to_convert.popleft()
+            with self._lock:
+                surface = handle.value
+                if surface is None or handle.converted:
+                    continue
+                if surface.get_alpha() is not None or surface.get_colorkey():
+                    surface = surface.convert_alpha()
+                else:
+                    surface = surface.convert()
+                self.used_bytes += _estimate_size("image", surface) - handle.size
+                handle.size = _estimate_size("image", surface)
+                handle.value = surface
+                handle.converted = True
+
+    def stats(self):
+        """回傳資源管理統計資訊"""
+        with self._lock:
+            states = {}
+            for handle in self.assets.values():
+                states[handle.state] = states.get(handle.state, 0) + 1
+            return {
+                "assets": len(self.assets),
+                "states": states,
+                "used_mb": self.used_bytes / 1024**2,
+                "budget_mb": self.budget / 1024**2,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "stalls": self.stalls,
+                "sync_loads": self.sync_loads,
+                "frame_path_loads": self.frame_path_loads,
+            }
+
+    ######################內部實作######################
+
+    def _enqueue(self, handle):
+        """把資源排進背景載入佇列（呼叫前需持有鎖）"""
+        if handle.state != "indexed":
+            return
+        handle.state = "queued"
+        handle.ready.clear()
+        self._queue.append(handle)
+        self._wakeup.set()
+
+    def _claim(self, handle):
+        """
+        把還沒開始讀的資源標記成讀取中，同一個資源只會有一個執行緒讀檔\n
+        \n
+        回傳:\n
+        bool: True 表示由呼叫的執行緒負責讀檔\n
+        """
+        with self._lock:
+            if handle.state not in ("indexed", "queued"):
+                return False
+            handle.state = "loading"
+            handle.ready.clear()
+            return True
+
+    def _touch(self, handle):
+        """標記為最近使用（呼叫前需持有鎖）"""
+        if handle.key in self._lru:
+            self._lru.move_to_end(handle.key)
+
+    def _worker(self):
+        """背景執行緒：依序讀檔並解碼"""
+        while not self._stopping:
+            try:
+                handle = self._queue.popleft()
+            except IndexError:
+                self._wakeup.wait(0.5)
+                self._wakeup.clear()
+                continue
+            if handle.state == "queued" and self._claim(handle):
+                self._load(handle)
+
+    def _load(self, handle):
+        """讀檔並解碼一個資源（在背景執行緒，或沒有背景執行緒時同步執行）"""
+        try:
+            with open(handle.path, "rb") as f:
+                data = f.read()
+            value = _decode(handle.kind, data, handle.path)
+        except (OSError, pygame.error) as e:
+            with self._lock:
+                handle.state = "failed"
+                handle.error = e
+            handle.ready.set()
+            return
+
+        with self._lock:
+            handle.value = value
+            handle.size = _estimate_size(handle.kind, value)
+            handle.converted = False
+            handle.state = "loaded"
+            self.used_bytes += handle.size
+            self.loads += 1
+            self._lru[handle.key] = handle
+            self._lru.move_to_end(handle.key)
+            if handle.kind == "image":
+                self._to_convert.append(handle)
+            self._evict_over_budget()
+        handle.ready.set()
+
+    def _evict_over_budget(self):
+        """超過記憶體預算時，依最久未使用的順序釋放沒人使用的資源（需持有鎖）"""
+        if self.used_bytes <= self.budget:
+            return
+        for key in list(self._lru):
+            if self.used_bytes <= self.budget:
+                break
+            handle = self._lru[key]
+            if handle.refcount > 0:
+                continue
+            del self._lru[key]
+            self.used_bytes -= handle.size
+            handle.value = None
+            handle.size = 0
+            handle.state = "indexed"
+            handle.ready.clear()
+            self.evictions += 1
+
+
+######################定義函式區######################
+
+
+def _decode(kind, data, path):
+    """把檔案內容解碼成遊戲可以使用的資源"""
+    if kind == "image":
+        return pygame.image.load(io.BytesIO(data), os.path.basename(path))
+    if kind == "sound":
+        if not pygame.mixer.get_init():
+            raise pygame.error("mixer not initialized")
+        return pygame.mixer.Sound(file=io.BytesIO(data))
+    # 字體保留檔案內容，各種大小的字體物件由 get_font 從記憶體建立
+    return data
+
+
+def _estimate_size(kind, value):
+    """估計資源佔用的記憶體（位元組）"""
+    if kind == "image":
+        width, height = value.get_size()
+        return width * height * value.get_bytesize()
+    if kind == "sound":
+        settings = pygame.mixer.get_init()
+        if settings:
+            frequency, size, channels = settings
+            return int(value.get_length() * frequency * channels * abs(size) // 8)
+        return 0
+    return len(value)
+
+
+def get_manager():
+    """
+    取得共用的資源管理器（第一次呼叫時建立並建立索引）\n
+    \n
+    回傳:\n
+    AssetManager: 資源管理器\n
+    """
+    global _manager
+
+    with _manager_lock:
+        if _manager is None:
+            manager = AssetManager()
+            manager.index()
+            _manager = manager
+        return _manager
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+音效模組
+
+負責初始化混音器並載入音效。混音器初始化可以交給背景執行緒，
+音效檔案由資源管理器讀檔與解碼，遊戲不用等音效準備好就能畫出第一幀；
+音效還沒載入完成前的播放要求會直接略過，不會讓遊戲主迴圈等待。
+
+遊戲邏輯呼叫 play() 時只記錄播放要求，真正呼叫混音器的是音效執行緒：
+短時間內同一個音效的多次要求（例如 TNT 連鎖爆炸）會合併成一次較大聲
+的播放，並且使用固定數量的聲道，每個音效同時播放的數量也有上限。
+"""
+
+######################載入套件######################
+import threading
+import time
+
+import pygame
+
+######################導入設定######################
+from config import AUDIO_CONFIG
+
+######################導入遊戲模組######################
+from . import assets
+
+######################全域變數######################
+_sounds = {}  # 音效名稱 → 資源控制代碼（持有參照，不會被記憶體預算釋放）
+_ready = threading.Event()  # 混音器初始化與音效載入都結束後設定
+_loader = None
+_pool = None  # 混音器可以使用時才建立的聲道池
+_muted = False  # 重新模擬已經播過音效的幀時暫時不播放
+
+
+######################物件類別######################
+
+
+class VoicePool:
+    """
+    固定數量聲道的音效播放器\n
+    \n
+    trigger() 可以在遊戲邏輯中隨時呼叫，只在鎖內累加計數；\n
+    背景執行緒在合併時間窗結束後才一次播放，音量依合併的次數提高。\n
+    \n
+    聲道分配:\n
+    1. 這個音效已經達到同時播放上限時，停掉它最早開始的那一聲\n
+    2. 否則使用空閒的聲道\n
+    3. 沒有空閒聲道時，停掉所有聲道中最早開始的那一聲\n
+    \n
+    屬性:\n
+    channels (list): 聲道池（pygame.mixer.Channel）\n
+    triggers (int): 收到的播放要求次數\n
+    plays (int): 實際播放的次數\n
+    coalesced (int): 被合併掉的播放要求次數\n
+    stolen (int): 因為聲道不夠或超過同時播放上限而被中斷的聲音數\n
+    """
+
+    def __init__(self, sounds, channels=None):
+        """
+        初始化聲道池\n
+        \n
+        參數:\n
+        sounds (dict): 音效名稱 → 資源控制代碼\n
+        channels (int): 聲道數量，預設使用設定檔中的值\n
+        """
+        count = channels or AUDIO_CONFIG["CHANNELS"]
+        pygame.mixer.set_num_channels(count)
+        self.channels = [pygame.mixer.Channel(index) for index in range(count)]
+        self.sounds = sounds
+        self.window = AUDIO_CONFIG["COALESCE_MS"] / 1000.0
+
+        # 每個聲道目前播放的音效名稱與開始時間
+        self._voices = [None] * count
+        self._started = [0.0] * count
+
+        # 等待播放的要求：音效名稱 → [次數, 第一次要求的時間]
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+        self.triggers = 0
+        self.plays = 0
+        self.coalesced = 0
+        self.stolen = 0
+
+    def start(self):
+        """啟動音效執行緒"""
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="AudioDispatch", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """停止音效執行緒（還沒播放的要求直接丟棄）"""
+        if self._thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+
+    def trigger(self, name):
+        """
+        記錄一次播放要求（在遊戲邏輯中呼叫，不碰混音器）\n
+        \n
+        參數:\n
+        name (str): 音效名稱\n
+        """
+        with self._lock:
+            self.triggers += 1
+            request = self._pending.get(name)
+            if request is None:
+                self._pending[name] = [1, time.perf_counter()]
+                self._wakeup.set()
+            else:
+                request[0] += 1
+
+    def stats(self):
+        """回傳播放統計"""
+        return {
+            "triggers": self.triggers,
+            "plays": self.plays,
+            "coalesced": self.coalesced,
+            "stolen": self.stolen,
+            "busy_channels": sum(1 for voice in self._voices if voice is not None),
+        }
+
+    def _run(self):
+        """音效執行緒：等到合併時間窗結束，再把合併後的要求播放出來"""
+        while not self._stopping:
+            with self._lock:
+                oldest = min(
+                    (first for _count, first in self._pending.values()), default=None
+                )
+            if oldest is None:
+                self._wakeup.wait(0.5)
+                self._wakeup.clear()
+                continue
+
+            delay = oldest + self.window - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            now = time.perf_counter()
+            with self._lock:
+                due = [
+                    (name, count)
+                    for name, (count, first) in self._pending.items()
+                    if first + self.window <= now
+                ]
+                for name, _count in due:
+                    del self._pending[name]
+            for name, count in due:
+                self._play(name, count)
+
+    def _play(self, name, count):
+        """
+        播放合併後的一次音效\n
+        \n
+        參數:\n
+        name (str): 音效名稱\n
+        count (int): 合併了幾次要求\n
+        """
+        handle = self.sounds.get(name)
+        sound = handle.value if handle is not None else None
+        if sound is None:
+            return
+
+        self.coalesced += count - 1
+        volume = min(
+            AUDIO_CONFIG["MAX_VOLUME"],
+            AUDIO_CONFIG["BASE_VOLUME"]
+            * (1.0 + AUDIO_CONFIG["COALESCE_VOLUME_STEP"] * (count - 1)),
+        )
+        index = self._pick_channel(name)
+        channel = self.channels[index]
+        try:
+            if self._voices[index] is not None and channel.get_busy():
+                channel.stop()
+                self.stolen += 1
+            channel.set_volume(volume)
+            channel.play(sound)
+        except pygame.error:
+            # 音效播放失敗也不影響遊戲運行
+            return
+        self._voices[index] = name
+        self._started[index] = time.perf_counter()
+        self.plays += 1
+
+    def _pick_channel(self, name):
+        """選出要使用的聲道編號（見類別說明的分配規則）"""
+        own = []
+        free = None
+        for index, channel in enumerate(self.channels):
+            if self._voices[index] is not None and not channel.get_busy():
+                self._voices[index] = None
+            voice = self._voices[index]
+            if voice is None:
+                if free is None:
+                    free = index
+            elif voice == name:
+                own.append(index)
+
+        limit = AUDIO_CONFIG["MAX_VOICES"].get(name, AUDIO_CONFIG["DEFAULT_MAX_VOICES"])
+        if len(own) >= limit:
+            return min(own, key=lambda index: self._started[index])
+        if free is not None:
+            return free
+        return min(range(len(self.channels)), key=lambda index: self._started[index])
+
+
+######################定義函式區######################
+
+
+def start(background=None):
+    """
+    初始化混音器並載入設定檔中的所有音效\n
+    \n
+    重複呼叫不會重新載入。\n
+    \n
+    參數:\n
+    background (bool): 是否在背景執行緒進行，預設使用設定檔中的值\n
+    """
+    global _loader
+
+    if _loader is not None or _ready.is_set():
+        return
+    if not AUDIO_CONFIG["ENABLED"]:
+        _ready.set()
+        return
+    if background is None:
+        background = AUDIO_CONFIG["BACKGROUND_LOAD"]
+
+    if background:
+        _loader = threading.Thread(target=_load, name="AudioLoader", daemon=True)
+        _loader.start()
+    else:
+        _load()
+
+
+def stop():
+    """停止音效執行緒（遊戲結束時呼叫）"""
+    if _pool is not None:
+        _pool.stop()
+
+
+def wait_ready(timeout=None):
+    """
+    等待音效載入完成\n
+    \n
+    參數:\n
+    timeout (float): 最多等待幾秒，None 表示一直等\n
+    \n
+    回傳:\n
+    bool: True 表示已經載入完成\n
+    """
+    return _ready.wait(timeout)
+
+
+def is_ready():
+    """回傳音效是否已經載入完成"""
+    return _ready.is_set()
+
+
+def play(name):
+    """
+    要求播放音效（還沒載入完成或沒有音效裝置時什麼都不做）\n
+    \n
+    只記錄要求，不會在呼叫的當下使用混音器，可以放心在遊戲邏輯中呼叫。\n
+    \n
+    參數:\n
+    name (str): 音效名稱，例如 "explosion"\n
+    """
+    pool = _pool
+    if pool is not None and not _muted:
+        pool.trigger(name)
+
+
+def set_muted(muted):
+    """
+    暫時不播放音效（對戰模式回溯時重新模擬的幀已經播過音效）\n
+    \n
+    參數:\n
+    muted (bool): 是否不播放\n
+    """
+    global _muted
+
+    _muted = muted
+
+
+def stats():
+    """
+    回傳播放統計\n
+    \n
+    回傳:\n
+    dict: 播放要求、實際播放、合併與中斷的次數，沒有音效時為 None\n
+    """
+    return _pool.stats() if _pool is not None else None
+
+
+def _load():
+    """初始化混音器並載入所有音效（可能在背景執行緒執行）"""
+    global _pool
+
+    try:
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        manager = assets.get_manager()
+        for name, key in AUDIO_CONFIG["SOUNDS"].items():
+            handle = manager.acquire(key)
+            if handle is None:
+                continue  # 資源資料夾中沒有這個檔案
+            # 單一音效載入失敗時 value 維持 None，播放時直接略過
+            manager.require(key)
+            _sounds[name] = handle
+        if _sounds:
+            pool = VoicePool(_sounds)
+            pool.start()
+            _pool = pool
+    except pygame.error:
+        # 沒有音效裝置時不播放音效
+        pass
+    finally:
+        _ready.set()
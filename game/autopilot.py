@@ -0,0 +1,482 @@
+# -*- coding: utf-8 -*-
+"""
+自動操作底板模組
+
+TrajectoryPredictor 直接算出每顆球什麼時候、在哪裡到達底板的高度，不必一幀
+一幀往後模擬：球在兩次反彈之間是直線運動，用和 Ball.update() 相同的規則
+（左右牆、天花板、磚塊）算出下一次反彈在第幾幀，一段一段算到底板的高度。
+算好的落點記在快取中，球的速度沒有改變（沒有反彈）就一直沿用；反彈時如果
+和預測的一樣，繼續沿用，不一樣才重新計算。
+
+Autopilot 用這些落點決定底板要往哪裡移動：追來得及接到的球中最早落地的
+那一顆，並讓球從底板的適當位置彈出去，朝最下面的磚塊飛。和玩家一樣每幀
+只能移動一次底板，給待機畫面示範、長時間測試與輔助模式使用。
+"""
+
+######################載入套件######################
+import math
+
+######################導入設定######################
+from config import AUTOPILOT_CONFIG, PHYSICS_CONFIG
+
+######################全域變數######################
+# 比對反彈後的速度是否和預測相同時允許的誤差（相對於球的速度）
+VELOCITY_TOLERANCE = 1e-6
+
+
+######################物件類別######################
+
+
+class Prediction:
+    """
+    一顆球的預測落點\n
+    \n
+    屬性:\n
+    frame (int): 球到達底板高度那一幀結束時 game.frames 的值，\n
+        反彈太多次算不出來時為 None\n
+    x (float): 到達底板高度時球心的 X 座標\n
+    vx, vy (float): 目前這一段的速度（和球的速度不同就表示反彈了）\n
+    bounces (list): 預測中還沒發生的反彈 (幀, vx, vy)，最後一個是下一次反彈\n
+    """
+
+    __slots__ = ("frame", "x", "vx", "vy", "bounces")
+
+    def __init__(self, frame, x, vx, vy, bounces):
+        self.frame = frame
+        self.x = x
+        self.vx = vx
+        self.vy = vy
+        self.bounces = bounces
+
+
+class TrajectoryPredictor:
+    """
+    預測球到達底板高度的時間與位置\n
+    \n
+    屬性:\n
+    max_bounces (int): 最多計算幾次反彈\n
+    traced (int): 重新計算軌跡的次數\n
+    reused (int): 沿用快取的次數\n
+    \n
+    使用範例:\n
+    predictor = TrajectoryPredictor()\n
+    for ball, prediction in predictor.predict_all(game):\n
+        print(prediction.frame - game.frames, prediction.x)\n
+    """
+
+    def __init__(self, max_bounces=None):
+        """
+        參數:\n
+        max_bounces (int): 最多計算幾次反彈，預設使用設定檔中的值\n
+        """
+        self.max_bounces = max_bounces or AUTOPILOT_CONFIG["MAX_BOUNCES"]
+        self._cache = {}  # id(ball) -> (ball, Prediction)
+        self.traced = 0
+        self.reused = 0
+
+    def predict(self, game, ball):
+        """
+        回傳一顆球的預測落點（球沒有反彈時沿用上次的結果）\n
+        \n
+        參數:\n
+        game (GameState): 遊戲狀態\n
+        ball (Ball): 已經發射的球\n
+        \n
+        回傳:\n
+        Prediction: 預測落點\n
+        """
+        entry = self._cache.get(id(ball))
+        if (
+            entry is not None
+            and entry[0] is ball
+            and _still_valid(entry[1], ball, game.frames)
+        ):
+            self.reused += 1
+            return entry[1]
+        prediction = self.trace(game, ball)
+        self._cache[id(ball)] = (ball, prediction)
+        self.traced += 1
+        return prediction
+
+    def predict_all(self, game):
+        """
+        預測所有已經發射的球，並丟掉已經不在遊戲中的球的快取\n
+        \n
+        參數:\n
+        game (GameState): 遊戲狀態\n
+        \n
+        回傳:\n
+        list: (球, Prediction) 的列表\n
+        """
+        cache, self._cache = self._cache, {}
+        frames = game.frames
+        results = []
+        for ball in game.balls:
+            if ball.stuck or ball.spinning:
+                continue
+            entry = cache.get(id(ball))
+            if (
+                entry is not None
+                and entry[0] is ball
+                and _still_valid(entry[1], ball, frames)
+            ):
+                prediction = entry[1]
+                self.reused += 1
+            else:
+                prediction = self.trace(game, ball)
+                self.traced += 1
+            self._cache[id(ball)] = (ball, prediction)
+            results.append((ball, prediction))
+        return results
+
+    def clear(self):
+        """清空快取（例如恢復存檔之後）"""
+        self._cache.clear()
+
+    def trace(self, game, ball):
+        """
+        從球目前的位置與速度算出落點（不使用快取）\n
+        \n
+        一段一段計算：每一段算出球再過幾幀會碰到左右牆、天花板、底板的高度\n
+        或磚塊，取最早的那一個，照 Ball.update() 的規則反彈後繼續算下一段。\n
+        \n
+        參數:\n
+        game (GameState): 遊戲狀態\n
+        ball (Ball): 已經發射的球\n
+        \n
+        回傳:\n
+        Prediction: 預測落點\n
+        """
+        width = game.world_width
+        radius = ball.radius
+        line = game.paddle.y - radius  # 球心到達這個高度就會碰到底板的高度
+        speed = ball.speed
+        x, y, vx, vy = ball.x, ball.y, ball.vx, ball.vy
+        frame = game.frames
+        bounces = []
+        skipped = set()  # 這次預測中已經撞過的磚塊（一般磚塊會被打掉）
+
+        for _ in range(self.max_bounces + 1):
+            # 每個事件在第幾步發生（至少 1 步）；沒有速度的方向不會發生
+            steps_wall = math.inf
+            if vx > 0:
+                steps_wall = _steps(width - radius - x, vx)
+            elif vx < 0:
+                steps_wall = _steps(x - radius, -vx)
+            steps_top = steps_line = math.inf
+            if vy < 0:
+                steps_top = _steps(y - radius, -vy)
+            elif vy > 0:
+                steps_line = _steps(line - y, vy)
+            steps = min(steps_wall, steps_top, steps_line)
+            if steps == math.inf:
+                break
+
+            hit, hit_steps = self._first_brick(game, ball, x, y, vx, vy, steps, skipped)
+            if hit is not None:
+                steps = hit_steps
+
+            # 移動到事件發生的那一步，依照 Ball.update() 的順序處理
+            x += vx * steps
+            y += vy * steps
+            frame += steps
+            if steps_line == steps:
+                return Prediction(frame, x, ball.vx, ball.vy, bounces[::-1])
+            bounced = False
+            if steps_wall == steps:
+                vx = -vx
+                x = radius if vx > 0 else width - radius
+                bounced = True
+            if steps_top == steps:
+                vy = -vy
+                y = radius
+                bounced = True
+            if bounced:
+                vx, vy = _normalize(vx, vy, speed)
+            if hit is not None:
+                skipped.add(id(hit))
+                if x < hit.x or x > hit.x + hit.width:
+                    vx = -vx
+                if y < hit.y or y > hit.y + hit.height:
+                    vy = -vy
+                angle = math.atan2(vy, vx)
+                vx = math.cos(angle) * speed
+                vy = math.sin(angle) * speed
+            bounces.append((frame, vx, vy))
+
+        # 反彈太多次（或速度為 0）：不知道落點，球反彈時再重新計算
+        return Prediction(None, x, ball.vx, ball.vy, [])
+
+    def _first_brick(self, game, ball, x, y, vx, vy, steps, skipped):
+        """
+        找出這一段最先撞到的磚塊\n
+        \n
+        超大關卡的一段可能橫跨整個場地，分成大約一個索引格子長的幾小段，\n
+        依序向空間索引查詢附近的磚塊，找到就不必再往後查。\n
+        \n
+        回傳:\n
+        tuple: (磚塊, 第幾步)，沒有撞到時為 (None, None)\n
+        """
+        if game.board is None:
+            return _first_hit(game.bricks, ball.radius, x, y, vx, vy, 1, steps, skipped)
+        index = game.board.index
+        radius = ball.radius
+        per_chunk = max(1, int(index.cell / max(abs(vx), abs(vy))))
+        first = 1
+        while first <= steps:
+            last = min(steps, first + per_chunk - 1)
+            start_x, start_y = x + vx * (first - 1), y + vy * (first - 1)
+            end_x, end_y = x + vx * last, y + vy * last
+            candidates = index.query(
+                min(start_x, end_x) - radius,
+                min(start_y, end_y) - radius,
+                max(start_x, end_x) + radius,
+                max(start_y, end_y) + radius,
+            )
+            hit = _first_hit(candidates, radius, x, y, vx, vy, first, last, skipped)
+            if hit[0] is not None:
+                return hit
+            first = last + 1
+        return None, None
+
+
+class Autopilot:
+    """
+    自動操作底板\n
+    \n
+    每一幀發射黏在底板上的球，從來得及接到的球中挑最早落地的那一顆，\n
+    把底板往它的落點移動（和按住方向鍵一樣每幀移動 paddle.speed）。\n
+    接球時讓球打在底板偏一邊的位置，彈向最下面還沒打掉的磚塊，\n
+    不會一直在同一條直線上來回。\n
+    \n
+    屬性:\n
+    predictor (TrajectoryPredictor): 落點預測\n
+    target (float): 上一幀底板中心要去的 X 座標，沒有要接的球時為 None\n
+    \n
+    使用範例:\n
+    autopilot = Autopilot()\n
+    autopilot.steer(game)  # 每一幀在 handle_continuous_input 中呼叫\n
+    """
+
+    def __init__(self, predictor=None):
+        """
+        參數:\n
+        predictor (TrajectoryPredictor): 落點預測，預設建立一個新的\n
+        """
+        self.predictor = predictor or TrajectoryPredictor()
+        self.target = None
+        self._aim = None  # 瞄準的磚塊
+        self._aim_bricks = None  # 瞄準的磚塊屬於哪一個磚塊列表（換關時重新找）
+        self._aim_index = -1  # 超大關卡從磚塊列表的這個位置往前找
+
+    def choose(self, game):
+        """
+        回傳底板中心要去的 X 座標\n
+        \n
+        參數:\n
+        game (GameState): 遊戲狀態\n
+        \n
+        回傳:\n
+        float: 底板中心的目標 X 座標，沒有要接的球時為 None\n
+        """
+        now = game.frames
+        paddle = game.paddle
+        center = paddle.x + paddle.width / 2
+        reach = paddle.width / 2
+        best = earliest = None
+        for _, prediction in self.predictor.predict_all(game):
+            frame = prediction.frame
+            if frame is None or frame <= now:
+                continue
+            if earliest is None or frame < earliest.frame:
+                earliest = prediction
+            # 在落地前移動得到的球才追
+            if abs(prediction.x - center) - reach <= paddle.speed * (frame - now):
+                if best is None or frame < best.frame:
+                    best = prediction
+        best = best or earliest
+        if best is None:
+            return None
+        return best.x - self._aim_offset(game, best)
+
+    def steer(self, game):
+        """
+        發射黏在底板上的球，並把底板往目標移動一步\n
+        \n
+        參數:\n
+        game (GameState): 遊戲狀態\n
+        """
+        for ball in game.balls:
+            if ball.stuck:
+                ball.launch()
+        self.target = target = self.choose(game)
+        if target is None:
+            return
+        paddle = game.paddle
+        center = paddle.x + paddle.width / 2
+        deadzone = paddle.speed / 2
+        if target < center - deadzone:
+            paddle.move_left(game.world_width)
+        elif target > center + deadzone:
+            paddle.move_right(game.world_width)
+
+    def _aim_offset(self, game, prediction):
+        """
+        回傳球要打在底板中心右邊多遠，才會彈向瞄準的磚塊\n
+        \n
+        底板的反彈角度由撞擊位置決定（見 Ball.update()），\n
+        反過來從想要的角度算出撞擊位置。\n
+        """
+        brick = self._aim_brick(game)
+        if brick is None:
+            return 0.0
+        paddle = game.paddle
+        max_angle = math.radians(PHYSICS_CONFIG["BOUNCE_ANGLE_MAX"])
+        limit = max_angle * AUTOPILOT_CONFIG["AIM_ANGLE"]
+        dx = brick.x + brick.width / 2 - prediction.x
+        dy = paddle.y - (brick.y + brick.height)
+        angle = max(-limit, min(limit, math.atan2(dx, max(dy, 1.0))))
+        return angle / (2 * max_angle) * paddle.width
+
+    def _aim_brick(self, game):
+        """
+        回傳要瞄準的磚塊：最下面還沒被打掉的磚塊，打掉之後才找下一個\n
+        \n
+        一般關卡與無盡模式直接找最下面的磚塊；超大關卡的磚塊很多，\n
+        改成從磚塊列表的最後面（關卡的最下面）往前找。\n
+        """
+        bricks = game.bricks
+        aim = self._aim
+        if aim is not None and not aim.hit and self._aim_bricks is bricks:
+            return aim
+        self._aim_bricks = bricks
+        self._aim = None
+        if game.board is None:
+            self._aim = max(
+                (brick for brick in bricks if not brick.hit),
+                key=lambda brick: brick.y,
+                default=None,
+            )
+            return self._aim
+        if self._aim_index >= len(bricks) or self._aim_index < 0:
+            self._aim_index = len(bricks) - 1
+        index = self._aim_index
+        for _ in range(len(bricks)):
+            if not bricks[index].hit:
+                self._aim_index = index
+                self._aim = bricks[index]
+                break
+            index -= 1
+            if index < 0:
+                index = len(bricks) - 1
+        return self._aim
+
+
+######################定義函式區######################
+
+
+def _steps(distance, speed):
+    """回傳以 speed 前進幾步之後才會走完 distance（至少 1 步）"""
+    return max(1, math.ceil(distance / speed))
+
+
+def _slab(start, velocity, low, high):
+    """
+    回傳沿著一個軸移動時，位於 [low, high] 之間的步數範圍\n
+    \n
+    回傳:\n
+    tuple: (進入, 離開)，永遠不會進入時為 (inf, -inf)\n
+    """
+    if velocity == 0:
+        if low <= start <= high:
+            return -math.inf, math.inf
+        return math.inf, -math.inf
+    first = (low - start) / velocity
+    second = (high - start) / velocity
+    if first > second:
+        first, second = second, first
+    return first, second
+
+
+def _first_hit(bricks, radius, x, y, vx, vy, first, last, skipped):
+    """
+    找出球在第 first 到第 last 步之間最先撞到的磚塊\n
+    \n
+    把磚塊往外擴大一個球的半徑，先算出球心進入與離開擴大範圍的步數，\n
+    再逐步用和 Ball.check_brick_collision() 相同的圓形碰撞確認；\n
+    同一步撞到好幾塊時取列表中的第一塊（和 Ball.update() 相同）。\n
+    \n
+    回傳:\n
+    tuple: (磚塊, 第幾步)，沒有撞到時為 (None, None)\n
+    """
+    limit_sq = radius * radius
+    start_x, start_y = x + vx * (first - 1), y + vy * (first - 1)
+    end_x, end_y = x + vx * last, y + vy * last
+    left = min(start_x, end_x) - radius
+    right = max(start_x, end_x) + radius
+    top = min(start_y, end_y) - radius
+    bottom = max(start_y, end_y) + radius
+
+    best, best_steps = None, last + 1
+    for brick in bricks:
+        if brick.hit:
+            continue
+        bx, by = brick.x, brick.y
+        bright, bbottom = bx + brick.width, by + brick.height
+        if bx > right or by > bottom or bright < left or bbottom < top:
+            continue
+        if id(brick) in skipped:
+            continue
+        enter, leave = _slab(x, vx, bx - radius, bright + radius)
+        enter_y, leave_y = _slab(y, vy, by - radius, bbottom + radius)
+        enter = max(enter, enter_y, first)
+        leave = min(leave, leave_y, best_steps - 1)
+        step = math.ceil(enter)
+        while step <= leave:
+            px = x + vx * step
+            py = y + vy * step
+            dx = px - max(bx, min(px, bright))
+            dy = py - max(by, min(py, bbottom))
+            if dx * dx + dy * dy < limit_sq:
+                best, best_steps = brick, step
+                break
+            step += 1
+    if best is None:
+        return None, None
+    return best, best_steps
+
+
+def _normalize(vx, vy, speed):
+    """和 Ball.normalize_velocity() 相同的正規化"""
+    mag = math.hypot(vx, vy)
+    if mag == 0:
+        return 0, -speed
+    return vx / mag * speed, vy / mag * speed
+
+
+def _still_valid(prediction, ball, frames):
+    """
+    檢查快取的預測是否還能用\n
+    \n
+    球的速度沒變就表示沒有反彈，除非已經過了預測的下一次反彈時間；\n
+    速度變了但和預測的下一次反彈相同（同一幀、同樣的速度），就把那次\n
+    反彈從預測中拿掉繼續使用。\n
+    """
+    bounces = prediction.bounces
+    if ball.vx == prediction.vx and ball.vy == prediction.vy:
+        # 預測的反彈時間過了卻沒有反彈（例如預測會撞到的磚塊被 TNT 炸掉了）
+        return not bounces or frames <= bounces[-1][0]
+    if not bounces:
+        return False
+    frame, vx, vy = bounces[-1]
+    tolerance = VELOCITY_TOLERANCE * ball.speed
+    if (
+        frame != frames
+        or abs(ball.vx - vx) > tolerance
+        or abs(ball.vy - vy) > tolerance
+    ):
+        return False
+    bounces.pop()
+    prediction.vx = ball.vx
+    prediction.vy = ball.vy
+    return True
@@ -0,0 +1,758 @@
+# -*- coding: utf-8 -*-
+"""
+超大磚塊場地模組
+
+關卡比視窗大的時候（例如 500x500 塊磚），整個場地不再等於視窗：
+球、底板與磚塊都在場地座標中運動，畫面透過可以捲動與縮放的攝影機觀看。
+
+- 空間索引：把磚塊依照位置分到固定大小的格子，球只跟附近格子中的磚塊做碰撞檢查
+- 區塊圖層：場地切成固定大小的區塊，每個區塊有自己的快取表面，
+  只有在畫面內的區塊才會更新（塗掉被打掉的磚塊）與繪製，
+  很久沒看到的區塊會釋放表面，需要時再重新畫
+- 過關判斷與 TNT 倒數也只處理需要的磚塊，不會每一幀掃過整個場地
+
+所以每一幀的成本取決於畫面上看得到多少東西，而不是場地有多大。
+"""
+
+######################載入套件######################
+import math
+from collections import OrderedDict
+
+import pygame
+
+######################導入設定######################
+from config import (
+    WINDOW_WIDTH,
+    WINDOW_HEIGHT,
+    PADDLE_CONFIG,
+    BOARD_CONFIG,
+    TNT_CONFIG,
+    COLORS,
+)
+
+######################導入遊戲模組######################
+from . import systems
+from .events import TntDetonated
+from .levels import footprint, tnt_label
+
+######################物件類別######################
+
+
+class Camera:
+    """
+    場地的攝影機\n
+    \n
+    x, y 是畫面左上角在場地中的座標，zoom 是縮放倍率（大於 1 放大）。\n
+    預設會跟著球移動；玩家手動捲動之後停止跟隨，直到重新置中。\n
+    \n
+    屬性:\n
+    x, y (float): 畫面左上角的場地座標\n
+    zoom (float): 縮放倍率\n
+    following (bool): 是否跟著球移動\n
+    \n
+    使用範例:\n
+    camera = Camera(5000, 4000)\n
+    camera.follow(ball.x, ball.y)\n
+    screen_x, screen_y = camera.to_screen(brick.x, brick.y)\n
+    """
+
+    def __init__(
+        self,
+        world_width,
+        world_height,
+        view_width=WINDOW_WIDTH,
+        view_height=WINDOW_HEIGHT,
+    ):
+        """
+        參數:\n
+        world_width, world_height (int): 場地大小\n
+        view_width, view_height (int): 畫面大小，預設為視窗大小\n
+        """
+        self.world_width = world_width
+        self.world_height = world_height
+        self.view_width = view_width
+        self.view_height = view_height
+        # 最多縮小到整個場地剛好放進畫面
+        self.min_zoom = max(
+            BOARD_CONFIG["MIN_ZOOM"],
+            min(view_width / world_width, view_height / world_height),
+        )
+        self.max_zoom = BOARD_CONFIG["MAX_ZOOM"]
+        self.zoom = 1.0
+        self.following = True
+        # 一開始對準場地下方中央（底板的位置）
+        self.x = 0.0
+        self.y = 0.0
+        self.center_on(world_width / 2, world_height - view_height / 2)
+
+    @property
+    def origin(self):
+        """畫面左上角換算成縮放後像素的整數座標（區塊與物件共用，不會錯開）"""
+        return math.floor(self.x * self.zoom), math.floor(self.y * self.zoom)
+
+    def visible_rect(self, margin=0):
+        """
+        回傳畫面看得到的場地範圍\n
+        \n
+        參數:\n
+        margin (int): 往外多留的場地像素\n
+        \n
+        回傳:\n
+        pygame.Rect: 場地座標的範圍\n
+        """
+        return pygame.Rect(
+            math.floor(self.x) - margin,
+            math.floor(self.y) - margin,
+            math.ceil(self.view_width / self.zoom) + 2 * margin + 1,
+            math.ceil(self.view_height / self.zoom) + 2 * margin + 1,
+        )
+
+    def to_screen(self, x, y):
+        """把場地座標換算成畫面座標"""
+        origin_x, origin_y = self.origin
+        return x * self.zoom - origin_x, y * self.zoom - origin_y
+
+    def to_world(self, x, y):
+        """把畫面座標換算成場地座標"""
+        return self.x + x / self.zoom, self.y + y / self.zoom
+
+    def center_on(self, x, y):
+        """把畫面中心移到指定的場地座標"""
+        self.x = x - self.view_width / self.zoom / 2
+        self.y = y - self.view_height / self.zoom / 2
+        self.clamp()
+
+    def follow(self, x, y):
+        """
+        平滑地跟著目標移動（手動捲動後不跟隨）\n
+        \n
+        參數:\n
+        x, y (float): 目標的場地座標\n
+        """
+        if not self.following:
+            return
+        lerp = BOARD_CONFIG["FOLLOW_LERP"]
+        target_x = x - self.view_width / self.zoom / 2
+        target_y = y - self.view_height / self.zoom / 2
+        self.x += (target_x - self.x) * lerp
+        self.y += (target_y - self.y) * lerp
+        self.clamp()
+
+    def pan(self, dx, dy):
+        """
+        手動捲動（以畫面像素為單位），之後停止跟隨\n
+        \n
+        參數:\n
+        dx, dy (float): 捲動的畫面像素\n
+        """
+        self.following = False
+        self.x += dx / self.zoom
+        self.y += dy / self.zoom
+        self.clamp()
+
+    def zoom_by(self, factor, anchor=None):
+        """
+        縮放畫面，anchor 所在的場地位置縮放後仍然在畫面同一個地方\n
+        \n
+        參數:\n
+        factor (float): 倍率變化（大於 1 放大）\n
+        anchor (tuple): 畫面座標，預設為畫面中心\n
+        """
+        if anchor is None:
+            anchor = (self.view_width / 2, self.view_height / 2)
+        world_x, world_y = self.to_world(*anchor)
+        self.zoom = min(self.max_zoom, max(self.min_zoom, self.zoom * factor))
+        self.x = world_x - anchor[0] / self.zoom
+        self.y = world_y - anchor[1] / self.zoom
+        self.clamp()
+
+    def clamp(self):
+        """不讓畫面超出場地（場地比畫面小的方向置中）"""
+        view_w = self.view_width / self.zoom
+        view_h = self.view_height / self.zoom
+        if view_w >= self.world_width:
+            self.x = (self.world_width - view_w) / 2
+        else:
+            self.x = min(max(self.x, 0.0), self.world_width - view_w)
+        if view_h >= self.world_height:
+            self.y = (self.world_height - view_h) / 2
+        else:
+            self.y = min(max(self.y, 0.0), self.world_height - view_h)
+
+
+class SpatialIndex:
+    """
+    磚塊的均勻格子索引\n
+    \n
+    每個格子記錄和它重疊的磚塊編號；查詢時只看範圍內的格子，\n
+    順便把格子裡已經被打掉的磚塊清掉，之後的查詢越來越快。\n
+    \n
+    屬性:\n
+    cell (int): 格子邊長（場地像素）\n
+    cols, rows (int): 格子的列數與行數\n
+    """
+
+    def __init__(self, level, bricks, width, height, cell=None):
+        """
+        從關卡的座標陣列建立索引\n
+        \n
+        參數:\n
+        level (CompiledLevel): 關卡（使用停好之後的座標）\n
+        bricks (list): 磚塊列表\n
+        width, height (int): 場地大小\n
+        cell (int): 格子邊長，預設使用設定檔中的值\n
+        """
+        self.bricks = bricks
+        self.cell = cell = cell or BOARD_CONFIG["INDEX_CELL"]
+        self.cols = cols = width // cell + 1
+        self.rows = rows = height // cell + 1
+        self.cells = cells = [[] for _ in range(cols * rows)]
+        xs, ys, widths, heights = level.xs, level.ys, level.widths, level.heights
+        for index in range(level.count):
+            x, y = xs[index], ys[index]
+            col_end = min(cols - 1, (x + widths[index] - 1) // cell)
+            row_end = min(rows - 1, (y + heights[index] - 1) // cell)
+            for row in range(max(0, y // cell), row_end + 1):
+                base = row * cols
+                for col in range(max(0, x // cell), col_end + 1):
+                    cells[base + col].append(index)
+
+    def query(self, left, top, right, bottom):
+        """
+        找出和範圍重疊的格子中還沒被打掉的磚塊\n
+        \n
+        參數:\n
+        left, top, right, bottom (float): 場地座標的範圍\n
+        \n
+        回傳:\n
+        list: 磚塊列表，依照磚塊在關卡中的順序排列\n
+        """
+        cell, cols, cells, bricks = self.cell, self.cols, self.cells, self.bricks
+        col_start = max(0, int(left) // cell)
+        col_end = min(cols - 1, int(right) // cell)
+        row_start = max(0, int(top) // cell)
+        row_end = min(self.rows - 1, int(bottom) // cell)
+        found = set()
+        for row in range(row_start, row_end + 1):
+            base = row * cols
+            for col in range(col_start, col_end + 1):
+                indices = cells[base + col]
+                alive = [index for index in indices if not bricks[index].hit]
+                if len(alive) != len(indices):
+                    cells[base + col] = alive
+                found.update(alive)
+        return [bricks[index] for index in sorted(found)]
+
+
+class Chunk:
+    """
+    場地中的一個區塊\n
+    \n
+    屬性:\n
+    rect (pygame.Rect): 區塊在場地中的範圍\n
+    indices (list): 和區塊重疊的磚塊編號\n
+    dynamic (list): 每一幀都要重畫的磚塊編號（閃爍磚塊與 TNT）\n
+    surface (pygame.Surface): 快取的靜態磚塊表面，還沒畫或已釋放時為 None\n
+    scaled (pygame.Surface): 依目前縮放倍率縮放過的表面\n
+    """
+
+    def __init__(self, key, rect):
+        self.key = key
+        self.rect = rect
+        self.indices = []
+        self.dynamic = []
+        self.surface = None
+        self.erased = None
+        self.scaled = None
+        self.scaled_size = None
+
+    def release(self):
+        """釋放快取的表面（需要時再重新畫）"""
+        self.surface = None
+        self.erased = None
+        self.scaled = None
+        self.scaled_size = None
+
+
+class Board:
+    """
+    超大關卡的場地：攝影機、空間索引與區塊圖層\n
+    \n
+    可以在背景執行緒建立（見 prefetch.py），建立時會先把一開始\n
+    畫面內的區塊畫好。\n
+    \n
+    屬性:\n
+    level (CompiledLevel): 關卡\n
+    bricks (list): 磚塊列表\n
+    width, height (int): 場地大小\n
+    camera (Camera): 攝影機\n
+    index (SpatialIndex): 碰撞用的空間索引\n
+    chunks (list): 所有區塊\n
+    primed (list): 正在倒數的 TNT\n
+    chunks_drawn (int): 上一幀畫了幾個區塊\n
+    chunks_rendered (int): 總共畫了幾次區塊表面\n
+    """
+
+    def __init__(self, level, bricks):
+        """
+        參數:\n
+        level (CompiledLevel): 關卡\n
+        bricks (list): level.build_bricks() 建立的磚塊（不使用滑下來的動畫）\n
+        """
+        self.level = level
+        self.bricks = bricks
+        self.width, self.height = world_size(level)
+        self.camera = Camera(self.width, self.height)
+        self.index = SpatialIndex(level, bricks, self.width, self.height)
+
+        # 把磚塊分到區塊
+        size = self.chunk_size = BOARD_CONFIG["CHUNK_SIZE"]
+        self.chunk_cols = self.width // size + 1
+        self.chunk_rows = self.height // size + 1
+        self.chunks = [
+            Chunk(
+                key,
+                pygame.Rect(
+                    (key % self.chunk_cols) * size,
+                    (key // self.chunk_cols) * size,
+                    size,
+                    size,
+                ),
+            )
+            for key in range(self.chunk_cols * self.chunk_rows)
+        ]
+        largest = 0
+        spilling = []
+        for index, brick in enumerate(bricks):
+            area = footprint(brick.x, brick.y, brick.width, brick.height, brick.is_tnt)
+            largest = max(largest, area.width, area.height)
+            # 文字比磚塊大的 TNT 會蓋到旁邊的磚塊
+            if area.width > brick.width or area.height > brick.height:
+                spilling.append((index, area))
+            for chunk in self._chunks_in(area):
+                chunk.indices.append(index)
+                if brick.is_blinking or brick.is_tnt:
+                    chunk.dynamic.append(index)
+
+        # 和 TNT 文字互相蓋住的磚塊：塗黑或重畫時要連旁邊的磚塊一起照順序重畫
+        self._tangled = bytearray(len(bricks))
+        for index, area in spilling:
+            for other in self.index.query(
+                area.left, area.top, area.right - 1, area.bottom - 1
+            ):
+                if other.level_index != index and area.colliderect(
+                    footprint(other.x, other.y, other.width, other.height, other.is_tnt)
+                ):
+                    self._tangled[index] = 1
+                    self._tangled[other.level_index] = 1
+        self._reach = largest
+
+        # 爆炸中心到被炸到的磚塊畫出範圍的最遠距離
+        self._blast_reach = math.ceil(TNT_CONFIG["EXPLOSION_RADIUS"]) + largest
+
+        self.primed = []
+        self._primed_indices = set()
+        self._cursor = 0  # 在這之前的磚塊都已經被打掉
+        self._cached = OrderedDict()  # 有快取表面的區塊（最久沒畫的在前面）
+        self._dirty = set()  # 表面上還有被打掉的磚塊沒塗黑的區塊
+        self._tiles = {}  # 同顏色、同大小的磚塊共用一張表面
+        self._renders_left = 0
+        self.chunks_drawn = 0
+        self.chunks_rendered = 0
+
+        # 先畫好一開始畫面內的區塊
+        for chunk in self._chunks_in(self.camera.visible_rect()):
+            self._render(chunk, force=True)
+
+    ######################模擬######################
+
+    def nearby(self, ball):
+        """
+        回傳球這一幀可能碰到的磚塊\n
+        \n
+        參數:\n
+        ball (Ball): 球\n
+        \n
+        回傳:\n
+        list: 磚塊列表\n
+        """
+        reach = ball.radius + ball.speed + 1
+        return self.index.query(
+            ball.x - reach, ball.y - reach, ball.x + reach, ball.y + reach
+        )
+
+    def watch(self, candidates):
+        """
+        記下這一幀被球觸發倒數的 TNT\n
+        \n
+        參數:\n
+        candidates (list): nearby() 回傳、剛交給球做碰撞檢查的磚塊\n
+        """
+        for brick in candidates:
+            if brick.hit:
+                self._mark_dirty(
+                    footprint(brick.x, brick.y, brick.width, brick.height, True)
+                )
+            elif brick.tnt_primed and brick.level_index not in self._primed_indices:
+                self._primed_indices.add(brick.level_index)
+                self.primed.append(brick)
+
+    def update(self, now, events=None):
+        """
+        更新正在倒數的 TNT，並檢查是否所有磚塊都被打掉\n
+        \n
+        參數:\n
+        now (int): 當前時間戳記（毫秒）\n
+        events (EventQueue): 遊戲的事件佇列，TNT 爆炸事件用來找出這一幀\n
+            被炸到的區塊\n
+        \n
+        回傳:\n
+        bool: True 表示過關\n
+        """
+        if self.primed:
+            detonated = events.pending(TntDetonated) if events is not None else None
+            before = len(detonated) if detonated is not None else 0
+            for brick in list(self.primed):
+                brick.update(now, self.bricks, events, self.level)
+            if detonated is None:
+                # 不知道炸到哪裡，所有快取的區塊都要檢查
+                self._dirty.update(self._cached)
+            else:
+                # 連鎖爆炸的每個 TNT 都會加入一個爆炸事件
+                reach = self._blast_reach
+                for blast in detonated[before:]:
+                    self._mark_dirty(
+                        pygame.Rect(
+                            blast.x - reach,
+                            blast.y - reach,
+                            reach * 2 + 1,
+                            reach * 2 + 1,
+                        )
+                    )
+            still = [b for b in self.primed if b.tnt_primed and not b.hit]
+            if len(still) != len(self.primed):
+                self.primed = still
+                self._primed_indices = {brick.level_index for brick in still}
+
+        # 被打掉的磚塊不會復原，游標只會往前走，整關加起來只掃過每個磚塊一次
+        bricks = self.bricks
+        cursor = self._cursor
+        count = len(bricks)
+        while cursor < count and bricks[cursor].hit:
+            cursor += 1
+        self._cursor = cursor
+        return cursor == count
+
+    def snapshot(self):
+        """
+        記下模擬用的狀態：倒數中的 TNT、過關判斷的游標與攝影機\n
+        （磚塊本身由呼叫的人另外記錄，見 game/rollback.py）\n
+        \n
+        回傳:\n
+        tuple: 交給 restore() 的資料\n
+        """
+        camera = self.camera
+        return (
+            tuple(self.primed),
+            self._cursor,
+            (camera.x, camera.y, camera.zoom, camera.following),
+        )
+
+    def restore(self, state, revived=False):
+        """
+        恢復 snapshot() 時的狀態\n
+        \n
+        被打掉的磚塊又回到場上時，空間索引已經把它們清掉、快取的區塊也已經\n
+        塗黑，所以要重新建立索引並丟掉快取的區塊（之後再慢慢重畫）。\n
+        \n
+        參數:\n
+        state (tuple): snapshot() 回傳的資料\n
+        revived (bool): 是否有磚塊從被打掉恢復成還在場上\n
+        """
+        primed, self._cursor, camera_state = state
+        self.primed = list(primed)
+        self._primed_indices = {brick.level_index for brick in primed}
+        camera = self.camera
+        camera.x, camera.y, camera.zoom, camera.following = camera_state
+        if revived:
+            self.index = SpatialIndex(self.level, self.bricks, self.width, self.height)
+            for chunk in self._cached.values():
+                chunk.release()
+            self._cached.clear()
+            self._dirty.clear()
+
+    ######################繪製######################
+
+    def draw(self, surface, game):
+        """
+        繪製畫面內的磚塊與遊戲物件\n
+        \n
+        參數:\n
+        surface (pygame.Surface): 螢幕表面\n
+        game (GameState): 遊戲狀態\n
+        """
+        camera = self.camera
+        zoom = camera.zoom
+        origin_x, origin_y = camera.origin
+        visible = camera.visible_rect()
+        self._renders_left = BOARD_CONFIG["CHUNK_RENDERS_PER_FRAME"]
+
+        drawn = 0
+        dynamic = []
+        for chunk in self._chunks_in(visible):
+            if chunk.surface is None and not self._render(chunk):
+                continue  # 這一幀畫新區塊的額度用完了，下一幀再畫
+            if chunk.key in self._dirty:
+                self._erase_hit(chunk)
+            self._cached.move_to_end(chunk.key)
+            left = math.floor(chunk.rect.x * zoom)
+            top = math.floor(chunk.rect.y * zoom)
+            if zoom == 1.0:
+                image = chunk.surface
+            else:
+                size = (
+                    math.floor(chunk.rect.right * zoom) - left,
+                    math.floor(chunk.rect.bottom * zoom) - top,
+                )
+                if chunk.scaled is None or chunk.scaled_size != size:
+                    chunk.scaled = pygame.transform.scale(chunk.surface, size)
+                    chunk.scaled_size = size
+                image = chunk.scaled
+            surface.blit(image, (left - origin_x, top - origin_y))
+            dynamic.extend(chunk.dynamic)
+            drawn += 1
+        self.chunks_drawn = drawn
+
+        # 閃爍磚塊與倒數中的 TNT 每一幀重畫（相鄰區塊可能重複列出，只畫一次）
+        black = COLORS["BLACK"]
+        for index in set(dynamic):
+            brick = self.bricks[index]
+            if brick.hit or not (brick.is_blinking or brick.tnt_primed):
+                continue
+            if self._tangled[index]:
+                # TNT 文字會和旁邊的磚塊互相蓋住：把這個範圍內的磚塊
+                # 依照編號順序重畫一次
+                area = footprint(
+                    brick.x, brick.y, brick.width, brick.height, brick.tnt_primed
+                )
+                x, y = camera.to_screen(area.x, area.y)
+                clip = surface.get_clip()
+                surface.set_clip(
+                    (x, y, math.ceil(area.width * zoom), math.ceil(area.height * zoom))
+                )
+                surface.fill(black)
+                reach = self._reach
+                for other in self.index.query(
+                    area.left - reach,
+                    area.top - reach,
+                    area.right + reach,
+                    area.bottom + reach,
+                ):
+                    self._draw_scaled(surface, other, ("width", "height"))
+                surface.set_clip(clip)
+                continue
+            if brick.tnt_primed:
+                area = footprint(brick.x, brick.y, brick.width, brick.height, True)
+                x, y = camera.to_screen(area.x, area.y)
+                area = pygame.Rect(
+                    x, y, math.ceil(area.width * zoom), math.ceil(area.height * zoom)
+                )
+                surface.fill(black, area.clip(surface.get_rect()))
+            self._draw_scaled(surface, brick, ("width", "height"))
+
+        # 遊戲物件（只畫畫面內的）：位置跟著縮放，大小也跟著縮放
+        self._draw_scaled(surface, game.paddle, ("width", "height"))
+        near = camera.visible_rect(BOARD_CONFIG["ENTITY_MARGIN"])
+        for ball in game.balls:
+            if near.collidepoint(ball.x, ball.y):
+                self._draw_scaled(surface, ball, ("radius",))
+        systems.render(game.world, surface, camera, near)
+
+    def stats(self):
+        """回傳場地的統計"""
+        return {
+            "bricks": len(self.bricks),
+            "chunks": len(self.chunks),
+            "chunks_cached": len(self._cached),
+            "chunks_drawn": self.chunks_drawn,
+            "chunks_rendered": self.chunks_rendered,
+            "zoom": self.camera.zoom,
+        }
+
+    def _chunks_in(self, rect):
+        """回傳和場地範圍重疊的區塊"""
+        size = self.chunk_size
+        col_start = max(0, rect.left // size)
+        col_end = min(self.chunk_cols - 1, (rect.right - 1) // size)
+        row_start = max(0, rect.top // size)
+        row_end = min(self.chunk_rows - 1, (rect.bottom - 1) // size)
+        chunks = self.chunks
+        cols = self.chunk_cols
+        return [
+            chunks[row * cols + col]
+            for row in range(row_start, row_end + 1)
+            for col in range(col_start, col_end + 1)
+        ]
+
+    def _render(self, chunk, force=False):
+        """
+        畫出區塊的靜態磚塊表面（超過這一幀的額度時不畫）\n
+        \n
+        參數:\n
+        chunk (Chunk): 區塊\n
+        force (bool): 不管額度一定要畫\n
+        \n
+        回傳:\n
+        bool: 是否已經畫好\n
+        """
+        if self._renders_left <= 0 and not force:
+            return False
+        self._renders_left -= 1
+
+        surface = pygame.Surface(chunk.rect.size, 0, 32)
+        surface.fill(COLORS["BLACK"])
+        erased = bytearray(len(chunk.indices))
+        left, top = chunk.rect.topleft
+        bricks = self.bricks
+        # 磚塊是實心矩形，用同顏色同大小的磚塊表面一次 blits 比逐一畫矩形快，
+        # 依磚塊編號的順序畫（和 Brick.draw 逐一畫出來的重疊結果相同）
+        blits = []
+        label = tnt_label()
+        for position, index in enumerate(chunk.indices):
+            brick = bricks[index]
+            if brick.hit:
+                erased[position] = 1
+            elif not brick.is_blinking:
+                x, y = brick.x - left, brick.y - top
+                blits.append(
+                    (self._tile(brick.color, brick.width, brick.height), (x, y))
+                )
+                if brick.is_tnt:
+                    center = (x + brick.width // 2, y + brick.height // 2)
+                    blits.append((label, label.get_rect(center=center)))
+        surface.blits(blits, False)
+        chunk.surface = surface
+        chunk.erased = erased
+        chunk.scaled = None
+        self._dirty.discard(chunk.key)
+        self.chunks_rendered += 1
+
+        # 超過快取數量時釋放最久沒畫的區塊
+        self._cached[chunk.key] = chunk
+        while len(self._cached) > BOARD_CONFIG["CACHED_CHUNKS"]:
+            key, oldest = self._cached.popitem(last=False)
+            oldest.release()
+            self._dirty.discard(key)
+        return True
+
+    def _tile(self, color, width, height):
+        """回傳指定顏色與大小的實心磚塊表面"""
+        key = (color, width, height)
+        tile = self._tiles.get(key)
+        if tile is None:
+            tile = self._tiles[key] = pygame.Surface((width, height), 0, 32)
+            tile.fill(color)
+        return tile
+
+    def _mark_dirty(self, rect):
+        """把和範圍重疊、已經有快取表面的區塊標記為需要塗黑被打掉的磚塊"""
+        for chunk in self._chunks_in(rect):
+            if chunk.surface is not None:
+                self._dirty.add(chunk.key)
+
+    def _erase_hit(self, chunk):
+        """把區塊中這一幀之前被打掉的磚塊從表面上塗黑"""
+        self._dirty.discard(chunk.key)
+        bricks = self.bricks
+        erased = chunk.erased
+        left, top = chunk.rect.topleft
+        black = COLORS["BLACK"]
+        for position, index in enumerate(chunk.indices):
+            if erased[position]:
+                continue
+            brick = bricks[index]
+            if brick.hit:
+                if self._tangled[index]:
+                    # 塗黑會連旁邊磚塊被 TNT 文字蓋住（或蓋住文字）的部分一起塗掉，
+                    # 直接重畫整個區塊
+                    self._render(chunk, force=True)
+                    return
+                erased[position] = 1
+                area = footprint(
+                    brick.x, brick.y, brick.width, brick.height, brick.is_tnt
+                )
+                # fill 的範圍超出表面左邊或上面時不會被正確裁切，先自己裁切
+                area = area.move(-left, -top).clip(chunk.surface.get_rect())
+                chunk.surface.fill(black, area)
+                chunk.scaled = None
+
+    def _draw_scaled(self, surface, obj, size_attrs):
+        """
+        用畫面座標畫出場地中的物件：暫時把位置（與大小）換算過再呼叫 draw()\n
+        \n
+        參數:\n
+        surface (pygame.Surface): 螢幕表面\n
+        obj: 有 x、y 與 draw(surface) 的遊戲物件\n
+        size_attrs (tuple): 要跟著縮放的大小屬性名稱\n
+        """
+        zoom = self.camera.zoom
+        saved = [(name, getattr(obj, name)) for name in ("x", "y") + size_attrs]
+        obj.x, obj.y = self.camera.to_screen(obj.x, obj.y)
+        for name in size_attrs:
+            setattr(obj, name, getattr(obj, name) * zoom)
+        try:
+            obj.draw(surface)
+        finally:
+            for name, value in saved:
+                setattr(obj, name, value)
+
+
+######################定義函式區######################
+
+
+def world_size(level):
+    """
+    計算關卡需要的場地大小（至少和視窗一樣大）\n
+    \n
+    右邊留和左邊一樣的邊距，最下面一排磚塊下方留出固定高度給球與底板。\n
+    \n
+    參數:\n
+    level (CompiledLevel): 關卡\n
+    \n
+    回傳:\n
+    tuple: (寬, 高)\n
+    """
+    bounds = level.bounds()
+    if bounds is None:
+        return WINDOW_WIDTH, WINDOW_HEIGHT
+    width = max(WINDOW_WIDTH, bounds.right + max(0, bounds.left))
+    height = max(WINDOW_HEIGHT, bounds.bottom + BOARD_CONFIG["PLAY_AREA_HEIGHT"])
+    return width, height
+
+
+def is_huge(level):
+    """
+    關卡是否比視窗大，需要使用攝影機與區塊圖層\n
+    \n
+    參數:\n
+    level (CompiledLevel): 關卡\n
+    \n
+    回傳:\n
+    bool: True 表示超大關卡\n
+    """
+    return world_size(level) != (WINDOW_WIDTH, WINDOW_HEIGHT)
+
+
+def paddle_start(width, height):
+    """
+    回傳底板在場地中的起始位置（下方中央）\n
+    \n
+    參數:\n
+    width, height (int): 場地大小\n
+    \n
+    回傳:\n
+    tuple: (x, y)\n
+    """
+    return (width - PADDLE_CONFIG["WIDTH"]) // 2, height - PADDLE_CONFIG[
+        "MARGIN_BOTTOM"
+    ]
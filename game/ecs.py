@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+實體元件系統（ECS）核心模組
+
+實體只是一個整數編號；實體的資料放在元件（Component）裡，擁有同一組元件的
+實體放在同一個原型（Archetype）中，每個欄位是一個欄（column）：例如所有碎片
+的 x 座標連續放在同一個列表，而不是分散在一個個物件的屬性裡。
+
+系統（system）是一般的函數，用 World.query() 找出擁有需要元件的原型，再一次
+處理整欄資料；新增一種實體只是多一種元件組合，不需要再寫一個逐一更新物件的
+迴圈。每一欄都是普通的列表，熱點系統之後也可以單獨改成向量化的實作。
+"""
+
+######################載入套件######################
+from array import array
+from itertools import compress
+
+######################物件類別######################
+
+
+class Component:
+    """
+    元件種類：名稱與欄位（以及建立實體時沒有給值的預設值）\n
+    \n
+    不同元件的欄位名稱不能重複，同一個原型中每個欄位名稱對應一欄資料。\n
+    \n
+    使用範例:\n
+    POSITION = Component("position", x=0.0, y=0.0)\n
+    GRAVITY = Component("gravity")  # 沒有欄位的標記元件\n
+    """
+
+    __slots__ = ("name", "defaults")
+
+    def __init__(self, name, **defaults):
+        """
+        參數:\n
+        name (str): 元件名稱\n
+        **defaults: 欄位名稱與預設值\n
+        """
+        self.name = name
+        self.defaults = defaults
+
+    @property
+    def fields(self):
+        """元件的欄位名稱"""
+        return tuple(self.defaults)
+
+    def __repr__(self):
+        return f"Component({self.name!r})"
+
+
+class Archetype:
+    """
+    擁有同一組元件的實體，資料依欄位分開存放\n
+    \n
+    第 i 個實體的資料是每一欄的第 i 個值；移除實體時整欄一起壓縮，\n
+    所以欄中沒有空洞，系統可以直接 zip 需要的欄位。\n
+    \n
+    屬性:\n
+    components (frozenset): 元件種類\n
+    ids (array): 實體編號（與每一欄對齊）\n
+    columns (dict): 欄位名稱 → 資料列表\n
+    """
+
+    __slots__ = ("components", "ids", "columns", "_defaults")
+
+    def __init__(self, components):
+        """
+        參數:\n
+        components (iterable): 元件種類\n
+        """
+        self.components = frozenset(components)
+        self.ids = array("q")
+        self.columns = {}
+        self._defaults = {}
+        for component in sorted(self.components, key=lambda c: c.name):
+            for field, default in component.defaults.items():
+                if field in self.columns:
+                    raise ValueError(f"欄位 {field!r} 重複出現在不同的元件中")
+                self.columns[field] = []
+                self._defaults[field] = default
+
+    def __len__(self):
+        return len(self.ids)
+
+    def has(self, *components):
+        """是否擁有全部指定的元件"""
+        return self.components.issuperset(components)
+
+    def extend(self, ids, values):
+        """
+        加入一批實體\n
+        \n
+        參數:\n
+        ids (iterable): 實體編號\n
+        values (dict): 欄位名稱 → 每個實體的值（列表）；沒有給的欄位使用預設值\n
+        """
+        start = len(self.ids)
+        self.ids.extend(ids)
+        count = len(self.ids) - start
+        for field, column in self.columns.items():
+            column_values = values.get(field)
+            if column_values is None:
+                column.extend([self._defaults[field]] * count)
+            elif len(column_values) != count:
+                raise ValueError(
+                    f"欄位 {field!r} 有 {len(column_values)} 個值，應為 {count} 個"
+                )
+            else:
+                column.extend(column_values)
+
+    def retain(self, mask):
+        """
+        只留下 mask 為真的實體（系統移除實體的方式）\n
+        \n
+        參數:\n
+        mask (list): 每個實體是否保留（與欄位對齊）\n
+        \n
+        回傳:\n
+        int: 移除的實體數量\n
+        """
+        if all(mask):
+            return 0
+        before = len(self.ids)
+        self.ids = array("q", compress(self.ids, mask))
+        for field, column in self.columns.items():
+            self.columns[field] = list(compress(column, mask))
+        return before - len(self.ids)
+
+    def clear(self):
+        """移除所有實體"""
+        self.ids = array("q")
+        for field in self.columns:
+            self.columns[field] = []
+
+
+class World:
+    """
+    所有實體與原型\n
+    \n
+    實體編號只存在原型的 ids 欄中，不另外建立編號對照表：同時可能有上萬個\n
+    碎片，每個實體多一筆字典項目的記憶體比碎片本身的資料還多。用編號\n
+    讀取或移除單一實體要搜尋 ids 欄，只適合除錯與偶爾的操作。\n
+    \n
+    屬性:\n
+    archetypes (dict): 元件組合 → Archetype，依建立的順序\n
+    \n
+    使用範例:\n
+    world = World()\n
+    ids = world.spawn((POSITION, VELOCITY), x=[1.0], y=[2.0], vx=[0.5], vy=[0.0])\n
+    for archetype in world.query(POSITION, VELOCITY):\n
+        columns = archetype.columns\n
+        columns["x"] = [x + vx for x, vx in zip(columns["x"], columns["vx"])]\n
+    """
+
+    def __init__(self):
+        self.archetypes = {}
+        self._queries = {}  # 元件組合 → 符合的原型列表（新增原型時清除）
+        self._next_id = 1
+
+    def __len__(self):
+        return sum(len(archetype) for archetype in self.archetypes.values())
+
+    def __contains__(self, entity):
+        return self._find(entity) is not None
+
+    def archetype(self, components):
+        """
+        取得（需要時建立）擁有這組元件的原型\n
+        \n
+        參數:\n
+        components (iterable): 元件種類\n
+        \n
+        回傳:\n
+        Archetype: 原型\n
+        """
+        key = frozenset(components)
+        archetype = self.archetypes.get(key)
+        if archetype is None:
+            archetype = self.archetypes[key] = Archetype(key)
+            self._queries.clear()
+        return archetype
+
+    def spawn(self, components, count=1, **values):
+        """
+        建立一批擁有同一組元件的實體\n
+        \n
+        參數:\n
+        components (iterable): 元件種類\n
+        count (int): 實體數量\n
+        **values: 欄位名稱 → 每個實體的值（長度為 count 的列表）\n
+        \n
+        回傳:\n
+        range: 新實體的編號\n
+        """
+        archetype = self.archetype(components)
+        ids = range(self._next_id, self._next_id + count)
+        self._next_id += count
+        archetype.extend(ids, values)
+        return ids
+
+    def despawn(self, entity):
+        """
+        移除一個實體\n
+        \n
+        參數:\n
+        entity (int): 實體編號\n
+        """
+        archetype, row = self._locate(entity)
+        archetype.retain([i != row for i in range(len(archetype))])
+
+    def get(self, entity, field):
+        """
+        讀取一個實體的欄位值（除錯與測試用，系統應該整欄處理）\n
+        \n
+        參數:\n
+        entity (int): 實體編號\n
+        field (str): 欄位名稱\n
+        """
+        archetype, row = self._locate(entity)
+        return archetype.columns[field][row]
+
+    def query(self, *components):
+        """
+        找出擁有全部指定元件的原型\n
+        \n
+        參數:\n
+        *components (Component): 元件種類\n
+        \n
+        回傳:\n
+        list: 符合的原型（依建立的順序，包含目前沒有實體的原型）\n
+        """
+        # 系統每一幀都會查詢，直接用參數的 tuple 當快取的鍵
+        matches = self._queries.get(components)
+        if matches is None:
+            wanted = frozenset(components)
+            matches = self._queries[components] = [
+                archetype
+                for archetype in self.archetypes.values()
+                if archetype.components >= wanted
+            ]
+        return matches
+
+    def count(self, *components):
+        """擁有全部指定元件的實體數量"""
+        return sum(len(archetype) for archetype in self.query(*components))
+
+    def clear(self):
+        """移除所有實體（原型保留，之後可以直接重複使用）"""
+        for archetype in self.archetypes.values():
+            archetype.clear()
+
+    def snapshot(self):
+        """
+        複製所有實體的資料（對戰模式回溯時用 restore() 倒回這個時間點）\n
+        \n
+        回傳:\n
+        tuple: 交給 restore() 的資料\n
+        """
+        return self._next_id, [
+            (
+                archetype,
+                archetype.ids[:],
+                [(field, column[:]) for field, column in archetype.columns.items()],
+            )
+            for archetype in self.archetypes.values()
+            if archetype.ids
+        ]
+
+    def restore(self, state):
+        """
+        把所有實體恢復成 snapshot() 時的樣子（同一份資料可以恢復很多次）\n
+        \n
+        參數:\n
+        state (tuple): snapshot() 回傳的資料\n
+        """
+        next_id, saved = state
+        self.clear()
+        for archetype, ids, columns in saved:
+            archetype.ids = ids[:]
+            for field, column in columns:
+                archetype.columns[field] = column[:]
+        self._next_id = next_id
+
+    def _find(self, entity):
+        """回傳實體所在的原型，找不到時回傳 None"""
+        for archetype in self.archetypes.values():
+            if entity in archetype.ids:
+                return archetype
+        return None
+
+    def _locate(self, entity):
+        """回傳 (原型, 第幾個)；實體不存在時拋出 KeyError"""
+        archetype = self._find(entity)
+        if archetype is None:
+            raise KeyError(entity)
+        return archetype, archetype.ids.index(entity)
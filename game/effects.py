@@ -2,189 +2,346 @@
 """
 遊戲特效系統模組
 
-包含爆炸效果、磚塊碎片、彩蛋等視覺特效類別。
+包含爆炸效果、磚塊碎片、彩蛋等視覺特效。
+
+特效都是實體元件系統（game/ecs.py）中的實體：這個模組定義特效使用的元件、
+每一種特效的元件組合，以及一次建立一批特效的函數；移動、重力、生命週期、
+撿取與繪製由 game/systems.py 中的系統整批處理。
 """
 
 ######################載入套件######################
-import pygame
-import math
 import random
+import warnings
 
 ######################導入設定######################
 from config import EFFECTS_CONFIG, COLORS
 
-######################音效載入######################
-# 嘗試載入爆炸音效（若不存在則忽略）
-EXPLOSION_SOUND = None
-try:
-    # 檢查 mixer 是否已初始化
-    if not pygame.mixer.get_init():
-        try:
-            pygame.mixer.init()
-        except Exception:
-            pass
-    sound_path = "assets/sounds/explosion.wav"
-    EXPLOSION_SOUND = pygame.mixer.Sound(sound_path)
-except Exception:
-    # 如果載入失敗就不播放音效，遊戲仍然可以正常運行
-    EXPLOSION_SOUND = None
+######################導入遊戲模組######################
+from . import audio
+from .ecs import Component, World
+from .entity import ConfigConstant
+
+######################元件######################
+POSITION = Component("position", x=0.0, y=0.0)  # 場地座標
+VELOCITY = Component("velocity", vx=0.0, vy=0.0)  # 每幀移動的距離
+GRAVITY = Component("gravity")  # 受重力與空氣阻力影響
+LIFETIME = Component("lifetime", timer=0, life=0)  # 經過幾幀、最多存在幾幀
+FALL_LIMIT = Component("fall_limit", fall_margin=0)  # 掉到場地底部以下多遠時移除
+PICKUP = Component("pickup", radius=8)  # 碰到底板時被撿起來的圓形物件
+SQUARE = Component("square", size=2, color=(255, 255, 255))  # 畫成實心方塊
+EGG_SPRITE = Component("egg_sprite", egg_color=COLORS["PINK"])  # 畫成帶高光的蛋
+BLAST = Component("blast")  # 畫成隨生命週期擴散的爆炸圓圈
+
+######################特效種類######################
+# 磚塊碎片：小方塊，受重力落下，生命結束或掉出場地時移除
+SHARD = (POSITION, VELOCITY, GRAVITY, LIFETIME, FALL_LIMIT, SQUARE)
 
+# 彩蛋：緩慢下落，碰到底板就被撿起來（得分）
+EGG = (POSITION, VELOCITY, FALL_LIMIT, PICKUP, EGG_SPRITE)
 
-######################物件類別######################
+# 爆炸效果：TNT 爆炸時從小圓圈擴散到最大半徑，顏色逐漸變淡
+EXPLOSION = (POSITION, LIFETIME, BLAST)
 
 
-class Explosion:
+######################定義函式區######################
+
+
+def create_explosions(world, points):
     """
-    爆炸效果類別\n
+    建立一批爆炸效果\n
     \n
-    產生擴散式的圓圈爆炸動畫，用於 TNT 爆炸時的視覺效果。\n
-    爆炸會從小圓圈逐漸擴大，顏色從亮橙色漸變到透明。\n
+    每個爆炸都會要求播放爆炸音效；音效執行緒會把同一幀連鎖爆炸的\n
+    多個要求合併成一次較大聲的爆炸音效。\n
     \n
-    特性:\n
-    1. 多層圓圈效果，創造深度感\n
-    2. 漸變透明度，模擬爆炸消散\n
-    3. 自動播放音效（如果有載入）\n
+    參數:\n
+    world (World): 實體世界\n
+    points (iterable): 爆炸中心座標 (x, y)\n
     \n
-    屬性:\n
-    x, y (float): 爆炸中心座標\n
-    radius (float): 當前爆炸半徑\n
-    max_radius (int): 最大爆炸半徑\n
-    duration (int): 爆炸持續的幀數\n
-    timer (int): 當前經過的幀數\n
+    回傳:\n
+    range: 新實體的編號\n
+    """
+    points = list(points)
+    for _ in points:
+        audio.play("explosion")
+    return world.spawn(
+        EXPLOSION,
+        len(points),
+        x=[x for x, _ in points],
+        y=[y for _, y in points],
+        life=[EFFECTS_CONFIG["EXPLOSION_DURATION"]] * len(points),
+    )
+
+
+def create_shards(world, sources):
+    """
+    建立一批磚塊碎片\n
     \n
-    使用範例:\n
-    explosion = Explosion(100, 200)  # 在指定位置創建爆炸\n
-    while explosion.update():  # 每幀更新\n
-        explosion.draw(screen)  # 繪製爆炸效果\n
+    碎片的位置在來源範圍內隨機分布，初始速度、大小與生命週期也帶有隨機性。\n
+    \n
+    參數:\n
+    world (World): 實體世界\n
+    sources (iterable): (範圍 (x, y, 寬, 高), 顏色, 碎片數量)\n
+    \n
+    回傳:\n
+    range: 新實體的編號\n
     """
+    uniform = random.uniform
+    randint = random.randint
+    size_min, size_max = (
+        EFFECTS_CONFIG["SHARD_SIZE_MIN"],
+        EFFECTS_CONFIG["SHARD_SIZE_MAX"],
+    )
+    life_min, life_max = (
+        EFFECTS_CONFIG["SHARD_LIFE_MIN"],
+        EFFECTS_CONFIG["SHARD_LIFE_MAX"],
+    )
+    xs, ys, vxs, vys, sizes, lives, colors = [], [], [], [], [], [], []
+    for (left, top, width, height), color, count in sources:
+        for _ in range(count):
+            xs.append(uniform(left, left + width))
+            ys.append(uniform(top, top + height))
+            # 初始速度帶有隨機性
+            vxs.append(uniform(-4.0, 4.0))
+            vys.append(uniform(-7.0, -2.0))
+            sizes.append(randint(size_min, size_max))
+            lives.append(randint(life_min, life_max))
+            colors.append(color)
+    count = len(xs)
+    return world.spawn(
+        SHARD,
+        count,
+        x=xs,
+        y=ys,
+        vx=vxs,
+        vy=vys,
+        life=lives,
+        fall_margin=[200] * count,
+        size=sizes,
+        color=colors,
+    )
 
-    def __init__(self, x, y):
+
+def create_eggs(world, points):
+    """
+    建立一批彩蛋\n
+    \n
+    參數:\n
+    world (World): 實體世界\n
+    points (iterable): 彩蛋的位置 (x, y)\n
+    \n
+    回傳:\n
+    range: 新實體的編號\n
+    """
+    points = list(points)
+    count = len(points)
+    return world.spawn(
+        EGG,
+        count,
+        x=[float(x) for x, _ in points],
+        y=[float(y) for _, y in points],
+        vy=[random.uniform(1.0, 3.0) for _ in points],
+        fall_margin=[100] * count,
+    )
+
+
+def count_effects(world):
+    """
+    統計各種特效的數量\n
+    \n
+    參數:\n
+    world (World): 實體世界\n
+    \n
+    回傳:\n
+    dict: shards、eggs、explosions 的數量\n
+    """
+    return {
+        "shards": len(world.archetype(SHARD)),
+        "eggs": len(world.archetype(EGG)),
+        "explosions": len(world.archetype(EXPLOSION)),
+    }
+
+
+######################相容用的類別######################
+
+
+class _LegacyEffect:
+    """
+    舊版單一特效物件的相容包裝（不建議使用）\n
+    \n
+    舊版的 Explosion、Shard、Egg 是一個個物件，各自有 update() 與 draw()。\n
+    這些類別保留同樣的建構參數、方法與屬性，讓外部的程式碼還能執行：每個\n
+    物件擁有一個只有一個實體的 World，讀寫屬性（x、y、timer 等）直接讀寫\n
+    實體的欄位，繪製交給 game/systems.py 的系統。update() 依照舊版的規則\n
+    回傳特效是否還存在，但不會移除實體，結束後屬性還是可以讀取。\n
+    遊戲本身不使用它們；大量特效請改用 create_explosions() 等批次函數。\n
+    \n
+    屬性:\n
+    world (World): 只有這個特效的實體世界\n
+    其他屬性直接對應實體的欄位（名稱不同的列在 _aliases）\n
+    """
+
+    __slots__ = ("world",)
+
+    kind = ()  # 子類別的元件組合
+    _aliases = {}  # 舊版的屬性名稱 → 欄位名稱
+
+    def __init__(self):
+        warnings.warn(
+            f"{type(self).__name__} 已不建議使用，請改用 game.effects 的批次建立函數",
+            DeprecationWarning,
+            stacklevel=3,
+        )
+        self.world = World()
+
+    def _column(self, name):
+        """回傳屬性對應的欄，沒有這個欄位時為 None"""
+        columns = self.world.archetype(self.kind).columns
+        return columns.get(self._aliases.get(name, name))
+
+    def __getattr__(self, name):
+        """讀取實體的欄位"""
+        # world 還沒設定時（例如 copy.copy() 建立的空物件）不能再讀 self.world
+        if name == "world":
+            raise AttributeError(name)
+        column = self._column(name)
+        if column is None:
+            raise AttributeError(name)
+        return column[0]
+
+    def __setattr__(self, name, value):
+        """寫入實體的欄位（slot 與類別上的屬性照一般的方式設定）"""
+        if name == "world" or hasattr(type(self), name):
+            object.__setattr__(self, name, value)
+            return
+        column = self._column(name)
+        if column is None:
+            raise AttributeError(name)
+        column[0] = value
+
+    def draw(self, surface):
         """
-        初始化爆炸效果\n
+        繪製特效\n
         \n
         參數:\n
-        x (float): 爆炸中心 X 座標\n
-        y (float): 爆炸中心 Y 座標\n
+        surface (pygame.Surface): 要繪製到的表面\n
         """
-        self.x = x
-        self.y = y
-        self.radius = 0  # 從 0 開始擴散
-        self.max_radius = EFFECTS_CONFIG["EXPLOSION_MAX_RADIUS"]
-        self.duration = EFFECTS_CONFIG["EXPLOSION_DURATION"]
-        self.timer = 0
-
-        # 嘗試播放爆炸音效（如果有載入的話）
-        try:
-            if EXPLOSION_SOUND:
-                EXPLOSION_SOUND.play()
-        except Exception:
-            # 音效播放失敗也不影響遊戲運行
-            pass
+        from . import systems
+
+        systems.render(self.world, surface)
+
+
+class Explosion(_LegacyEffect):
+    """
+    單一爆炸效果（相容用，請改用 create_explosions）\n
+    \n
+    使用範例:\n
+    explosion = Explosion(100, 200)\n
+    while explosion.update():\n
+        explosion.draw(screen)\n
+    """
+
+    __slots__ = ()
+
+    kind = EXPLOSION
+    _aliases = {"duration": "life"}
+
+    max_radius = ConfigConstant(EFFECTS_CONFIG, "EXPLOSION_MAX_RADIUS")
+
+    def __init__(self, x, y):
+        super().__init__()
+        create_explosions(self.world, [(x, y)])
+
+    @property
+    def radius(self):
+        """目前的爆炸半徑"""
+        return (self.timer / self.duration) * self.max_radius
 
     def update(self):
-        """更新爆炸效果"""
+        """
+        更新爆炸\n
+        \n
+        回傳:\n
+        bool: 爆炸是否還在進行\n
+        """
         self.timer += 1
-        self.radius = (self.timer / self.duration) * self.max_radius
         return self.timer < self.duration
 
     def draw(self, surface):
-        """繪製爆炸效果"""
+        """繪製爆炸效果（結束後不畫）"""
         if self.timer < self.duration:
-            # 創建多層圓圈效果
-            alpha = 255 - int((self.timer / self.duration) * 255)
-            for i in range(3):
-                radius = self.radius - i * 15
-                if radius > 0:
-                    color_intensity = max(0, alpha - i * 50)
-                    color = (255, min(255, color_intensity + 100), 0)  # 橙紅色
-                    pygame.draw.circle(
-                        surface, color, (int(self.x), int(self.y)), int(radius), 3
-                    )
+            super().draw(surface)
+
+
+class Shard(_LegacyEffect):
+    """單一磚塊碎片（相容用，請改用 create_shards）"""
 
+    __slots__ = ()
 
-class Shard:
-    """磚塊碎片小方塊，簡單的物理與生命週期"""
+    kind = SHARD
 
     def __init__(self, x, y, color):
-        self.x = float(x)
-        self.y = float(y)
-        # 初始速度帶有隨機性
-        self.vx = random.uniform(-4.0, 4.0)
-        self.vy = random.uniform(-7.0, -2.0)
-        self.size = random.randint(
-            EFFECTS_CONFIG["SHARD_SIZE_MIN"], EFFECTS_CONFIG["SHARD_SIZE_MAX"]
-        )
-        self.color = color
-        self.life = random.randint(
-            EFFECTS_CONFIG["SHARD_LIFE_MIN"], EFFECTS_CONFIG["SHARD_LIFE_MAX"]
-        )
-        self.timer = 0
+        super().__init__()
+        create_shards(self.world, [((x, y, 0, 0), color, 1)])
 
     def update(self, screen_height=600):
-        """更新碎片位置和狀態"""
-        # 重力
-        self.vy += EFFECTS_CONFIG["GRAVITY"]
-        # 空氣阻力
-        self.vx *= EFFECTS_CONFIG["AIR_RESISTANCE"]
-        self.vy *= 0.999
-        self.x += self.vx
-        self.y += self.vy
+        """
+        更新碎片\n
+        \n
+        參數:\n
+        screen_height (int): 場地高度\n
+        \n
+        回傳:\n
+        bool: 碎片是否還存在\n
+        """
+        from . import systems
+
+        systems.gravity(self.world)
+        systems.movement(self.world)
         self.timer += 1
+        return self.timer < self.life and self.y <= screen_height + self.fall_margin
 
-        # 邊界外或生命結束就移除
-        if self.timer >= self.life or self.y > screen_height + 200:
-            return False
-        return True
 
-    def draw(self, surface):
-        """繪製碎片"""
-        pygame.draw.rect(
-            surface,
-            self.color,
-            pygame.Rect(int(self.x), int(self.y), self.size, self.size),
-        )
+class Egg(_LegacyEffect):
+    """單一彩蛋（相容用，請改用 create_eggs）"""
 
+    __slots__ = ("collected",)
 
-class Egg:
-    """簡單的彩蛋物件，會緩慢下落，碰到板子則觸發撿取效果"""
+    kind = EGG
+    _aliases = {"color": "egg_color"}
 
     def __init__(self, x, y):
-        self.x = float(x)
-        self.y = float(y)
-        self.vy = random.uniform(1.0, 3.0)
-        self.radius = 8
+        super().__init__()
         self.collected = False
-        # 顏色與裝飾
-        self.color = COLORS["PINK"]
+        create_eggs(self.world, [(x, y)])
 
     def update(self, screen_height=600):
-        """更新彩蛋位置"""
-        self.y += self.vy
-        # 若落出畫面則刪除
-        return not self.collected and self.y < screen_height + 100
+        """
+        更新彩蛋\n
+        \n
+        參數:\n
+        screen_height (int): 場地高度\n
+        \n
+        回傳:\n
+        bool: 彩蛋是否還在場地中（還沒被撿到）\n
+        """
+        from . import systems
 
-    def draw(self, surface):
-        """繪製彩蛋"""
-        rect = pygame.Rect(
-            int(self.x) - self.radius,
-            int(self.y) - self.radius,
-            self.radius * 2,
-            self.radius * 2,
-        )
-        pygame.draw.ellipse(surface, self.color, rect)
-        # 白色高光
-        pygame.draw.ellipse(
-            surface,
-            COLORS["WHITE"],
-            (int(self.x) - 3, int(self.y) - self.radius + 2, 6, 4),
-        )
+        systems.movement(self.world)
+        return not self.collected and self.y < screen_height + self.fall_margin
 
     def check_paddle_collision(self, paddle):
-        """檢查是否與底板碰撞"""
+        """
+        檢查彩蛋是否被底板撿到\n
+        \n
+        參數:\n
+        paddle (Paddle): 底板\n
+        \n
+        回傳:\n
+        bool: 是否被撿到\n
+        """
         if (
             self.y + self.radius >= paddle.y
-            and self.x >= paddle.x
-            and self.x <= paddle.x + paddle.width
+            and paddle.x <= self.x <= paddle.x + paddle.width
         ):
             self.collected = True
             return True
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+無盡模式模組
+
+磚塊區會持續往下移動，新的磚塊行從畫面上方不斷補進來，
+磚塊碰到底板上方的警戒線時遊戲結束。
+
+所有磚塊物件在開始時一次建立好，放在固定大小的環狀儲存區中：
+整行被清空的磚塊行會回到空閒清單，之後當作新的一行重新放回畫面上方，
+所以玩多久記憶體用量都不會增加，也沒有任何一幀需要重建整個磚塊陣列。
+"""
+
+######################載入套件######################
+import math
+import random
+from collections import deque
+
+######################導入設定######################
+from config import (
+    WINDOW_HEIGHT,
+    BRICK_CONFIG,
+    PADDLE_CONFIG,
+    ENDLESS_CONFIG,
+    ROW_COLORS,
+    COLORS,
+)
+
+######################導入遊戲模組######################
+from .objects import Brick
+from . import trace
+
+######################物件類別######################
+
+
+class EndlessField:
+    """
+    無盡模式的磚塊區\n
+    \n
+    bricks 是固定長度的列表，第 slot 行的磚塊是\n
+    bricks[slot * cols : (slot + 1) * cols]；還沒使用或已經清空的行\n
+    裡面的磚塊都是 hit 狀態，繪製與碰撞檢查時會直接略過。\n
+    \n
+    屬性:\n
+    bricks (list): 所有磚塊（長度固定，不會重新配置）\n
+    cols (int): 每一行的磚塊數\n
+    capacity (int): 儲存區的行數\n
+    active (deque): 使用中的行（由上到下）\n
+    free (list): 空閒的行\n
+    rows_spawned (int): 總共補進來幾行\n
+    rows_cleared (int): 總共清空幾行\n
+    danger_y (float): 警戒線，還沒被打掉的磚塊碰到就遊戲結束\n
+    \n
+    使用範例:\n
+    field = EndlessField()\n
+    game_state.bricks = field.bricks\n
+    field.update()  # 每幀呼叫\n
+    if field.reached_danger_line():\n
+        game_over()\n
+    """
+
+    def __init__(self, cols=None, capacity=None):
+        """
+        建立磚塊儲存區並放好一開始的幾行\n
+        \n
+        參數:\n
+        cols (int): 每一行的磚塊數，預設使用設定檔中的值\n
+        capacity (int): 儲存區的行數，預設依照畫面高度計算\n
+        """
+        self.cols = cols or BRICK_CONFIG["COLS"]
+        self.width = BRICK_CONFIG["WIDTH"]
+        self.height = BRICK_CONFIG["HEIGHT"]
+        self.pitch = BRICK_CONFIG["HEIGHT"] + BRICK_CONFIG["SPACING_Y"]
+        self.top = BRICK_CONFIG["MARGIN_TOP"]
+        self.danger_y = (
+            WINDOW_HEIGHT
+            - PADDLE_CONFIG["MARGIN_BOTTOM"]
+            - ENDLESS_CONFIG["DANGER_MARGIN"]
+        )
+
+        # 從畫面最上方到警戒線放得下的行數，再加上正在補進來與剛清空的行
+        if capacity is None:
+            capacity = math.ceil(self.danger_y / self.pitch) + 2
+        self.capacity = capacity
+
+        self.columns_x = [
+            BRICK_CONFIG["MARGIN_LEFT"] + col * (self.width + BRICK_CONFIG["SPACING_X"])
+            for col in range(self.cols)
+        ]
+        self.bricks = []
+        for _ in range(capacity * self.cols):
+            brick = Brick(0, -self.height, self.width, self.height)
+            brick.hit = True
+            self.bricks.append(brick)
+
+        self.active = deque()
+        self.free = list(range(capacity - 1, -1, -1))
+        self.row_y = [0.0] * capacity
+        self.rows_spawned = 0
+        self.rows_cleared = 0
+
+        # 一開始的幾行和一般模式一樣停在磚塊區
+        for row in range(BRICK_CONFIG["ROWS"] - 1, -1, -1):
+            self._spawn_row(self.top + row * self.pitch)
+
+    @property
+    def level(self):
+        """目前的關卡數：每清空固定行數升一級"""
+        return 1 + self.rows_cleared // ENDLESS_CONFIG["ROWS_PER_LEVEL"]
+
+    @property
+    def speed(self):
+        """目前每幀往下移動的像素數，關卡越高越快"""
+        return ENDLESS_CONFIG["DESCENT_SPEED"] * (
+            1 + ENDLESS_CONFIG["SPEEDUP_PER_LEVEL"] * (self.level - 1)
+        )
+
+    def row_bricks(self, slot):
+        """回傳第 slot 行的磚塊"""
+        start = slot * self.cols
+        return self.bricks[start : start + self.cols]
+
+    def update(self):
+        """
+        每幀更新：回收清空的行、整個磚塊區往下移動、從上方補進新的一行\n
+        \n
+        回傳:\n
+        int: 這一幀回收了幾行\n
+        """
+        # 回收整行都被打掉的行
+        cleared = 0
+        bricks = self.bricks
+        cols = self.cols
+        for slot in list(self.active):
+            start = slot * cols
+            if all(brick.hit for brick in bricks[start : start + cols]):
+                self.active.remove(slot)
+                self.free.append(slot)
+                cleared += 1
+        if cleared:
+            self.rows_cleared += cleared
+            trace.emit("rows_cleared", rows=cleared, total=self.rows_cleared)
+
+        # 整個磚塊區往下移動（只移動使用中的行）
+        speed = self.speed
+        row_y = self.row_y
+        for slot in self.active:
+            y = row_y[slot] + speed
+            row_y[slot] = y
+            start = slot * cols
+            for brick in bricks[start : start + cols]:
+                brick.y = y
+                brick.target_y = y
+
+        # 最上面一行已經完全進入磚塊區時，從上方補進新的一行
+        while self.free and (not self.active or row_y[self.active[0]] >= self.top):
+            top_y = row_y[self.active[0]] if self.active else self.top
+            self._spawn_row(top_y - self.pitch)
+        return cleared
+
+    def reached_danger_line(self):
+        """
+        檢查還沒被打掉的磚塊是否已經碰到警戒線\n
+        \n
+        回傳:\n
+        bool: True 表示遊戲結束\n
+        """
+        if not self.active:
+            return False
+        bottom = self.active[-1]
+        if self.row_y[bottom] + self.height < self.danger_y:
+            return False
+        return not all(brick.hit for brick in self.row_bricks(bottom))
+
+    def snapshot(self):
+        """
+        記下磚塊區的行（磚塊本身由呼叫的人另外記錄，見 game/rollback.py）\n
+        \n
+        回傳:\n
+        tuple: 交給 restore() 的資料\n
+        """
+        return (
+            self.row_y[:],
+            tuple(self.active),
+            tuple(self.free),
+            self.rows_spawned,
+            self.rows_cleared,
+        )
+
+    def restore(self, state):
+        """
+        把磚塊區的行恢復成 snapshot() 時的樣子\n
+        \n
+        參數:\n
+        state (tuple): snapshot() 回傳的資料\n
+        """
+        row_y, active, free, self.rows_spawned, self.rows_cleared = state
+        self.row_y[:] = row_y
+        self.active.clear()
+        self.active.extend(active)
+        self.free[:] = free
+
+    def _spawn_row(self, y):
+        """
+        從空閒清單取出一行，重新放在指定高度\n
+        \n
+        參數:\n
+        y (float): 這一行的 Y 座標\n
+        """
+        slot = self.free.pop()
+        self.row_y[slot] = y
+        color = ROW_COLORS[self.rows_spawned % len(ROW_COLORS)]
+        tnt_chance = ENDLESS_CONFIG["TNT_CHANCE"]
+        blinking_chance = ENDLESS_CONFIG["BLINKING_CHANCE"]
+        for col, brick in enumerate(self.row_bricks(slot)):
+            brick.recycle(self.columns_x[col], y, color)
+            roll = random.random()
+            if roll < tnt_chance:
+                brick.is_tnt = True
+                brick.color = COLORS["BRICK_TNT"]
+            elif roll < tnt_chance + blinking_chance:
+                brick.is_blinking = True
+        self.active.appendleft(slot)
+        self.rows_spawned += 1
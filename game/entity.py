@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+遊戲物件共用的類別常數模組
+
+磚塊、碎片等遊戲物件一次可能有幾十萬個，所以都用 __slots__ 定義，
+每個實例只存自己會變的狀態；同一種物件都一樣的設定值（例如 TNT 的
+倒數時間、磚塊的下落速度）改成類別上的描述器，全部實例共用一份，
+讀取時才從設定檔取值。
+"""
+
+######################物件類別######################
+
+
+class ConfigConstant:
+    """
+    從設定檔讀取的類別常數（唯讀描述器）\n
+    \n
+    在類別上宣告，實例讀取屬性時回傳設定檔中的值；實例不能覆寫，\n
+    需要每個實例不同的值時應該改用一般的 slot 屬性。\n
+    \n
+    使用範例:\n
+    class Brick:\n
+        __slots__ = ("x", "y")\n
+        fall_speed = ConfigConstant(PHYSICS_CONFIG, "FALL_SPEED")\n
+    """
+
+    __slots__ = ("section", "key", "name")
+
+    def __init__(self, section, key):
+        """
+        參數:\n
+        section (dict): 設定檔中的設定字典，例如 TNT_CONFIG\n
+        key (str): 設定名稱\n
+        """
+        self.section = section
+        self.key = key
+        self.name = key
+
+    def __set_name__(self, owner, name):
+        self.name = f"{owner.__name__}.{name}"
+
+    def __get__(self, instance, owner=None):
+        return self.section[self.key]
+
+    def __set__(self, instance, value):
+        raise AttributeError(f"{self.name} 是所有實例共用的設定值，不能個別修改")
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+遊戲事件佇列模組
+
+模擬程式（球的碰撞、TNT 爆炸）不直接修改遊戲狀態，而是把發生的事情
+以事件的形式放進這一局自己的事件佇列；每一幀結束前遊戲狀態一次處理
+所有事件：同一種事件整批交給處理函數，碎片與爆炸效果一次建立、
+分數一次加上去。
+
+因為事件佇列屬於各自的 GameState，同一個行程中可以同時有好幾局遊戲
+（例如效能測試、重播或觀戰），彼此不會互相影響。
+"""
+
+######################物件類別######################
+
+
+class BrickDestroyed:
+    """
+    磚塊被打掉（要產生碎片）\n
+    \n
+    屬性:\n
+    brick (Brick): 被打掉的磚塊\n
+    shards (int): 要產生的碎片數量\n
+    """
+
+    __slots__ = ("brick", "shards")
+
+    def __init__(self, brick, shards):
+        self.brick = brick
+        self.shards = shards
+
+
+class TntDetonated:
+    """
+    TNT 爆炸（要產生爆炸效果）\n
+    \n
+    屬性:\n
+    x, y (int): 爆炸中心座標\n
+    chain (int): 連鎖中的第幾個 TNT（0 為被直接擊中的 TNT，1 以上為被連鎖引爆的）\n
+    """
+
+    __slots__ = ("x", "y", "chain")
+
+    def __init__(self, x, y, chain=0):
+        self.x = x
+        self.y = y
+        self.chain = chain
+
+
+class BallSpawned:
+    """
+    產生新的球（例如撞到閃爍磚塊的多球效果）\n
+    \n
+    屬性:\n
+    ball (Ball): 新的球，處理事件時才加入遊戲\n
+    """
+
+    __slots__ = ("ball",)
+
+    def __init__(self, ball):
+        self.ball = ball
+
+
+class EggSpawned:
+    """
+    產生彩蛋\n
+    \n
+    屬性:\n
+    x, y (float): 彩蛋的位置\n
+    """
+
+    __slots__ = ("x", "y")
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class ScoreDelta:
+    """
+    分數變化\n
+    \n
+    屬性:\n
+    points (int): 要加上的分數\n
+    """
+
+    __slots__ = ("points",)
+
+    def __init__(self, points):
+        self.points = points
+
+
+# 所有事件種類，也是處理事件的順序
+EVENT_TYPES = (ScoreDelta, TntDetonated, BrickDestroyed, BallSpawned, EggSpawned)
+
+
+class EventQueue:
+    """
+    依事件種類分開存放的事件佇列\n
+    \n
+    push() 只是把事件加到該種類的列表，模擬程式的熱迴圈中成本很低；\n
+    dispatch() 依照 EVENT_TYPES 的順序，把每一種累積的事件整批交給\n
+    訂閱的處理函數。\n
+    \n
+    屬性:\n
+    dispatched (dict): 每一種事件總共處理了幾個（統計用）\n
+    \n
+    使用範例:\n
+    events = EventQueue()\n
+    events.subscribe(ScoreDelta, lambda batch: print(sum(e.points for e in batch)))\n
+    events.push(ScoreDelta(10))\n
+    events.dispatch()  # 每一幀呼叫一次\n
+    """
+
+    def __init__(self):
+        self._pending = {kind: [] for kind in EVENT_TYPES}
+        self._handlers = {kind: [] for kind in EVENT_TYPES}
+        self.dispatched = {kind.__name__: 0 for kind in EVENT_TYPES}
+
+    def push(self, event):
+        """
+        加入一個事件\n
+        \n
+        參數:\n
+        event: EVENT_TYPES 中的任一種事件\n
+        """
+        self._pending[type(event)].append(event)
+
+    def subscribe(self, kind, handler):
+        """
+        訂閱一種事件\n
+        \n
+        參數:\n
+        kind (type): 事件種類\n
+        handler (callable): 處理函數，參數是這一幀累積的該種事件列表\n
+        """
+        self._handlers[kind].append(handler)
+
+    def pending(self, kind):
+        """
+        回傳還沒處理的某種事件（不會移除）\n
+        \n
+        參數:\n
+        kind (type): 事件種類\n
+        \n
+        回傳:\n
+        list: 事件列表，依照加入的順序\n
+        """
+        return self._pending[kind]
+
+    def dispatch(self):
+        """
+        把累積的事件依種類整批交給處理函數\n
+        \n
+        處理函數中再加入的事件，會在同一次 dispatch 中後面的種類\n
+        或下一次 dispatch 時處理。\n
+        \n
+        回傳:\n
+        int: 這次處理的事件數量\n
+        """
+        total = 0
+        pending = self._pending
+        for kind in EVENT_TYPES:
+            batch = pending[kind]
+            if not batch:
+                continue
+            pending[kind] = []
+            for handler in self._handlers[kind]:
+                handler(batch)
+            self.dispatched[kind.__name__] += len(batch)
+            total += len(batch)
+        return total
+
+    def clear(self):
+        """丟掉所有還沒處理的事件（例如重新開始遊戲）"""
+        for kind in EVENT_TYPES:
+            self._pending[kind] = []
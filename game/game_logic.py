@@ -6,22 +6,49 @@
 """
 
 ######################載入套件######################
+import time
+
 import pygame
 
 ######################導入設定######################
 from config import (
     WINDOW_WIDTH,
     WINDOW_HEIGHT,
-    PADDLE_CONFIG,
     BALL_CONFIG,
     FONT_CONFIG,
     COLORS,
     SCORE_CONFIG,
+    SCORES_CONFIG,
+    LEVEL_CONFIG,
+    ENDLESS_CONFIG,
+    BOARD_CONFIG,
+    AUTOPILOT_CONFIG,
+    INPUT_CONFIG,
 )
 
 ######################導入遊戲物件######################
 from .objects import Paddle, Ball
+from .events import (
+    EventQueue,
+    ScoreDelta,
+    TntDetonated,
+    BrickDestroyed,
+    BallSpawned,
+    EggSpawned,
+)
 from .utils import initialize_bricks, create_new_bricks
+from .endless import EndlessField
+from .ecs import World
+from .autopilot import Autopilot
+from . import board
+from . import effects
+from . import gcpolicy
+from . import levels
+from . import prefetch
+from . import savegame
+from . import systems
+from . import trace
+from . import utils
 
 
 ######################物件類別######################
@@ -44,16 +71,30 @@ class GameState:
     state (str): 遊戲狀態 ("PLAYING", "GAME_OVER")\n
     game_over (bool): 是否遊戲結束\n
     running (bool): 是否繼續運行遊戲\n
+    endless (EndlessField): 無盡模式的磚塊區（一般模式為 None）\n
+    board (Board): 超大關卡的場地與攝影機（關卡不比視窗大時為 None）\n
+    world_width, world_height (int): 場地大小（一般關卡等於視窗大小）\n
+    events (EventQueue): 這一局的事件佇列，每一幀最後一次處理\n
+    store (ScoreStore): 分數資料庫，遊戲結束時記錄這一局（None 表示不記錄）\n
+    prefetch_levels (bool): 是否由共用的預先準備器在背景準備下一關\n
+    mouse_control (str): 滑鼠操作底板的方式（"absolute"、"relative"，不使用時為 None）\n
+    \n
+    這一局的統計（遊戲結束時存進分數資料庫）:\n
+    tnt_chains (int): 引爆其他 TNT 的連鎖次數\n
+    eggs_collected (int): 撿到的彩蛋數量\n
+    bricks_destroyed (int): 打掉的磚塊數量\n
+    frames (int): 這一局更新了幾幀\n
     \n
     遊戲物件:\n
     bricks (list): 所有磚塊的列表\n
+    level_map (CompiledLevel): 目前關卡的編譯結果（沒有使用關卡檔案時為 None）\n
+    brick_layer (BrickLayer): 目前關卡的磚塊圖層（沒有圖層時為 None）\n
+    bricks_settled (bool): 磚塊是否都已經停在最後的位置\n
     paddle (Paddle): 玩家控制的底板\n
     balls (list): 所有球的列表\n
     \n
     特效物件:\n
-    explosions (list): 爆炸效果列表\n
-    shards (list): 碎片效果列表\n
-    eggs (list): 彩蛋物件列表\n
+    world (World): 爆炸效果、碎片與彩蛋等特效實體（見 game/effects.py）\n
     \n
     使用範例:\n
     game_state = GameState()  # 創建遊戲狀態\n
@@ -62,29 +103,75 @@ class GameState:
     game_state.draw(screen)  # 繪製遊戲畫面\n
     """
 
-    def __init__(self):
+    def __init__(self, endless=None, store=None, prefetch=None):
         """
         初始化遊戲狀態\n
         \n
-        設定遊戲的初始狀態，創建必要的字體物件，\n
+        設定遊戲的初始狀態，\n
         並呼叫 reset_game() 來初始化所有遊戲物件。\n
+        \n
+        參數:\n
+        endless (bool): 是否為無盡模式，預設使用設定檔中的值\n
+        store (ScoreStore): 分數資料庫，None 表示不記錄（例如效能測試）\n
+        prefetch (bool): 是否預先準備下一關，預設使用設定檔中的值；同一個行程\n
+            有好幾局同時進行時（例如對戰模式）傳入 False，過關時自己建立\n
         """
+        if endless is None:
+            endless = ENDLESS_CONFIG["ENABLED"]
+        if prefetch is None:
+            prefetch = LEVEL_CONFIG["PREFETCH"]
+        self.endless_mode = endless
+        self.store = store
+        self.prefetch_levels = prefetch
+        self.world_width = WINDOW_WIDTH
+        self.world_height = WINDOW_HEIGHT
+        self.paddle = None
+
         # 遊戲統計資訊
         self.score = 0  # 玩家得分
         self.level = 1  # 當前關卡
         self.tnt_count = 0  # TNT 爆炸計數（統計用）
+        self.tnt_chains = 0  # 連鎖次數
+        self.eggs_collected = 0  # 撿到的彩蛋
+        self.bricks_destroyed = 0  # 打掉的磚塊
+        self.frames = 0  # 這一局的幀數
+        self.session_started = time.time()  # 這一局開始的時間
+        self.session_saved = False  # 這一局是否已經記錄
 
         # 遊戲狀態控制
         self.state = "PLAYING"  # 遊戲狀態
         self.game_over = False  # 是否遊戲結束
         self.running = True  # 是否繼續運行
+        self.profile_requested = False  # 是否要求擷取效能分析（F9）
+        # 輔助模式：由電腦移動底板（F6 切換），關閉時為 None
+        self.autopilot = Autopilot() if AUTOPILOT_CONFIG["ASSIST"] else None
+        # 滑鼠操作底板：absolute 讓底板中心跟著游標，relative 依照移動量
+        self.mouse_control = INPUT_CONFIG["MOUSE_CONTROL"]
+        self._mouse_pos = None  # 上一幀的游標位置（游標沒動時不蓋掉鍵盤的移動）
+
+        # 特效實體（爆炸、碎片、彩蛋），由 game/systems.py 的系統整批更新
+        self.world = World()
+
+        # 這一局的事件佇列：球與 TNT 產生的分數、特效與新的球在幀結束前一次處理
+        self.events = EventQueue()
+        self.events.subscribe(ScoreDelta, self.on_score)
+        self.events.subscribe(TntDetonated, self.on_tnt_detonated)
+        self.events.subscribe(BrickDestroyed, self.on_bricks_destroyed)
+        self.events.subscribe(BallSpawned, self.on_balls_spawned)
+        self.events.subscribe(EggSpawned, self.on_eggs_spawned)
+
+        # 初始化所有遊戲物件（字體在第一次繪製文字時才載入）
+        self.reset_game()
 
-        # 載入遊戲字體，用於顯示文字資訊
-        self.font = pygame.font.Font(None, FONT_CONFIG["DEFAULT_SIZE"])
-        self.font_large = pygame.font.Font(None, FONT_CONFIG["LARGE_SIZE"])
+    @property
+    def font(self):
+        """一般文字字體"""
+        return utils.get_font(FONT_CONFIG["DEFAULT_SIZE"])
 
-        # 初始化所有遊戲物件
-        self.reset_game()
+    @property
+    def font_large(self):
+        """大標題字體（遊戲結束畫面才會用到）"""
+        return utils.get_font(FONT_CONFIG["LARGE_SIZE"])
 
     def reset_game(self):
         """
@@ -109,14 +196,18 @@ class GameState:
         self.score = 0
         self.level = 1
         self.tnt_count = 0
+        self.tnt_chains = 0
+        self.eggs_collected = 0
+        self.bricks_destroyed = 0
+        self.frames = 0
+        self.session_started = time.time()
+        self.session_saved = False
 
         # 重新創建磚塊陣列
-        self.bricks = initialize_bricks()
+        self.load_bricks()
 
-        # 重新創建底板，位置在螢幕下方中央
-        paddle_x = (WINDOW_WIDTH - PADDLE_CONFIG["WIDTH"]) // 2
-        paddle_y = WINDOW_HEIGHT - PADDLE_CONFIG["MARGIN_BOTTOM"]
-        self.paddle = Paddle(paddle_x, paddle_y)
+        # 重新創建底板，位置在場地下方中央
+        self.paddle = Paddle(*board.paddle_start(self.world_width, self.world_height))
 
         # 重新創建球，一開始只有一顆球黏在底板上
         self.balls = []
@@ -127,9 +218,76 @@ class GameState:
         self.balls.append(main_ball)
 
         # 清空所有特效物件
-        self.explosions = []  # 爆炸效果
-        self.shards = []  # 磚塊碎片
-        self.eggs = []  # 彩蛋物件
+        self.world.clear()
+        self.events.clear()  # 上一局還沒處理的事件
+
+        # 通知垃圾回收策略在這一幀結束時整理並凍結新關卡的物件
+        gcpolicy.level_loaded("reset_game", full=True)
+
+    def load_bricks(self, falling=False):
+        """
+        依照目前的關卡數建立磚塊陣列\n
+        \n
+        無盡模式建立會持續補充磚塊行的磚塊區；有啟用關卡檔案時\n
+        從編譯好的關卡快取建立磚塊與磚塊圖層，否則使用程式內建的磚塊排列。\n
+        有開啟預先準備時，過關的新關卡直接換上背景執行緒已經準備好的\n
+        磚塊與圖層，並且馬上開始準備再下一關。比視窗大的關卡使用場地\n
+        （攝影機、空間索引與區塊圖層），場地大小改變時底板與球會移到\n
+        新場地的下方中央。\n
+        \n
+        參數:\n
+        falling (bool): 磚塊是否從畫面上方滑下來（過關時的新關卡）\n
+        """
+        self.endless = None
+        self.board = None
+        if self.endless_mode:
+            # 無盡模式的磚塊物件一次建立好，之後一直重複使用
+            self.endless = EndlessField()
+            bricks = self.endless.bricks
+            self.level_map = None
+            self.brick_layer = None
+        elif LEVEL_CONFIG["ENABLED"]:
+            if falling and self.prefetch_levels:
+                level, bricks, layer, field = prefetch.get_prefetcher().take(self.level)
+            else:
+                level = levels.level_for(self.level)
+                bricks, layer, field = prefetch.build_level(level, falling)
+            self.level_map = level
+            self.brick_layer = layer
+            self.board = field
+            if field is not None:
+                falling = False  # 超大關卡的磚塊直接放在最後的位置
+            if self.prefetch_levels:
+                prefetch.get_prefetcher().schedule(self.level + 1)
+        else:
+            bricks = create_new_bricks() if falling else initialize_bricks()
+            self.level_map = None
+            self.brick_layer = None
+        self.bricks = bricks
+        self.bricks_settled = not falling
+
+        if self.board is not None:
+            self.fit_world(self.board.width, self.board.height)
+        else:
+            self.fit_world(WINDOW_WIDTH, WINDOW_HEIGHT)
+
+    def fit_world(self, width, height):
+        """
+        設定場地大小，大小改變時把底板移到下方中央、只留一顆黏在底板上的球\n
+        \n
+        參數:\n
+        width, height (int): 場地大小\n
+        """
+        if (width, height) == (self.world_width, self.world_height):
+            return
+        self.world_width = width
+        self.world_height = height
+        if self.paddle is not None:
+            self.paddle.x, self.paddle.y = board.paddle_start(width, height)
+            ball = self.balls[0] if self.balls else Ball(0, 0)
+            ball.stuck = True
+            ball.update(self.paddle, [], width, height)
+            self.balls = [ball]
 
     def handle_events(self, event):
         """
@@ -138,9 +296,13 @@ class GameState:
         響應玩家的各種按鍵操作，包含遊戲控制和狀態轉換。\n
         \n
         支援的按鍵:\n
-        - UP 鍵: 發射黏在底板上的球\n
+        - UP 鍵（滑鼠操作時也可以按滑鼠左鍵）: 發射黏在底板上的球\n
         - R 鍵: 遊戲結束時重新開始\n
         - ESC 鍵: 退出遊戲\n
+        - F5 / F8 鍵: 存檔 / 讀取存檔繼續那一局\n
+        - F6 鍵: 切換輔助模式（由電腦移動底板）\n
+        - F9 鍵: 擷取接下來幾幀的效能分析資料\n
+        - 超大關卡：滑鼠滾輪或 + / - 鍵縮放，C 鍵讓攝影機重新跟著球\n
         \n
         參數:\n
         event (pygame.event.Event): Pygame 事件物件\n
@@ -151,9 +313,7 @@ class GameState:
         elif event.type == pygame.KEYDOWN:
             if event.key == pygame.K_UP:
                 # 按上鍵發射所有還黏在底板上的球
-                for ball in self.balls:
-                    if ball.stuck:
-                        ball.launch()
+                self.launch_balls()
             elif event.key == pygame.K_r and (
                 self.game_over or self.state == "GAME_OVER"
             ):
@@ -162,6 +322,44 @@ class GameState:
             elif event.key == pygame.K_ESCAPE:
                 # 按 ESC 鍵退出遊戲
                 self.running = False
+            elif event.key == pygame.K_F5 and not self.game_over:
+                # 按 F5 鍵把進行中的這一局存檔（磁碟滿了或沒有寫入權限時只提示，遊戲繼續）
+                try:
+                    savegame.save_game(self)
+                except OSError as e:
+                    print(f"⚠️ 無法存檔: {e}")
+            elif event.key == pygame.K_F8:
+                # 按 F8 鍵讀取存檔，從存檔的畫面繼續
+                try:
+                    savegame.load_game(self)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ 無法讀取存檔: {e}")
+            elif event.key == pygame.K_F6:
+                # 按 F6 鍵切換輔助模式
+                self.autopilot = None if self.autopilot else Autopilot()
+            elif event.key == pygame.K_F9:
+                # 按 F9 鍵要求主迴圈擷取接下來幾幀的效能分析資料
+                self.profile_requested = True
+            elif self.board is not None:
+                camera = self.board.camera
+                if event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                    camera.zoom_by(BOARD_CONFIG["ZOOM_STEP"])
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    camera.zoom_by(1 / BOARD_CONFIG["ZOOM_STEP"])
+                elif event.key == pygame.K_c:
+                    camera.following = True
+        elif (
+            event.type == pygame.MOUSEBUTTONDOWN
+            and event.button == 1
+            and self.mouse_control is not None
+        ):
+            # 滑鼠操作時按左鍵發射黏在底板上的球
+            self.launch_balls()
+        elif event.type == pygame.MOUSEWHEEL and self.board is not None:
+            # 以滑鼠所在的位置為中心縮放
+            self.board.camera.zoom_by(
+                BOARD_CONFIG["ZOOM_STEP"] ** event.y, pygame.mouse.get_pos()
+            )
 
     def handle_continuous_input(self):
         """
@@ -173,16 +371,74 @@ class GameState:
         支援的按鍵:\n
         - 左箭頭或 A 鍵: 向左移動底板\n
         - 右箭頭或 D 鍵: 向右移動底板\n
+        - 超大關卡的 I、J、K、L 鍵: 手動捲動畫面\n
+        - 滑鼠（設定開啟滑鼠操作時）: 見 apply_mouse()\n
+        \n
+        輸入在這裡才讀取，主迴圈晚取樣時離畫面送出只剩一幀的工作時間。\n
+        輔助模式開啟時，電腦接著移動底板並發射黏在底板上的球。\n
         """
         # 只有在遊戲進行中才處理移動
         if not self.game_over:
             keys = pygame.key.get_pressed()  # 獲取當前所有按鍵的狀態
             if keys[pygame.K_LEFT] or keys[pygame.K_a]:
                 # 向左移動底板
-                self.paddle.move_left(WINDOW_WIDTH)
+                self.paddle.move_left(self.world_width)
             if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
                 # 向右移動底板
-                self.paddle.move_right(WINDOW_WIDTH)
+                self.paddle.move_right(self.world_width)
+            if self.mouse_control is not None:
+                self.apply_mouse()
+            if self.board is not None:
+                speed = BOARD_CONFIG["PAN_SPEED"]
+                dx = (keys[pygame.K_l] - keys[pygame.K_j]) * speed
+                dy = (keys[pygame.K_k] - keys[pygame.K_i]) * speed
+                if dx or dy:
+                    self.board.camera.pan(dx, dy)
+            if self.autopilot is not None:
+                self.autopilot.steer(self)
+
+    def apply_mouse(self):
+        """
+        依照滑鼠移動底板\n
+        \n
+        absolute: 游標移動時，底板中心移到游標的位置（超大關卡換算成場地座標）；\n
+            游標沒動時不處理，鍵盤仍然可以移動底板\n
+        relative: 底板移動滑鼠這一幀的移動量乘上靈敏度（軌跡球、旋鈕）\n
+        """
+        paddle = self.paddle
+        if self.mouse_control == "relative":
+            dx = pygame.mouse.get_rel()[0]
+            if not dx:
+                return
+            x = paddle.x + dx * INPUT_CONFIG["MOUSE_SENSITIVITY"]
+        else:
+            pos = pygame.mouse.get_pos()
+            if pos == self._mouse_pos:
+                return
+            self._mouse_pos = pos
+            mouse_x = pos[0]
+            if self.board is not None:
+                mouse_x = self.board.camera.to_world(*pos)[0]
+            x = mouse_x - paddle.width / 2
+        paddle.x = min(max(x, 0), self.world_width - paddle.width)
+
+    def launch_balls(self):
+        """發射所有還黏在底板上的球"""
+        for ball in self.balls:
+            if ball.stuck:
+                ball.launch()
+
+    # 每一幀更新依序執行的階段：(階段名稱, 方法名稱)
+    # 除錯工具（例如效能分析覆蓋層）會依照這張表替各階段計時
+    UPDATE_PHASES = (
+        ("input", "handle_continuous_input"),
+        ("explosions", "update_explosions"),
+        ("bricks", "update_bricks"),
+        ("balls", "update_balls"),
+        ("shards", "update_shards"),
+        ("eggs", "update_eggs"),
+        ("events", "dispatch_events"),
+    )
 
     def update(self):
         """更新遊戲狀態"""
@@ -193,34 +449,89 @@ class GameState:
         # 處理連續輸入
         self.handle_continuous_input()
 
-        # 設定全域變數給工具函數使用（通過回調函數的方式）
-        import game.utils as utils
-
-        utils._game_state = self  # 傳遞整個遊戲狀態對象
+        self.update_explosions()
+        self.update_bricks()
+        self.update_balls()
+        self.update_shards()
+        self.update_eggs()
+        self.dispatch_events()
+        self.frames += 1
 
-        # 更新爆炸效果
-        self.explosions = [
-            explosion for explosion in self.explosions if explosion.update()
-        ]
+        # 這一幀結束了這一局：只把統計交給分數資料庫的佇列，不會等待寫入
+        if self.game_over:
+            self.end_session("game_over")
 
-        # 更新所有磚塊
+    def update_bricks(self):
+        """更新所有磚塊（下落動畫、TNT 倒數），全部清除時進入下一關"""
         now = pygame.time.get_ticks()
+        if self.endless is not None:
+            self.update_endless(now)
+            return
+        if self.board is not None:
+            # 超大關卡只更新倒數中的 TNT，過關判斷也不用掃過所有磚塊
+            if self.board.update(now, self.events):
+                self.advance_level()
+            return
+
+        # 磚塊都停好以後，TNT 爆炸可以使用關卡的鄰居表
+        level = self.level_map if self.bricks_settled else None
+        settled = True
         for brick in self.bricks:
-            brick.update(now, self.bricks)
+            brick.update(now, self.bricks, self.events, level)
+            if brick.falling:
+                settled = False
+        self.bricks_settled = settled
 
         # 檢查是否所有磚塊都被摧毀
         if all(brick.hit for brick in self.bricks):
-            self.level += 1
-            # 直接生成新磚塊，不顯示過關訊息
-            self.bricks = create_new_bricks()
+            self.advance_level()
+
+    def advance_level(self):
+        """進入下一關：直接換上新磚塊，不顯示過關訊息"""
+        self.level += 1
+        started = time.perf_counter()
+        self.load_bricks(falling=True)
+        trace.emit_span(
+            "create_new_bricks", started, level=self.level, bricks=len(self.bricks)
+        )
+        gcpolicy.level_loaded("create_new_bricks")
+
+    def update_endless(self, now):
+        """
+        無盡模式的磚塊更新：磚塊區往下移動、補充新的行，\n
+        磚塊碰到警戒線時遊戲結束\n
+        \n
+        參數:\n
+        now (int): 當前時間戳記（毫秒）\n
+        """
+        field = self.endless
+        field.update()
+        for brick in self.bricks:
+            if not brick.hit:
+                brick.update(now, self.bricks, self.events)
+        self.level = field.level
+
+        if field.reached_danger_line():
+            self.game_over = True
+            self.state = "GAME_OVER"
 
-        # 更新所有球
+    def update_balls(self):
+        """更新所有球，移除掉出畫面的球，沒有球時遊戲結束"""
         alive_any = False
         remove_list = []
+        field = self.board
         for ball in self.balls:
+            # 超大關卡只把球附近的磚塊交給球做碰撞檢查
+            bricks = field.nearby(ball) if field is not None else self.bricks
             alive = ball.update(
-                self.paddle, self.bricks, WINDOW_WIDTH, WINDOW_HEIGHT, self.balls, self
+                self.paddle,
+                bricks,
+                self.world_width,
+                self.world_height,
+                self.events,
             )
+            if field is not None:
+                field.watch(bricks)
             if not alive:
                 remove_list.append(ball)
             else:
@@ -235,57 +546,118 @@ class GameState:
         if not alive_any:
             self.game_over = True
             self.state = "GAME_OVER"
+        elif field is not None:
+            # 攝影機跟著最下面的球（最需要注意的那一顆）
+            lowest = max(self.balls, key=lambda ball: ball.y)
+            field.camera.follow(lowest.x, lowest.y)
+
+    def update_explosions(self):
+        """更新爆炸效果，移除已結束的爆炸"""
+        systems.update(self.world, self.world_height, self.paddle, effects.EXPLOSION)
+
+    def update_shards(self):
+        """更新碎片，移除生命結束或掉出場地的碎片"""
+        systems.update(self.world, self.world_height, self.paddle, effects.SHARD)
+
+    def update_eggs(self):
+        """更新彩蛋並檢查是否被撿取"""
+        collected = systems.update(
+            self.world, self.world_height, self.paddle, effects.EGG
+        )
+        if collected:
+            self.eggs_collected += collected
+            self.events.push(ScoreDelta(SCORE_CONFIG["EGG_COLLECTED"] * collected))
 
-        # 更新碎片
-        self.shards = [shard for shard in self.shards if shard.update(WINDOW_HEIGHT)]
+    def effect_counts(self):
+        """
+        回傳各種特效的數量\n
+        \n
+        回傳:\n
+        dict: shards、eggs、explosions 的數量\n
+        """
+        return effects.count_effects(self.world)
 
-        # 更新彩蛋並檢查是否被撿取
-        remaining_eggs = []
-        for egg in self.eggs:
-            alive = egg.update(WINDOW_HEIGHT)
-            if not alive:
-                continue
+    def dispatch_events(self):
+        """處理這一幀累積的事件（每一幀的最後一個階段）"""
+        self.events.dispatch()
 
-            if egg.check_paddle_collision(self.paddle):
-                self.score += SCORE_CONFIG["EGG_COLLECTED"]
-                continue
-            remaining_eggs.append(egg)
-        self.eggs = remaining_eggs
+    def on_score(self, batch):
+        """分數事件：一次加上這一幀所有的分數"""
+        self.score += sum(event.points for event in batch)
 
-    def draw(self, surface):
-        """繪製遊戲畫面"""
-        # 清空背景
-        surface.fill(COLORS["BLACK"])
+    def on_tnt_detonated(self, batch):
+        """TNT 爆炸事件：加入爆炸效果"""
+        effects.create_explosions(self.world, ((event.x, event.y) for event in batch))
+        self.tnt_count += len(batch)
+        # 每串連鎖只有一個第 1 個被連鎖引爆的 TNT
+        self.tnt_chains += sum(1 for event in batch if event.chain == 1)
 
-        if not self.game_over:
-            # 繪製所有磚塊
-            for brick in self.bricks:
-                brick.draw(surface)
+    def on_bricks_destroyed(self, batch):
+        """磚塊被打掉的事件：一次產生所有碎片"""
+        utils.spawn_shards(batch, self.world)
+        self.bricks_destroyed += len(batch)
 
-            # 繪製玩家底板
-            self.paddle.draw(surface)
+    def on_balls_spawned(self, batch):
+        """新球事件：把多球效果產生的球加入遊戲"""
+        self.balls.extend(event.ball for event in batch)
 
-            # 繪製所有球
-            for ball in self.balls:
-                ball.draw(surface)
+    def on_eggs_spawned(self, batch):
+        """彩蛋事件：加入彩蛋"""
+        effects.create_eggs(self.world, ((event.x, event.y) for event in batch))
 
-            # 繪製碎片
-            for shard in self.shards:
-                shard.draw(surface)
+    def session_stats(self, reason):
+        """
+        回傳這一局的統計（分數資料庫記錄的欄位）\n
+        \n
+        參數:\n
+        reason (str): 這一局結束的原因（"game_over"、"quit"）\n
+        \n
+        回傳:\n
+        dict: 見 game/scores.py 的 SESSION_FIELDS\n
+        """
+        return {
+            "mode": "endless" if self.endless_mode else "classic",
+            "reason": reason,
+            "started_at": self.session_started,
+            "ended_at": time.time(),
+            "frames": self.frames,
+            "score": self.score,
+            "level": self.level,
+            "bricks_destroyed": self.bricks_destroyed,
+            "tnt_detonated": self.tnt_count,
+            "tnt_chains": self.tnt_chains,
+            "eggs_collected": self.eggs_collected,
+        }
+
+    def end_session(self, reason):
+        """
+        把這一局記錄到分數資料庫（每一局只記錄一次）\n
+        \n
+        參數:\n
+        reason (str): 這一局結束的原因\n
+        """
+        if self.store is None or self.session_saved:
+            return
+        self.session_saved = True
+        self.store.record(self.session_stats(reason))
 
-            # 繪製彩蛋
-            for egg in self.eggs:
-                egg.draw(surface)
+    def draw(self, surface):
+        """繪製遊戲畫面"""
+        # 清空背景
+        surface.fill(COLORS["BLACK"])
 
-            # 繪製爆炸效果
-            for explosion in self.explosions:
-                explosion.draw(surface)
+        if not self.game_over:
+            if self.board is not None and self.board.bricks is self.bricks:
+                # 超大關卡透過攝影機只畫畫面內的區塊與物件
+                self.board.draw(surface, self)
+            else:
+                self.draw_world(surface)
 
             # 顯示發射提示（與 main.py 一致）
             any_stuck = any(ball.stuck for ball in self.balls)
             if any_stuck:
-                text = self.font.render(
-                    "Press UP to launch ball", True, COLORS["WHITE"]
+                text = utils.render_text(
+                    self.font, "Press UP to launch ball", COLORS["WHITE"]
                 )
                 text_rect = text.get_rect(
                     center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT - 100)
@@ -293,23 +665,76 @@ class GameState:
                 surface.blit(text, text_rect)
         else:
             # 遊戲結束畫面（與 main.py 一致）
-            text = self.font_large.render("GAME OVER", True, COLORS["RED"])
+            text = utils.render_text(self.font_large, "GAME OVER", COLORS["RED"])
             text_rect = text.get_rect(
                 center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 30)
             )
             surface.blit(text, text_rect)
 
             # 顯示最終得分
-            score_text = self.font.render(
-                f"Final Score: {self.score}", True, COLORS["WHITE"]
+            score_text = utils.render_text(
+                self.font, f"Final Score: {self.score}", COLORS["WHITE"]
             )
             score_rect = score_text.get_rect(
                 center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 10)
             )
             surface.blit(score_text, score_rect)
 
-            restart_text = self.font.render("Press R to restart", True, COLORS["WHITE"])
+            restart_text = utils.render_text(
+                self.font, "Press R to restart", COLORS["WHITE"]
+            )
             restart_rect = restart_text.get_rect(
                 center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 50)
             )
             surface.blit(restart_text, restart_rect)
+
+            if self.store is not None:
+                self.draw_leaderboard(surface, WINDOW_HEIGHT // 2 + 100)
+
+    def draw_leaderboard(self, surface, top):
+        """
+        在遊戲結束畫面顯示排行榜（從分數資料庫的記憶體快取讀取）\n
+        \n
+        參數:\n
+        surface (pygame.Surface): 要繪製到的螢幕表面\n
+        top (int): 排行榜第一行的 y 座標\n
+        """
+        mode = "endless" if self.endless_mode else "classic"
+        line_height = FONT_CONFIG["DEFAULT_SIZE"] + 4
+        for rank, entry in enumerate(
+            self.store.top(mode, SCORES_CONFIG["SHOW_TOP"]), start=1
+        ):
+            text = utils.render_text(
+                self.font,
+                f"{rank}. {entry['score']}  (Level {entry['level']})",
+                COLORS["YELLOW"],
+            )
+            rect = text.get_rect(
+                center=(WINDOW_WIDTH // 2, top + (rank - 1) * line_height)
+            )
+            surface.blit(text, rect)
+
+    def draw_world(self, surface):
+        """
+        繪製磚塊與遊戲物件（場地等於視窗大小時，直接使用場地座標）\n
+        \n
+        參數:\n
+        surface (pygame.Surface): 要繪製到的螢幕表面\n
+        """
+        # 繪製所有磚塊（有磚塊圖層時只需要貼一次圖層）
+        layer = self.brick_layer
+        if layer is not None and layer.bricks is self.bricks:
+            layer.draw(surface)
+        else:
+            for brick in self.bricks:
+                brick.draw(surface)
+
+        # 繪製玩家底板
+        self.paddle.draw(surface)
+
+        # 繪製所有球
+        for ball in self.balls:
+            ball.draw(surface)
+
+        # 繪製碎片、彩蛋與爆炸效果
+        systems.render(self.world, surface)
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+垃圾回收控制模組
+
+Python 的循環垃圾回收會在配置達到門檻時自動觸發，可能剛好落在
+TNT 連鎖爆炸那一幀的中間。這個模組在遊戲進行中調高或關閉自動回收，
+改在安全的時間點（換關、重新開始、遊戲結束畫面、還有空閒時間的幀）
+主動回收，並在載入關卡後用 gc.freeze() 把長期存在的物件移出回收範圍。
+每一次回收的暫停時間都會被記錄下來，並送到時間軸追蹤中。
+"""
+
+######################載入套件######################
+import gc
+import time
+from collections import deque
+
+######################導入設定######################
+from config import GC_CONFIG, FPS
+
+######################導入遊戲模組######################
+from . import trace
+
+######################全域變數######################
+# 目前啟用的回收策略；沒有啟用時為 None，遊戲邏輯的呼叫點只需檢查這個變數
+active_policy = None
+
+
+######################物件類別######################
+
+
+class GCPolicy:
+    """
+    垃圾回收策略管理器\n
+    \n
+    作為主迴圈的 frame hook 使用（begin_frame / end_frame）。\n
+    \n
+    模式:\n
+    - "disable": 遊戲進行中完全關閉自動回收，只在安全時間點回收\n
+    - "raise": 把自動回收門檻調高到設定值，減少自動回收的次數\n
+    - "off": 不改變回收行為，只記錄暫停時間（用來比較）\n
+    \n
+    安全時間點:\n
+    - 換關後（level_loaded）：回收年輕與中間世代後 gc.freeze()\n
+    - 重新開始後：解除凍結、完整回收後再 gc.freeze()\n
+    - 進入遊戲結束畫面時：完整回收一次\n
+    - 幀結束時還有足夠空閒時間：回收年輕世代\n
+    \n
+    屬性:\n
+    mode (str): 目前的模式\n
+    pauses (deque): 最近的回收記錄 (世代, 毫秒, 原因, 是否在遊戲中途)\n
+    totals (dict): 依原因統計的回收次數與總暫停時間\n
+    midplay_pauses (int): 遊戲進行中自動觸發的回收次數\n
+    \n
+    使用範例:\n
+    policy = GCPolicy()\n
+    policy.attach(game_state)\n
+    policy.start()\n
+    game.frame_hooks.append(policy)\n
+    """
+
+    def __init__(self, mode=None, budget=None):
+        """
+        初始化回收策略\n
+        \n
+        參數:\n
+        mode (str): "disable"、"raise" 或 "off"，預設使用設定檔中的值\n
+        budget (float): 一幀的時間預算（秒），預設為 FPS 週期\n
+        """
+        self.mode = mode or GC_CONFIG["MODE"]
+        self.budget = budget or 1.0 / FPS
+        self.spare = GC_CONFIG["SPARE_BUDGET_MS"] / 1000.0
+        self.game_state = None
+
+        self.pauses = deque(maxlen=GC_CONFIG["HISTORY"])
+        self.totals = {}
+        self.midplay_pauses = 0
+        self.max_midplay_ms = 0.0
+
+        self._settle_reason = None
+        self._settle_full = False
+        self._game_over_handled = False
+        self._young_collections = 0
+        self._frame_start = None
+        self._reason = None
+        self._gc_start = None
+        self._saved = None
+
+    ######################啟動與關閉######################
+
+    def attach(self, game_state):
+        """
+        設定要觀察的遊戲狀態（用來判斷是否在遊戲結束畫面）\n
+        \n
+        參數:\n
+        game_state (GameState): 遊戲狀態\n
+        """
+        self.game_state = game_state
+
+    def start(self):
+        """套用回收模式、開始記錄暫停時間，並先整理一次目前的物件"""
+        global active_policy
+
+        if self._saved is not None:
+            return
+        self._saved = (gc.isenabled(), gc.get_threshold())
+        gc.callbacks.append(self._on_gc)
+        active_policy = self
+
+        # 啟動時遊戲已經載入第一關，等第一幀畫完再整理並凍結，不拖慢第一幀
+        self.request_settle("startup", full=True)
+        self._apply_mode()
+
+    def stop(self):
+        """恢復原本的回收設定並停止記錄"""
+        global active_policy
+
+        if self._saved is None:
+            return
+        if active_policy is self:
+            active_policy = None
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+
+        enabled, threshold = self._saved
+        self._saved = None
+        gc.set_threshold(*threshold)
+        gc.unfreeze()
+        if enabled:
+            gc.enable()
+        else:
+            gc.disable()
+
+    def _apply_mode(self):
+        """依照模式調整自動回收"""
+        if self.mode == "disable":
+            gc.disable()
+        elif self.mode == "raise":
+            gc.set_threshold(*GC_CONFIG["PLAY_THRESHOLDS"])
+
+    ######################遊戲事件######################
+
+    def request_settle(self, reason, full=False):
+        """
+        要求在這一幀結束時回收並凍結存活物件\n
+        \n
+        不在呼叫當下回收，避免換關那一幀的後半段（球、碎片的更新）\n
+        被拖慢；幀結束時畫面已經送出，是最安全的時間點。\n
+        \n
+        參數:\n
+        reason (str): 原因，例如 "create_new_bricks"\n
+        full (bool): 是否解除凍結並完整回收（較慢，適合重新開始時）\n
+        """
+        self._settle_reason = reason
+        self._settle_full = self._settle_full or full
+
+    def _settle(self, reason, full):
+        """
+        回收後凍結所有存活的物件\n
+        \n
+        換關時只回收年輕與中間世代，已經凍結的物件不用再掃一次，\n
+        讓換關的暫停維持很短；凍結的物件仍然會因為參照計數歸零而釋放，\n
+        只有循環參照要等到下一次完整回收。完整回收時先 unfreeze，\n
+        讓之前凍結的物件也能被回收。\n
+        """
+        if full:
+            gc.unfreeze()
+        self._collect(2 if full else 1, reason)
+        gc.freeze()
+
+    def _collect(self, generation, reason):
+        """以指定原因主動回收一個世代"""
+        self._reason = reason
+        try:
+            gc.collect(generation)
+        finally:
+            self._reason = None
+
+    ######################幀生命週期######################
+
+    def begin_frame(self):
+        """在每一幀開始時呼叫"""
+        self._frame_start = time.perf_counter()
+
+    def end_frame(self, game=None):
+        """
+        在每一幀結束時呼叫，在安全的時間點執行回收\n
+        \n
+        參數:\n
+        game (BreakoutGame): 遊戲主物件（不需要，只是為了符合 frame hook 介面）\n
+        """
+        start = self._frame_start
+        self._frame_start = None
+
+        # 換關或重新開始
+        if self._settle_reason is not None:
+            reason, self._settle_reason = self._settle_reason, None
+            full, self._settle_full = self._settle_full, False
+            self._game_over_handled = False
+            self._settle(reason, full)
+            return
+
+        # 剛進入遊戲結束畫面
+        state = self.game_state
+        if state is not None and state.game_over:
+            if not self._game_over_handled:
+                self._game_over_handled = True
+                self._collect(2, "game_over")
+                return
+        else:
+            self._game_over_handled = False
+
+        if self.mode == "off":
+            return
+
+        young = gc.get_count()[0]
+        if young >= GC_CONFIG["EMERGENCY_OBJECTS"]:
+            # 一直沒有空閒時間時的保險，避免垃圾無限累積
+            self._collect_young("emergency")
+        elif young >= GC_CONFIG["SPARE_MIN_OBJECTS"] and start is not None:
+            elapsed = time.perf_counter() - start
+            if self.budget - elapsed >= self.spare:
+                self._collect_young("spare_time")
+
+    def _collect_young(self, reason):
+        """回收年輕世代，每隔幾次順便回收中間世代"""
+        self._young_collections += 1
+        generation = 0
+        if self._young_collections % GC_CONFIG["GEN1_EVERY"] == 0:
+            generation = 1
+        self._collect(generation, reason)
+
+    ######################暫停記錄######################
+
+    def _on_gc(self, phase, info):
+        """gc.callbacks：記錄每一次回收（包含自動觸發的）的暫停時間"""
+        if phase == "start":
+            self._gc_start = time.perf_counter()
+            return
+        if self._gc_start is None:
+            return
+
+        start, self._gc_start = self._gc_start, None
+        duration = (time.perf_counter() - start) * 1000.0
+        reason = self._reason or "automatic"
+        midplay = reason == "automatic" and self._frame_start is not None
+        generation = info["generation"]
+
+        self.pauses.append((generation, duration, reason, midplay))
+        total = self.totals.setdefault(reason, [0, 0.0, 0.0])
+        total[0] += 1
+        total[1] += duration
+        total[2] = max(total[2], duration)
+        if midplay:
+            self.midplay_pauses += 1
+            self.max_midplay_ms = max(self.max_midplay_ms, duration)
+
+        trace.emit_span(
+            "gc",
+            start,
+            generation=generation,
+            reason=reason,
+            collected=info["collected"],
+        )
+
+    def summary(self):
+        """
+        整理回收統計\n
+        \n
+        回傳:\n
+        dict: 依原因分類的次數、總暫停與最長暫停（毫秒），\n
+        以及遊戲進行中自動回收的次數與最長暫停\n
+        """
+        return {
+            "mode": self.mode,
+            "reasons": {
+                reason: {"count": count, "total_ms": total_ms, "max_ms": max_ms}
+                for reason, (count, total_ms, max_ms) in sorted(self.totals.items())
+            },
+            "midplay_pauses": self.midplay_pauses,
+            "max_midplay_ms": self.max_midplay_ms,
+            "frozen_objects": gc.get_freeze_count(),
+        }
+
+
+######################定義函式區######################
+
+
+def level_loaded(reason, full=False):
+    """
+    通知回收策略關卡已經載入完成（沒有啟用時什麼都不做）\n
+    \n
+    參數:\n
+    reason (str): 例如 "reset_game" 或 "create_new_bricks"\n
+    full (bool): 是否需要完整回收（重新開始時）\n
+    """
+    policy = active_policy
+    if policy is not None:
+        policy.request_settle(reason, full)
@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""
+輸入延遲模組
+
+原本的主迴圈畫完一幀之後才用 clock.tick 等待，下一幀一開始就讀取輸入，
+所以輸入要等上將近一整幀才會畫到螢幕上。這個模組把等待移到一幀的開頭：
+
+- FramePacer：先等到「預計送出畫面的時間減去這一幀大概要做多久」才開始
+  這一幀，輸入在畫面送出前的最後一刻才讀取（晚取樣）
+- InputLatency：等待時每隔一小段時間把事件取出來並記下時間（pygame 的事件
+  本身沒有時間戳記），畫面送出之後統計每個輸入事件到畫面亮起的時間
+- LatencyHistogram：固定寬度的延遲直方圖，用來調整機台的反應速度
+
+畫面亮起的時間是「送出畫面的時間加上設定的螢幕延遲」，螢幕本身的延遲
+量不到，要依照機台的螢幕調整 INPUT_CONFIG["DISPLAY_LATENCY_MS"]。
+"""
+
+######################載入套件######################
+import math
+import time
+from collections import deque
+
+import pygame
+
+######################導入設定######################
+from config import INPUT_CONFIG, FPS
+
+######################全域變數######################
+# 會被統計延遲的輸入事件（滑鼠移動每一幀只算最早的那一個）
+INPUT_EVENTS = frozenset(
+    (
+        pygame.KEYDOWN,
+        pygame.KEYUP,
+        pygame.MOUSEBUTTONDOWN,
+        pygame.MOUSEBUTTONUP,
+        pygame.MOUSEMOTION,
+    )
+)
+
+######################物件類別######################
+
+
+class LatencyHistogram:
+    """
+    延遲直方圖\n
+    \n
+    每一格的寬度固定，超過上限的延遲都算在最後一格，記錄的成本固定，\n
+    玩再久也不會變多。百分位數回傳那一格的上緣（實際的延遲不會更長）。\n
+    \n
+    屬性:\n
+    bucket_ms (float): 每一格的寬度（毫秒）\n
+    counts (list): 每一格的次數\n
+    count (int): 總次數\n
+    max_ms (float): 記錄過最長的延遲\n
+    \n
+    使用範例:\n
+    histogram = LatencyHistogram()\n
+    histogram.record(12.5)\n
+    histogram.percentile(99)\n
+    """
+
+    def __init__(self, bucket_ms=None, limit_ms=None):
+        """
+        參數:\n
+        bucket_ms (float): 每一格的寬度（毫秒），預設使用設定檔中的值\n
+        limit_ms (float): 直方圖的上限（毫秒），預設使用設定檔中的值\n
+        """
+        if bucket_ms is None:
+            bucket_ms = INPUT_CONFIG["HISTOGRAM_BUCKET_MS"]
+        if limit_ms is None:
+            limit_ms = INPUT_CONFIG["HISTOGRAM_MAX_MS"]
+        self.bucket_ms = bucket_ms
+        self.counts = [0] * (int(math.ceil(limit_ms / bucket_ms)) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms):
+        """記錄一次延遲（毫秒）"""
+        index = min(int(max(ms, 0.0) / self.bucket_ms), len(self.counts) - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def clear(self):
+        """清除所有記錄"""
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def percentile(self, pct):
+        """
+        回傳百分位數（毫秒）\n
+        \n
+        參數:\n
+        pct (float): 0 到 100\n
+        \n
+        回傳:\n
+        float: 那一格的上緣，沒有記錄時為 0\n
+        """
+        if not self.count:
+            return 0.0
+        target = max(1, int(math.ceil(self.count * pct / 100.0)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                if index == len(self.counts) - 1:
+                    return self.max_ms
+                return (index + 1) * self.bucket_ms
+        return self.max_ms
+
+    def summary(self):
+        """回傳延遲的統計（毫秒）"""
+        return {
+            "count": self.count,
+            "mean": self.total_ms / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max_ms,
+        }
+
+    def to_dict(self):
+        """回傳可以寫成 JSON 的直方圖（只列出有記錄的格子）"""
+        return {
+            "bucket_ms": self.bucket_ms,
+            "buckets": {
+                f"{index * self.bucket_ms:g}": count
+                for index, count in enumerate(self.counts)
+                if count
+            },
+            **self.summary(),
+        }
+
+    def format_lines(self, width=40):
+        """
+        把直方圖畫成文字長條（從第一個到最後一個有記錄的格子）\n
+        \n
+        參數:\n
+        width (int): 最長的長條有幾個字元\n
+        \n
+        回傳:\n
+        list: 每一格一行文字\n
+        """
+        used = [index for index, count in enumerate(self.counts) if count]
+        if not used:
+            return []
+        peak = max(self.counts)
+        last = len(self.counts) - 1
+        lines = []
+        for index in range(used[0], used[-1] + 1):
+            count = self.counts[index]
+            low = index * self.bucket_ms
+            label = (
+                f"{low:>5g}+ ms"
+                if index == last
+                else f"{low:>5g}-{low + self.bucket_ms:g} ms"
+            )
+            bar = "#" * int(round(count / peak * width))
+            lines.append(f"{label:<13}{count:>7} {bar}")
+        return lines
+
+
+class FramePacer:
+    """
+    控制每一幀開始的時間（取代畫完之後的 clock.tick）\n
+    \n
+    晚取樣時，每一幀等到「預計送出畫面的時間」減去「最近幾幀的工作時間\n
+    （百分位數）加上保留時間」才開始，讀到的輸入離畫面送出只剩一幀的\n
+    工作時間。預計送出的時間跟著畫面實際送出的時間走：趕上了就維持\n
+    固定的間隔，沒趕上（或開啟垂直同步時畫面等到螢幕更新）就從實際\n
+    送出的時間重新對齊。\n
+    \n
+    不晚取樣時和 clock.tick 相同，上一幀開始之後過了一個 FPS 週期就開始。\n
+    \n
+    工作時間從這一幀開始算到呼叫 pygame.display.flip() 為止，不包含\n
+    垂直同步時 flip 裡面的等待。\n
+    \n
+    屬性:\n
+    period (float): 一幀的時間（秒）\n
+    late (bool): 是否晚取樣\n
+    deadline (float): 下一次預計送出畫面的時間（perf_counter 秒）\n
+    missed (int): 畫面送出比預計晚了半幀以上的幀數\n
+    waited (float): 總共等待的時間（秒）\n
+    \n
+    使用範例:\n
+    pacer = FramePacer()\n
+    pacer.wait(latency.collect)  # 每一幀開始前\n
+    pacer.flipping()\n
+    pygame.display.flip()\n
+    pacer.presented()\n
+    """
+
+    def __init__(self, fps=FPS, late=None):
+        """
+        參數:\n
+        fps (int): 目標 FPS\n
+        late (bool): 是否晚取樣，預設使用設定檔中的值\n
+        """
+        self.period = 1.0 / fps
+        self.late = INPUT_CONFIG["LATE_SAMPLING"] if late is None else late
+        self.percentile = INPUT_CONFIG["WORK_PERCENTILE"]
+        self.headroom = INPUT_CONFIG["HEADROOM_MS"] / 1000.0
+        self.poll_interval = INPUT_CONFIG["POLL_INTERVAL_MS"] / 1000.0
+        self.work = deque(maxlen=INPUT_CONFIG["WORK_HISTORY"])
+        self.deadline = None
+        self.missed = 0
+        self.waited = 0.0
+        self._started = None
+        self._estimate = None
+
+    def estimate(self):
+        """
+        預估這一幀從開始到送出畫面要多久（秒）\n
+        \n
+        回傳:\n
+        float: 工作時間的百分位數加上保留時間，還沒有記錄時為一整幀\n
+        """
+        if self._estimate is None:
+            if not self.work:
+                return self.period
+            ordered = sorted(self.work)
+            index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100.0))
+            self._estimate = min(ordered[index] + self.headroom, self.period)
+        return self._estimate
+
+    def wait(self, poll=None):
+        """
+        等到這一幀應該開始的時間\n
+        \n
+        參數:\n
+        poll (callable): 等待時每隔一小段時間呼叫一次（取出事件並記下時間）\n
+        """
+        now = time.perf_counter()
+        if self._started is None:
+            target = now
+        elif self.late and self.deadline is not None:
+            target = self.deadline - self.estimate()
+        else:
+            target = self._started + self.period
+        while True:
+            if poll is not None:
+                poll()
+            remaining = target - time.perf_counter()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, self.poll_interval))
+        self._started = time.perf_counter()
+        self.waited += self._started - now
+        if self.deadline is None:
+            self.deadline = self._started + self.period
+
+    def flipping(self):
+        """在呼叫 pygame.display.flip() 之前呼叫，記錄這一幀的工作時間"""
+        if self._started is not None:
+            self.work.append(time.perf_counter() - self._started)
+            self._estimate = None
+
+    def presented(self):
+        """
+        在 pygame.display.flip() 回傳之後呼叫\n
+        \n
+        回傳:\n
+        float: 畫面送出的時間（perf_counter 秒）\n
+        """
+        now = time.perf_counter()
+        if self.deadline is None:
+            return now
+        if now > self.deadline:
+            # 比預計晚（垂直同步時通常只晚一點點）：從實際送出的時間重新對齊；
+            # 晚了半幀以上才算沒趕上（垂直同步時就是晚了一次螢幕更新）
+            if now - self.deadline > self.period / 2:
+                self.missed += 1
+            self.deadline = now + self.period
+        else:
+            self.deadline += self.period
+        return now
+
+    def stats(self):
+        """回傳節奏控制的統計"""
+        return {
+            "late": self.late,
+            "estimate_ms": self.estimate() * 1000.0,
+            "missed": self.missed,
+            "waited_s": self.waited,
+        }
+
+
+class InputLatency:
+    """
+    輸入事件的時間戳記與輸入到畫面的延遲\n
+    \n
+    collect() 把 pygame 的事件取出來放進緩衝區，每個事件加上 stamp 屬性\n
+    （perf_counter 秒）。取出時只知道事件在上一次取出之後才到，所以\n
+    時間戳記用兩次取出的中間點，等待時每毫秒取出一次，誤差很小；\n
+    一幀工作中途到的事件誤差最多是工作時間的一半，平均起來會互相抵消。\n
+    \n
+    take() 把緩衝的事件交給遊戲處理，這些事件的結果會畫在這一幀，\n
+    presented() 時以送出畫面的時間加上螢幕延遲減去時間戳記記錄延遲。\n
+    \n
+    屬性:\n
+    histogram (LatencyHistogram): 輸入到畫面的延遲\n
+    display_latency (float): 畫面送出後到螢幕亮起的估計時間（秒）\n
+    \n
+    使用範例:\n
+    latency = InputLatency()\n
+    for event in latency.take():  # 每一幀讀取輸入時\n
+        handle(event)\n
+    latency.presented(pacer.presented())  # 畫面送出之後\n
+    """
+
+    def __init__(self, display_latency_ms=None, histogram=None):
+        """
+        參數:\n
+        display_latency_ms (float): 螢幕延遲（毫秒），預設使用設定檔中的值\n
+        histogram (LatencyHistogram): 記錄延遲的直方圖，預設建立一個新的\n
+        """
+        if display_latency_ms is None:
+            display_latency_ms = INPUT_CONFIG["DISPLAY_LATENCY_MS"]
+        self.display_latency = display_latency_ms / 1000.0
+        self.histogram = histogram if histogram is not None else LatencyHistogram()
+        self._buffer = []
+        self._taken = []
+        self._last_poll = time.perf_counter()
+
+    def collect(self):
+        """取出 pygame 的事件，加上時間戳記後放進緩衝區"""
+        events = pygame.event.get()
+        now = time.perf_counter()
+        if events:
+            stamp = (self._last_poll + now) / 2.0
+            for event in events:
+                event.stamp = stamp
+            self._buffer.extend(events)
+        self._last_poll = now
+
+    def take(self):
+        """
+        取出最新的事件，回傳這一幀要處理的所有事件\n
+        \n
+        回傳:\n
+        list: 依照發生順序排列的 pygame 事件\n
+        """
+        self.collect()
+        events = self._buffer
+        self._buffer = []
+        self._taken = events
+        return events
+
+    def presented(self, presented_at=None):
+        """
+        畫面送出之後，記錄這一幀處理的輸入事件的延遲\n
+        \n
+        參數:\n
+        presented_at (float): 畫面送出的時間（perf_counter 秒），預設為現在\n
+        """
+        events = self._taken
+        if not events:
+            return
+        self._taken = []
+        if presented_at is None:
+            presented_at = time.perf_counter()
+        shown = presented_at + self.display_latency
+        motion = False
+        for event in events:
+            if event.type not in INPUT_EVENTS:
+                continue
+            if event.type == pygame.MOUSEMOTION:
+                if motion:
+                    continue
+                motion = True
+            self.histogram.record((shown - event.stamp) * 1000.0)
+
+    def stats(self):
+        """回傳延遲的統計（毫秒）"""
+        return self.histogram.summary()
@@ -0,0 +1,686 @@
+# -*- coding: utf-8 -*-
+"""
+關卡模組
+
+關卡以 JSON 檔案描述（放在 levels/ 資料夾），內容是磚塊格子、每種
+字元代表的磚塊種類與顏色，以及隨機放置的 TNT 與閃爍磚塊數量。
+
+第一次載入關卡時會把它編譯成一個緊密排列的二進位快取檔：
+磚塊座標與種類陣列、每個磚塊在 TNT 爆炸範圍內的鄰居表，以及預先
+畫好的磚塊圖層。之後載入同一個關卡時直接把快取檔 mmap 進來，
+不需要再解析 JSON、計算鄰居或繪製圖層，換關幾乎不花時間。
+原始檔、編譯程式或相關設定改變時快取檔名稱也會改變，會自動重新編譯。
+"""
+
+######################載入套件######################
+import hashlib
+import json
+import math
+import mmap
+import os
+import random
+import struct
+import threading
+
+import pygame
+
+######################導入設定######################
+from config import (
+    WINDOW_WIDTH,
+    BRICK_CONFIG,
+    TNT_CONFIG,
+    FONT_CONFIG,
+    COLORS,
+    LEVEL_CONFIG,
+)
+
+######################導入遊戲模組######################
+from .objects import Brick
+from . import utils
+
+######################全域變數######################
+# 專案根目錄，關卡與快取資料夾以此為基準，不受目前工作目錄影響
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 快取檔格式：檔頭之後是各個 8 位元組對齊的陣列區段
+MAGIC = b"BRKL"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHIIIIIIiiII" + "Q" * 10)
+
+# 磚塊種類（快取檔中的 kind 陣列）
+KIND_NORMAL = 0
+KIND_TNT = 1
+KIND_BLINKING = 2
+KIND_NAMES = {"normal": KIND_NORMAL, "tnt": KIND_TNT, "blinking": KIND_BLINKING}
+
+# 格子中代表空位的字元
+EMPTY_CELLS = (".", " ")
+
+_loaded = {}  # 關卡名稱 → CompiledLevel（快取檔在行程結束前保持 mmap）
+_load_lock = threading.Lock()  # 背景執行緒也會載入關卡
+_tnt_label = None  # 畫好的 "TNT" 文字（第一次要在主執行緒建立）
+
+
+######################物件類別######################
+
+
+class CompiledLevel:
+    """
+    從快取檔 mmap 進來的關卡\n
+    \n
+    所有陣列都是直接指向 mmap 的 memoryview，不會複製資料。\n
+    \n
+    屬性:\n
+    name (str): 關卡名稱\n
+    count (int): 磚塊數量\n
+    rows, cols (int): 格子的行數與列數\n
+    xs, ys, widths, heights (memoryview): 磚塊停好後的位置與大小\n
+    grid_rows (memoryview): 每個磚塊所在的行\n
+    colors (memoryview): 每個磚塊的顏色（每 3 個位元組一組 RGB）\n
+    kinds (memoryview): 每個磚塊的種類（KIND_*）\n
+    random_tnt, random_blinking (int): 載入時隨機指定的 TNT 與閃爍磚塊數量\n
+    layer_rect (pygame.Rect): 預先繪製圖層的位置與大小，沒有圖層時為 None\n
+    \n
+    使用範例:\n
+    level = load_level("classic")\n
+    bricks = level.build_bricks()\n
+    layer = BrickLayer(level, bricks)\n
+    """
+
+    def __init__(self, name, path):
+        """
+        mmap 快取檔並建立各陣列的 memoryview\n
+        \n
+        參數:\n
+        name (str): 關卡名稱\n
+        path (str): 快取檔路徑\n
+        """
+        self.name = name
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        (
+            magic,
+            version,
+            _flags,
+            self.count,
+            self.rows,
+            self.cols,
+            self.random_tnt,
+            self.random_blinking,
+            neighbour_total,
+            layer_x,
+            layer_y,
+            layer_w,
+            layer_h,
+            *offsets,
+        ) = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} 不是這個版本的關卡快取檔")
+
+        count = self.count
+        self.xs = _section(view, offsets[0], count, "i")
+        self.ys = _section(view, offsets[1], count, "i")
+        self.widths = _section(view, offsets[2], count, "i")
+        self.heights = _section(view, offsets[3], count, "i")
+        self.grid_rows = _section(view, offsets[4], count, "i")
+        self.colors = _section(view, offsets[5], count * 3, "B")
+        self.kinds = _section(view, offsets[6], count, "B")
+        self._starts = _section(view, offsets[7], count + 1, "I")
+        self._neighbours = _section(view, offsets[8], neighbour_total, "I")
+
+        self._bounds = None
+        self.layer_rect = None
+        self._layer_pixels = None
+        if layer_w and layer_h:
+            self.layer_rect = pygame.Rect(layer_x, layer_y, layer_w, layer_h)
+            self._layer_pixels = view[offsets[9] : offsets[9] + layer_w * layer_h * 3]
+
+    def bounds(self):
+        """
+        回傳所有磚塊停好之後佔用的範圍（第一次呼叫時計算）\n
+        \n
+        回傳:\n
+        pygame.Rect: 範圍，沒有磚塊時為 None\n
+        """
+        if self._bounds is None and self.count:
+            xs, ys = self.xs, self.ys
+            left, top = min(xs), min(ys)
+            right = max(map(int.__add__, xs, self.widths))
+            bottom = max(map(int.__add__, ys, self.heights))
+            self._bounds = pygame.Rect(left, top, right - left, bottom - top)
+        return self._bounds
+
+    def neighbours(self, index):
+        """
+        回傳在這個磚塊 TNT 爆炸範圍內的其他磚塊編號（由小到大）\n
+        \n
+        參數:\n
+        index (int): 磚塊編號\n
+        \n
+        回傳:\n
+        memoryview: 磚塊編號\n
+        """
+        return self._neighbours[self._starts[index] : self._starts[index + 1]]
+
+    def build_bricks(self, falling=False, rng=None):
+        """
+        依照關卡建立磚塊物件，並隨機指定 TNT 與閃爍磚塊\n
+        \n
+        隨機選擇的方式與順序和原本的 initialize_bricks / create_new_bricks\n
+        相同，同一個亂數種子會得到同樣的關卡。\n
+        \n
+        參數:\n
+        falling (bool): 是否從畫面上方滑下來（過關時的新關卡）\n
+        rng (random.Random): 亂數產生器，預設使用 random 模組\n
+        \n
+        回傳:\n
+        list: 磚塊列表，每個磚塊的 level_index 是它在關卡中的編號\n
+        """
+        xs, ys, widths, heights = self.xs, self.ys, self.widths, self.heights
+        grid_rows, colors, kinds = self.grid_rows, self.colors, self.kinds
+        margin_top = BRICK_CONFIG["MARGIN_TOP"]
+        tnt_color = COLORS["BRICK_TNT"]
+        rng = rng or random
+
+        bricks = []
+        for index in range(self.count):
+            offset = index * 3
+            color = (colors[offset], colors[offset + 1], colors[offset + 2])
+            target_y = ys[index]
+            height = heights[index]
+            if falling:
+                # 和原本的新關卡一樣，越上面的行要滑越遠
+                y = target_y - margin_top - height * (self.rows - grid_rows[index])
+            else:
+                y = target_y
+            brick = Brick(xs[index], y, widths[index], height, color, rng=rng)
+            brick.target_y = target_y
+            brick.falling = falling
+            brick.level_index = index
+            kind = kinds[index]
+            if kind == KIND_TNT:
+                brick.is_tnt = True
+                brick.color = tnt_color
+            elif kind == KIND_BLINKING:
+                brick.is_blinking = True
+            bricks.append(brick)
+
+        # 隨機選擇磚塊設為 TNT
+        candidates = [i for i in range(len(bricks)) if kinds[i] == KIND_NORMAL]
+        tnt_indices = rng.sample(candidates, min(self.random_tnt, len(candidates)))
+        for i in tnt_indices:
+            bricks[i].is_tnt = True
+            bricks[i].color = tnt_color
+
+        # 選擇磚塊設為會閃爍的特殊磚塊
+        non_tnt_indices = [
+            i
+            for i in range(len(bricks))
+            if kinds[i] == KIND_NORMAL and not bricks[i].is_tnt
+        ]
+        if len(non_tnt_indices) >= self.random_blinking:
+            blinking_indices = rng.sample(non_tnt_indices, self.random_blinking)
+        else:
+            blinking_indices = non_tnt_indices
+        for i in blinking_indices:
+            bricks[i].is_blinking = True
+            bricks[i].color = bricks[i].base_color
+
+        return bricks
+
+    def layer_surface(self):
+        """
+        回傳預先繪製的磚塊圖層（直接指向 mmap，不可修改）\n
+        \n
+        回傳:\n
+        pygame.Surface: 圖層，沒有圖層時為 None\n
+        """
+        if self._layer_pixels is None:
+            return None
+        return pygame.image.frombuffer(self._layer_pixels, self.layer_rect.size, "RGB")
+
+
+class BrickLayer:
+    """
+    一局關卡的磚塊圖層\n
+    \n
+    從關卡的預先繪製圖層複製一份，加上這一局隨機指定的 TNT，\n
+    之後每一幀只要貼一次圖層，再把被打掉的磚塊塗黑、畫上會變色的\n
+    閃爍磚塊與正在倒數的 TNT，不用逐一畫出所有磚塊。\n
+    磚塊還在滑下來的時候位置和圖層不同，這段期間改為逐一繪製。\n
+    \n
+    屬性:\n
+    bricks (list): 這一局的磚塊列表\n
+    surface (pygame.Surface): 可修改的圖層\n
+    settled (bool): 磚塊是否都已經停在最後的位置\n
+    converted (bool): 圖層是否已經轉換成螢幕的像素格式\n
+    """
+
+    def __init__(self, level, bricks, convert=True):
+        """
+        建立這一局的圖層\n
+        \n
+        參數:\n
+        level (CompiledLevel): 關卡\n
+        bricks (list): level.build_bricks() 建立的磚塊\n
+        convert (bool): 是否馬上轉換像素格式；在背景執行緒建立時傳入 False，\n
+            之後再由主執行緒呼叫 convert()\n
+        """
+        self.level = level
+        self.bricks = bricks
+        self.rect = level.layer_rect
+        self.settled = not any(brick.falling for brick in bricks)
+        self.converted = False
+        self._paint()
+
+        # 每一幀都要重畫的磚塊：閃爍磚塊會變色，TNT 倒數時會閃紅白
+        self.dynamic = [brick for brick in bricks if brick.is_blinking or brick.is_tnt]
+
+        if convert:
+            self.convert()
+
+    def _paint(self):
+        """從關卡的預先繪製圖層重新畫出這一局的圖層（所有磚塊都還在）"""
+        # 複製成 32 位元的表面再補畫 TNT，文字邊緣的混色和畫在螢幕上相同
+        source = self.level.layer_surface()
+        self.surface = pygame.Surface(source.get_size(), 0, 32)
+        self.surface.blit(source, (0, 0))
+        self.converted = False
+
+        # 隨機指定的 TNT 不在預先繪製的圖層中，補畫上去
+        # （畫在停好之後的位置，新關卡的磚塊這時還在畫面上方）
+        kinds = self.level.kinds
+        for brick in self.bricks:
+            if brick.is_tnt and kinds[brick.level_index] != KIND_TNT:
+                draw_static_brick(
+                    self.surface,
+                    brick.x - self.rect.x,
+                    brick.target_y - self.rect.y,
+                    brick.width,
+                    brick.height,
+                    brick.color,
+                    True,
+                )
+        self._erased = bytearray(len(self.bricks))
+
+    def revive(self):
+        """
+        磚塊的狀態被倒回去之後（對戰模式的回溯）重新整理圖層\n
+        \n
+        已經塗黑的磚塊又回到場上時，從預先繪製的圖層重畫一次，\n
+        還是被打掉的磚塊在下一次繪製時再塗黑。\n
+        """
+        self.settled = not any(brick.falling for brick in self.bricks)
+        erased = self._erased
+        for index, brick in enumerate(self.bricks):
+            if erased[index] and not brick.hit:
+                converted = self.converted
+                self._paint()
+                if converted:
+                    self.convert()
+                return
+
+    def convert(self):
+        """把圖層轉換成螢幕的像素格式，之後貼圖比較快（需在主執行緒呼叫）"""
+        if not self.converted and pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert()
+            self.converted = True
+
+    def draw(self, surface):
+        """
+        繪製所有磚塊\n
+        \n
+        參數:\n
+        surface (pygame.Surface): 要繪製到的螢幕表面\n
+        """
+        if not self.settled:
+            if any(brick.falling for brick in self.bricks):
+                for brick in self.bricks:
+                    brick.draw(surface)
+                return
+            self.settled = True
+
+        # 把這一幀之前被打掉的磚塊從圖層上塗黑
+        erased = self._erased
+        layer_x, layer_y = self.rect.x, self.rect.y
+        black = COLORS["BLACK"]
+        for index, brick in enumerate(self.bricks):
+            if brick.hit and not erased[index]:
+                erased[index] = 1
+                area = footprint(
+                    brick.x, brick.y, brick.width, brick.height, brick.is_tnt
+                )
+                self.surface.fill(black, area.move(-layer_x, -layer_y))
+
+        surface.blit(self.surface, self.rect)
+        for brick in self.dynamic:
+            if brick.hit:
+                continue
+            if brick.tnt_primed:
+                # 倒數中的 TNT 文字會蓋到圖層上原本的 TNT 文字，先清掉
+                area = footprint(brick.x, brick.y, brick.width, brick.height, True)
+                surface.fill(black, area)
+                brick.draw(surface)
+            elif brick.is_blinking:
+                brick.draw(surface)
+
+
+######################定義函式區######################
+
+
+def load_level(name):
+    """
+    載入關卡（需要時先編譯成快取檔，之後直接 mmap）\n
+    \n
+    參數:\n
+    name (str): 關卡名稱（levels/ 資料夾中的檔名，不含 .json）\n
+    \n
+    回傳:\n
+    CompiledLevel: 關卡\n
+    """
+    with _load_lock:
+        level = _loaded.get(name)
+        if level is None:
+            source_path = os.path.join(_level_dir(), f"{name}.json")
+            with open(source_path, "rb") as f:
+                source = f.read()
+            cache_path = _cache_path(name, source)
+            if not os.path.exists(cache_path):
+                # 編譯不會用到亂數，有沒有快取檔都不影響同一個種子的遊戲結果
+                compile_level(json.loads(source.decode("utf-8")), cache_path)
+            level = CompiledLevel(name, cache_path)
+            _loaded[name] = level
+    return level
+
+
+def level_for(number):
+    """
+    取得第幾關要使用的關卡（依照設定檔中的順序循環）\n
+    \n
+    參數:\n
+    number (int): 關卡數，從 1 開始\n
+    \n
+    回傳:\n
+    CompiledLevel: 關卡\n
+    """
+    sequence = LEVEL_CONFIG["SEQUENCE"]
+    return load_level(sequence[(number - 1) % len(sequence)])
+
+
+def compile_level(data, cache_path):
+    """
+    把關卡描述編譯成二進位快取檔\n
+    \n
+    參數:\n
+    data (dict): 關卡 JSON 的內容\n
+    cache_path (str): 快取檔路徑\n
+    \n
+    算法說明:\n
+    - 鄰居表：把磚塊依照爆炸半徑大小的格子分桶，只比較相鄰的格子，\n
+      距離的算法和 explode_tnt 相同（中心點整數座標的歐幾里得距離）\n
+    - 鄰居表以 CSR 格式儲存：starts[i] 到 starts[i + 1] 是第 i 個磚塊的鄰居\n
+    """
+    # 格子可以重複排列成很大的關卡：repeat 是 [縱向次數, 橫向次數]
+    down, across = data.get("repeat", (1, 1))
+    grid = [line * across for line in data["grid"]] * down
+
+    layout = dict(_default_layout(len(grid[0]) if grid else 1))
+    layout.update(data.get("layout", {}))
+    legend = data.get("legend", {})
+    random_placement = data.get("random", {})
+
+    # 解析格子
+    xs, ys, widths, heights, grid_rows, colors, kinds = [], [], [], [], [], [], []
+    rows = len(grid)
+    cols = max((len(line) for line in grid), default=0)
+    for row, line in enumerate(grid):
+        for col, cell in enumerate(line):
+            if cell in EMPTY_CELLS:
+                continue
+            if cell not in legend:
+                raise ValueError(f"關卡格子中的字元 {cell!r} 沒有定義在 legend 中")
+            entry = legend[cell]
+            xs.append(
+                layout["MARGIN_LEFT"] + col * (layout["WIDTH"] + layout["SPACING_X"])
+            )
+            ys.append(
+                layout["MARGIN_TOP"] + row * (layout["HEIGHT"] + layout["SPACING_Y"])
+            )
+            widths.append(layout["WIDTH"])
+            heights.append(layout["HEIGHT"])
+            grid_rows.append(row)
+            colors.extend(_parse_color(entry.get("color", "BRICK_TOMATO")))
+            kinds.append(KIND_NAMES[entry.get("type", "normal")])
+    count = len(xs)
+
+    # 會用到鄰居表的磚塊：有隨機 TNT 時每個普通磚塊都可能是 TNT
+    random_tnt = random_placement.get("tnt", 0)
+    needs_table = [
+        kind == KIND_TNT or (random_tnt and kind == KIND_NORMAL) for kind in kinds
+    ]
+    starts, neighbours = _blast_neighbours(xs, ys, widths, heights, needs_table)
+
+    # 預先繪製圖層（閃爍磚塊每一幀都會重畫，不畫進圖層）
+    layer_rect = None
+    layer_bytes = b""
+    if count:
+        # 圖層範圍要包含 TNT 文字超出磚塊的部分
+        bounds = [
+            footprint(x, y, w, h, needs_table[index])
+            for index, (x, y, w, h) in enumerate(zip(xs, ys, widths, heights))
+        ]
+        bounds = bounds[0].unionall(bounds[1:])
+        left, top = bounds.topleft
+        if bounds.width * bounds.height <= LEVEL_CONFIG["PRERENDER_MAX_PIXELS"]:
+            layer_rect = bounds
+            layer = pygame.Surface(layer_rect.size)
+            layer.fill(COLORS["BLACK"])
+            for index in range(count):
+                kind = kinds[index]
+                if kind == KIND_BLINKING:
+                    continue
+                if kind == KIND_TNT:
+                    color = COLORS["BRICK_TNT"]
+                else:
+                    color = tuple(colors[index * 3 : index * 3 + 3])
+                draw_static_brick(
+                    layer,
+                    xs[index] - left,
+                    ys[index] - top,
+                    widths[index],
+                    heights[index],
+                    color,
+                    kind == KIND_TNT,
+                )
+            layer_bytes = pygame.image.tostring(layer, "RGB")
+
+    # 組合各個區段
+    sections = [
+        struct.pack(f"<{count}i", *xs),
+        struct.pack(f"<{count}i", *ys),
+        struct.pack(f"<{count}i", *widths),
+        struct.pack(f"<{count}i", *heights),
+        struct.pack(f"<{count}i", *grid_rows),
+        bytes(colors),
+        bytes(kinds),
+        struct.pack(f"<{count + 1}I", *starts),
+        struct.pack(f"<{len(neighbours)}I", *neighbours),
+        layer_bytes,
+    ]
+    offsets = []
+    position = HEADER.size
+    for section in sections:
+        position = _align(position)
+        offsets.append(position)
+        position += len(section)
+
+    header = HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        0,
+        count,
+        rows,
+        cols,
+        random_tnt,
+        random_placement.get("blinking", 0),
+        len(neighbours),
+        layer_rect.x if layer_rect else 0,
+        layer_rect.y if layer_rect else 0,
+        layer_rect.width if layer_rect else 0,
+        layer_rect.height if layer_rect else 0,
+        *offsets,
+    )
+
+    # 先寫到暫存檔再改名，其他行程不會讀到寫到一半的快取檔
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header)
+        for offset, section in zip(offsets, sections):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(section)
+    os.replace(temp_path, cache_path)
+
+
+def _blast_neighbours(xs, ys, widths, heights, needs_table):
+    """
+    計算每個磚塊在爆炸範圍內的其他磚塊\n
+    \n
+    回傳:\n
+    tuple: (starts, neighbours)，CSR 格式的鄰居表\n
+    """
+    radius = TNT_CONFIG["EXPLOSION_RADIUS"]
+    cell = max(1, int(radius))
+    centers = [(x + w // 2, y + h // 2) for x, y, w, h in zip(xs, ys, widths, heights)]
+    buckets = {}
+    for index, (cx, cy) in enumerate(centers):
+        buckets.setdefault((cx // cell, cy // cell), []).append(index)
+
+    starts = [0]
+    neighbours = []
+    for index, (cx, cy) in enumerate(centers):
+        if needs_table[index]:
+            found = []
+            bx, by = cx // cell, cy // cell
+            for gx in (bx - 1, bx, bx + 1):
+                for gy in (by - 1, by, by + 1):
+                    for other in buckets.get((gx, gy), ()):
+                        if other == index:
+                            continue
+                        ox, oy = centers[other]
+                        if math.hypot(cx - ox, cy - oy) <= radius:
+                            found.append(other)
+            # 依照磚塊順序排列，爆炸處理的順序才會和逐一檢查時相同
+            found.sort()
+            neighbours.extend(found)
+        starts.append(len(neighbours))
+    return starts, neighbours
+
+
+def tnt_label():
+    """
+    取得畫好的 "TNT" 文字（和 Brick.draw 畫出來的相同）\n
+    \n
+    第一次呼叫會用到字體，要在主執行緒呼叫；之後背景執行緒繪製圖層時\n
+    只貼這張表面，不會和主執行緒同時使用同一個字體物件。\n
+    \n
+    回傳:\n
+    pygame.Surface: 文字表面\n
+    """
+    global _tnt_label
+
+    if _tnt_label is None:
+        font = utils.get_font(FONT_CONFIG["TNT_TEXT_SIZE"])
+        _tnt_label = utils.render_text(font, "TNT", COLORS["WHITE"])
+    return _tnt_label
+
+
+def draw_static_brick(surface, x, y, width, height, color, is_tnt):
+    """把不會變色的磚塊（含 TNT 文字）畫到圖層上，畫法和 Brick.draw 相同"""
+    pygame.draw.rect(surface, color, pygame.Rect(x, y, width, height))
+    if is_tnt:
+        label = tnt_label()
+        surface.blit(label, label.get_rect(center=(x + width // 2, y + height // 2)))
+
+
+def footprint(x, y, width, height, is_tnt):
+    """
+    磚塊畫出來會佔用的範圍（TNT 的文字可能比磚塊寬）\n
+    \n
+    回傳:\n
+    pygame.Rect: 範圍\n
+    """
+    rect = pygame.Rect(x, y, width, height)
+    if is_tnt:
+        text = tnt_label().get_rect()
+        text.center = (x + width // 2, y + height // 2)
+        rect.union_ip(text)
+    return rect
+
+
+def _default_layout(cols):
+    """預設的磚塊大小與間距：和設定檔相同，寬度依列數填滿視窗"""
+    layout = {
+        key: BRICK_CONFIG[key]
+        for key in ("HEIGHT", "MARGIN_LEFT", "MARGIN_TOP", "SPACING_X", "SPACING_Y")
+    }
+    available_width = (
+        WINDOW_WIDTH - 2 * layout["MARGIN_LEFT"] - (cols - 1) * layout["SPACING_X"]
+    )
+    layout["WIDTH"] = max(1, available_width // cols)
+    return layout
+
+
+def _parse_color(value):
+    """顏色可以寫成 COLORS 中的名稱或 [R, G, B]"""
+    if isinstance(value, str):
+        return COLORS[value]
+    return tuple(int(channel) for channel in value)
+
+
+def _section(view, offset, length, fmt):
+    """從 mmap 中取出一段陣列"""
+    size = struct.calcsize(fmt)
+    return view[offset : offset + length * size].cast(fmt)
+
+
+def _align(position):
+    """對齊到 8 位元組"""
+    return (position + 7) & ~7
+
+
+def _level_dir():
+    """關卡資料夾"""
+    path = LEVEL_CONFIG["DIR"]
+    return path if os.path.isabs(path) else os.path.join(ROOT_DIR, path)
+
+
+def _cache_path(name, source):
+    """
+    快取檔路徑，檔名包含會影響編譯結果的所有內容的雜湊\n
+    （關卡原始檔、編譯程式本身、視窗與磚塊設定、爆炸半徑、顏色與字體）\n
+    """
+    digest = hashlib.sha1(source)
+    with open(__file__, "rb") as f:
+        digest.update(f.read())
+    digest.update(
+        repr(
+            (
+                FORMAT_VERSION,
+                WINDOW_WIDTH,
+                sorted(BRICK_CONFIG.items()),
+                TNT_CONFIG["EXPLOSION_RADIUS"],
+                sorted(COLORS.items()),
+                FONT_CONFIG["TNT_TEXT_SIZE"],
+                FONT_CONFIG["FILE"],
+                LEVEL_CONFIG["PRERENDER_MAX_PIXELS"],
+            )
+        ).encode("utf-8")
+    )
+    path = LEVEL_CONFIG["CACHE_DIR"]
+    if not os.path.isabs(path):
+        path = os.path.join(ROOT_DIR, path)
+    return os.path.join(path, f"{name}-{digest.hexdigest()[:16]}.bin")
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+記憶體追蹤模組
+
+使用 tracemalloc 逐幀統計記憶體配置，並把配置歸屬到各個子系統
+（球的更新、碎片產生、TNT 爆炸、繪製、文字繪製），同時記錄每一關的
+記憶體最高水位，結果可以匯出給效能測試套件做回歸比較。
+"""
+
+######################載入套件######################
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+######################導入設定######################
+from config import MEMTRACK_CONFIG
+
+######################導入遊戲模組######################
+from . import utils
+
+######################物件類別######################
+
+
+class MemoryTracker:
+    """
+    逐幀記憶體追蹤器\n
+    \n
+    attach() 會暫時包裝各子系統的函數，每次呼叫前後讀取 tracemalloc\n
+    的目前配置量與 sys.getallocatedblocks() 的記憶體區塊數，\n
+    差值（扣掉巢狀子系統的部分）就是該子系統這次呼叫造成的配置。\n
+    \n
+    每幀記錄:\n
+    - net_bytes: 這一幀結束時比開始時多出的記憶體\n
+    - peak_bytes: 這一幀中最多比開始時多用了多少記憶體（暫時配置）\n
+    - blocks: 這一幀淨增加的記憶體區塊數（約等於物件數量）\n
+    - subsystems: 各子系統的淨配置位元組、區塊數與呼叫次數\n
+    \n
+    屬性:\n
+    frames (deque): 最近幾幀的記錄\n
+    level_high_water (dict): 每一關的記憶體最高水位（位元組）\n
+    totals (dict): 各子系統累計的配置位元組、區塊數與呼叫次數\n
+    \n
+    使用範例:\n
+    tracker = MemoryTracker()\n
+    tracker.start()\n
+    tracker.attach(game_state, game)\n
+    tracker.begin_frame()\n
+    ...\n
+    tracker.end_frame()\n
+    tracker.export("memory.json")\n
+    """
+
+    # 子系統名稱與要包裝的目標：(擁有者名稱, 方法名稱)
+    SUBSYSTEMS = (
+        ("ball_update", "state", "update_balls"),
+        ("shard_spawning", "utils", "spawn_shards"),
+        ("explode_tnt", "utils", "explode_tnt"),
+        ("event_dispatch", "state", "dispatch_events"),
+        ("draw", "state", "draw"),
+        ("draw", "game", "draw_ui"),
+        ("text", "utils", "render_text"),
+    )
+
+    def __init__(self, history_frames=None):
+        """
+        初始化追蹤器\n
+        \n
+        參數:\n
+        history_frames (int): 保留最近幾幀的記錄，預設使用設定檔中的值\n
+        """
+        self.frames = deque(maxlen=history_frames or MEMTRACK_CONFIG["HISTORY_FRAMES"])
+        self.level_high_water = {}
+        self.totals = {}
+        self.frame = 0
+        self.game_state = None
+
+        self._current = {}
+        self._stack = []
+        self._patched = []
+        self._frame_base = 0
+        self._frame_blocks = 0
+        self._started_tracing = False
+
+    ######################啟動與關閉######################
+
+    def start(self):
+        """開始 tracemalloc 追蹤（如果還沒開始）"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MEMTRACK_CONFIG["TRACEBACK_FRAMES"])
+            self._started_tracing = True
+
+    def stop(self):
+        """移除包裝，並停止由這個追蹤器開始的 tracemalloc"""
+        self.detach()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def attach(self, game_state, game=None):
+        """
+        包裝各子系統的函數\n
+        \n
+        參數:\n
+        game_state (GameState): 要追蹤的遊戲狀態\n
+        game (BreakoutGame): 遊戲主物件（可省略，例如效能測試時）\n
+        """
+        self.game_state = game_state
+        owners = {"state": game_state, "game": game, "utils": utils}
+        for name, owner_name, attr in self.SUBSYSTEMS:
+            owner = owners[owner_name]
+            if owner is not None:
+                self._wrap(owner, attr, name)
+
+    def detach(self):
+        """恢復所有被包裝的函數"""
+        for owner, attr, original, on_instance in reversed(self._patched):
+            if on_instance:
+                try:
+                    delattr(owner, attr)
+                except AttributeError:
+                    pass
+            else:
+                setattr(owner, attr, original)
+        self._patched = []
+
+    def _wrap(self, owner, attr, name):
+        """把函數換成會統計記憶體配置的包裝函數"""
+        original = getattr(owner, attr)
+        on_instance = attr not in vars(owner)
+        current = self._current
+        stack = self._stack
+        traced = tracemalloc.get_traced_memory
+        blocks = sys.getallocatedblocks
+
+        def tracked(*args, **kwargs):
+            start_bytes = traced()[0]
+            start_blocks = blocks()
+            stack.append([0, 0])
+            try:
+                return original(*args, **kwargs)
+            finally:
+                child_bytes, child_blocks = stack.pop()
+                delta_bytes = traced()[0] - start_bytes
+                delta_blocks = blocks() - start_blocks
+                entry = current.setdefault(name, [0, 0, 0])
+                entry[0] += delta_bytes - child_bytes
+                entry[1] += delta_blocks - child_blocks
+                entry[2] += 1
+                if stack:
+                    # 巢狀呼叫：從外層子系統扣掉這一段
+                    stack[-1][0] += delta_bytes
+                    stack[-1][1] += delta_blocks
+
+        setattr(owner, attr, tracked)
+        self._patched.append((owner, attr, original, on_instance))
+
+    def reset(self):
+        """清除目前累積的統計（例如效能測試暖身結束後）"""
+        self.frames.clear()
+        self.level_high_water.clear()
+        self.totals.clear()
+        self.frame = 0
+
+    ######################幀生命週期######################
+
+    def begin_frame(self):
+        """在每一幀開始時呼叫"""
+        self._current.clear()
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        self._frame_base = tracemalloc.get_traced_memory()[0]
+        self._frame_blocks = sys.getallocatedblocks()
+
+    def end_frame(self, game=None):
+        """
+        在每一幀結束時呼叫，保存這一幀的記錄\n
+        \n
+        參數:\n
+        game (BreakoutGame): 遊戲主物件（不需要，只是為了符合 frame hook 介面）\n
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        level = self.game_state.level if self.game_state is not None else 0
+        record = {
+            "frame": self.frame,
+            "level": level,
+            "net_bytes": current - self._frame_base,
+            "peak_bytes": max(0, peak - self._frame_base),
+            "blocks": sys.getallocatedblocks() - self._frame_blocks,
+            "subsystems": {
+                name: {"bytes": entry[0], "blocks": entry[1], "calls": entry[2]}
+                for name, entry in self._current.items()
+            },
+        }
+        self.frames.append(record)
+
+        if peak > self.level_high_water.get(level, 0):
+            self.level_high_water[level] = peak
+
+        for name, entry in self._current.items():
+            total = self.totals.setdefault(name, [0, 0, 0])
+            total[0] += entry[0]
+            total[1] += entry[1]
+            total[2] += entry[2]
+        self.frame += 1
+
+    ######################報告######################
+
+    def summary(self):
+        """
+        整理追蹤結果\n
+        \n
+        回傳:\n
+        dict: 每幀統計的百分位數、各子系統平均配置與每關最高水位\n
+        """
+        frames = list(self.frames)
+        count = max(1, self.frame)
+        return {
+            "frames": self.frame,
+            "frame_peak_kb": _distribution([f["peak_bytes"] / 1024 for f in frames]),
+            "frame_net_kb": _distribution([f["net_bytes"] / 1024 for f in frames]),
+            "frame_blocks": _distribution([f["blocks"] for f in frames]),
+            "subsystems": {
+                name: {
+                    "bytes_per_frame": total[0] / count,
+                    "blocks_per_frame": total[1] / count,
+                    "calls_per_frame": total[2] / count,
+                }
+                for name, total in sorted(self.totals.items())
+            },
+            "level_high_water_kb": {
+                str(level): peak / 1024
+                for level, peak in sorted(self.level_high_water.items())
+            },
+        }
+
+    def export(self, path=None):
+        """
+        把摘要與最近幾幀的記錄寫成 JSON\n
+        \n
+        參數:\n
+        path (str): 輸出路徑，預設在設定檔的資料夾中以時間命名\n
+        \n
+        回傳:\n
+        str: 實際寫入的路徑\n
+        """
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(MEMTRACK_CONFIG["OUTPUT_DIR"], f"memory-{stamp}.json")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"summary": self.summary(), "frames": list(self.frames)},
+                f,
+                indent=2,
+                ensure_ascii=False,
+            )
+        return path
+
+
+######################定義函式區######################
+
+
+def _distribution(values):
+    """回傳一組數值的平均、最大值與百分位數"""
+    if not values:
+        return {"mean": 0.0, "max": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0}
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {
+        "mean": sum(ordered) / len(ordered),
+        "max": ordered[-1],
+        "p50": ordered[int(last * 0.50)],
+        "p90": ordered[int(last * 0.90)],
+        "p99": ordered[int(last * 0.99)],
+    }
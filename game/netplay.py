@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+對戰連線模組
+
+兩台電腦（或同一台電腦上的兩個視窗）透過 UDP 交換每一幀的輸入：
+
+- 連線：加入的一方重複送出 HELLO，開對戰的一方回覆 WELCOME，內容是這一場
+  的亂數種子、輸入延遲與最多預測幾幀，兩邊用同樣的設定建立 VersusMatch
+- 輸入：每一幀送出對手還沒收到的所有本機輸入（對手在每個封包中回報收到
+  幾幀），封包遺失也不用另外重送；同一個封包帶著最新一個確定下來的檢查碼
+  與時間戳記，用來比對兩邊是否同步和估計來回時間
+- 離開：關閉時送出 BYE；太久沒有收到封包也當作對手已經離開
+
+每一幀由主迴圈呼叫 poll() 與 send_inputs()，socket 是非阻塞的，
+不會等待網路。
+"""
+
+######################載入套件######################
+import random
+import socket
+import struct
+import time
+
+######################導入設定######################
+from config import VERSUS_CONFIG
+
+######################全域變數######################
+MAGIC = b"BRKV"
+PROTOCOL_VERSION = 1
+
+# 每個封包的開頭：識別字、版本、種類
+HEADER = struct.Struct("<4sBB")
+KIND_HELLO = 1  # 加入的一方要求開始
+KIND_WELCOME = 2  # 開對戰的一方回覆這一場的設定
+KIND_INPUTS = 3  # 輸入
+KIND_BYE = 4  # 離開
+
+# 這一場的設定：亂數種子、輸入延遲、最多預測幾幀、旗標
+WELCOME = struct.Struct("<QBBB")
+FLAG_ENDLESS = 1  # 無盡模式
+
+# 輸入封包：收到對手幾幀的輸入、第一個輸入的幀數、檢查碼的幀數、檢查碼、
+# 送出的時間、對手上一個封包的時間（回送）、輸入數量；後面接著每幀一個位元組
+INPUTS = struct.Struct("<IIIIIIB")
+NO_CHECKSUM = 0xFFFFFFFF
+
+# 收到的封包最大長度
+MAX_PACKET = 2048
+
+
+######################物件類別######################
+
+
+class NetplayPeer:
+    """
+    對戰的一方\n
+    \n
+    開對戰的一方（host=True）是第 0 個玩家，在指定的位址等待；加入的一方\n
+    是第 1 個玩家，連到開對戰的一方。\n
+    \n
+    屬性:\n
+    state (str): connecting（等待對手）、playing（對戰中）、closed（對手已經離開）\n
+    local (int): 本機玩家的編號\n
+    seed (int): 這一場的亂數種子（開始對戰之後）\n
+    delay (int): 輸入延遲的幀數\n
+    max_rollback (int): 最多預測幾幀\n
+    endless (bool): 是否為無盡模式\n
+    rtt_ms (float): 最近一次估計的來回時間（毫秒）\n
+    desynced (bool): 是否發現兩邊的檢查碼不同\n
+    \n
+    使用範例:\n
+    peer = NetplayPeer(("127.0.0.1", 47048), host=True)\n
+    peer.start()\n
+    peer.poll(session)  # 每一幀\n
+    peer.send_inputs(session)\n
+    peer.close()\n
+    """
+
+    def __init__(self, address=None, host=False, endless=False):
+        """
+        參數:\n
+        address (tuple): 開對戰時等待的位址，加入時為對手的位址，\n
+            預設使用設定檔中的值\n
+        host (bool): 是否為開對戰的一方\n
+        endless (bool): 開對戰時是否使用無盡模式（加入的一方依照對手的設定）\n
+        """
+        if address is None:
+            address = (VERSUS_CONFIG["HOST"], VERSUS_CONFIG["PORT"])
+        self.address = address
+        self.host = host
+        self.local = 0 if host else 1
+        self.state = "connecting"
+        self.sock = None
+        self.remote = None if host else address
+
+        self.seed = None
+        self.delay = VERSUS_CONFIG["INPUT_DELAY"]
+        self.max_rollback = VERSUS_CONFIG["MAX_ROLLBACK"]
+        self.endless = endless
+        if host:
+            self.seed = random.getrandbits(64)
+
+        self.remote_ack = 0  # 對手已經收到幾幀的本機輸入
+        self.rtt_ms = 0.0
+        self.desynced = False
+        self._last_heard = 0.0
+        self._last_hello = 0.0
+        self._echo = 0  # 對手最後一個封包的時間戳記
+
+        self.packets_sent = 0
+        self.packets_received = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    @property
+    def remote_player(self):
+        """對手的玩家編號"""
+        return 1 - self.local
+
+    def start(self):
+        """
+        開啟 socket（開對戰的一方綁定等待的位址）\n
+        \n
+        回傳:\n
+        bool: 是否成功\n
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            if self.host:
+                sock.bind(self.address)
+            else:
+                sock.bind(("", 0))
+        except OSError as e:
+            sock.close()
+            print(f"⚠️ 無法開啟對戰連線 {self.address}: {e}")
+            return False
+        sock.setblocking(False)
+        self.sock = sock
+        self._last_heard = time.monotonic()
+        return True
+
+    def poll(self, session=None):
+        """
+        處理收到的所有封包（每一幀呼叫，不會等待）\n
+        \n
+        參數:\n
+        session (RollbackSession): 對戰開始之後的同步狀態，收到的輸入交給它\n
+        """
+        if self.sock is None or self.state == "closed":
+            return
+        now = time.monotonic()
+        if self.state == "connecting" and not self.host:
+            # 對手還沒回覆：重送連線要求
+            if (now - self._last_hello) * 1000 >= VERSUS_CONFIG["HELLO_INTERVAL_MS"]:
+                self._last_hello = now
+                self._send(HEADER.pack(MAGIC, PROTOCOL_VERSION, KIND_HELLO))
+
+        while True:
+            try:
+                data, sender = self.sock.recvfrom(MAX_PACKET)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                # 對手的連接埠還沒開（ICMP 無法送達），繼續等
+                break
+            if self.remote is not None and sender != self.remote:
+                continue  # 不是這一場的對手
+            if len(data) < HEADER.size:
+                continue
+            magic, version, kind = HEADER.unpack_from(data)
+            if magic != MAGIC or version != PROTOCOL_VERSION:
+                continue
+            self.packets_received += 1
+            self.bytes_received += len(data)
+            self._last_heard = now
+            self._handle(kind, data, sender, session)
+
+        if (
+            self.state == "playing"
+            and (now - self._last_heard) * 1000 > VERSUS_CONFIG["DISCONNECT_MS"]
+        ):
+            self.state = "closed"
+
+    def send_inputs(self, session):
+        """
+        送出對手還沒收到的本機輸入（每一幀呼叫）\n
+        \n
+        參數:\n
+        session (RollbackSession): 同步狀態\n
+        """
+        if self.state != "playing":
+            return
+        first = self.remote_ack
+        bits = session.local_inputs(first)[: VERSUS_CONFIG["MAX_INPUTS_PER_PACKET"]]
+        checksum = session.latest_checksum()
+        check_frame, check_value = checksum if checksum else (NO_CHECKSUM, 0)
+        header = INPUTS.pack(
+            len(session.inputs[self.remote_player]),
+            first,
+            check_frame,
+            check_value,
+            _now_ms(),
+            self._echo,
+            len(bits),
+        )
+        self._send(HEADER.pack(MAGIC, PROTOCOL_VERSION, KIND_INPUTS) + header + bits)
+
+    def close(self):
+        """通知對手並關閉 socket"""
+        if self.sock is None:
+            return
+        if self.state == "playing":
+            self._send(HEADER.pack(MAGIC, PROTOCOL_VERSION, KIND_BYE))
+        self.sock.close()
+        self.sock = None
+        self.state = "closed"
+
+    def stats(self):
+        """回傳連線的統計"""
+        return {
+            "state": self.state,
+            "rtt_ms": self.rtt_ms,
+            "packets_sent": self.packets_sent,
+            "packets_received": self.packets_received,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "desynced": self.desynced,
+        }
+
+    def _handle(self, kind, data, sender, session):
+        """處理一個封包"""
+        body = memoryview(data)[HEADER.size :]
+        if kind == KIND_HELLO and self.host:
+            if self.remote is None:
+                self.remote = sender
+            flags = FLAG_ENDLESS if self.endless else 0
+            # 對手可能沒收到上一次的回覆，每次都回覆
+            self._send(
+                HEADER.pack(MAGIC, PROTOCOL_VERSION, KIND_WELCOME)
+                + WELCOME.pack(self.seed, self.delay, self.max_rollback, flags)
+            )
+            self.state = "playing"
+        elif kind == KIND_WELCOME and not self.host:
+            if self.state != "connecting" or len(body) < WELCOME.size:
+                return
+            self.seed, self.delay, self.max_rollback, flags = WELCOME.unpack_from(body)
+            self.endless = bool(flags & FLAG_ENDLESS)
+            self.state = "playing"
+        elif kind == KIND_INPUTS:
+            if session is None or len(body) < INPUTS.size:
+                return
+            ack, first, check_frame, check_value, sent, echo, count = (
+                INPUTS.unpack_from(body)
+            )
+            bits = bytes(body[INPUTS.size : INPUTS.size + count])
+            if len(bits) != count:
+                return
+            self.remote_ack = max(self.remote_ack, ack)
+            self._echo = sent
+            if echo:
+                self.rtt_ms = float((_now_ms() - echo) & 0xFFFFFFFF)
+            session.add_remote_inputs(self.remote_player, first, bits)
+            if check_frame != NO_CHECKSUM and not session.check_remote(
+                check_frame, check_value
+            ):
+                if not self.desynced:
+                    print(f"⚠️ 第 {check_frame} 幀和對手的模擬不同步")
+                self.desynced = True
+        elif kind == KIND_BYE:
+            self.state = "closed"
+
+    def _send(self, packet):
+        """送出一個封包（送不出去時直接丟掉，下一幀會再送）"""
+        if self.remote is None:
+            return
+        try:
+            self.sock.sendto(packet, self.remote)
+        except OSError:
+            return
+        self.packets_sent += 1
+        self.bytes_sent += len(packet)
+
+
+######################定義函式區######################
+
+
+def _now_ms():
+    """回傳 32 位元的毫秒時間戳記（0 保留給還沒收到任何封包）"""
+    return (int(time.monotonic() * 1000) & 0xFFFFFFFF) or 1
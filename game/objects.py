@@ -23,6 +23,12 @@ from config import (
     PHYSICS_CONFIG,
 )
 
+######################導入遊戲模組######################
+from . import trace
+from . import utils
+from .entity import ConfigConstant
+from .events import BrickDestroyed, BallSpawned, ScoreDelta
+
 
 ######################物件類別######################
 
@@ -45,6 +51,7 @@ class Brick:
     is_tnt (bool): 是否為 TNT 爆炸磚塊\n
     is_blinking (bool): 是否為會閃爍的特殊磚塊\n
     falling (bool): 是否正在執行下落動畫\n
+    level_index (int): 在關卡中的編號，不是由關卡建立的磚塊為 None\n
     \n
     TNT 相關屬性:\n
     tnt_primed (bool): TNT 是否已被觸發開始倒數\n
@@ -56,7 +63,35 @@ class Brick:
     brick.start_priming()  # 觸發 TNT 倒數\n
     """
 
-    def __init__(self, x, y, width=None, height=None, color=None, is_tnt=False):
+    # 超大關卡有幾十萬塊磚，不使用每個實例各自的 __dict__
+    __slots__ = (
+        "x",
+        "y",
+        "width",
+        "height",
+        "color",
+        "base_color",
+        "hit",
+        "is_tnt",
+        "tnt_primed",
+        "tnt_primed_start",
+        "tnt_primed_cycles",
+        "is_blinking",
+        "blink_offset",
+        "falling",
+        "target_y",
+        "level_index",
+    )
+
+    # 所有磚塊都一樣的設定值，放在類別上共用
+    tnt_blink_duration = ConfigConstant(TNT_CONFIG, "BLINK_DURATION")
+    tnt_blink_repeats = ConfigConstant(TNT_CONFIG, "BLINK_REPEATS")
+    blink_period = ConfigConstant(BLINKING_CONFIG, "PERIOD")
+    fall_speed = ConfigConstant(PHYSICS_CONFIG, "FALL_SPEED")
+
+    def __init__(
+        self, x, y, width=None, height=None, color=None, is_tnt=False, rng=None
+    ):
         """
         初始化磚塊物件\n
         \n
@@ -67,6 +102,8 @@ class Brick:
         height (int): 磚塊高度，預設使用設定檔中的值\n
         color (tuple): 磚塊顏色 (R, G, B)，預設為番茄紅\n
         is_tnt (bool): 是否為 TNT 磚塊，預設為 False\n
+        rng (random.Random): 亂數產生器，預設使用 random 模組（背景執行緒\n
+            建立磚塊時傳入自己的產生器，才不會動到主執行緒的亂數順序）\n
         """
         # 設定磚塊在螢幕上的位置
         self.x = x
@@ -88,19 +125,18 @@ class Brick:
         self.tnt_primed = False  # TNT 是否已經被觸發開始倒數
         self.tnt_primed_start = 0  # 開始倒數的時間點
         self.tnt_primed_cycles = 0  # 已經閃爍了幾次
-        # 從設定檔讀取 TNT 的倒數時間設定
-        self.tnt_blink_duration = TNT_CONFIG["BLINK_DURATION"]
-        self.tnt_blink_repeats = TNT_CONFIG["BLINK_REPEATS"]
 
         # 特殊閃爍磚塊的設定
         self.is_blinking = False  # 是否是會持續閃爍變色的特殊磚塊
-        self.blink_period = BLINKING_CONFIG["PERIOD"]  # 顏色變化的週期
-        self.blink_offset = random.randint(0, 1000)  # 隨機偏移，讓每個磚塊閃爍不同步
+        # 隨機偏移，讓每個磚塊閃爍不同步
+        self.blink_offset = (rng or random).randint(0, 1000)
 
         # 磚塊下落動畫相關
         self.falling = False  # 是否正在下落
         self.target_y = y  # 目標 Y 座標
-        self.fall_speed = PHYSICS_CONFIG["FALL_SPEED"]  # 下落速度
+
+        # 在關卡中的編號（由關卡建立磚塊時設定）
+        self.level_index = None
 
     def draw(self, surface):
         """
@@ -160,13 +196,39 @@ class Brick:
             if self.is_tnt:
                 from config import FONT_CONFIG
 
-                font = pygame.font.Font(None, FONT_CONFIG["TNT_TEXT_SIZE"])
-                text = font.render("TNT", True, COLORS["WHITE"])
+                font = utils.get_font(FONT_CONFIG["TNT_TEXT_SIZE"])
+                text = utils.render_text(font, "TNT", COLORS["WHITE"])
                 text_rect = text.get_rect(
                     center=(self.x + self.width // 2, self.y + self.height // 2)
                 )
                 surface.blit(text, text_rect)
 
+    def recycle(self, x, y, color):
+        """
+        把已經被打掉的磚塊重新放回場上\n
+        \n
+        無盡模式重複使用同一批磚塊物件，不會一直建立新的磚塊；\n
+        所有狀態都會恢復成剛建立時的樣子。\n
+        \n
+        參數:\n
+        x (float): 新的左上角 X 座標\n
+        y (float): 新的左上角 Y 座標\n
+        color (tuple): 新的顏色 (R, G, B)\n
+        """
+        self.x = x
+        self.y = y
+        self.target_y = y
+        self.color = color
+        self.base_color = color
+        self.hit = False
+        self.is_tnt = False
+        self.tnt_primed = False
+        self.tnt_primed_start = 0
+        self.tnt_primed_cycles = 0
+        self.is_blinking = False
+        self.blink_offset = random.randint(0, 1000)
+        self.falling = False
+
     def start_priming(self):
         """
         啟動 TNT 磚塊的倒數程序\n
@@ -190,8 +252,9 @@ class Brick:
         self.tnt_primed = True
         self.tnt_primed_start = pygame.time.get_ticks()  # 記錄開始倒數的時間
         self.tnt_primed_cycles = 0  # 重置閃爍次數計數器
+        trace.emit("tnt_primed", x=self.x, y=self.y)
 
-    def update(self, now, all_bricks):
+    def update(self, now, all_bricks, events=None, level=None):
         """
         每一幀更新磚塊的狀態\n
         \n
@@ -202,6 +265,8 @@ class Brick:
         參數:\n
         now (int): 當前時間戳記（毫秒）\n
         all_bricks (list): 所有磚塊的列表，用於 TNT 爆炸處理\n
+        events (EventQueue): 這一局的事件佇列，TNT 爆炸的效果與分數放在這裡\n
+        level (CompiledLevel): 使用這個關卡的爆炸鄰居表（見 explode_tnt）\n
         """
         # 處理磚塊下落動畫
         if self.falling:
@@ -222,10 +287,8 @@ class Brick:
 
             # 如果閃爍次數達到設定值，就該爆炸了
             if cycles_completed >= self.tnt_blink_repeats:
-                # 匯入爆炸處理函數並執行爆炸
-                from .utils import explode_tnt
-
-                explode_tnt(self, all_bricks)
+                # 執行爆炸（透過模組呼叫，記憶體追蹤才能包裝這個函數）
+                utils.explode_tnt(self, all_bricks, events, level)
                 self.tnt_primed = False  # 爆炸後重置倒數狀態
             else:
                 # 更新已完成的閃爍次數
@@ -256,6 +319,8 @@ class Paddle:
     paddle.draw(screen)        # 繪製底板\n
     """
 
+    __slots__ = ("x", "y", "width", "height", "color", "speed")
+
     def __init__(self, x, y, width=None, height=None, color=None, speed=None):
         """
         初始化底板物件\n
@@ -358,6 +423,23 @@ class Ball:
     success = ball.update(paddle, bricks, 800, 600)  # 更新並檢查碰撞\n
     """
 
+    __slots__ = (
+        "x",
+        "y",
+        "radius",
+        "color",
+        "speed",
+        "vx",
+        "vy",
+        "stuck",
+        "spinning",
+        "spin_center_x",
+        "spin_center_y",
+        "spin_radius",
+        "spin_angle",
+        "spin_angular_speed",
+    )
+
     def __init__(self, x, y, radius=None, color=None, speed=None):
         """
         初始化球物件\n
@@ -399,8 +481,7 @@ class Ball:
         bricks,
         screen_width,
         screen_height,
-        balls_list=None,
-        game_state=None,
+        events=None,
     ):
         """
         統一的球更新方法 - 處理球的移動和所有碰撞檢測\n
@@ -417,8 +498,8 @@ class Ball:
         bricks (list): 磚塊陣列，包含所有未被擊中的磚塊\n
         screen_width (int): 螢幕寬度，範圍 > 0\n
         screen_height (int): 螢幕高度，範圍 > 0\n
-        balls_list (list): 球的陣列，用於新增額外球\n
-        game_state (GameState): 遊戲狀態物件，用於更新分數和特效\n
+        events (EventQueue): 這一局的事件佇列，碎片、分數與額外的球以事件的形式\n
+            放進去，幀結束時才加入遊戲\n
         \n
         回傳:\n
         bool: True 表示球仍然存活，False 表示球掉出螢幕底部\n
@@ -487,9 +568,21 @@ class Ball:
             self.y = paddle.y - self.radius
 
         # 檢查球是否撞到任何磚塊
+        # 先用球的外框（多留 1 像素）排除離得很遠的磚塊，只有外框重疊時才做
+        # 精確的圓形碰撞檢查；結果和每個磚塊都做精確檢查相同
+        reach = self.radius + 1
+        left, right = self.x - reach, self.x + reach
+        top, bottom = self.y - reach, self.y + reach
         for brick in bricks:
             # 只檢查還沒被打掉的磚塊
-            if not brick.hit and self.check_brick_collision(brick):
+            if (
+                not brick.hit
+                and brick.x <= right
+                and brick.y <= bottom
+                and brick.x + brick.width >= left
+                and brick.y + brick.height >= top
+                and self.check_brick_collision(brick)
+            ):
                 # 根據磚塊類型執行不同的處理
                 if brick.is_tnt:
                     # 如果撞到 TNT 磚塊，啟動倒數程序（不會立即摧毀）
@@ -498,29 +591,14 @@ class Ball:
                     # 普通磚塊直接摧毀
                     brick.hit = True
 
-                    # 產生磚塊碎片效果讓畫面更生動
-                    if game_state:
-                        try:
-                            from .effects import Shard
-
-                            count = 8  # 每個磚塊產生 8 個碎片
-                            for _ in range(count):
-                                # 在磚塊範圍內隨機產生碎片位置
-                                sx = random.uniform(brick.x, brick.x + brick.width)
-                                sy = random.uniform(brick.y, brick.y + brick.height)
-                                # 使用磚塊的原始顏色作為碎片顏色
-                                color = getattr(brick, "base_color", brick.color)
-                                game_state.shards.append(Shard(sx, sy, color))
-                        except Exception:
-                            # 如果特效載入失敗也不影響遊戲運行
-                            pass
-
-                    # 增加玩家得分
-                    if game_state:
-                        game_state.score += SCORE_CONFIG["BRICK_HIT"]
+                    if events is not None:
+                        # 產生磚塊碎片效果讓畫面更生動（每個磚塊產生 8 個碎片）
+                        events.push(BrickDestroyed(brick, 8))
+                        # 增加玩家得分
+                        events.push(ScoreDelta(SCORE_CONFIG["BRICK_HIT"]))
 
                 # 如果撞到會閃爍的特殊磚塊，產生額外的球
-                if brick.is_blinking and balls_list is not None:
+                if brick.is_blinking and events is not None:
                     for _ in range(BLINKING_CONFIG["EXTRA_BALLS"]):
                         # 創建新球，位置和當前球相同
                         new_ball = Ball(
@@ -532,7 +610,8 @@ class Ball:
                         angle = random.uniform(-math.pi, math.pi)
                         new_ball.vx = math.cos(angle) * new_ball.speed
                         new_ball.vy = math.sin(angle) * new_ball.speed
-                        balls_list.append(new_ball)
+                        events.push(BallSpawned(new_ball))
+                    trace.emit("multiball", spawned=BLINKING_CONFIG["EXTRA_BALLS"])
 
                 # 處理球的反彈（簡單的反彈邏輯）
                 # 根據球撞到磚塊的哪一側來決定反彈方向
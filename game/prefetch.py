@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+下一關預先產生模組
+
+玩家還在打目前這一關的時候，背景執行緒就先把下一關準備好：
+載入（需要時編譯）關卡快取、建立磚塊物件、隨機指定 TNT 與閃爍磚塊，
+並畫好這一局的磚塊圖層（超大關卡則是建立空間索引、把磚塊分到區塊，
+並先畫好一開始畫面內的區塊）。過關時只要把準備好的磚塊列表與圖層換上去，
+不會在過關的那一幀卡一下。
+
+隨機選擇使用排程時從主執行緒亂數抽出的種子，不會在背景執行緒動到
+random 模組，所以不管背景執行緒什麼時候做完，同一個亂數種子都會玩出
+同樣的遊戲；背景執行緒來不及做完時，主執行緒用同一個種子自己建立。
+"""
+
+######################載入套件######################
+import random
+import threading
+import time
+from collections import deque
+
+import pygame
+
+######################導入設定######################
+from config import LEVEL_CONFIG
+
+######################導入遊戲模組######################
+from . import board
+from . import levels
+
+######################全域變數######################
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+######################物件類別######################
+
+
+class PreparedLevel:
+    """
+    一個預先準備的關卡\n
+    \n
+    屬性:\n
+    number (int): 關卡數\n
+    seed (int): 隨機指定 TNT 與閃爍磚塊用的種子\n
+    state (str): queued（排隊中）、building（建立中）、ready（完成）、failed（失敗）\n
+    level (CompiledLevel): 關卡\n
+    bricks (list): 磚塊列表（從畫面上方滑下來）\n
+    layer (BrickLayer): 磚塊圖層，關卡沒有預先繪製圖層時為 None\n
+    board (Board): 超大關卡的場地（一般關卡為 None）\n
+    build_ms (float): 建立花了多少毫秒\n
+    ready (threading.Event): 建立結束（成功或失敗）時設定\n
+    """
+
+    def __init__(self, number, seed):
+        """
+        參數:\n
+        number (int): 關卡數\n
+        seed (int): 亂數種子\n
+        """
+        self.number = number
+        self.seed = seed
+        self.state = "queued"
+        self.level = None
+        self.bricks = None
+        self.layer = None
+        self.board = None
+        self.error = None
+        self.build_ms = 0.0
+        self.ready = threading.Event()
+
+    def build(self):
+        """建立關卡、磚塊與圖層（在背景執行緒或主執行緒執行）"""
+        started = time.perf_counter()
+        try:
+            level = levels.level_for(self.number)
+            # 像素格式轉換留給主執行緒
+            bricks, layer, field = build_level(
+                level, True, random.Random(self.seed), convert=False
+            )
+        except (OSError, ValueError, pygame.error) as e:
+            self.error = e
+            self.state = "failed"
+        else:
+            self.level, self.bricks = level, bricks
+            self.layer, self.board = layer, field
+            self.state = "ready"
+        self.build_ms = (time.perf_counter() - started) * 1000
+        self.ready.set()
+
+
+class LevelPrefetcher:
+    """
+    在背景準備下一關\n
+    \n
+    同一時間只保留一個預先準備的關卡；重新排程（例如重新開始遊戲）時\n
+    舊的關卡直接丟掉。作為主迴圈的 frame hook 使用時，準備好的圖層\n
+    會在幀結束時轉換成螢幕的像素格式。\n
+    \n
+    屬性:\n
+    hits (int): 過關時下一關已經準備好的次數\n
+    stalls (int): 過關時還要等背景執行緒做完的次數\n
+    sync_builds (int): 由主執行緒自己建立的次數\n
+    \n
+    使用範例:\n
+    prefetcher = get_prefetcher()\n
+    prefetcher.schedule(game_state.level + 1)  # 載入目前這一關之後\n
+    level, bricks, layer, field = prefetcher.take(game_state.level)  # 過關時\n
+    """
+
+    def __init__(self, background=None):
+        """
+        參數:\n
+        background (bool): 是否使用背景執行緒，預設使用設定檔中的值\n
+        """
+        if background is None:
+            background = LEVEL_CONFIG["PREFETCH_BACKGROUND"]
+        self.background = background
+        self._pending = None
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+        self.hits = 0
+        self.stalls = 0
+        self.sync_builds = 0
+        self.last_build_ms = 0.0
+
+    def start(self):
+        """啟動背景執行緒（schedule 第一次呼叫時也會自動啟動）"""
+        if self.background and self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._worker, name="LevelPrefetch", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """停止背景執行緒（正在建立的關卡會先做完）"""
+        if self._thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+
+    def schedule(self, number, seed=None):
+        """
+        開始準備第幾關（在主執行緒呼叫）\n
+        \n
+        參數:\n
+        number (int): 關卡數\n
+        seed (int): 這一關的亂數種子，預設從 random 模組抽出\n
+            （讀取存檔時使用存檔中的種子，不會多用到一次亂數）\n
+        """
+        # 種子在主執行緒抽出，亂數的使用順序和背景執行緒的進度無關
+        if seed is None:
+            seed = random.getrandbits(64)
+        job = PreparedLevel(number, seed)
+        # 背景執行緒繪製圖層時會用到 TNT 文字，先在主執行緒畫好
+        levels.tnt_label()
+        with self._lock:
+            self._pending = job
+            if self.background:
+                self._queue.append(job)
+        if self.background:
+            self.start()
+            self._wakeup.set()
+
+    def scheduled_seed(self, number):
+        """
+        回傳已經排定的第幾關使用的亂數種子（存檔用）\n
+        \n
+        參數:\n
+        number (int): 關卡數\n
+        \n
+        回傳:\n
+        int: 亂數種子，沒有排定這一關時為 None\n
+        """
+        with self._lock:
+            job = self._pending
+        if job is None or job.number != number:
+            return None
+        return job.seed
+
+    def take(self, number):
+        """
+        取出準備好的關卡（過關時在主執行緒呼叫）\n
+        \n
+        參數:\n
+        number (int): 關卡數\n
+        \n
+        回傳:\n
+        tuple: (CompiledLevel, 磚塊列表, BrickLayer 或 None, Board 或 None)\n
+        """
+        build_here = False
+        with self._lock:
+            job = self._pending
+            self._pending = None
+            if job is None or job.number != number:
+                job = PreparedLevel(number, random.getrandbits(64))
+                job.state = "building"
+                build_here = True
+            elif job.state == "queued":
+                job.state = "building"
+                build_here = True
+
+        if build_here:
+            job.build()
+            self.sync_builds += 1
+        elif job.ready.is_set():
+            self.hits += 1
+        else:
+            job.ready.wait()
+            self.stalls += 1
+
+        if job.state == "failed":
+            raise job.error
+        self.last_build_ms = job.build_ms
+        if job.layer is not None:
+            job.layer.convert()
+        return job.level, job.bricks, job.layer, job.board
+
+    def begin_frame(self):
+        """幀開始（不需要做任何事）"""
+
+    def end_frame(self, game=None):
+        """幀結束：把已經準備好的圖層轉換成螢幕的像素格式"""
+        job = self._pending
+        if job is not None and job.state == "ready" and job.layer is not None:
+            job.layer.convert()
+
+    def stats(self):
+        """回傳預先準備的統計"""
+        return {
+            "hits": self.hits,
+            "stalls": self.stalls,
+            "sync_builds": self.sync_builds,
+            "last_build_ms": self.last_build_ms,
+        }
+
+    def _worker(self):
+        """背景執行緒：依序建立排進來的關卡"""
+        while not self._stopping:
+            try:
+                job = self._queue.popleft()
+            except IndexError:
+                self._wakeup.wait(0.5)
+                self._wakeup.clear()
+                continue
+            with self._lock:
+                # 已經被主執行緒拿去自己建立，或被新的排程取代
+                if job.state != "queued" or job is not self._pending:
+                    continue
+                job.state = "building"
+            job.build()
+
+
+######################定義函式區######################
+
+
+def build_level(level, falling=False, rng=None, convert=True):
+    """
+    建立一局關卡的磚塊與繪製用的圖層\n
+    \n
+    一般關卡建立磚塊圖層；比視窗大的關卡改為建立場地（攝影機、空間索引\n
+    與區塊圖層），磚塊直接放在最後的位置，不使用滑下來的動畫。\n
+    \n
+    參數:\n
+    level (CompiledLevel): 關卡\n
+    falling (bool): 磚塊是否從畫面上方滑下來\n
+    rng (random.Random): 亂數產生器，預設使用 random 模組\n
+    convert (bool): 是否馬上轉換圖層的像素格式（背景執行緒傳入 False）\n
+    \n
+    回傳:\n
+    tuple: (磚塊列表, BrickLayer 或 None, Board 或 None)\n
+    """
+    if board.is_huge(level):
+        bricks = level.build_bricks(False, rng)
+        return bricks, None, board.Board(level, bricks)
+    bricks = level.build_bricks(falling, rng)
+    layer = None
+    if level.layer_rect is not None:
+        layer = levels.BrickLayer(level, bricks, convert)
+    return bricks, layer, None
+
+
+def get_prefetcher():
+    """
+    取得共用的下一關預先準備器\n
+    \n
+    回傳:\n
+    LevelPrefetcher: 預先準備器\n
+    """
+    global _prefetcher
+
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = LevelPrefetcher()
+        return _prefetcher
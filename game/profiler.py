@@ -0,0 +1,512 @@
+# -*- coding: utf-8 -*-
+"""
+效能分析模組
+
+提供逐幀、逐階段的計時器與畫面上的除錯覆蓋層。
+只有在 GAME_CONFIG["SHOW_DEBUG_INFO"] 開啟時才會建立，
+計時用的包裝函數也只在那時才掛到遊戲物件上，關閉時完全沒有額外成本。
+另外提供 cProfile 擷取器，可以按鍵觸發記錄接下來 N 幀的完整效能資料。
+"""
+
+######################載入套件######################
+import cProfile
+import io
+import os
+import pstats
+import time
+from collections import deque
+
+import pygame
+
+######################導入設定######################
+from config import DEBUG_CONFIG, PROFILE_CONFIG, COLORS, FPS
+
+######################導入遊戲模組######################
+from . import utils
+
+######################全域變數######################
+# 會被計算繪製次數的 pygame.draw 函數
+COUNTED_DRAW_FUNCTIONS = ("rect", "circle", "ellipse", "line", "lines", "polygon")
+
+# 覆蓋層中各階段的顯示順序
+FRAME_PHASES = (
+    "input",
+    "explosions",
+    "bricks",
+    "balls",
+    "shards",
+    "eggs",
+    "events",
+    "draw",
+    "flip",
+)
+
+
+######################物件類別######################
+
+
+class FrameProfiler:
+    """
+    逐幀階段計時器\n
+    \n
+    attach() 會把遊戲的各個階段方法換成計時用的包裝函數\n
+    （只設定在物件實例上，detach() 時刪除即可恢復原本的類別方法），\n
+    同時暫時包裝 pygame.draw 的函數來計算每幀的繪製次數。\n
+    \n
+    屬性:\n
+    frame (int): 已完成的幀數\n
+    phase_history (dict): 每個階段最近幾幀的耗時（秒）\n
+    frame_history (deque): 最近幾幀的完整幀時間（秒，含等待）\n
+    work_history (deque): 最近幾幀實際工作時間（各階段總和，秒）\n
+    entity_counts (dict): 最近一幀的物件數量\n
+    draw_calls (int): 最近一幀的 pygame.draw 呼叫次數\n
+    \n
+    使用範例:\n
+    profiler = FrameProfiler()\n
+    profiler.attach(game)  # game 為 BreakoutGame\n
+    profiler.begin_frame()\n
+    ...  # 處理輸入、更新、繪製\n
+    profiler.end_frame(game)\n
+    """
+
+    def __init__(self, average_frames=None, history_frames=None):
+        """
+        初始化計時器\n
+        \n
+        參數:\n
+        average_frames (int): 平均值取最近幾幀，預設使用設定檔中的值\n
+        history_frames (int): 幀時間歷史保留幾幀，預設使用設定檔中的值\n
+        """
+        average_frames = average_frames or DEBUG_CONFIG["AVERAGE_FRAMES"]
+        history_frames = history_frames or DEBUG_CONFIG["HISTORY_FRAMES"]
+
+        self.frame = 0
+        self.phase_history = {
+            phase: deque(maxlen=average_frames) for phase in FRAME_PHASES
+        }
+        self.frame_history = deque(maxlen=history_frames)
+        self.work_history = deque(maxlen=history_frames)
+        self.entity_counts = {}
+        self.draw_calls = 0
+
+        # 目前這一幀各階段累計的耗時
+        self.current = dict.fromkeys(FRAME_PHASES, 0.0)
+        self._frame_start = None
+        self._draw_calls = 0
+        self._wrapped = []
+        self._draw_originals = {}
+
+    ######################掛載與卸載######################
+
+    def attach(self, game):
+        """
+        替遊戲的各個階段掛上計時包裝\n
+        \n
+        參數:\n
+        game (BreakoutGame): 遊戲主物件\n
+        """
+        for owner, attr, phase in frame_phase_targets(game):
+            self.wrap(owner, attr, phase)
+        self._patch_draw_functions()
+
+    def detach(self):
+        """移除所有計時包裝，恢復原本的方法"""
+        for owner, attr in reversed(self._wrapped):
+            try:
+                delattr(owner, attr)
+            except AttributeError:
+                pass
+        self._wrapped = []
+        for name, original in self._draw_originals.items():
+            setattr(pygame.draw, name, original)
+        self._draw_originals = {}
+
+    def wrap(self, owner, attr, phase):
+        """
+        把物件的某個方法換成會累計耗時的包裝函數\n
+        \n
+        同一階段可以包裝多個方法，耗時會加總到同一階段。\n
+        \n
+        參數:\n
+        owner (object): 擁有該方法的物件\n
+        attr (str): 方法名稱\n
+        phase (str): 要累計到的階段名稱\n
+        """
+        current = self.current
+
+        def record(start, end):
+            current[phase] = current.get(phase, 0.0) + end - start
+
+        wrap_method(owner, attr, record)
+        self._wrapped.append((owner, attr))
+
+    def _patch_draw_functions(self):
+        """暫時包裝 pygame.draw 的函數來計算繪製次數"""
+        for name in COUNTED_DRAW_FUNCTIONS:
+            original = getattr(pygame.draw, name, None)
+            if original is None or name in self._draw_originals:
+                continue
+            self._draw_originals[name] = original
+            setattr(pygame.draw, name, self._counting(original))
+
+    def _counting(self, original):
+        def counted(*args, **kwargs):
+            self._draw_calls += 1
+            return original(*args, **kwargs)
+
+        return counted
+
+    ######################幀生命週期######################
+
+    def begin_frame(self):
+        """在每一幀開始（處理輸入之前）呼叫"""
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            # 兩次 begin_frame 的間隔就是完整幀時間（包含等待下一幀的時間）
+            self.frame_history.append(now - self._frame_start)
+        self._frame_start = now
+        for phase in self.current:
+            self.current[phase] = 0.0
+        self._draw_calls = 0
+
+    def end_frame(self, game):
+        """
+        在每一幀結束（畫面送出之後）呼叫，保存這一幀的統計\n
+        \n
+        參數:\n
+        game (BreakoutGame): 遊戲主物件，用於統計物件數量\n
+        """
+        for phase, seconds in self.current.items():
+            history = self.phase_history.get(phase)
+            if history is not None:
+                history.append(seconds)
+        self.work_history.append(sum(self.current.values()))
+        self.draw_calls = self._draw_calls
+        self.entity_counts = count_entities(game.game_state)
+        self.frame += 1
+
+    ######################統計查詢######################
+
+    def averages(self):
+        """回傳各階段最近幾幀的平均耗時（毫秒）"""
+        result = {}
+        for phase, history in self.phase_history.items():
+            result[phase] = (sum(history) / len(history) * 1000.0) if history else 0.0
+        return result
+
+    def last_frame(self):
+        """回傳最近一幀各階段的耗時（毫秒）"""
+        return {phase: seconds * 1000.0 for phase, seconds in self.current.items()}
+
+
+class DebugOverlay:
+    """
+    除錯覆蓋層\n
+    \n
+    在畫面左上角顯示各階段平均耗時、物件數量、繪製次數、輸入延遲，\n
+    並在下方畫出最近幾幀的幀時間長條圖（紅線為一幀的時間預算）。\n
+    文字每隔幾幀才重新產生一次，避免覆蓋層本身拖慢遊戲。\n
+    \n
+    使用範例:\n
+    overlay = DebugOverlay(profiler)\n
+    overlay.draw(screen)  # 在畫面送出前呼叫\n
+    """
+
+    def __init__(self, profiler, position=(10, 10), latency=None):
+        """
+        初始化覆蓋層\n
+        \n
+        參數:\n
+        profiler (FrameProfiler): 資料來源\n
+        position (tuple): 覆蓋層左上角位置\n
+        latency (InputLatency): 輸入延遲的來源，沒有時不顯示\n
+        """
+        self.profiler = profiler
+        self.latency = latency
+        self.position = position
+        self.font = utils.get_font(DEBUG_CONFIG["FONT_SIZE"])
+        self.line_height = self.font.get_linesize()
+        self.graph_height = DEBUG_CONFIG["GRAPH_HEIGHT"]
+        self.graph_width = DEBUG_CONFIG["HISTORY_FRAMES"]
+        self.refresh_frames = DEBUG_CONFIG["TEXT_REFRESH_FRAMES"]
+        self.budget = 1.0 / FPS
+        self._text_surface = None
+        self._last_refresh = None
+
+    def build_lines(self):
+        """產生覆蓋層要顯示的文字行"""
+        profiler = self.profiler
+        averages = profiler.averages()
+        frames = profiler.frame_history
+        frame_ms = (sum(frames) / len(frames) * 1000.0) if frames else 0.0
+        fps = 1000.0 / frame_ms if frame_ms else 0.0
+
+        lines = [f"frame {frame_ms:5.2f} ms  ({fps:5.1f} fps)"]
+        for phase in FRAME_PHASES:
+            lines.append(f"{phase:<11}{averages.get(phase, 0.0):6.2f} ms")
+
+        counts = profiler.entity_counts
+        lines.append(
+            f"bricks {counts.get('bricks_alive', 0)}/{counts.get('bricks', 0)}"
+            f"  balls {counts.get('balls', 0)}"
+        )
+        lines.append(
+            f"shards {counts.get('shards', 0)}  eggs {counts.get('eggs', 0)}"
+            f"  expl {counts.get('explosions', 0)}"
+        )
+        lines.append(f"draw calls {profiler.draw_calls}")
+        if self.latency is not None:
+            latency = self.latency.stats()
+            lines.append(f"input p50 {latency['p50']:.0f}  p99 {latency['p99']:.0f} ms")
+        return lines
+
+    def _render_text(self):
+        """把文字行畫到一張半透明的快取表面上"""
+        lines = self.build_lines()
+        width = max(self.graph_width, 220) + 10
+        height = len(lines) * self.line_height + self.graph_height + 15
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, DEBUG_CONFIG["BACKGROUND_ALPHA"]))
+        for i, line in enumerate(lines):
+            text = self.font.render(line, True, COLORS["WHITE"])
+            panel.blit(text, (5, 5 + i * self.line_height))
+        return panel
+
+    def draw(self, surface):
+        """
+        在畫面上繪製覆蓋層\n
+        \n
+        參數:\n
+        surface (pygame.Surface): 要繪製到的螢幕表面\n
+        """
+        frame = self.profiler.frame
+        if (
+            self._text_surface is None
+            or frame - self._last_refresh >= self.refresh_frames
+        ):
+            self._text_surface = self._render_text()
+            self._last_refresh = frame
+
+        x, y = self.position
+        surface.blit(self._text_surface, (x, y))
+
+        # 幀時間長條圖：綠色為實際工作時間，灰色為完整幀時間
+        graph_top = y + self._text_surface.get_height() - self.graph_height - 5
+        graph_bottom = graph_top + self.graph_height
+        scale = self.graph_height / (self.budget * 2)  # 圖的高度代表兩倍預算
+        frames = list(self.profiler.frame_history)
+        works = list(self.profiler.work_history)
+        offset = self.graph_width - len(frames)
+        for i, seconds in enumerate(frames):
+            bar_x = x + 5 + offset + i
+            height = min(self.graph_height, int(seconds * scale))
+            surface.fill((90, 90, 90), (bar_x, graph_bottom - height, 1, height))
+        offset = self.graph_width - len(works)
+        for i, seconds in enumerate(works):
+            bar_x = x + 5 + offset + i
+            height = min(self.graph_height, int(seconds * scale))
+            color = COLORS["GREEN"] if seconds <= self.budget else COLORS["RED"]
+            surface.fill(color, (bar_x, graph_bottom - height, 1, height))
+
+        # 一幀的時間預算線
+        budget_y = graph_bottom - int(self.budget * scale)
+        surface.fill(COLORS["RED"], (x + 5, budget_y, self.graph_width, 1))
+
+
+class ProfileCapture:
+    """
+    cProfile 幀數擷取器\n
+    \n
+    request() 之後，從下一幀開始用 cProfile 記錄接下來 N 次主迴圈，\n
+    結束時寫出帶時間戳記的 .pstats 檔案和前 N 名函數的文字摘要，\n
+    不需要重新啟動遊戲或接上除錯器。\n
+    \n
+    屬性:\n
+    armed (bool): 是否已要求擷取或正在擷取（主迴圈只檢查這個旗標）\n
+    last_output (tuple): 最近一次寫出的 (pstats 路徑, 摘要路徑)\n
+    \n
+    使用範例:\n
+    capture = ProfileCapture()\n
+    capture.request(120)\n
+    # 主迴圈中:\n
+    if capture.armed:\n
+        capture.begin_frame()\n
+    ...\n
+    if capture.armed:\n
+        capture.end_frame()\n
+    """
+
+    def __init__(self, output_dir=None, top_n=None):
+        """
+        初始化擷取器\n
+        \n
+        參數:\n
+        output_dir (str): 輸出資料夾，預設使用設定檔中的值\n
+        top_n (int): 摘要列出的函數數量，預設使用設定檔中的值\n
+        """
+        self.output_dir = output_dir or PROFILE_CONFIG["OUTPUT_DIR"]
+        self.top_n = top_n or PROFILE_CONFIG["TOP_N"]
+        self.armed = False
+        self.last_output = None
+        self._profile = None
+        self._remaining = 0
+        self._frames = 0
+
+    def request(self, frames=None):
+        """
+        要求從下一幀開始擷取\n
+        \n
+        已經在擷取中時忽略，避免兩段擷取互相干擾。\n
+        \n
+        參數:\n
+        frames (int): 要擷取的幀數，預設使用設定檔中的值\n
+        \n
+        回傳:\n
+        bool: True 表示已排定擷取\n
+        """
+        if self.armed:
+            return False
+        self._frames = max(1, int(frames or PROFILE_CONFIG["CAPTURE_FRAMES"]))
+        self._remaining = self._frames
+        self.armed = True
+        print(f"⏺ 開始擷取接下來 {self._frames} 幀的效能資料")
+        return True
+
+    def begin_frame(self):
+        """每幀開始時呼叫（只在 armed 時）"""
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def end_frame(self):
+        """每幀結束時呼叫（只在 armed 時），擷取完畢就寫出結果"""
+        self._remaining -= 1
+        if self._remaining > 0:
+            return
+        self._profile.disable()
+        profile, self._profile = self._profile, None
+        self.armed = False
+        try:
+            self.last_output = self.write(profile)
+        except OSError as e:
+            # 磁碟滿了或目錄唯讀時放棄這次擷取，遊戲照常進行
+            print(f"⚠️ 無法寫出效能資料: {e}")
+            return
+        print(f"💾 效能資料已寫入 {self.last_output[0]}")
+
+    def write(self, profile):
+        """
+        寫出 .pstats 檔案與文字摘要\n
+        \n
+        參數:\n
+        profile (cProfile.Profile): 已停止的效能分析物件\n
+        \n
+        回傳:\n
+        tuple: (pstats 路徑, 摘要路徑)\n
+        \n
+        例外:\n
+        OSError: 無法建立目錄或寫入檔案\n
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(self.output_dir, f"profile-{stamp}-{self._frames}f")
+        stats_path = base + ".pstats"
+        summary_path = base + ".txt"
+
+        profile.dump_stats(stats_path)
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream)
+        stream.write(f"擷取幀數: {self._frames}\n\n")
+        stream.write("=== 依累計時間排序 ===\n")
+        stats.sort_stats("cumulative").print_stats(self.top_n)
+        stream.write("=== 依函數本身時間排序 ===\n")
+        stats.sort_stats("tottime").print_stats(self.top_n)
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(stream.getvalue())
+        return stats_path, summary_path
+
+
+######################定義函式區######################
+
+
+def wrap_method(owner, attr, on_done):
+    """
+    把物件實例上的方法換成計時包裝\n
+    \n
+    包裝函數只設定在實例上，之後用 delattr(owner, attr) 就能恢復原本的\n
+    類別方法。每次呼叫結束（包含拋出例外）都會以 on_done(start, end)\n
+    回報 time.perf_counter() 的開始與結束時間。\n
+    \n
+    參數:\n
+    owner (object): 擁有該方法的物件\n
+    attr (str): 方法名稱\n
+    on_done (callable): 呼叫結束後的回報函數\n
+    """
+    original = getattr(owner, attr)
+    clock = time.perf_counter
+
+    def timed(*args, **kwargs):
+        start = clock()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            on_done(start, clock())
+
+    setattr(owner, attr, timed)
+
+
+def frame_phase_targets(game):
+    """
+    列出一幀中要計時的方法\n
+    \n
+    參數:\n
+    game (BreakoutGame): 遊戲主物件\n
+    \n
+    回傳:\n
+    list: 每個元素為 (擁有者, 方法名稱, 階段名稱)\n
+    """
+    state = game.game_state
+    targets = [(game, "handle_events", "input")]
+    for phase, method_name in state.UPDATE_PHASES:
+        targets.append((state, method_name, phase))
+    targets.append((state, "draw", "draw"))
+    targets.append((game, "draw_ui", "draw"))
+    targets.append((game, "flip", "flip"))
+    return targets
+
+
+def count_entities(game_state):
+    """
+    統計遊戲狀態中各種物件的數量\n
+    \n
+    參數:\n
+    game_state (GameState): 遊戲狀態\n
+    \n
+    回傳:\n
+    dict: 各種物件的數量\n
+    """
+    bricks = game_state.bricks
+    return {
+        "bricks": len(bricks),
+        "bricks_alive": sum(1 for brick in bricks if not brick.hit),
+        "balls": len(game_state.balls),
+        **game_state.effect_counts(),
+    }
+
+
+def capture_frames_from_environment():
+    """
+    讀取啟動時擷取的環境變數\n
+    \n
+    回傳:\n
+    int: 要擷取的幀數，未設定或格式錯誤時回傳 0\n
+    """
+    value = os.environ.get(PROFILE_CONFIG["ENV_VAR"], "").strip()
+    if not value:
+        return 0
+    try:
+        return max(0, int(value))
+    except ValueError:
+        print(f"⚠️ {PROFILE_CONFIG['ENV_VAR']}={value!r} 不是有效的幀數，略過")
+        return 0
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+遊戲畫面錄製模組
+
+在主迴圈繪製完成後擷取畫面，交給背景執行緒編碼成影片或圖片序列，
+讓 QA 可以回放機台上的遊戲過程，而不影響遊戲的幀率。
+"""
+
+######################載入套件######################
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+
+import pygame
+
+######################導入設定######################
+from config import RECORDER_CONFIG, FPS
+
+######################定義函式區######################
+
+
+def _surface_to_bytes(surface):
+    """把畫面轉成 RGB 位元組（相容舊版 pygame 的 tostring）"""
+    if hasattr(pygame.image, "tobytes"):
+        return pygame.image.tobytes(surface, "RGB")
+    return pygame.image.tostring(surface, "RGB")
+
+
+######################物件類別######################
+
+
+class FrameRecorder:
+    """
+    背景執行緒畫面錄製器\n
+    \n
+    主執行緒只負責把畫面複製成位元組並放進有上限的佇列，\n
+    編碼與寫檔都在背景執行緒完成。佇列滿了就直接丟棄新幀，\n
+    絕不讓遊戲主迴圈等待。\n
+    \n
+    佇列使用 collections.deque：只有主執行緒會 append、只有背景\n
+    執行緒會 popleft，兩者在 CPython 中都是原子操作，不需要加鎖。\n
+    \n
+    支援的輸出格式:\n
+    - "ffmpeg": 透過管線把原始畫面送給外部編碼程式，輸出 mp4\n
+    - "png": 每一幀存成一張 PNG 圖片\n
+    - "raw": 所有幀接在同一個 .rgb 檔案中，另附尺寸說明檔\n
+    - "auto": 找得到編碼程式就用 ffmpeg，否則用 png\n
+    \n
+    屬性:\n
+    output_dir (str): 這次錄影的輸出資料夾\n
+    captured_frames (int): 成功放進佇列的幀數\n
+    written_frames (int): 已經寫出的幀數\n
+    dropped_frames (int): 因為佇列已滿而丟棄的幀數\n
+    \n
+    使用範例:\n
+    recorder = FrameRecorder()\n
+    recorder.start()\n
+    recorder.capture(screen)  # 每幀 draw 之後呼叫\n
+    recorder.stop()  # 結束時等待剩餘幀寫完\n
+    """
+
+    def __init__(
+        self,
+        output_dir=None,
+        fmt=None,
+        queue_size=None,
+        frame_step=None,
+        encoder=None,
+        fps=FPS,
+    ):
+        """
+        初始化錄製器\n
+        \n
+        參數:\n
+        output_dir (str): 輸出根目錄，預設使用設定檔中的值\n
+        fmt (str): 輸出格式，預設使用設定檔中的值\n
+        queue_size (int): 佇列上限（幀數），預設使用設定檔中的值\n
+        frame_step (int): 每幾幀錄一幀，預設使用設定檔中的值\n
+        encoder (str): 外部編碼程式名稱，預設使用設定檔中的值\n
+        fps (int): 輸出影片的幀率\n
+        """
+        root = output_dir or RECORDER_CONFIG["OUTPUT_DIR"]
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.output_dir = os.path.join(root, f"session-{stamp}")
+
+        self.queue_size = queue_size or RECORDER_CONFIG["QUEUE_SIZE"]
+        self.frame_step = max(1, frame_step or RECORDER_CONFIG["FRAME_STEP"])
+        self.fps = max(1, fps // self.frame_step)
+
+        # 決定實際使用的格式
+        fmt = fmt or RECORDER_CONFIG["FORMAT"]
+        encoder = encoder or RECORDER_CONFIG["ENCODER"]
+        self.encoder_path = shutil.which(encoder) if encoder else None
+        if fmt == "auto":
+            fmt = "ffmpeg" if self.encoder_path else "png"
+        if fmt == "ffmpeg" and not self.encoder_path:
+            fmt = "png"  # 找不到編碼程式時退回圖片序列
+        self.format = fmt
+
+        # 主執行緒與背景執行緒共用的狀態
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+        # 統計資訊
+        self.frame_index = 0
+        self.captured_frames = 0
+        self.written_frames = 0
+        self.dropped_frames = 0
+        self.error = None
+
+    def start(self):
+        """建立輸出資料夾並啟動背景編碼執行緒"""
+        if self._thread is not None:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._thread = threading.Thread(
+            target=self._worker, name="FrameRecorder", daemon=True
+        )
+        self._thread.start()
+
+    def capture(self, surface):
+        """
+        擷取一幀畫面（在主執行緒呼叫）\n
+        \n
+        佇列已滿時直接丟棄，並且不做任何畫面複製，\n
+        所以丟幀的成本幾乎為零。\n
+        \n
+        參數:\n
+        surface (pygame.Surface): 剛繪製完成的畫面\n
+        \n
+        回傳:\n
+        bool: True 表示這一幀已放進佇列\n
+        """
+        self.frame_index += 1
+        if self._thread is None or self._stopping:
+            return False
+        if (self.frame_index - 1) % self.frame_step:
+            return False
+
+        # 只有主執行緒會增加佇列長度，所以先檢查再放入不會超過上限
+        if len(self._queue) >= self.queue_size:
+            self.dropped_frames += 1
+            return False
+
+        self._queue.append((surface.get_size(), _surface_to_bytes(surface)))
+        self.captured_frames += 1
+        self._wakeup.set()
+        return True
+
+    def stop(self, timeout=10.0):
+        """
+        停止錄製並等待佇列中剩餘的幀寫完\n
+        \n
+        參數:\n
+        timeout (float): 最多等待幾秒\n
+        \n
+        回傳:\n
+        dict: 錄製統計（參考 stats()）\n
+        """
+        if self._thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            self._thread.join(timeout)
+            self._thread = None
+        return self.stats()
+
+    def stats(self):
+        """回傳錄製統計資訊"""
+        return {
+            "format": self.format,
+            "output_dir": self.output_dir,
+            "captured": self.captured_frames,
+            "written": self.written_frames,
+            "dropped": self.dropped_frames,
+            "pending": len(self._queue),
+        }
+
+    ######################背景執行緒######################
+
+    def _worker(self):
+        """背景執行緒：不斷從佇列取出畫面並寫出"""
+        sink = None
+        try:
+            while True:
+                try:
+                    size, data = self._queue.popleft()
+                except IndexError:
+                    if self._stopping:
+                        break
+                    self._wakeup.wait(0.1)
+                    self._wakeup.clear()
+                    continue
+
+                if sink is None:
+                    sink = self._open_sink(size)
+                sink(size, data)
+                self.written_frames += 1
+        except Exception as e:
+            # 寫檔失敗時停止錄影，但不影響遊戲運行
+            self.error = e
+            self._stopping = True
+            self._queue.clear()
+        finally:
+            self._close_sink()
+
+    def _open_sink(self, size):
+        """依照輸出格式建立寫出函數"""
+        width, height = size
+        self._encoder = None
+        self._raw_file = None
+
+        if self.format == "ffmpeg":
+            command = [
+                self.encoder_path,
+                "-loglevel",
+                "error",
+                "-y",
+                "-f",
+                "rawvideo",
+                "-pix_fmt",
+                "rgb24",
+                "-s",
+                f"{width}x{height}",
+                "-r",
+                str(self.fps),
+                "-i",
+                "-",
+                "-an",
+                "-pix_fmt",
+                "yuv420p",
+                os.path.join(self.output_dir, "gameplay.mp4"),
+            ]
+            self._encoder = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+            def write_encoder(_size, data):
+                self._encoder.stdin.write(data)
+
+            return write_encoder
+
+        if self.format == "raw":
+            # 尺寸與格式寫在說明檔中，方便之後用其他工具轉檔
+            with open(
+                os.path.join(self.output_dir, "frames.txt"), "w", encoding="utf-8"
+            ) as f:
+                f.write(f"width={width}\nheight={height}\nfps={self.fps}\n")
+                f.write("pix_fmt=rgb24\n")
+            self._raw_file = open(os.path.join(self.output_dir, "frames.rgb"), "wb")
+
+            def write_raw(_size, data):
+                self._raw_file.write(data)
+
+            return write_raw
+
+        def write_png(frame_size, data):
+            image = pygame.image.frombuffer(data, frame_size, "RGB")
+            filename = f"frame_{self.written_frames:06d}.png"
+            pygame.image.save(image, os.path.join(self.output_dir, filename))
+
+        return write_png
+
+    def _close_sink(self):
+        """關閉編碼程式或檔案"""
+        encoder = getattr(self, "_encoder", None)
+        if encoder is not None:
+            try:
+                encoder.stdin.close()
+                encoder.wait(timeout=10)
+            except Exception:
+                pass
+            self._encoder = None
+
+        raw_file = getattr(self, "_raw_file", None)
+        if raw_file is not None:
+            raw_file.close()
+            self._raw_file = None
@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+"""
+回溯同步模組（對戰模式的網路同步）
+
+兩台電腦各自執行同一場對戰的模擬，彼此只交換每一幀的輸入。對手的輸入
+還沒收到時先預測（沿用對手最後一個已知的輸入）繼續往下模擬；收到的輸入
+和預測不同時，把遊戲狀態倒回那一幀之前的快照，用正確的輸入重新模擬到
+目前這一幀。只要模擬完全可重現，兩邊最後的畫面一定相同。
+
+快照存在記憶體中，不經過存檔格式：磚塊、球與底板記成屬性值的 tuple，
+特效實體複製每一欄的列表，恢復時只重設和目前不同的磚塊。只有用到預測
+輸入的幀才需要快照，對手的輸入準時送到時完全不用複製狀態。
+
+同步用的時間（TNT 倒數）來自 FrameClock：pygame.time.get_ticks() 改為由
+幀數換算，回溯時跟著倒回去，兩邊的倒數也會在同一幀爆炸。
+"""
+
+######################載入套件######################
+import time
+from operator import attrgetter
+
+import pygame
+
+######################導入設定######################
+from config import FPS, VERSUS_CONFIG
+
+######################導入遊戲模組######################
+from .objects import Brick, Ball, Paddle
+from . import audio
+
+######################全域變數######################
+# GameState 中會隨著模擬改變的屬性（參照換掉的物件，例如換關時的磚塊列表，
+# 直接記下參照）
+GAME_FIELDS = (
+    "score",
+    "level",
+    "tnt_count",
+    "tnt_chains",
+    "eggs_collected",
+    "bricks_destroyed",
+    "frames",
+    "state",
+    "game_over",
+    "bricks_settled",
+    "world_width",
+    "world_height",
+    "bricks",
+    "level_map",
+    "brick_layer",
+    "board",
+    "endless",
+    "paddle",
+)
+GAME_STATE = attrgetter(*GAME_FIELDS)
+
+# 物件的所有屬性都記下來（都是數值、布林值或顏色 tuple）
+BRICK_FIELDS = Brick.__slots__
+BRICK_STATE = attrgetter(*BRICK_FIELDS)
+BRICK_HIT = BRICK_FIELDS.index("hit")
+BALL_FIELDS = Ball.__slots__
+BALL_STATE = attrgetter(*BALL_FIELDS)
+PADDLE_FIELDS = Paddle.__slots__
+PADDLE_STATE = attrgetter(*PADDLE_FIELDS)
+
+_clock = None
+
+
+######################物件類別######################
+
+
+class FrameClock:
+    """
+    由幀數換算的遊戲時鐘\n
+    \n
+    install() 之後 pygame.time.get_ticks() 回傳目前這一幀的時間，\n
+    模擬第幾幀之前呼叫 seek()，回溯重新模擬時時間也跟著倒回去，\n
+    兩台電腦上同一幀的時間完全相同。\n
+    \n
+    使用範例:\n
+    clock = get_clock()\n
+    clock.install()\n
+    clock.seek(frame)  # 模擬每一幀之前\n
+    clock.uninstall()\n
+    """
+
+    def __init__(self, fps=FPS):
+        self.frame_ms = 1000.0 / fps
+        self.ms = 0.0
+        self._original = None
+
+    def get_ticks(self):
+        """回傳目前這一幀的時間（毫秒）"""
+        return int(self.ms)
+
+    def seek(self, frame):
+        """
+        把時間設定到第幾幀\n
+        \n
+        參數:\n
+        frame (int): 幀數\n
+        """
+        self.ms = frame * self.frame_ms
+
+    def install(self):
+        """讓 pygame.time.get_ticks 改用幀數換算的時間"""
+        if self._original is None:
+            self._original = pygame.time.get_ticks
+            pygame.time.get_ticks = self.get_ticks
+
+    def uninstall(self):
+        """恢復原本的 pygame.time.get_ticks"""
+        if self._original is not None:
+            pygame.time.get_ticks = self._original
+            self._original = None
+
+
+class RollbackSession:
+    """
+    一場對戰的輸入紀錄、預測與回溯\n
+    \n
+    模擬物件（例如 VersusMatch）需要提供：\n
+    - step(inputs): 用每個玩家這一幀的輸入模擬一幀\n
+    - save() / load(state): 建立與恢復快照\n
+    - checksum(): 目前狀態的檢查碼（兩邊比對是否同步）\n
+    \n
+    本機輸入延後 delay 幀才生效，對手的輸入只要在這幾幀內送到就不需要\n
+    回溯；預測的幀數達到 max_rollback 時暫停，等對手的輸入送到。\n
+    \n
+    屬性:\n
+    frame (int): 下一個要模擬的幀\n
+    inputs (list): 每個玩家已知的輸入，第 i 個是第 i 幀的輸入\n
+    rollbacks (int): 回溯的次數\n
+    rollback_frames (int): 回溯時重新模擬的總幀數\n
+    max_rollback_ms (float): 最久的一次回溯（恢復快照加上重新模擬）花了多少毫秒\n
+    stalls (int): 因為對手的輸入太久沒送到而暫停的幀數\n
+    desyncs (int): 和對手的檢查碼不同的次數\n
+    \n
+    使用範例:\n
+    session = RollbackSession(match, local=0)\n
+    session.add_remote_inputs(1, first_frame, bits)  # 收到對手的輸入\n
+    session.advance(local_bits)  # 每一幀\n
+    """
+
+    def __init__(
+        self,
+        simulation,
+        local,
+        players=2,
+        delay=None,
+        max_rollback=None,
+        checksum_interval=None,
+    ):
+        """
+        參數:\n
+        simulation: 模擬物件\n
+        local (int): 本機玩家的編號\n
+        players (int): 玩家數\n
+        delay (int): 本機輸入延後幾幀，預設使用設定檔中的值\n
+        max_rollback (int): 最多預測幾幀，預設使用設定檔中的值\n
+        checksum_interval (int): 每隔幾幀記錄一次檢查碼，預設使用設定檔中的值\n
+        """
+        if delay is None:
+            delay = VERSUS_CONFIG["INPUT_DELAY"]
+        self.simulation = simulation
+        self.local = local
+        self.players = players
+        self.delay = delay
+        self.max_rollback = max_rollback or VERSUS_CONFIG["MAX_ROLLBACK"]
+        self.checksum_interval = checksum_interval or VERSUS_CONFIG["CHECKSUM_INTERVAL"]
+
+        self.frame = 0
+        # 輸入延遲的前幾幀所有玩家都沒有輸入，兩邊都知道
+        self.inputs = [[0] * delay for _ in range(players)]
+        self._predicted = {}  # 幀 → 模擬時使用的輸入（包含預測的輸入）
+        self._snapshots = {}  # 幀 → 模擬這一幀之前的快照
+        self._rollback_to = None  # 預測錯誤的第一幀
+        self._checksums = {}  # 幀 → 模擬完這一幀之後的檢查碼
+
+        self.rollbacks = 0
+        self.rollback_frames = 0
+        self.max_rollback_ms = 0.0
+        self.stalls = 0
+        self.desyncs = 0
+
+    @property
+    def confirmed(self):
+        """所有玩家的輸入都已經知道的幀數（這之前的幀不會再回溯）"""
+        return min(len(inputs) for inputs in self.inputs)
+
+    def add_remote_inputs(self, player, first, bits):
+        """
+        加入收到的對手輸入\n
+        \n
+        重複收到的輸入直接略過；和模擬時預測的不同時，下一次 advance()\n
+        會從那一幀開始重新模擬。\n
+        \n
+        參數:\n
+        player (int): 玩家編號\n
+        first (int): bits 第一個輸入的幀數\n
+        bits (bytes): 連續幾幀的輸入\n
+        """
+        known = self.inputs[player]
+        start = len(known) - first
+        if start < 0:
+            return  # 中間有漏掉的輸入，等包含它們的封包
+        for frame in range(len(known), first + len(bits)):
+            value = bits[frame - first]
+            known.append(value)
+            used = self._predicted.get(frame)
+            if used is not None and used[player] != value:
+                if self._rollback_to is None or frame < self._rollback_to:
+                    self._rollback_to = frame
+        self._forget()
+
+    def advance(self, local_bits):
+        """
+        模擬一幀：先處理預測錯誤的回溯，再加入本機輸入並模擬下一幀\n
+        \n
+        參數:\n
+        local_bits (int): 本機玩家這一幀的輸入\n
+        \n
+        回傳:\n
+        bool: False 表示預測太多幀，這一幀暫停等待對手的輸入\n
+        """
+        self.rollback()
+        if self.frame - self.confirmed >= self.max_rollback:
+            self.stalls += 1
+            return False
+        self.inputs[self.local].append(local_bits)
+        self._simulate(self.frame)
+        self.frame += 1
+        return True
+
+    def rollback(self):
+        """
+        預測錯誤時恢復快照，用正確的輸入重新模擬到目前這一幀\n
+        \n
+        回傳:\n
+        int: 重新模擬了幾幀\n
+        """
+        target = self._rollback_to
+        if target is None:
+            return 0
+        self._rollback_to = None
+        started = time.perf_counter()
+        self.simulation.load(self._snapshots[target])
+        # 重新模擬的幀之前已經播過音效
+        audio.set_muted(True)
+        try:
+            for frame in range(target, self.frame):
+                self._simulate(frame)
+        finally:
+            audio.set_muted(False)
+        elapsed = (time.perf_counter() - started) * 1000
+        self.max_rollback_ms = max(self.max_rollback_ms, elapsed)
+        self.rollbacks += 1
+        self.rollback_frames += self.frame - target
+        return self.frame - target
+
+    def local_inputs(self, first):
+        """
+        回傳從第幾幀開始的本機輸入（送給對手）\n
+        \n
+        參數:\n
+        first (int): 對手已經收到的本機輸入幀數\n
+        \n
+        回傳:\n
+        bytes: 連續幾幀的輸入\n
+        """
+        return bytes(self.inputs[self.local][first:])
+
+    def latest_checksum(self):
+        """
+        回傳最新一個確定下來的檢查碼（所有輸入都已經知道的幀）\n
+        \n
+        回傳:\n
+        tuple: (幀數, 檢查碼)，還沒有時為 None\n
+        """
+        settled = self._settled()
+        final = [frame for frame in self._checksums if frame < settled]
+        if not final:
+            return None
+        frame = max(final)
+        return frame, self._checksums[frame]
+
+    def check_remote(self, frame, checksum):
+        """
+        比對對手送來的檢查碼（自己這一幀還沒確定時略過）\n
+        \n
+        參數:\n
+        frame (int): 幀數\n
+        checksum (int): 對手在這一幀的檢查碼\n
+        \n
+        回傳:\n
+        bool: False 表示兩邊的模擬已經不同步\n
+        """
+        mine = self._checksums.get(frame)
+        if mine is None or frame >= self._settled() or mine == checksum:
+            return True
+        self.desyncs += 1
+        return False
+
+    def stats(self):
+        """回傳同步的統計"""
+        return {
+            "frames": self.frame,
+            "confirmed": self.confirmed,
+            "rollbacks": self.rollbacks,
+            "rollback_frames": self.rollback_frames,
+            "max_rollback_ms": self.max_rollback_ms,
+            "stalls": self.stalls,
+            "desyncs": self.desyncs,
+        }
+
+    def _settled(self):
+        """這之前的幀都已經用正確的輸入模擬過（還沒回溯的預測錯誤不算）"""
+        confirmed = self.confirmed
+        if self._rollback_to is not None:
+            return min(confirmed, self._rollback_to)
+        return confirmed
+
+    def _input(self, player, frame):
+        """回傳玩家在這一幀的輸入，還不知道時預測為最後一個已知的輸入"""
+        known = self.inputs[player]
+        if frame < len(known):
+            return known[frame]
+        return known[-1] if known else 0
+
+    def _simulate(self, frame):
+        """模擬一幀；用到預測的輸入時先建立快照，之後才能倒回來"""
+        inputs = tuple(self._input(player, frame) for player in range(self.players))
+        if frame >= self.confirmed:
+            self._snapshots[frame] = self.simulation.save()
+            self._predicted[frame] = inputs
+        else:
+            self._snapshots.pop(frame, None)
+            self._predicted.pop(frame, None)
+        self.simulation.step(inputs)
+        if frame % self.checksum_interval == 0:
+            self._checksums[frame] = self.simulation.checksum()
+
+    def _forget(self):
+        """丟掉不會再回溯的幀的快照與預測，只保留最近幾個檢查碼"""
+        confirmed = self.confirmed
+        for table in (self._snapshots, self._predicted):
+            for frame in [frame for frame in table if frame < confirmed]:
+                if frame != self._rollback_to:
+                    del table[frame]
+        if len(self._checksums) > 8:
+            for frame in sorted(self._checksums)[:-8]:
+                del self._checksums[frame]
+
+
+######################定義函式區######################
+
+
+def snapshot(game):
+    """
+    建立遊戲狀態的快照（只存在記憶體中，比存檔快很多）\n
+    \n
+    記下 GameState 會隨著模擬改變的屬性、每個磚塊與球的屬性、底板、\n
+    特效實體，以及無盡模式的磚塊區或超大關卡的場地。\n
+    \n
+    參數:\n
+    game (GameState): 遊戲狀態（幀與幀之間，事件佇列是空的）\n
+    \n
+    回傳:\n
+    tuple: 交給 restore() 的快照\n
+    """
+    balls = tuple(game.balls)
+    return (
+        GAME_STATE(game),
+        list(map(BRICK_STATE, game.bricks)),
+        PADDLE_STATE(game.paddle),
+        balls,
+        list(map(BALL_STATE, balls)),
+        game.world.snapshot(),
+        game.endless.snapshot() if game.endless is not None else None,
+        game.board.snapshot() if game.board is not None else None,
+    )
+
+
+def restore(game, state):
+    """
+    把遊戲狀態恢復成快照的樣子（同一個快照可以恢復很多次）\n
+    \n
+    參數:\n
+    game (GameState): 遊戲狀態\n
+    state (tuple): snapshot() 回傳的快照\n
+    """
+    fields, bricks, paddle, balls, ball_states, world, endless, field = state
+    for name, value in zip(GAME_FIELDS, fields):
+        setattr(game, name, value)
+
+    # 只重設和目前不同的磚塊；被打掉又回到場上的磚塊要通知圖層或場地
+    revived = False
+    for brick, saved, current in zip(
+        game.bricks, bricks, map(BRICK_STATE, game.bricks)
+    ):
+        if saved != current:
+            if current[BRICK_HIT] and not saved[BRICK_HIT]:
+                revived = True
+            for name, value in zip(BRICK_FIELDS, saved):
+                setattr(brick, name, value)
+
+    for name, value in zip(PADDLE_FIELDS, paddle):
+        setattr(game.paddle, name, value)
+    game.balls = list(balls)
+    for ball, saved in zip(balls, ball_states):
+        for name, value in zip(BALL_FIELDS, saved):
+            setattr(ball, name, value)
+
+    game.world.restore(world)
+    if endless is not None:
+        game.endless.restore(endless)
+    if field is not None:
+        game.board.restore(field, revived)
+    layer = game.brick_layer
+    if layer is not None and layer.bricks is game.bricks:
+        layer.revive()
+    game.events.clear()
+
+
+def get_clock():
+    """
+    取得共用的幀時鐘（同一個行程中的對戰共用同一個 get_ticks）\n
+    \n
+    回傳:\n
+    FrameClock: 幀時鐘\n
+    """
+    global _clock
+
+    if _clock is None:
+        _clock = FrameClock()
+    return _clock
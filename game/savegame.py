@@ -0,0 +1,638 @@
+# -*- coding: utf-8 -*-
+"""
+遊戲存檔模組
+
+把進行中的一局存成緊密的二進位檔，之後（例如機台重新開機）可以從同一個
+畫面繼續玩：磚塊（包含下落與 TNT 倒數的狀態）、球、底板、還在掉落的彩蛋、
+分數、關卡、這一局的統計，以及亂數產生器與下一關預先準備用的亂數種子。
+
+格式和關卡快取檔（game/levels.py）一樣以欄位為單位：檔頭之後每個磚塊屬性
+是一個連續的陣列，直接由 array 轉成位元組，不會替每個磚塊建立 tuple 或
+bytes，磚塊越多存讀時間也只是線性增加。不使用 pickle，檔案只包含資料，
+讀取不會執行任何程式碼；格式改變時 FORMAT_VERSION 加一，舊版本的存檔
+在 _UPGRADES 寫好轉換方式。
+
+爆炸與碎片只是畫面效果，不會存檔，繼續遊戲時畫面上沒有這些特效。
+"""
+
+######################載入套件######################
+import os
+import random
+import struct
+import sys
+import time
+from array import array
+from itertools import chain
+from operator import attrgetter
+
+import pygame
+
+######################導入設定######################
+from config import SAVE_CONFIG
+
+######################導入遊戲模組######################
+from .objects import Brick, Ball, Paddle
+from .endless import EndlessField
+from .effects import EGG
+from . import board
+from . import gcpolicy
+from . import levels
+from . import prefetch
+from . import trace
+
+######################全域變數######################
+MAGIC = b"BRKS"
+FORMAT_VERSION = 1
+
+# 檔頭：識別字、版本、旗標、分數、關卡、這一局的統計、開始時間、場地大小、
+# 磚塊數、球數、彩蛋數、下一關的亂數種子、關卡名稱長度
+HEADER = struct.Struct("<4sHHqIIIIIIdIIIIIQH")
+
+# 檔頭旗標
+FLAG_ENDLESS = 1  # 無盡模式
+FLAG_BOARD = 2  # 超大關卡（後面接著攝影機）
+FLAG_SETTLED = 4  # 磚塊都已經停在最後的位置
+FLAG_PREFETCH = 8  # 下一關已經用檔頭中的亂數種子排定預先準備
+
+# 亂數產生器：版本、是否有 gauss_next、gauss_next，後面接著 MT 狀態陣列
+RNG_HEADER = struct.Struct("<IBd")
+RNG_STATE_WORDS = 625
+
+CAMERA = struct.Struct("<ddd?")  # x, y, 縮放倍率, 是否跟著球
+# 無盡模式：每行磚塊數、行數、補進與清空的行數、使用中與空閒的行數
+ENDLESS = struct.Struct("<IIIIII")
+
+# 底板與球的數值屬性都存成浮點數，另外用一個位元遮罩記錄哪些原本是整數，
+# 讀回來的數值型別和存檔前相同
+PADDLE_FIELDS = ("x", "y", "width", "height", "speed")
+PADDLE = struct.Struct("<B5dBBB")  # 整數遮罩、PADDLE_FIELDS、顏色
+BALL_FIELDS = (
+    "x",
+    "y",
+    "radius",
+    "speed",
+    "vx",
+    "vy",
+    "spin_center_x",
+    "spin_center_y",
+    "spin_radius",
+    "spin_angle",
+    "spin_angular_speed",
+)
+BALL = struct.Struct("<H11d??BBB")  # 整數遮罩、BALL_FIELDS、黏在底板上、繞圈中、顏色
+
+# 彩蛋的欄位：(欄位名稱, array 型別)
+EGG_COLUMNS = (
+    ("x", "d"),
+    ("y", "d"),
+    ("vx", "d"),
+    ("vy", "d"),
+    ("fall_margin", "i"),
+    ("radius", "i"),
+)
+
+# 磚塊的座標：陣列前面一個位元組記錄存法，全部是整數時為 "q"，全部是浮點數時為
+# "d"，兩種都有時為 "m"（"d" 陣列之後每個磚塊再一個位元組記錄是否為整數）；
+# 讀回來的數值型別和存檔前相同，繼續遊戲時的計算結果也完全相同
+BRICK_COORDINATES = ("x", "y", "target_y")
+
+# 磚塊的其他數值屬性（"i"）
+BRICK_COLUMNS = ("width", "height", "blink_offset", "tnt_primed_cycles")
+
+# 磚塊的狀態旗標（每個磚塊一個位元組，依序為第 0 到第 4 個位元）
+BRICK_FLAGS = ("hit", "is_tnt", "tnt_primed", "is_blinking", "falling")
+
+# 舊版本存檔的轉換：版本 → 把資料轉成下一個版本的函數
+_UPGRADES = {}
+
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+######################定義函式區######################
+
+
+def dumps(game):
+    """
+    把進行中的一局轉成存檔資料\n
+    \n
+    參數:\n
+    game (GameState): 遊戲狀態\n
+    \n
+    回傳:\n
+    bytes: 存檔資料\n
+    """
+    return serialize(capture(game))
+
+
+def capture(game):
+    """
+    記下存檔需要的狀態，之後再用 serialize() 轉成存檔資料\n
+    \n
+    磚塊以外的部分（檔頭、亂數、球、彩蛋等）直接轉成位元組；磚塊只複製\n
+    列表，屬性在 serialize() 時才讀取，所以成本和磚塊數量幾乎無關，可以\n
+    在遊戲執行緒呼叫後交給其他執行緒完成。這段期間被改變的磚塊會存成\n
+    改變後的狀態，需要某一幀的確切狀態時由呼叫的人另外補送（見\n
+    game/spectator.py 的差異幀）。\n
+    \n
+    參數:\n
+    game (GameState): 遊戲狀態\n
+    \n
+    回傳:\n
+    tuple: (磚塊以外的資料, 磚塊列表的複本, 目前的時間)，交給 serialize()\n
+    """
+    bricks = game.bricks
+    field = (
+        game.board if game.board is not None and game.board.bricks is bricks else None
+    )
+    level_name = (game.level_map.name if game.level_map is not None else "").encode(
+        "utf-8"
+    )
+
+    flags = 0
+    if game.endless is not None:
+        flags |= FLAG_ENDLESS
+    if field is not None:
+        flags |= FLAG_BOARD
+    if game.bricks_settled:
+        flags |= FLAG_SETTLED
+    next_seed = None
+    if game.level_map is not None and game.prefetch_levels:
+        next_seed = prefetch.get_prefetcher().scheduled_seed(game.level + 1)
+    if next_seed is not None:
+        flags |= FLAG_PREFETCH
+    eggs = game.world.archetype(EGG)
+
+    parts = [
+        HEADER.pack(
+            MAGIC,
+            FORMAT_VERSION,
+            flags,
+            game.score,
+            game.level,
+            game.tnt_count,
+            game.tnt_chains,
+            game.eggs_collected,
+            game.bricks_destroyed,
+            game.frames,
+            game.session_started,
+            game.world_width,
+            game.world_height,
+            len(bricks),
+            len(game.balls),
+            len(eggs),
+            next_seed or 0,
+            len(level_name),
+        ),
+        level_name,
+    ]
+
+    version, words, gauss_next = random.getstate()
+    parts.append(RNG_HEADER.pack(version, gauss_next is not None, gauss_next or 0.0))
+    parts.append(_array_bytes(array("I", words)))
+
+    if field is not None:
+        camera = field.camera
+        parts.append(CAMERA.pack(camera.x, camera.y, camera.zoom, camera.following))
+    if game.endless is not None:
+        endless = game.endless
+        parts.append(
+            ENDLESS.pack(
+                endless.cols,
+                endless.capacity,
+                endless.rows_spawned,
+                endless.rows_cleared,
+                len(endless.active),
+                len(endless.free),
+            )
+        )
+        parts.append(_array_bytes(array("d", endless.row_y)))
+        parts.append(_array_bytes(array("I", endless.active)))
+        parts.append(_array_bytes(array("I", endless.free)))
+
+    paddle = game.paddle
+    parts.append(PADDLE.pack(*_numbers(paddle, PADDLE_FIELDS), *paddle.color))
+    parts.extend(
+        BALL.pack(*_numbers(ball, BALL_FIELDS), ball.stuck, ball.spinning, *ball.color)
+        for ball in game.balls
+    )
+    for name, typecode in EGG_COLUMNS:
+        parts.append(_array_bytes(array(typecode, eggs.columns[name])))
+    return b"".join(parts), list(bricks), pygame.time.get_ticks()
+
+
+def serialize(captured):
+    """
+    把 capture() 記下的狀態轉成存檔資料（可以在其他執行緒呼叫）\n
+    \n
+    參數:\n
+    captured (tuple): capture() 的回傳值\n
+    \n
+    回傳:\n
+    bytes: 存檔資料\n
+    """
+    head, bricks, now = captured
+    parts = [head]
+
+    # 磚塊：每個屬性一個陣列，直接從磚塊的屬性產生；座標要看兩次（型別與值），
+    # 先讀成列表，其他執行緒呼叫時磚塊在中途移動也不會前後不一致
+    for name in BRICK_COORDINATES:
+        values = list(map(attrgetter(name), bricks))
+        is_int = array("B", (type(value) is int for value in values))
+        if all(is_int):
+            parts.append(b"q")
+            parts.append(_array_bytes(array("q", values)))
+        elif any(is_int):
+            parts.append(b"m")
+            parts.append(_array_bytes(array("d", values)))
+            parts.append(is_int.tobytes())
+        else:
+            parts.append(b"d")
+            parts.append(_array_bytes(array("d", values)))
+    for name in BRICK_COLUMNS:
+        parts.append(_array_bytes(array("i", map(attrgetter(name), bricks))))
+    parts.append(
+        _array_bytes(
+            array(
+                "i",
+                (
+                    -1 if index is None else index
+                    for index in map(attrgetter("level_index"), bricks)
+                ),
+            )
+        )
+    )
+    parts.append(
+        array(
+            "B",
+            (
+                hit | tnt << 1 | primed << 2 | blinking << 3 | falling << 4
+                for hit, tnt, primed, blinking, falling in map(
+                    attrgetter(*BRICK_FLAGS), bricks
+                )
+            ),
+        ).tobytes()
+    )
+    # TNT 倒數開始的時間存成已經倒數了多久，讀檔之後從同一個進度繼續
+    parts.append(
+        _array_bytes(
+            array(
+                "q",
+                (
+                    now - brick.tnt_primed_start if brick.tnt_primed else 0
+                    for brick in bricks
+                ),
+            )
+        )
+    )
+    parts.append(
+        array("B", chain.from_iterable(map(attrgetter("color"), bricks))).tobytes()
+    )
+    parts.append(
+        array("B", chain.from_iterable(map(attrgetter("base_color"), bricks))).tobytes()
+    )
+    return b"".join(parts)
+
+
+def loads(game, data, resume=True):
+    """
+    從存檔資料恢復一局遊戲（取代目前這一局）\n
+    \n
+    參數:\n
+    game (GameState): 遊戲狀態\n
+    data (bytes): dumps() 產生的存檔資料\n
+    resume (bool): 是否要從這裡繼續玩：恢復亂數狀態並排定下一關的預先準備；\n
+        只用來顯示畫面時（例如觀戰程式）傳入 False\n
+    \n
+    例外:\n
+    ValueError: 不是存檔、版本不支援或資料不完整\n
+    """
+    view = memoryview(data)
+    if len(view) < HEADER.size or bytes(view[:4]) != MAGIC:
+        raise ValueError("不是遊戲存檔")
+    version = HEADER.unpack_from(view)[1]
+    while version != FORMAT_VERSION:
+        upgrade = _UPGRADES.get(version)
+        if upgrade is None:
+            raise ValueError(f"不支援版本 {version} 的存檔")
+        view = memoryview(upgrade(view))
+        version = HEADER.unpack_from(view)[1]
+
+    try:
+        _restore(game, view, resume)
+    except struct.error as e:
+        raise ValueError(f"存檔資料不完整: {e}") from e
+
+
+def save_game(game, path=None):
+    """
+    把進行中的一局存檔（先寫到暫存檔再取代，寫到一半斷電也不會壞掉舊存檔）\n
+    \n
+    參數:\n
+    game (GameState): 遊戲狀態\n
+    path (str): 存檔路徑，預設使用設定檔中的值\n
+    \n
+    回傳:\n
+    int: 存檔大小（位元組）\n
+    \n
+    例外:\n
+    OSError: 無法寫入存檔（磁碟已滿、目錄唯讀、沒有權限等），呼叫端要自己處理\n
+    """
+    path = path or SAVE_CONFIG["PATH"]
+    started = time.perf_counter()
+    data = dumps(game)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = path + ".tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+    except OSError:
+        # 寫到一半失敗（例如磁碟滿了）：把暫存檔刪掉，舊存檔保持原樣
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
+    trace.emit_span("save_game", started, bytes=len(data), bricks=len(game.bricks))
+    return len(data)
+
+
+def load_game(game, path=None):
+    """
+    讀取存檔並繼續那一局\n
+    \n
+    參數:\n
+    game (GameState): 遊戲狀態\n
+    path (str): 存檔路徑，預設使用設定檔中的值\n
+    \n
+    回傳:\n
+    bool: True 表示已經讀取，沒有存檔時為 False\n
+    """
+    path = path or SAVE_CONFIG["PATH"]
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return False
+    started = time.perf_counter()
+    loads(game, data)
+    trace.emit_span("load_game", started, bytes=len(data), bricks=len(game.bricks))
+    return True
+
+
+def delete_save(path=None):
+    """
+    刪除存檔（這一局結束之後就不能再繼續）\n
+    \n
+    參數:\n
+    path (str): 存檔路徑，預設使用設定檔中的值\n
+    """
+    try:
+        os.remove(path or SAVE_CONFIG["PATH"])
+    except FileNotFoundError:
+        pass
+
+
+def _restore(game, view, resume=True):
+    """依照存檔資料設定遊戲狀態的每個部分（亂數狀態最後設定）"""
+    (
+        _magic,
+        _version,
+        flags,
+        score,
+        level,
+        tnt_count,
+        tnt_chains,
+        eggs_collected,
+        bricks_destroyed,
+        frames,
+        session_started,
+        world_width,
+        world_height,
+        brick_count,
+        ball_count,
+        egg_count,
+        next_seed,
+        name_length,
+    ) = HEADER.unpack_from(view)
+    offset = HEADER.size
+    level_name = bytes(view[offset : offset + name_length]).decode("utf-8")
+    offset += name_length
+
+    rng_version, has_gauss, gauss_next = RNG_HEADER.unpack_from(view, offset)
+    offset += RNG_HEADER.size
+    words, offset = _read_array(view, offset, "I", RNG_STATE_WORDS)
+    rng_state = (rng_version, tuple(words), gauss_next if has_gauss else None)
+
+    camera_state = None
+    if flags & FLAG_BOARD:
+        camera_state = CAMERA.unpack_from(view, offset)
+        offset += CAMERA.size
+
+    # 建立磚塊列表：無盡模式重複使用磚塊區的磚塊，其他模式建立空的磚塊物件，
+    # 屬性全部由存檔設定（不經過 __init__，也不會用到亂數）
+    endless = None
+    if flags & FLAG_ENDLESS:
+        cols, capacity, rows_spawned, rows_cleared, active, free = ENDLESS.unpack_from(
+            view, offset
+        )
+        offset += ENDLESS.size
+        endless = EndlessField(cols, capacity)
+        if len(endless.bricks) != brick_count:
+            raise ValueError("無盡模式的磚塊數和存檔不符")
+        endless.rows_spawned = rows_spawned
+        endless.rows_cleared = rows_cleared
+        row_y, offset = _read_array(view, offset, "d", capacity)
+        endless.row_y = row_y.tolist()
+        active_slots, offset = _read_array(view, offset, "I", active)
+        endless.active.clear()
+        endless.active.extend(active_slots)
+        free_slots, offset = _read_array(view, offset, "I", free)
+        endless.free = free_slots.tolist()
+        bricks = endless.bricks
+    else:
+        new = Brick.__new__
+        bricks = [new(Brick) for _ in range(brick_count)]
+
+    values = PADDLE.unpack_from(view, offset)
+    offset += PADDLE.size
+    paddle = Paddle.__new__(Paddle)
+    _set_numbers(paddle, PADDLE_FIELDS, values)
+    paddle.color = values[-3:]
+
+    balls = []
+    for _ in range(ball_count):
+        values = BALL.unpack_from(view, offset)
+        offset += BALL.size
+        ball = Ball.__new__(Ball)
+        _set_numbers(ball, BALL_FIELDS, values)
+        ball.stuck, ball.spinning = values[-5:-3]
+        ball.color = values[-3:]
+        balls.append(ball)
+
+    eggs = {}
+    for name, typecode in EGG_COLUMNS:
+        values, offset = _read_array(view, offset, typecode, egg_count)
+        eggs[name] = values.tolist()
+
+    # 磚塊屬性：先讀出所有陣列，再一次走過所有磚塊設定屬性
+    columns = []
+    for _ in BRICK_COORDINATES:
+        kind = bytes(view[offset : offset + 1])
+        if kind not in (b"q", b"d", b"m"):
+            raise ValueError("存檔資料格式錯誤")
+        values, offset = _read_array(
+            view, offset + 1, "q" if kind == b"q" else "d", brick_count
+        )
+        if kind == b"m":
+            is_int, offset = _read_array(view, offset, "B", brick_count)
+            values = [int(v) if i else v for v, i in zip(values, is_int)]
+        columns.append(values)
+    for _ in BRICK_COLUMNS:
+        values, offset = _read_array(view, offset, "i", brick_count)
+        columns.append(values)
+    indices, offset = _read_array(view, offset, "i", brick_count)
+    brick_flags, offset = _read_array(view, offset, "B", brick_count)
+    elapsed, offset = _read_array(view, offset, "q", brick_count)
+    colors = []
+    for _ in range(2):
+        rgb, offset = _read_array(view, offset, "B", brick_count * 3)
+        colors.append(zip(rgb[0::3], rgb[1::3], rgb[2::3]))
+    if offset != len(view):
+        raise ValueError("存檔資料長度不符")
+
+    now = pygame.time.get_ticks()
+    for (
+        brick,
+        x,
+        y,
+        target_y,
+        width,
+        height,
+        blink_offset,
+        cycles,
+        index,
+        bits,
+        waited,
+        color,
+        base_color,
+    ) in zip(bricks, *columns, indices, brick_flags, elapsed, *colors):
+        brick.x = x
+        brick.y = y
+        brick.target_y = target_y
+        brick.width = width
+        brick.height = height
+        brick.blink_offset = blink_offset
+        brick.tnt_primed_cycles = cycles
+        brick.level_index = None if index < 0 else index
+        brick.hit = bool(bits & 1)
+        brick.is_tnt = bool(bits & 2)
+        brick.tnt_primed = bool(bits & 4)
+        brick.is_blinking = bool(bits & 8)
+        brick.falling = bool(bits & 16)
+        brick.tnt_primed_start = now - waited
+        brick.color = color
+        brick.base_color = base_color
+
+    # 關卡檔案的磚塊圖層或超大關卡的場地依照恢復後的磚塊重新建立
+    level_map = levels.load_level(level_name) if level_name else None
+    layer = field = None
+    if level_map is not None:
+        if level_map.count != brick_count:
+            raise ValueError(f"關卡 {level_name} 的磚塊數和存檔不符")
+        if camera_state is not None:
+            field = board.Board(level_map, bricks)
+            camera = field.camera
+            camera.x, camera.y, camera.zoom, camera.following = camera_state
+            camera.clamp()
+            # 讓場地接手正在倒數的 TNT
+            field.watch([brick for brick in bricks if brick.tnt_primed])
+        elif level_map.layer_rect is not None:
+            layer = levels.BrickLayer(level_map, bricks)
+
+    game.endless_mode = endless is not None
+    game.endless = endless
+    game.board = field
+    game.level_map = level_map
+    game.brick_layer = layer
+    game.bricks = bricks
+    game.bricks_settled = bool(flags & FLAG_SETTLED)
+    game.world_width = world_width
+    game.world_height = world_height
+    game.paddle = paddle
+    game.balls = balls
+
+    game.score = score
+    game.level = level
+    game.tnt_count = tnt_count
+    game.tnt_chains = tnt_chains
+    game.eggs_collected = eggs_collected
+    game.bricks_destroyed = bricks_destroyed
+    game.frames = frames
+    game.session_started = session_started
+    game.session_saved = False
+    game.game_over = False
+    game.state = "PLAYING"
+    game.world.clear()
+    game.world.spawn(EGG, egg_count, **eggs)
+    game.events.clear()
+
+    if not resume:
+        return
+
+    # 亂數狀態最後設定：建立無盡模式的磚塊區時用到的亂數不會影響繼續的遊戲
+    random.setstate(rng_state)
+
+    if level_map is not None and game.prefetch_levels:
+        if flags & FLAG_PREFETCH:
+            # 和存檔前排定的是同一個種子，下一關的磚塊也會一樣
+            prefetch.get_prefetcher().schedule(level + 1, next_seed)
+        else:
+            prefetch.get_prefetcher().schedule(level + 1)
+    gcpolicy.level_loaded("load_game", full=True)
+
+
+def _numbers(obj, fields):
+    """
+    回傳 (整數遮罩, 各屬性的值)，第 i 個位元表示第 i 個屬性是整數\n
+    """
+    values = attrgetter(*fields)(obj)
+    mask = 0
+    for bit, value in enumerate(values):
+        if type(value) is int:
+            mask |= 1 << bit
+    return (mask, *values)
+
+
+def _set_numbers(obj, fields, values):
+    """依照 _numbers() 的遮罩設定各屬性，原本是整數的值讀回整數"""
+    mask = values[0]
+    for bit, name in enumerate(fields):
+        value = values[bit + 1]
+        setattr(obj, name, int(value) if mask >> bit & 1 else value)
+
+
+def _array_bytes(values):
+    """把 array 轉成小端序的位元組"""
+    if _BIG_ENDIAN:
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_array(view, offset, typecode, count):
+    """
+    從存檔資料讀出一個陣列\n
+    \n
+    回傳:\n
+    tuple: (array, 陣列之後的位置)\n
+    """
+    values = array(typecode)
+    end = offset + values.itemsize * count
+    if end > len(view):
+        raise ValueError("存檔資料不完整")
+    values.frombytes(view[offset:end])
+    if _BIG_ENDIAN:
+        values.byteswap()
+    return values, end
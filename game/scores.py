@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+分數紀錄模組
+
+每一局結束時把分數與統計（關卡、TNT 爆炸與連鎖、撿到的彩蛋等）存進本機的
+SQLite 資料庫，做為機台的排行榜與營運統計。
+
+遊戲執行緒從不碰資料庫：結束的那一幀只把這一局的資料放進佇列並更新記憶體
+中的排行榜，背景執行緒再把累積的資料整批寫入（一次交易寫入多局）。資料庫
+使用 WAL 模式，寫入時其他程式（例如營運工具）仍然可以讀取。
+"""
+
+######################載入套件######################
+import bisect
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+######################導入設定######################
+from config import SCORES_CONFIG
+
+######################全域變數######################
+_store = None
+_store_lock = threading.Lock()
+
+# 資料表結構版本（PRAGMA user_version），改變結構時加一並寫好升級方式
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    mode TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    ended_at REAL NOT NULL,
+    frames INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    bricks_destroyed INTEGER NOT NULL,
+    tnt_detonated INTEGER NOT NULL,
+    tnt_chains INTEGER NOT NULL,
+    eggs_collected INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_score ON sessions (mode, score DESC);
+"""
+
+# 每一局記錄的欄位（GameState.session_stats() 回傳的字典）
+SESSION_FIELDS = (
+    "mode",
+    "reason",
+    "started_at",
+    "ended_at",
+    "frames",
+    "score",
+    "level",
+    "bricks_destroyed",
+    "tnt_detonated",
+    "tnt_chains",
+    "eggs_collected",
+)
+
+INSERT_SESSION = (
+    f"INSERT INTO sessions ({', '.join(SESSION_FIELDS)}) "
+    f"VALUES ({', '.join(':' + field for field in SESSION_FIELDS)})"
+)
+
+# 排行榜分開計算的遊戲模式
+MODES = ("classic", "endless")
+
+
+######################物件類別######################
+
+
+class ScoreStore:
+    """
+    本機分數資料庫\n
+    \n
+    record() 在遊戲執行緒呼叫，只做佇列與記憶體中的排行榜更新；\n
+    背景執行緒開啟資料庫（WAL 模式）、載入排行榜，之後待寫入的資料\n
+    累積到 BATCH_SIZE 局或等了 FLUSH_INTERVAL_MS 就整批寫入。\n
+    資料庫無法開啟或寫入時只會印出警告，遊戲照常進行。\n
+    \n
+    屬性:\n
+    path (str): 資料庫檔案路徑\n
+    recorded (int): 已經記錄（放進佇列）的局數\n
+    written (int): 已經寫入的局數\n
+    batches (int): 寫入的交易次數\n
+    failed (int): 寫入失敗而丟棄的局數\n
+    error (Exception): 最後一次資料庫錯誤\n
+    \n
+    使用範例:\n
+    store = get_store()\n
+    store.start()\n
+    store.record(game_state.session_stats("game_over"))  # 遊戲結束時\n
+    store.top("classic")  # 排行榜（從記憶體讀取）\n
+    store.stop()  # 結束時把剩下的資料寫完\n
+    """
+
+    def __init__(
+        self,
+        path=None,
+        batch_size=None,
+        flush_interval_ms=None,
+        top_n=None,
+    ):
+        """
+        參數:\n
+        path (str): 資料庫檔案路徑，預設使用設定檔中的值\n
+        batch_size (int): 一次交易最多寫入幾局\n
+        flush_interval_ms (int): 有待寫入的資料時，最多等多久就寫入\n
+        top_n (int): 記憶體中保留的排行榜名次\n
+        """
+        self.path = path or SCORES_CONFIG["PATH"]
+        self.batch_size = batch_size or SCORES_CONFIG["BATCH_SIZE"]
+        if flush_interval_ms is None:
+            flush_interval_ms = SCORES_CONFIG["FLUSH_INTERVAL_MS"]
+        self.flush_interval = flush_interval_ms / 1000
+        self.top_n = top_n or SCORES_CONFIG["TOP_N"]
+
+        self._pending = deque()
+        self._wakeup = threading.Event()
+        self._drained = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+        # 排行榜：模式 → [(-分數, 結束時間, 關卡)]，由小到大排序（分數高的在前）
+        self._lock = threading.Lock()
+        self._top = {mode: [] for mode in MODES}
+        self.loaded = threading.Event()
+
+        self.recorded = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.error = None
+        self.last_commit_ms = 0.0
+
+    def start(self):
+        """啟動背景寫入執行緒（開啟資料庫並載入排行榜）"""
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._worker, name="ScoreWriter", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        停止背景執行緒，還沒寫入的資料會先寫完\n
+        \n
+        參數:\n
+        timeout (float): 最多等待幾秒，None 表示一直等\n
+        """
+        if self._thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def record(self, session):
+        """
+        記錄結束的一局（在遊戲執行緒呼叫，不會碰資料庫）\n
+        \n
+        參數:\n
+        session (dict): SESSION_FIELDS 中的每個欄位\n
+        """
+        self._remember(
+            session["mode"], session["score"], session["ended_at"], session["level"]
+        )
+        self.recorded += 1
+        self._pending.append(session)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def top(self, mode="classic", count=None):
+        """
+        回傳排行榜（從記憶體讀取，不會碰資料庫）\n
+        \n
+        參數:\n
+        mode (str): 遊戲模式\n
+        count (int): 取前幾名，預設為全部保留的名次\n
+        \n
+        回傳:\n
+        list: 每個元素為 {"score", "level", "ended_at"}，分數高的在前\n
+        """
+        with self._lock:
+            entries = self._top.get(mode, [])[: count or self.top_n]
+        return [
+            {"score": -negative, "level": level, "ended_at": ended_at}
+            for negative, ended_at, level in entries
+        ]
+
+    def flush(self, timeout=None):
+        """
+        要求背景執行緒馬上寫入，並等待目前的資料都寫完\n
+        \n
+        參數:\n
+        timeout (float): 最多等待幾秒\n
+        \n
+        回傳:\n
+        bool: True 表示已經寫完\n
+        """
+        target = self.recorded
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.written + self.failed < target:
+            if self._thread is None:
+                return False
+            self._drained.clear()
+            self._wakeup.set()
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._drained.wait(remaining)
+        return True
+
+    def stats(self):
+        """回傳寫入的統計"""
+        return {
+            "recorded": self.recorded,
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "pending": len(self._pending),
+            "last_commit_ms": self.last_commit_ms,
+        }
+
+    def _remember(self, mode, score, ended_at, level):
+        """把一局放進記憶體中的排行榜"""
+        with self._lock:
+            entries = self._top.setdefault(mode, [])
+            bisect.insort(entries, (-score, ended_at, level))
+            del entries[self.top_n :]
+
+    def _worker(self):
+        """背景執行緒：開啟資料庫、載入排行榜，之後整批寫入待寫入的資料"""
+        try:
+            connection = open_database(self.path)
+            self._load_top(connection)
+        except (sqlite3.Error, OSError) as e:
+            self._fail(e, "無法開啟分數資料庫")
+            connection = None
+        self.loaded.set()
+
+        while True:
+            stopping = self._stopping
+            self._write_pending(connection)
+            self._drained.set()
+            if stopping:
+                break
+            # 累積到一批或等了 flush_interval 才寫入，同時結束的多局會在同一次交易
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+
+        if connection is not None:
+            connection.close()
+
+    def _load_top(self, connection):
+        """從資料庫載入每種模式的排行榜，和還沒寫入的資料合併"""
+        for mode in MODES:
+            rows = connection.execute(
+                "SELECT score, ended_at, level FROM sessions WHERE mode = ? "
+                "ORDER BY score DESC, ended_at LIMIT ?",
+                (mode, self.top_n),
+            ).fetchall()
+            for score, ended_at, level in rows:
+                self._remember(mode, score, ended_at, level)
+
+    def _write_pending(self, connection):
+        """把待寫入的資料分成每批最多 batch_size 局寫入"""
+        while self._pending:
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popleft())
+            if connection is None:
+                self.failed += len(batch)
+                continue
+            started = time.perf_counter()
+            try:
+                with connection:
+                    connection.executemany(INSERT_SESSION, batch)
+            except sqlite3.Error as e:
+                self.failed += len(batch)
+                self._fail(e, "分數寫入失敗")
+                continue
+            self.last_commit_ms = (time.perf_counter() - started) * 1000
+            self.written += len(batch)
+            self.batches += 1
+
+    def _fail(self, error, message):
+        """記錄資料庫錯誤（同樣的錯誤只印一次）"""
+        if self.error is None or str(self.error) != str(error):
+            print(f"⚠️ {message}: {error}")
+        self.error = error
+
+
+######################定義函式區######################
+
+
+def open_database(path):
+    """
+    開啟分數資料庫（WAL 模式），需要時建立資料表\n
+    \n
+    參數:\n
+    path (str): 資料庫檔案路徑\n
+    \n
+    回傳:\n
+    sqlite3.Connection: 資料庫連線\n
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=SCORES_CONFIG["BUSY_TIMEOUT_MS"] / 1000)
+    # WAL：寫入時讀取的程式不會被擋住；NORMAL 在 WAL 模式下仍然不會損毀資料庫，
+    # 只是斷電時可能少掉最後一次交易
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        connection.close()
+        raise sqlite3.DatabaseError(
+            f"資料庫版本 {version} 比程式支援的 {SCHEMA_VERSION} 新"
+        )
+    with connection:
+        connection.executescript(SCHEMA)
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return connection
+
+
+def get_store():
+    """
+    取得共用的分數資料庫\n
+    \n
+    回傳:\n
+    ScoreStore: 分數資料庫\n
+    """
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = ScoreStore()
+        return _store
@@ -0,0 +1,1082 @@
+# -*- coding: utf-8 -*-
+"""
+觀戰串流模組
+
+機台旁邊的觀戰螢幕透過本機的 TCP 或 Unix socket 接收遊戲的狀態，
+由獨立的觀戰程式（spectator.py）重建並畫出同一局遊戲。
+
+- 關鍵幀：剛連上的觀戰程式先收到一份完整的狀態（內容和存檔相同，見
+  game/savegame.py），之後只收到每一幀的變化；換關或重新開始時所有
+  觀戰程式都重新收到關鍵幀
+- 差異幀：改變的磚塊用位元遮罩標出，只送出改變的磚塊；球的位置量化成
+  固定精度的整數，只送出和上一幀的差；另外是彩蛋的位置、分數與底板，
+  以及這一幀的爆炸與被打掉的磚塊（碎片與爆炸效果由觀戰程式自己產生）
+- 遊戲執行緒只負責產生差異與記下關鍵幀的狀態（沒有觀戰程式連線時什麼
+  都不做），關鍵幀的編碼、壓縮與傳送都在背景執行緒；跟不上的觀戰程式會
+  丟掉累積的資料，從下一個關鍵幀重新同步，遊戲永遠不會等待觀戰程式
+"""
+
+######################載入套件######################
+import os
+import selectors
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import deque
+from operator import attrgetter
+
+import pygame
+
+######################導入設定######################
+from config import SPECTATOR_CONFIG
+
+######################導入遊戲模組######################
+from .effects import EGG
+from .events import BrickDestroyed, TntDetonated
+from .objects import Ball
+from . import effects
+from . import savegame
+from . import systems
+from . import utils
+
+######################全域變數######################
+# 每則訊息前面的長度（壓縮後的位元組數），後面接著 zlib 壓縮的內容
+LENGTH = struct.Struct("<I")
+
+# 訊息開頭：種類、幀數、分數、關卡、旗標
+FRAME = struct.Struct("<BIqIB")
+KIND_KEYFRAME = 1  # 後面接著 savegame.dumps() 的完整狀態
+KIND_DELTA = 2  # 後面接著和上一幀的差異
+
+# 訊息旗標
+FLAG_GAME_OVER = 1  # 遊戲結束
+FLAG_CAMERA = 2  # 超大關卡的攝影機移動了（後面接著攝影機）
+FLAG_BALL_STYLE = 4  # 球的數量或外觀改變了（後面接著每顆球的外觀）
+FLAG_BALL_SHORT = 8  # 球的位置差都放得進 16 位元整數
+
+PADDLE = struct.Struct("<dd")  # 底板位置
+CAMERA = struct.Struct("<ddd")  # x, y, 縮放倍率
+COUNT = struct.Struct("<I")
+
+# 改變的磚塊：狀態旗標（同存檔的 BRICK_FLAGS）、位置、顏色、原始顏色、閃爍偏移
+BRICK = struct.Struct("<Bii6BH")
+BRICK_STATE = attrgetter(
+    "hit",
+    "is_tnt",
+    "tnt_primed",
+    "is_blinking",
+    "falling",
+    "x",
+    "y",
+    "color",
+    "base_color",
+    "blink_offset",
+)
+
+# 球的外觀：半徑、顏色、是否黏在底板上
+BALL_STYLE = struct.Struct("<H3B?")
+BALL_LOOK = attrgetter("radius", "color", "stuck")
+
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+######################物件類別######################
+
+
+class StreamEncoder:
+    """
+    把一局遊戲轉成關鍵幀與差異幀（在遊戲執行緒呼叫）\n
+    \n
+    記住上一次送出的狀態（磚塊、球的量化位置、攝影機），每一幀只編碼\n
+    改變的部分。一般關卡每一幀比較所有磚塊（幾百塊，一次 attrgetter\n
+    就能取得）；超大關卡的磚塊不會移動，只檢查這一幀被打掉的磚塊與\n
+    正在倒數的 TNT，成本和場地大小無關。\n
+    \n
+    使用範例:\n
+    encoder = StreamEncoder()\n
+    encoder.attach(game_state)\n
+    data = encoder.keyframe(game_state)  # 第一次或 needs_keyframe() 時\n
+    data = encoder.delta(game_state)  # 之後每一幀\n
+    \n
+    關鍵幀也可以分成兩步：遊戲執行緒呼叫 snapshot()，其他執行緒再用\n
+    encode_keyframe() 轉成關鍵幀。\n
+    """
+
+    def __init__(self, scale=None):
+        """
+        參數:\n
+        scale (int): 位置量化的倍數，預設使用設定檔中的值\n
+        """
+        self.scale = scale or SPECTATOR_CONFIG["POSITION_SCALE"]
+        self._destroyed = []
+        self._blasts = []
+        self._bricks = None  # 上一次送出的磚塊列表，None 表示需要關鍵幀
+        self._size = None
+        self._records = []
+        self._sent = {}
+        self._lookup = None
+        self._watching = []
+        self._camera = None
+        self._ball_look = []
+        self._positions = []
+
+    def attach(self, game):
+        """訂閱遊戲的事件佇列，收集每一幀的爆炸與被打掉的磚塊"""
+        game.events.subscribe(BrickDestroyed, self._destroyed.extend)
+        game.events.subscribe(TntDetonated, self._blasts.extend)
+
+    def discard(self):
+        """沒有人觀看：丟掉收集的事件，下一次一定送出關鍵幀"""
+        self._destroyed.clear()
+        self._blasts.clear()
+        self._bricks = None
+
+    def needs_keyframe(self, game):
+        """
+        是否要送出關鍵幀（還沒送過、換關或重新開始）\n
+        \n
+        回傳:\n
+        bool: True 表示差異幀無法表示這一幀的變化\n
+        """
+        return (
+            game.bricks is not self._bricks
+            or len(game.bricks) != len(self._records)
+            or (game.world_width, game.world_height) != self._size
+        )
+
+    def keyframe(self, game):
+        """
+        編碼完整的狀態，並把它當成之後差異幀的基準\n
+        \n
+        回傳:\n
+        bytes: 關鍵幀\n
+        """
+        return encode_keyframe(self.snapshot(game))
+
+    def snapshot(self, game):
+        """
+        記下關鍵幀的狀態，並把它當成之後差異幀的基準\n
+        \n
+        只複製磚塊列表（見 savegame.capture()），磚塊的屬性由\n
+        encode_keyframe() 讀取，成本和場地大小幾乎無關。讀取時已經改變的\n
+        磚塊一定也會出現在那一幀的差異幀中，觀戰端套用差異幀後還是一致。\n
+        超大關卡也不先記下每塊磚的狀態：之後被打掉或倒數中的磚塊第一次\n
+        檢查時一定會送出。\n
+        \n
+        回傳:\n
+        tuple: 交給 encode_keyframe() 的資料\n
+        """
+        bricks = game.bricks
+        field = _field(game)
+        self._bricks = bricks
+        self._size = (game.world_width, game.world_height)
+        if field is None:
+            self._records = list(map(BRICK_STATE, bricks))
+        else:
+            self._records = [None] * len(bricks)
+        self._sent = {}  # 關鍵幀之後送出過的磚塊：位置 → 最後送出的內容
+        self._lookup = None
+        self._watching = list(field.primed) if field is not None else []
+        self._camera = _camera_state(field)
+        self._ball_look = list(map(BALL_LOOK, game.balls))
+        self._positions = _quantize(game.balls, self.scale)
+        self._destroyed.clear()
+        self._blasts.clear()
+        flags = FLAG_GAME_OVER if game.game_over else 0
+        return (
+            FRAME.pack(KIND_KEYFRAME, game.frames, game.score, game.level, flags),
+            savegame.capture(game),
+        )
+
+    def delta(self, game):
+        """
+        編碼和上一次送出的狀態之間的差異\n
+        \n
+        回傳:\n
+        bytes: 差異幀\n
+        """
+        bricks = game.bricks
+        field = _field(game)
+        flags = FLAG_GAME_OVER if game.game_over else 0
+        paddle = game.paddle
+        parts = [b"", PADDLE.pack(paddle.x, paddle.y)]
+
+        camera = _camera_state(field)
+        if camera != self._camera:
+            self._camera = camera
+            flags |= FLAG_CAMERA
+            parts.append(CAMERA.pack(*camera))
+
+        # 磚塊：位元遮罩標出改變的磚塊，後面依序是它們的新狀態；
+        # 送出的位置是整數像素，無盡模式緩慢下降的磚塊只有跨過一個像素時才送出
+        candidates = self._changed_bricks(bricks, field)
+        records = self._records
+        sent = self._sent
+        pack = BRICK.pack
+        changed = []
+        packed = []
+        for index in candidates:
+            hit, tnt, primed, blinking, falling, x, y, color, base, blink = records[
+                index
+            ]
+            record = pack(
+                hit | tnt << 1 | primed << 2 | blinking << 3 | falling << 4,
+                int(x),
+                int(y),
+                *color,
+                *base,
+                blink,
+            )
+            if record != sent.get(index):
+                sent[index] = record
+                changed.append(index)
+                packed.append(record)
+        parts.append(COUNT.pack(len(changed)))
+        if changed:
+            mask = bytearray((len(bricks) + 7) // 8)
+            for index in changed:
+                mask[index >> 3] |= 1 << (index & 7)
+            parts.append(mask)
+            parts.extend(packed)
+
+        # 球：外觀改變時才送出外觀，位置送出和上一幀的量化位置的差
+        balls = game.balls
+        parts.append(COUNT.pack(len(balls)))
+        look = list(map(BALL_LOOK, balls))
+        if look != self._ball_look:
+            self._ball_look = look
+            flags |= FLAG_BALL_STYLE
+            parts.extend(
+                BALL_STYLE.pack(radius, *color, stuck) for radius, color, stuck in look
+            )
+        positions = _quantize(balls, self.scale)
+        previous = self._positions
+        moves = [new - old for new, old in zip(positions, previous)]
+        moves.extend(positions[len(moves) :])
+        self._positions = positions
+        if not moves or -32768 <= min(moves) and max(moves) <= 32767:
+            flags |= FLAG_BALL_SHORT
+            parts.append(_array_bytes(array("h", moves)))
+        else:
+            parts.append(_array_bytes(array("i", moves)))
+
+        # 彩蛋：量化後的位置
+        eggs = game.world.archetype(EGG)
+        scale = self.scale
+        parts.append(COUNT.pack(len(eggs)))
+        parts.append(
+            _array_bytes(
+                array(
+                    "i",
+                    [
+                        round(value * scale)
+                        for point in zip(eggs.columns["x"], eggs.columns["y"])
+                        for value in point
+                    ],
+                )
+            )
+        )
+
+        # 這一幀的爆炸與被打掉的磚塊
+        blasts = self._blasts
+        parts.append(COUNT.pack(len(blasts)))
+        parts.append(
+            _array_bytes(
+                array("i", [int(v) for blast in blasts for v in (blast.x, blast.y)])
+            )
+        )
+        destroyed = self._destroyed
+        parts.append(COUNT.pack(len(destroyed)))
+        index_of = self._index_of
+        parts.append(
+            _array_bytes(array("I", [index_of(event.brick) for event in destroyed]))
+        )
+        parts.append(bytes(min(255, event.shards) for event in destroyed))
+        blasts.clear()
+        destroyed.clear()
+
+        parts[0] = FRAME.pack(KIND_DELTA, game.frames, game.score, game.level, flags)
+        return b"".join(parts)
+
+    def _changed_bricks(self, bricks, field):
+        """找出狀態和上一次送出時不同的磚塊，並更新記住的狀態"""
+        records = self._records
+        if field is None:
+            current = list(map(BRICK_STATE, bricks))
+            changed = [
+                index
+                for index, (new, old) in enumerate(zip(current, records))
+                if new != old
+            ]
+            self._records = current
+            return changed
+
+        # 超大關卡：只有被打掉的磚塊與倒數中（或上一幀還在倒數）的 TNT 會改變
+        index_of = self._index_of
+        candidates = {index_of(event.brick) for event in self._destroyed}
+        candidates.update(index_of(brick) for brick in self._watching)
+        candidates.update(index_of(brick) for brick in field.primed)
+        self._watching = list(field.primed)
+        changed = []
+        for index in sorted(candidates):
+            state = BRICK_STATE(bricks[index])
+            if state != records[index]:
+                records[index] = state
+                changed.append(index)
+        return changed
+
+    def _index_of(self, brick):
+        """回傳磚塊在磚塊列表中的位置"""
+        index = brick.level_index
+        bricks = self._bricks
+        if index is not None and index < len(bricks) and bricks[index] is brick:
+            return index
+        if self._lookup is None:
+            self._lookup = {id(other): i for i, other in enumerate(bricks)}
+        return self._lookup[id(brick)]
+
+
+class SpectatorView:
+    """
+    觀戰程式這一端：把收到的關鍵幀與差異幀套用到一份遊戲狀態上\n
+    \n
+    遊戲狀態只用來顯示（不會呼叫 update()），直接用 GameState.draw()\n
+    畫出和機台上相同的畫面。碎片與爆炸效果依照收到的事件自己產生，\n
+    每收到一幀就前進一幀。\n
+    \n
+    屬性:\n
+    game (GameState): 重建的遊戲狀態\n
+    synced (bool): 是否已經收到關鍵幀\n
+    frames (int): 套用的幀數\n
+    keyframes (int): 套用的關鍵幀數\n
+    """
+
+    def __init__(self, game=None, scale=None):
+        """
+        參數:\n
+        game (GameState): 要更新的遊戲狀態，預設建立一個新的\n
+        scale (int): 位置量化的倍數，必須和遊戲端相同\n
+        """
+        if game is None:
+            from .game_logic import GameState
+
+            game = GameState(endless=False)
+        self.game = game
+        self.scale = scale or SPECTATOR_CONFIG["POSITION_SCALE"]
+        self.synced = False
+        self.frames = 0
+        self.keyframes = 0
+        self._positions = []
+
+    def reset(self):
+        """連線中斷：等待下一個關鍵幀"""
+        self.synced = False
+
+    def apply(self, data):
+        """
+        套用一則訊息\n
+        \n
+        參數:\n
+        data (bytes): 解壓縮後的訊息\n
+        \n
+        回傳:\n
+        bool: 是否套用（還沒收到關鍵幀時會略過差異幀）\n
+        \n
+        例外:\n
+        ValueError: 訊息格式不正確\n
+        """
+        view = memoryview(data)
+        try:
+            kind, frame, score, level, flags = FRAME.unpack_from(view)
+            if kind == KIND_KEYFRAME:
+                savegame.loads(self.game, view[FRAME.size :], resume=False)
+                self._positions = _quantize(self.game.balls, self.scale)
+                if self.game.board is not None:
+                    self.game.board.camera.following = False
+                self.synced = True
+                self.keyframes += 1
+            elif kind != KIND_DELTA:
+                raise ValueError(f"未知的訊息種類 {kind}")
+            elif not self.synced:
+                return False
+            else:
+                self._apply_delta(view, flags)
+        except struct.error as e:
+            raise ValueError(f"訊息不完整: {e}") from e
+
+        game = self.game
+        game.frames = frame
+        game.score = score
+        game.level = level
+        game.game_over = bool(flags & FLAG_GAME_OVER)
+        game.state = "GAME_OVER" if game.game_over else "PLAYING"
+        self.frames += 1
+        return True
+
+    def _apply_delta(self, view, flags):
+        """依照差異幀更新遊戲狀態"""
+        game = self.game
+        offset = FRAME.size
+        game.paddle.x, game.paddle.y = PADDLE.unpack_from(view, offset)
+        offset += PADDLE.size
+        if flags & FLAG_CAMERA:
+            camera = game.board.camera
+            camera.x, camera.y, camera.zoom = CAMERA.unpack_from(view, offset)
+            offset += CAMERA.size
+
+        # 磚塊
+        (changed,) = COUNT.unpack_from(view, offset)
+        offset += COUNT.size
+        if changed:
+            bricks = game.bricks
+            size = (len(bricks) + 7) // 8
+            mask = view[offset : offset + size]
+            offset += size
+            indices = [
+                base << 3 | bit
+                for base, byte in enumerate(mask)
+                if byte
+                for bit in range(8)
+                if byte >> bit & 1
+            ]
+            end = offset + changed * BRICK.size
+            if len(indices) != changed or end > len(view):
+                raise ValueError("磚塊遮罩和資料不符")
+            now = pygame.time.get_ticks()
+            touched = []
+            for index, values in zip(indices, BRICK.iter_unpack(view[offset:end])):
+                brick = bricks[index]
+                bits = values[0]
+                primed = bool(bits & 4)
+                if primed and not brick.tnt_primed:
+                    # 倒數的閃爍從觀戰程式看到的這一刻開始
+                    brick.tnt_primed_start = now
+                brick.hit = bool(bits & 1)
+                brick.is_tnt = bool(bits & 2)
+                brick.tnt_primed = primed
+                brick.is_blinking = bool(bits & 8)
+                brick.falling = bool(bits & 16)
+                brick.x = values[1]
+                brick.y = values[2]
+                brick.color = values[3:6]
+                brick.base_color = values[6:9]
+                brick.blink_offset = values[9]
+                touched.append(brick)
+            offset = end
+            field = game.board
+            if field is not None and field.bricks is bricks:
+                # 場地把被打掉的磚塊從區塊表面上塗黑
+                field.watch(touched)
+
+        # 球
+        (count,) = COUNT.unpack_from(view, offset)
+        offset += COUNT.size
+        balls = game.balls
+        if flags & FLAG_BALL_STYLE:
+            end = offset + count * BALL_STYLE.size
+            del balls[count:]
+            while len(balls) < count:
+                balls.append(_display_ball())
+            for ball, (radius, red, green, blue, stuck) in zip(
+                balls, BALL_STYLE.iter_unpack(view[offset:end])
+            ):
+                ball.radius = radius
+                ball.color = (red, green, blue)
+                ball.stuck = stuck
+            offset = end
+        elif count != len(balls):
+            raise ValueError("球的數量和上一幀不符")
+        moves, offset = _read_array(
+            view, offset, "h" if flags & FLAG_BALL_SHORT else "i", count * 2
+        )
+        previous = self._positions
+        positions = [old + move for old, move in zip(previous, moves)]
+        positions.extend(moves[len(positions) :])
+        self._positions = positions
+        scale = self.scale
+        for ball, x, y in zip(balls, positions[0::2], positions[1::2]):
+            ball.x = x / scale
+            ball.y = y / scale
+
+        # 已經在畫面上的碎片與爆炸前進一幀，再加入這一幀的新特效
+        world = game.world
+        systems.update(world, game.world_height, game.paddle)
+        (count,) = COUNT.unpack_from(view, offset)
+        offset += COUNT.size
+        eggs, offset = _read_array(view, offset, "i", count * 2)
+        (count,) = COUNT.unpack_from(view, offset)
+        offset += COUNT.size
+        blasts, offset = _read_array(view, offset, "i", count * 2)
+        if count:
+            effects.create_explosions(world, zip(blasts[0::2], blasts[1::2]))
+        (count,) = COUNT.unpack_from(view, offset)
+        offset += COUNT.size
+        indices, offset = _read_array(view, offset, "I", count)
+        shards = view[offset : offset + count]
+        if count:
+            bricks = game.bricks
+            utils.spawn_shards(
+                [
+                    BrickDestroyed(bricks[index], amount)
+                    for index, amount in zip(indices, shards)
+                ],
+                world,
+            )
+
+        # 彩蛋直接換成遊戲端的位置
+        world.archetype(EGG).clear()
+        count = len(eggs) // 2
+        world.spawn(
+            EGG,
+            count,
+            x=[x / scale for x in eggs[0::2]],
+            y=[y / scale for y in eggs[1::2]],
+            fall_margin=[100] * count,
+        )
+
+
+class _Viewer:
+    """伺服器這一端的一個觀戰連線"""
+
+    __slots__ = ("sock", "pending", "pending_bytes", "offset", "synced")
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.pending = deque()  # 還沒送完的訊息
+        self.pending_bytes = 0
+        self.offset = 0  # 第一則訊息已經送出的位元組數
+        self.synced = False  # 是否已經收到關鍵幀
+
+
+class SpectatorServer:
+    """
+    觀戰串流伺服器（主迴圈的 frame hook）\n
+    \n
+    每一幀結束時在遊戲執行緒產生差異幀（有新的觀戰程式時另外記下\n
+    關鍵幀的狀態），放進佇列後喚醒背景執行緒；背景執行緒負責接受連線、\n
+    編碼關鍵幀、壓縮，以及用非阻塞 socket 送給每個觀戰程式。背景執行緒用 selectors\n
+    同時等待 socket 與佇列（佇列透過一對 socket 喚醒）。\n
+    \n
+    屬性:\n
+    address: 監聽的位址（Unix socket 路徑或 (主機, 連接埠)）\n
+    clients (int): 目前連線的觀戰程式數量\n
+    frames (int): 產生的差異幀數\n
+    keyframes (int): 產生的關鍵幀數\n
+    raw_bytes (int): 壓縮前的總位元組數\n
+    sent_bytes (int): 壓縮後送出的總位元組數\n
+    resyncs (int): 觀戰程式跟不上而重新同步的次數\n
+    encode_ms (float): 上一幀在遊戲執行緒編碼花的時間\n
+    \n
+    使用範例:\n
+    server = SpectatorServer()\n
+    if server.start():\n
+        server.attach(game_state)\n
+        frame_hooks.append(server)\n
+    server.stop()\n
+    """
+
+    def __init__(self, address=None, max_clients=None, buffer_bytes=None):
+        """
+        參數:\n
+        address: 監聽的位址，預設使用設定檔中的值（見 stream_address()）\n
+        max_clients (int): 同時連線的觀戰程式上限\n
+        buffer_bytes (int): 觀戰程式累積超過這麼多沒收走時重新同步\n
+        """
+        self.address = address or stream_address()
+        self.max_clients = max_clients or SPECTATOR_CONFIG["MAX_CLIENTS"]
+        self.buffer_bytes = buffer_bytes or SPECTATOR_CONFIG["CLIENT_BUFFER_BYTES"]
+        self.compress_level = SPECTATOR_CONFIG["COMPRESS_LEVEL"]
+        self.encoder = StreamEncoder()
+
+        self._outgoing = deque()
+        self._listener = None
+        self._wake_reader = None
+        self._wake_writer = None
+        self._viewers = []
+        self._thread = None
+        self._stopping = False
+        # 新的觀戰程式連線或重新同步時加一，遊戲執行緒看到改變就產生關鍵幀
+        self._joins = 0
+        self._served_joins = 0
+
+        self.clients = 0
+        self.frames = 0
+        self.keyframes = 0
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+        self.resyncs = 0
+        self.encode_ms = 0.0
+
+    def start(self):
+        """
+        開始監聽並啟動背景執行緒\n
+        \n
+        回傳:\n
+        bool: False 表示無法監聽（例如連接埠被占用），遊戲照常進行\n
+        """
+        if self._thread is not None:
+            return True
+        try:
+            self._listener = _listen(self.address)
+            self._wake_reader, self._wake_writer = socket.socketpair()
+        except OSError as e:
+            print(f"⚠️ 無法開啟觀戰串流 {self.address}: {e}")
+            if self._listener is not None:
+                self._listener.close()
+                self._listener = None
+            return False
+        self._wake_reader.setblocking(False)
+        self._wake_writer.setblocking(False)
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._worker, name="SpectatorStream", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=1.0):
+        """
+        停止背景執行緒並關閉所有連線\n
+        \n
+        參數:\n
+        timeout (float): 最多等待幾秒\n
+        """
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wake()
+        self._thread.join(timeout)
+        self._thread = None
+        self._wake_reader.close()
+        self._wake_writer.close()
+
+    def attach(self, game):
+        """收集這一局的事件（爆炸與被打掉的磚塊）"""
+        self.encoder.attach(game)
+
+    def begin_frame(self):
+        """frame hook：幀開始時不需要做任何事"""
+
+    def end_frame(self, app):
+        """frame hook：幀結束時送出這一幀的狀態"""
+        self.publish(app.game_state)
+
+    def publish(self, game):
+        """
+        產生這一幀的差異幀（需要時加上關鍵幀）交給背景執行緒\n
+        \n
+        參數:\n
+        game (GameState): 遊戲狀態\n
+        """
+        encoder = self.encoder
+        if not self.clients:
+            encoder.discard()
+            return
+        started = time.perf_counter()
+        joins = self._joins
+        reset = encoder.needs_keyframe(game)
+        delta = None if reset else encoder.delta(game)
+        keyframe = None
+        if reset or joins != self._served_joins:
+            self._served_joins = joins
+            keyframe = encoder.snapshot(game)
+        self._outgoing.append((delta, keyframe, reset))
+        self.encode_ms = (time.perf_counter() - started) * 1000
+        self._wake()
+
+    def stats(self):
+        """回傳串流的統計"""
+        return {
+            "clients": self.clients,
+            "frames": self.frames,
+            "keyframes": self.keyframes,
+            "raw_bytes": self.raw_bytes,
+            "sent_bytes": self.sent_bytes,
+            "resyncs": self.resyncs,
+            "encode_ms": self.encode_ms,
+        }
+
+    def _wake(self):
+        """喚醒背景執行緒（佇列有新的訊息或要停止）"""
+        try:
+            self._wake_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # 還沒被讀走的喚醒資料已經足夠
+
+    def _worker(self):
+        """背景執行緒：接受連線、壓縮訊息、送給每個觀戰程式"""
+        selector = selectors.DefaultSelector()
+        selector.register(self._listener, selectors.EVENT_READ)
+        selector.register(self._wake_reader, selectors.EVENT_READ)
+        try:
+            while not self._stopping:
+                for key, events in selector.select():
+                    if key.fileobj is self._listener:
+                        self._accept(selector)
+                    elif key.fileobj is self._wake_reader:
+                        try:
+                            self._wake_reader.recv(4096)
+                        except BlockingIOError:
+                            pass
+                    elif key.data in self._viewers:
+                        self._service(selector, key.data, events)
+                self._distribute()
+                for viewer in list(self._viewers):
+                    self._flush(selector, viewer)
+        finally:
+            for viewer in list(self._viewers):
+                self._drop(selector, viewer)
+            selector.close()
+            self._listener.close()
+            if isinstance(self.address, str):
+                try:
+                    os.unlink(self.address)
+                except OSError:
+                    pass
+
+    def _accept(self, selector):
+        """接受新的觀戰程式（超過上限時直接關閉）"""
+        try:
+            sock, _ = self._listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        if len(self._viewers) >= self.max_clients:
+            sock.close()
+            return
+        sock.setblocking(False)
+        viewer = _Viewer(sock)
+        self._viewers.append(viewer)
+        selector.register(sock, selectors.EVENT_READ, viewer)
+        self.clients = len(self._viewers)
+        self._joins += 1
+
+    def _service(self, selector, viewer, events):
+        """處理觀戰程式的 socket 事件：可以送出更多資料，或是對方斷線"""
+        if events & selectors.EVENT_READ:
+            try:
+                data = viewer.sock.recv(4096)
+            except BlockingIOError:
+                data = None
+            except OSError:
+                data = b""
+            if data == b"":
+                self._drop(selector, viewer)
+                return
+        if events & selectors.EVENT_WRITE:
+            self._flush(selector, viewer)
+
+    def _distribute(self):
+        """把佇列中的訊息壓縮後交給每個觀戰程式"""
+        while self._outgoing:
+            delta, keyframe, reset = self._outgoing.popleft()
+            delta_message = self._pack(delta) if delta is not None else None
+            keyframe_message = None
+            for viewer in self._viewers:
+                if viewer.synced and not reset:
+                    if delta_message is not None:
+                        self._enqueue(viewer, delta_message)
+                elif keyframe is not None:
+                    if keyframe_message is None:
+                        keyframe_message = self._pack(encode_keyframe(keyframe))
+                    viewer.synced = True
+                    self._enqueue(viewer, keyframe_message, True)
+            if delta is not None:
+                self.frames += 1
+            if keyframe is not None:
+                self.keyframes += 1
+
+    def _pack(self, body):
+        """壓縮一則訊息並加上長度"""
+        compressed = zlib.compress(body, self.compress_level)
+        self.raw_bytes += len(body)
+        return LENGTH.pack(len(compressed)) + compressed
+
+    def _enqueue(self, viewer, message, keyframe=False):
+        """
+        把訊息放進觀戰程式的傳送佇列\n
+        \n
+        關鍵幀取代還沒送出的所有訊息；差異幀累積太多時丟掉佇列，\n
+        改為等待下一個關鍵幀。\n
+        """
+        if keyframe or viewer.pending_bytes + len(message) > self.buffer_bytes:
+            # 送到一半的訊息要送完，其他的丟掉
+            keep = viewer.pending.popleft() if viewer.offset else None
+            viewer.pending.clear()
+            viewer.pending_bytes = 0
+            if keep is not None:
+                viewer.pending.append(keep)
+                viewer.pending_bytes = len(keep)
+            if not keyframe:
+                viewer.synced = False
+                self.resyncs += 1
+                self._joins += 1
+                return
+        viewer.pending.append(message)
+        viewer.pending_bytes += len(message)
+
+    def _flush(self, selector, viewer):
+        """盡量送出觀戰程式佇列中的資料（不會阻塞）"""
+        pending = viewer.pending
+        sock = viewer.sock
+        while pending:
+            head = pending[0]
+            try:
+                sent = sock.send(memoryview(head)[viewer.offset :])
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                self._drop(selector, viewer)
+                return
+            self.sent_bytes += sent
+            viewer.offset += sent
+            if viewer.offset == len(head):
+                pending.popleft()
+                viewer.pending_bytes -= len(head)
+                viewer.offset = 0
+        events = selectors.EVENT_READ
+        if pending:
+            events |= selectors.EVENT_WRITE
+        if selector.get_key(sock).events != events:
+            selector.modify(sock, events, viewer)
+
+    def _drop(self, selector, viewer):
+        """關閉觀戰程式的連線"""
+        try:
+            selector.unregister(viewer.sock)
+        except (KeyError, ValueError):
+            pass
+        viewer.sock.close()
+        if viewer in self._viewers:
+            self._viewers.remove(viewer)
+        self.clients = len(self._viewers)
+
+
+class SpectatorClient:
+    """
+    觀戰程式的連線（背景執行緒接收訊息）\n
+    \n
+    背景執行緒連線、讀取並解壓縮每則訊息後放進佇列，主迴圈每一幀用\n
+    take() 一次取走；斷線時佇列中會出現 None，之後每隔 RECONNECT_MS\n
+    重新連線。\n
+    \n
+    屬性:\n
+    address: 遊戲端的位址\n
+    connected (bool): 是否已經連線\n
+    received (int): 收到的訊息數\n
+    received_bytes (int): 收到的位元組數（壓縮後）\n
+    """
+
+    def __init__(self, address=None):
+        """
+        參數:\n
+        address: 遊戲端的位址，預設使用設定檔中的值（見 stream_address()）\n
+        """
+        self.address = address or stream_address()
+        self.connected = False
+        self.received = 0
+        self.received_bytes = 0
+        self._messages = deque()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """啟動背景接收執行緒"""
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._worker, name="SpectatorReceiver", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """停止背景執行緒"""
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def take(self):
+        """
+        取走目前收到的所有訊息\n
+        \n
+        回傳:\n
+        list: 解壓縮後的訊息，None 表示連線中斷\n
+        """
+        messages = []
+        pending = self._messages
+        while pending:
+            messages.append(pending.popleft())
+        return messages
+
+    def _worker(self):
+        """背景執行緒：連線並持續接收訊息，斷線時重新連線"""
+        retry = SPECTATOR_CONFIG["RECONNECT_MS"] / 1000
+        while not self._stopping.is_set():
+            try:
+                sock = _connect(self.address)
+            except OSError:
+                self._stopping.wait(retry)
+                continue
+            self.connected = True
+            try:
+                self._receive(sock)
+            except (OSError, zlib.error, ValueError):
+                pass
+            finally:
+                sock.close()
+                if self.connected:
+                    self.connected = False
+                    self._messages.append(None)
+            self._stopping.wait(retry)
+
+    def _receive(self, sock):
+        """讀取訊息直到斷線或停止"""
+        sock.settimeout(0.2)  # 定期檢查是否要停止
+        while not self._stopping.is_set():
+            header = self._read(sock, LENGTH.size)
+            if header is None:
+                return
+            (length,) = LENGTH.unpack(header)
+            body = self._read(sock, length)
+            if body is None:
+                return
+            self._messages.append(zlib.decompress(body))
+            self.received += 1
+            self.received_bytes += LENGTH.size + length
+
+    def _read(self, sock, size):
+        """讀取剛好 size 個位元組，斷線或停止時回傳 None"""
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        done = 0
+        while done < size:
+            try:
+                count = sock.recv_into(view[done:])
+            except socket.timeout:
+                if self._stopping.is_set():
+                    return None
+                continue
+            if count == 0:
+                return None
+            done += count
+        return bytes(buffer)
+
+
+######################定義函式區######################
+
+
+def stream_address():
+    """
+    依照設定檔回傳串流的位址\n
+    \n
+    回傳:\n
+    str 或 tuple: Unix socket 路徑（有設定且系統支援時），否則為 (主機, 連接埠)\n
+    """
+    path = SPECTATOR_CONFIG["UNIX_PATH"]
+    if path and hasattr(socket, "AF_UNIX"):
+        return path
+    return (SPECTATOR_CONFIG["HOST"], SPECTATOR_CONFIG["PORT"])
+
+
+def encode_keyframe(snapshot):
+    """
+    把 StreamEncoder.snapshot() 記下的狀態轉成關鍵幀（可以在其他執行緒呼叫）\n
+    \n
+    參數:\n
+    snapshot (tuple): StreamEncoder.snapshot() 的回傳值\n
+    \n
+    回傳:\n
+    bytes: 關鍵幀\n
+    """
+    header, captured = snapshot
+    return header + savegame.serialize(captured)
+
+
+def _listen(address):
+    """開啟監聽的 socket（非阻塞）"""
+    if isinstance(address, str):
+        # 上一次沒有正常結束時留下的 socket 檔案
+        if os.path.exists(address):
+            os.unlink(address)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        listener.bind(address)
+        listener.listen()
+    except OSError:
+        listener.close()
+        raise
+    listener.setblocking(False)
+    return listener
+
+
+def _connect(address):
+    """連線到遊戲端"""
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+    return socket.create_connection(address, timeout=1.0)
+
+
+def _field(game):
+    """回傳正在使用的超大關卡場地（沒有時為 None）"""
+    field = game.board
+    if field is not None and field.bricks is game.bricks:
+        return field
+    return None
+
+
+def _camera_state(field):
+    """回傳攝影機的位置與縮放倍率（沒有場地時為 None）"""
+    if field is None:
+        return None
+    camera = field.camera
+    return (camera.x, camera.y, camera.zoom)
+
+
+def _quantize(balls, scale):
+    """把球的位置量化成整數，依序為 x0, y0, x1, y1, ..."""
+    return [round(value * scale) for ball in balls for value in (ball.x, ball.y)]
+
+
+def _display_ball():
+    """建立只用來顯示的球（外觀與位置由差異幀設定）"""
+    ball = Ball.__new__(Ball)
+    ball.spinning = False
+    ball.vx = ball.vy = 0.0
+    return ball
+
+
+def _array_bytes(values):
+    """把 array 轉成小端序的位元組"""
+    if _BIG_ENDIAN:
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_array(view, offset, typecode, count):
+    """
+    從訊息讀出一個陣列\n
+    \n
+    回傳:\n
+    tuple: (array, 陣列之後的位置)\n
+    """
+    values = array(typecode)
+    end = offset + values.itemsize * count
+    if end > len(view):
+        raise ValueError("訊息不完整")
+    values.frombytes(view[offset:end])
+    if _BIG_ENDIAN:
+        values.byteswap()
+    return values, end
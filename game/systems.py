@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+特效系統模組
+
+每個系統處理擁有某些元件的所有實體（見 game/ecs.py 與 game/effects.py）：
+一次讀寫整欄資料，不會逐一呼叫每個特效物件的 update()。
+
+更新系統依序為：重力 → 移動 → 生命週期 → 掉出場地 → 底板撿取，
+傳入 kind（例如 effects.SHARD）時只處理那一種特效，讓遊戲可以分別替爆炸、
+碎片與彩蛋計時；
+繪製系統依照 RENDER_ORDER 畫出碎片、彩蛋與爆炸效果。
+"""
+
+######################載入套件######################
+import pygame
+
+######################導入設定######################
+from config import EFFECTS_CONFIG, COLORS
+
+######################導入遊戲模組######################
+from .effects import (
+    POSITION,
+    VELOCITY,
+    GRAVITY,
+    LIFETIME,
+    FALL_LIMIT,
+    PICKUP,
+    SQUARE,
+    EGG_SPRITE,
+    BLAST,
+)
+
+######################更新系統######################
+
+
+def _select(world, kind, *components):
+    """
+    找出系統要處理的原型\n
+    \n
+    參數:\n
+    world (World): 實體世界\n
+    kind (tuple): 只處理擁有這組元件的原型，None 表示全部\n
+    *components (Component): 系統需要的元件\n
+    \n
+    回傳:\n
+    list: 符合的原型\n
+    """
+    matches = world.query(*components)
+    if kind is None:
+        return matches
+    kind = frozenset(kind)
+    return [archetype for archetype in matches if archetype.components == kind]
+
+
+def gravity(world, kind=None):
+    """重力與空氣阻力：改變速度"""
+    g = EFFECTS_CONFIG["GRAVITY"]
+    air = EFFECTS_CONFIG["AIR_RESISTANCE"]
+    for archetype in _select(world, kind, VELOCITY, GRAVITY):
+        if not archetype.ids:
+            continue
+        columns = archetype.columns
+        # 垂直方向先加上重力，再乘上較小的空氣阻力
+        columns["vy"] = [(vy + g) * 0.999 for vy in columns["vy"]]
+        columns["vx"] = [vx * air for vx in columns["vx"]]
+
+
+def movement(world, kind=None):
+    """依照速度移動位置"""
+    for archetype in _select(world, kind, POSITION, VELOCITY):
+        if not archetype.ids:
+            continue
+        columns = archetype.columns
+        columns["x"] = [x + vx for x, vx in zip(columns["x"], columns["vx"])]
+        columns["y"] = [y + vy for y, vy in zip(columns["y"], columns["vy"])]
+
+
+def lifetime(world, kind=None):
+    """生命週期：經過的幀數加一，到達壽命的實體移除"""
+    for archetype in _select(world, kind, LIFETIME):
+        if not archetype.ids:
+            continue
+        columns = archetype.columns
+        timers = columns["timer"] = [timer + 1 for timer in columns["timer"]]
+        archetype.retain([timer < life for timer, life in zip(timers, columns["life"])])
+
+
+def fall_out(world, world_height, kind=None):
+    """
+    移除掉到場地底部以下太遠的實體\n
+    \n
+    參數:\n
+    world (World): 實體世界\n
+    world_height (int): 場地高度\n
+    kind (tuple): 只處理這一種特效，None 表示全部\n
+    """
+    for archetype in _select(world, kind, POSITION, FALL_LIMIT):
+        if not archetype.ids:
+            continue
+        columns = archetype.columns
+        archetype.retain(
+            [
+                y <= world_height + margin
+                for y, margin in zip(columns["y"], columns["fall_margin"])
+            ]
+        )
+
+
+def collect(world, paddle, kind=None):
+    """
+    底板撿取：碰到底板的可撿取實體移除\n
+    \n
+    參數:\n
+    world (World): 實體世界\n
+    paddle (Paddle): 底板\n
+    kind (tuple): 只處理這一種特效，None 表示全部\n
+    \n
+    回傳:\n
+    int: 這一幀撿到的數量\n
+    """
+    top = paddle.y
+    left = paddle.x
+    right = paddle.x + paddle.width
+    collected = 0
+    for archetype in _select(world, kind, POSITION, PICKUP):
+        if not archetype.ids:
+            continue
+        columns = archetype.columns
+        collected += archetype.retain(
+            [
+                not (y + radius >= top and left <= x <= right)
+                for x, y, radius in zip(columns["x"], columns["y"], columns["radius"])
+            ]
+        )
+    return collected
+
+
+def update(world, world_height, paddle, kind=None):
+    """
+    依序執行所有更新系統\n
+    \n
+    參數:\n
+    world (World): 實體世界\n
+    world_height (int): 場地高度\n
+    paddle (Paddle): 底板\n
+    kind (tuple): 只更新這一種特效（例如 effects.SHARD），None 表示全部\n
+    \n
+    回傳:\n
+    int: 這一幀被底板撿到的數量（彩蛋）\n
+    """
+    gravity(world, kind)
+    movement(world, kind)
+    lifetime(world, kind)
+    fall_out(world, world_height, kind)
+    return collect(world, paddle, kind)
+
+
+######################繪製系統######################
+
+
+def _paint_squares(surface, archetype, rows, xs, ys, zoom):
+    """畫出實心方塊（大小不隨縮放改變）"""
+    sizes = archetype.columns["size"]
+    colors = archetype.columns["color"]
+    draw_rect = pygame.draw.rect
+    rect = pygame.Rect
+    for row, x, y in zip(rows, xs, ys):
+        size = sizes[row]
+        draw_rect(surface, colors[row], rect(int(x), int(y), size, size))
+
+
+def _paint_eggs(surface, archetype, rows, xs, ys, zoom):
+    """畫出蛋與白色高光"""
+    radii = archetype.columns["radius"]
+    colors = archetype.columns["egg_color"]
+    draw_ellipse = pygame.draw.ellipse
+    white = COLORS["WHITE"]
+    for row, x, y in zip(rows, xs, ys):
+        radius = radii[row] * zoom
+        x, y = int(x), int(y)
+        draw_ellipse(
+            surface,
+            colors[row],
+            pygame.Rect(x - radius, y - radius, radius * 2, radius * 2),
+        )
+        draw_ellipse(surface, white, (x - 3, y - radius + 2, 6, 4))
+
+
+def _paint_blasts(surface, archetype, rows, xs, ys, zoom):
+    """畫出多層擴散的爆炸圓圈，顏色從亮橙色逐漸變淡"""
+    timers = archetype.columns["timer"]
+    lives = archetype.columns["life"]
+    max_radius = EFFECTS_CONFIG["EXPLOSION_MAX_RADIUS"]
+    draw_circle = pygame.draw.circle
+    for row, x, y in zip(rows, xs, ys):
+        progress = timers[row] / lives[row]
+        alpha = 255 - int(progress * 255)
+        blast_radius = progress * max_radius * zoom
+        for i in range(3):
+            radius = blast_radius - i * 15
+            if radius > 0:
+                color_intensity = max(0, alpha - i * 50)
+                color = (255, min(255, color_intensity + 100), 0)  # 橙紅色
+                draw_circle(surface, color, (int(x), int(y)), int(radius), 3)
+
+
+# 繪製順序：(外觀元件, 繪製函數)
+RENDER_ORDER = (
+    (SQUARE, _paint_squares),
+    (EGG_SPRITE, _paint_eggs),
+    (BLAST, _paint_blasts),
+)
+
+
+def render(world, surface, camera=None, area=None):
+    """
+    畫出所有有外觀元件的實體\n
+    \n
+    參數:\n
+    world (World): 實體世界\n
+    surface (pygame.Surface): 要繪製到的表面\n
+    camera (Camera): 超大關卡的攝影機，None 表示直接使用場地座標\n
+    area (pygame.Rect): 有攝影機時只畫這個場地範圍內的實體\n
+    """
+    zoom = 1
+    if camera is not None:
+        zoom = camera.zoom
+        origin_x, origin_y = camera.origin
+    for component, paint in RENDER_ORDER:
+        for archetype in world.query(POSITION, component):
+            if not archetype.ids:
+                continue
+            xs = archetype.columns["x"]
+            ys = archetype.columns["y"]
+            if camera is None:
+                rows = range(len(xs))
+            else:
+                # 只畫範圍內的實體，位置換算成畫面座標
+                inside = area.collidepoint
+                rows = [row for row, point in enumerate(zip(xs, ys)) if inside(point)]
+                xs = [xs[row] * zoom - origin_x for row in rows]
+                ys = [ys[row] * zoom - origin_y for row in rows]
+            paint(surface, archetype, rows, xs, ys, zoom)
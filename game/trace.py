@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+時間軸追蹤模組
+
+把幀邊界、每個更新／繪製階段和遊戲事件（TNT 倒數、連鎖爆炸、多球、
+換關）寫成 Chrome Trace Event 格式的 JSON，可以用 chrome://tracing
+或 Perfetto 開啟，看出是哪個遊戲事件造成了哪一幀變慢。
+"""
+
+######################載入套件######################
+import json
+import os
+import threading
+import time
+from collections import deque
+
+######################導入設定######################
+from config import TRACE_CONFIG
+
+######################全域變數######################
+# 目前啟用的追蹤器；沒有啟用時為 None，遊戲事件的呼叫點只需檢查這個變數
+active_tracer = None
+
+
+######################物件類別######################
+
+
+class TraceWriter:
+    """
+    Chrome Trace Event 寫出器\n
+    \n
+    主執行緒只把事件以 tuple 形式放進記憶體緩衝區，\n
+    累積到一定數量後整塊交給背景執行緒轉成 JSON 並寫檔，\n
+    所以格式化與磁碟 I/O 都不會發生在遊戲主迴圈中。\n
+    \n
+    事件類型:\n
+    - "X"（完整事件）: 幀、各個階段、explode_tnt、create_new_bricks\n
+    - "i"（瞬間事件）: TNT 開始倒數、多球產生\n
+    - "C"（計數器）: 每幀的物件數量\n
+    \n
+    屬性:\n
+    path (str): 輸出檔案路徑\n
+    frame (int): 已記錄的幀數\n
+    event_count (int): 已記錄的事件總數\n
+    \n
+    使用範例:\n
+    tracer = TraceWriter()\n
+    tracer.start()\n
+    tracer.attach(game)  # 替每個階段加上追蹤\n
+    tracer.begin_frame()\n
+    ...\n
+    tracer.end_frame(game)\n
+    tracer.close()\n
+    """
+
+    def __init__(self, path=None, chunk_events=None):
+        """
+        初始化追蹤器\n
+        \n
+        參數:\n
+        path (str): 輸出檔案路徑，預設在設定檔的資料夾中以時間命名\n
+        chunk_events (int): 累積幾個事件交給背景執行緒寫出\n
+        """
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(TRACE_CONFIG["OUTPUT_DIR"], f"trace-{stamp}.json")
+        self.path = path
+        self.chunk_events = chunk_events or TRACE_CONFIG["CHUNK_EVENTS"]
+
+        self.frame = 0
+        self.event_count = 0
+        self.pid = os.getpid()
+        self._origin = time.perf_counter()
+        self._frame_start = None
+        self._buffer = []
+        self._wrapped = []
+
+        # 背景寫檔執行緒
+        self._chunks = deque()
+        self._wakeup = threading.Event()
+        self._closing = False
+        self._thread = None
+        self._file = None
+        self._first = True
+
+    ######################啟動與關閉######################
+
+    def start(self):
+        """開啟輸出檔案、啟動背景寫檔執行緒，並設為目前的追蹤器"""
+        global active_tracer
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write("[\n")
+        self._thread = threading.Thread(
+            target=self._worker, name="TraceWriter", daemon=True
+        )
+        self._thread.start()
+
+        self._buffer.append(("M", "process_name", "", 0, 0, {"name": "breakout"}))
+        self._buffer.append(("M", "thread_name", "", 0, 0, {"name": "game loop"}))
+        active_tracer = self
+
+    def attach(self, game):
+        """
+        替一幀中的各個階段加上追蹤\n
+        \n
+        參數:\n
+        game (BreakoutGame): 遊戲主物件\n
+        """
+        from .profiler import frame_phase_targets, wrap_method
+
+        for owner, attr, phase in frame_phase_targets(game):
+            wrap_method(owner, attr, self._phase_recorder(phase))
+            self._wrapped.append((owner, attr))
+
+    def close(self):
+        """送出剩餘事件、等待背景執行緒寫完並關閉檔案"""
+        global active_tracer
+
+        if active_tracer is self:
+            active_tracer = None
+        for owner, attr in reversed(self._wrapped):
+            try:
+                delattr(owner, attr)
+            except AttributeError:
+                pass
+        self._wrapped = []
+
+        if self._thread is None:
+            return
+        self._flush()
+        self._closing = True
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+        self._file.write("\n]\n")
+        self._file.close()
+        self._file = None
+
+    ######################記錄事件（主執行緒）######################
+
+    def now(self):
+        """回傳從追蹤開始到現在的時間（秒）"""
+        return time.perf_counter() - self._origin
+
+    def complete(self, name, start, end=None, category="game", args=None):
+        """
+        記錄一個有持續時間的事件\n
+        \n
+        參數:\n
+        name (str): 事件名稱\n
+        start (float): time.perf_counter() 的開始時間\n
+        end (float): time.perf_counter() 的結束時間，預設為現在\n
+        category (str): 事件分類\n
+        args (dict): 額外資訊\n
+        """
+        if end is None:
+            end = time.perf_counter()
+        self._record(("X", name, category, start - self._origin, end - start, args))
+
+    def instant(self, name, category="game", args=None):
+        """記錄一個瞬間事件"""
+        self._record(("i", name, category, self.now(), 0, args))
+
+    def counter(self, name, values):
+        """記錄一組計數器數值（在時間軸上畫成面積圖）"""
+        self._record(("C", name, "counters", self.now(), 0, values))
+
+    def begin_frame(self):
+        """在每一幀開始時呼叫"""
+        self._frame_start = time.perf_counter()
+
+    def end_frame(self, game):
+        """
+        在每一幀結束時呼叫，記錄整幀事件與物件數量\n
+        \n
+        參數:\n
+        game (BreakoutGame): 遊戲主物件\n
+        """
+        if self._frame_start is not None:
+            self.complete(
+                "frame", self._frame_start, category="frame", args={"frame": self.frame}
+            )
+        state = game.game_state
+        self.counter(
+            "entities",
+            {"balls": len(state.balls), **state.effect_counts()},
+        )
+        self.frame += 1
+
+    def _phase_recorder(self, phase):
+        def record(start, end):
+            self._record(("X", phase, "phase", start - self._origin, end - start, None))
+
+        return record
+
+    def _record(self, event):
+        self._buffer.append(event)
+        self.event_count += 1
+        if len(self._buffer) >= self.chunk_events:
+            self._flush()
+
+    def _flush(self):
+        """把目前的緩衝區整塊交給背景執行緒（只交換參考，不做格式化）"""
+        if not self._buffer:
+            return
+        chunk, self._buffer = self._buffer, []
+        self._chunks.append(chunk)
+        self._wakeup.set()
+
+    ######################背景執行緒######################
+
+    def _worker(self):
+        """背景執行緒：把事件轉成 JSON 並寫入檔案"""
+        while True:
+            try:
+                chunk = self._chunks.popleft()
+            except IndexError:
+                if self._closing:
+                    break
+                self._wakeup.wait(0.5)
+                self._wakeup.clear()
+                continue
+            self._write_chunk(chunk)
+
+    def _write_chunk(self, chunk):
+        lines = []
+        for phase, name, category, ts, dur, args in chunk:
+            event = {
+                "ph": phase,
+                "name": name,
+                "pid": self.pid,
+                "tid": 1,
+                "ts": round(ts * 1e6, 3),  # Chrome Trace 使用微秒
+            }
+            if category:
+                event["cat"] = category
+            if phase == "X":
+                event["dur"] = round(dur * 1e6, 3)
+            elif phase == "i":
+                event["s"] = "t"
+            if args:
+                event["args"] = args
+            lines.append(json.dumps(event, ensure_ascii=False))
+
+        if not lines:
+            return
+        if not self._first:
+            self._file.write(",\n")
+        self._first = False
+        self._file.write(",\n".join(lines))
+        self._file.flush()
+
+
+######################定義函式區######################
+
+
+def emit(name, **args):
+    """
+    記錄一個遊戲事件（沒有啟用追蹤時什麼都不做）\n
+    \n
+    參數:\n
+    name (str): 事件名稱，例如 "tnt_primed"\n
+    **args: 事件的額外資訊\n
+    """
+    tracer = active_tracer
+    if tracer is not None:
+        tracer.instant(name, "game", args or None)
+
+
+def emit_span(name, start, **args):
+    """
+    記錄一個從 start 到現在的遊戲事件（沒有啟用追蹤時什麼都不做）\n
+    \n
+    參數:\n
+    name (str): 事件名稱，例如 "explode_tnt"\n
+    start (float): time.perf_counter() 的開始時間\n
+    **args: 事件的額外資訊\n
+    """
+    tracer = active_tracer
+    if tracer is not None:
+        tracer.complete(name, start, category="game", args=args or None)
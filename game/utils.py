@@ -8,21 +8,27 @@
 ######################載入套件######################
 import math
 import random
+import time
 from collections import deque
 
 ######################導入設定######################
-from config import TNT_CONFIG, EFFECTS_CONFIG, SCORE_CONFIG
+from config import WINDOW_WIDTH, TNT_CONFIG, EFFECTS_CONFIG, SCORE_CONFIG, FONT_CONFIG
+
+######################導入遊戲模組######################
+from . import trace
+from . import effects
+from .events import BrickDestroyed, TntDetonated, EggSpawned, ScoreDelta
 
 
 ######################全域變數######################
-# 用於與主程式通信的全域變數
-_game_state = None
+# 已載入的字體：字體大小 → pygame.font.Font，第一次用到時才載入
+_fonts = {}
 
 
 ######################定義函式區######################
 
 
-def explode_tnt(tnt_brick, all_bricks):
+def explode_tnt(tnt_brick, all_bricks, events=None, level=None):
     """
     處理TNT磚塊爆炸，炸掉周圍的磚塊\n
     \n
@@ -34,6 +40,10 @@ def explode_tnt(tnt_brick, all_bricks):
     參數:\n
     tnt_brick (Brick): 被擊中的 TNT 磚塊\n
     all_bricks (list): 所有磚塊的列表\n
+    events (EventQueue): 這一局的事件佇列，爆炸效果、碎片與分數以事件的形式\n
+        放進去，None 表示只處理磚塊\n
+    level (CompiledLevel): 磚塊都是這個關卡建立的而且已經停好時傳入，\n
+        使用關卡的爆炸鄰居表\n
     \n
     回傳:\n
     int: 被炸掉的磚塊數量（包含 TNT 本身）\n
@@ -43,34 +53,32 @@ def explode_tnt(tnt_brick, all_bricks):
     2. 每個 TNT 爆炸都會產生視覺效果\n
     3. 計算距離時使用歐幾里得距離\n
     4. 被炸到的 TNT 會加入佇列等待處理\n
+    5. 有關卡鄰居表時只檢查表中的磚塊（結果與逐一檢查相同）\n
     """
-    global _game_state
+    started = time.perf_counter()
+    chained_tnt = 0  # 連鎖引爆的其他 TNT 數量
 
     # 使用佇列處理連鎖爆炸（BFS）
     exploded_count = 0
     explosion_radius = TNT_CONFIG["EXPLOSION_RADIUS"]
+    shard_count = EFFECTS_CONFIG["SHARD_COUNT"]
+    points = 0
 
     queue = deque()
 
     # 添加爆炸效果
-    explosion_x = tnt_brick.x + tnt_brick.width // 2
-    explosion_y = tnt_brick.y + tnt_brick.height // 2
-
-    # 創建爆炸效果
-    try:
-        from .effects import Explosion
-
-        if _game_state:
-            _game_state.explosions.append(Explosion(explosion_x, explosion_y))
-    except Exception:
-        pass
+    if events is not None:
+        events.push(
+            TntDetonated(
+                tnt_brick.x + tnt_brick.width // 2, tnt_brick.y + tnt_brick.height // 2
+            )
+        )
 
     # 若傳入的 tnt_brick 尚未被標記為 hit，則先標記並計數
     if not tnt_brick.hit:
         tnt_brick.hit = True
         exploded_count += 1
-        if _game_state:
-            _game_state.score += SCORE_CONFIG["TNT_EXPLOSION"]
+        points += SCORE_CONFIG["TNT_EXPLOSION"]
 
     # 將這顆 TNT 加入處理佇列以檢查其範圍內的磚塊
     queue.append(tnt_brick)
@@ -80,8 +88,16 @@ def explode_tnt(tnt_brick, all_bricks):
         cur_center_x = current.x + current.width // 2
         cur_center_y = current.y + current.height // 2
 
+        # 有關卡鄰居表時只檢查爆炸範圍內的磚塊，不用掃過所有磚塊
+        if level is not None and current.level_index is not None:
+            candidates = [
+                all_bricks[i] for i in level.neighbours(current.level_index)
+            ]
+        else:
+            candidates = all_bricks
+
         # 檢查所有尚未被摧毀的磚塊
-        for brick in all_bricks:
+        for brick in candidates:
             if brick.hit:
                 continue
 
@@ -92,92 +108,143 @@ def explode_tnt(tnt_brick, all_bricks):
             )
 
             if distance <= explosion_radius:
-                # 這個磚塊會被炸掉
+                # 這個磚塊會被炸掉，並產生碎片
                 brick.hit = True
-                # 產生碎片
-                if _game_state:
-                    try:
-                        spawn_shards(brick, count=10)
-                    except Exception:
-                        pass
                 exploded_count += 1
-                if _game_state:
-                    _game_state.score += SCORE_CONFIG["TNT_DESTROYED"]
+                points += SCORE_CONFIG["TNT_DESTROYED"]
+                if events is not None:
+                    events.push(BrickDestroyed(brick, shard_count))
 
                 # 如果被炸到的也是TNT，加入佇列以觸發連鎖，並添加爆炸效果
                 if brick.is_tnt:
                     queue.append(brick)
-                    explosion_x = brick.x + brick.width // 2
-                    explosion_y = brick.y + brick.height // 2
-                    try:
-                        from .effects import Explosion
-
-                        if _game_state:
-                            _game_state.explosions.append(
-                                Explosion(explosion_x, explosion_y)
+                    chained_tnt += 1
+                    if events is not None:
+                        events.push(
+                            TntDetonated(
+                                brick.x + brick.width // 2,
+                                brick.y + brick.height // 2,
+                                chained_tnt,
                             )
-                    except Exception:
-                        pass
-
-    return exploded_count
-
+                        )
 
-def spawn_shards(brick, count=None):
-    """從磚塊位置產生碎片"""
-    global _game_state
+    # 整串連鎖的分數合併成一個事件
+    if events is not None and points:
+        events.push(ScoreDelta(points))
 
-    if count is None:
-        count = EFFECTS_CONFIG["SHARD_COUNT"]
+    trace.emit_span("explode_tnt", started, bricks=exploded_count, chained=chained_tnt)
+    return exploded_count
 
-    try:
-        from .effects import Shard
 
-        if _game_state:
-            for _ in range(count):
-                sx = random.uniform(brick.x, brick.x + brick.width)
-                sy = random.uniform(brick.y, brick.y + brick.height)
-                # 使用磚塊原色作為碎片顏色
-                color = getattr(brick, "base_color", brick.color)
-                _game_state.shards.append(Shard(sx, sy, color))
-    except Exception:
-        pass
+def spawn_shards(destroyed, world):
+    """
+    把一批被打掉的磚塊變成碎片\n
+    \n
+    參數:\n
+    destroyed (list): BrickDestroyed 事件列表\n
+    world (World): 遊戲的實體世界\n
+    \n
+    回傳:\n
+    int: 產生的碎片數量\n
+    """
+    # 碎片散布在磚塊範圍內，使用磚塊原色作為碎片顏色
+    sources = [
+        (
+            (event.brick.x, event.brick.y, event.brick.width, event.brick.height),
+            event.brick.base_color,
+            event.shards,
+        )
+        for event in destroyed
+    ]
+    return len(effects.create_shards(world, sources))
 
 
-def spawn_eggs_from_bricks(bricks_list, num_eggs=5):
-    """根據剛清完的磚塊清單，產生一些彩蛋。"""
-    global _game_state
+def spawn_eggs_from_bricks(bricks_list, events, num_eggs=5):
+    """
+    根據剛清完的磚塊清單，產生一些彩蛋\n
+    \n
+    參數:\n
+    bricks_list (list): 磚塊列表\n
+    events (EventQueue): 這一局的事件佇列\n
+    num_eggs (int): 彩蛋數量\n
+    """
+    if not bricks_list:
+        return
 
-    try:
-        from .effects import Egg
+    # 優先使用已被打掉的磚的位置
+    dead_bricks = [b for b in bricks_list if b.hit]
+    if dead_bricks:
+        sample_src = dead_bricks
+    else:
+        sample_src = bricks_list
+
+    for i in range(num_eggs):
+        src = random.choice(sample_src)
+        cx = src.x + src.width / 2
+        cy = src.y + src.height / 2
+        # 把彩蛋稍微往上偏移
+        ex = cx + random.uniform(-20, 20)
+        ey = cy + random.uniform(-10, 10)
+        # 若該座標在畫面外，調整到畫面上方
+        if ey < 0:
+            ey = random.uniform(20, 80)
+            ex = random.uniform(60, WINDOW_WIDTH - 60)
+        events.push(EggSpawned(ex, ey))
+
+
+def get_font(size):
+    """
+    取得指定大小的字體（第一次使用時才建立，之後共用同一個物件）\n
+    \n
+    字體檔案由資源管理器在背景預載，這裡只從記憶體中的檔案內容建立\n
+    字體物件；設定檔中的 FONT_CONFIG["FILE"] 可以換成自訂字體。\n
+    \n
+    參數:\n
+    size (int): 字體大小\n
+    \n
+    回傳:\n
+    pygame.font.Font: 字體物件\n
+    """
+    font = _fonts.get(size)
+    if font is None:
+        import io
 
-        if not _game_state:
-            return
+        import pygame
 
-        available = [b for b in bricks_list]
-        if not available:
-            return
+        from . import assets
 
-        # 優先使用已被打掉的磚的位置
-        dead_bricks = [b for b in bricks_list if b.hit]
-        if dead_bricks:
-            sample_src = dead_bricks
-        else:
-            sample_src = bricks_list
-
-        for i in range(num_eggs):
-            src = random.choice(sample_src)
-            cx = src.x + src.width / 2
-            cy = src.y + src.height / 2
-            # 把彩蛋稍微往上偏移
-            ex = cx + random.uniform(-20, 20)
-            ey = cy + random.uniform(-10, 10)
-            # 若該座標在畫面外，調整到畫面上方
-            if ey < 0:
-                ey = random.uniform(20, 80)
-                ex = random.uniform(60, 800 - 60)  # 假設螢幕寬度800
-            _game_state.eggs.append(Egg(ex, ey))
-    except Exception:
-        pass
+        if not pygame.font.get_init():
+            pygame.font.init()
+        data = assets.get_manager().require(
+            FONT_CONFIG["FILE"] or assets.DEFAULT_FONT_KEY
+        )
+        try:
+            if data is None:
+                raise pygame.error("font asset not available")
+            font = pygame.font.Font(io.BytesIO(data), size)
+        except (pygame.error, OSError):
+            # 找不到字體檔案時，改用系統的 arial 字體
+            font = pygame.font.SysFont("arial", size)
+        _fonts[size] = font
+    return font
+
+
+def render_text(font, text, color, antialias=True):
+    """
+    把文字繪製成表面\n
+    \n
+    所有遊戲文字都經過這裡，記憶體追蹤等除錯工具可以統一統計文字繪製。\n
+    \n
+    參數:\n
+    font (pygame.font.Font): 字體\n
+    text (str): 文字內容\n
+    color (tuple): 文字顏色 (R, G, B)\n
+    antialias (bool): 是否反鋸齒\n
+    \n
+    回傳:\n
+    pygame.Surface: 繪製好的文字表面\n
+    """
+    return font.render(text, antialias, color)
 
 
 def create_new_bricks():
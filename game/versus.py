@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+雙人對戰模組
+
+兩個玩家各自有一局遊戲（VersusPlayer），由同一個亂數種子開始、同一個
+幀時鐘計時，每一幀依照兩個玩家的輸入一起模擬（VersusMatch）。兩台電腦上
+的 VersusMatch 只要輸入相同，結果就完全相同，網路上只需要交換輸入
+（見 game/rollback.py 與 game/netplay.py）。
+
+兩局遊戲都使用 random 模組：VersusMatch 模擬時換上自己的亂數狀態，
+模擬完再換回去，同一個行程中的其他程式（或另一場對戰）不會影響對戰的結果。
+"""
+
+######################載入套件######################
+import random
+import struct
+import zlib
+
+import pygame
+
+######################導入設定######################
+from config import WINDOW_WIDTH, WINDOW_HEIGHT, COLORS
+
+######################導入遊戲模組######################
+from .game_logic import GameState
+from . import rollback
+from . import utils
+
+######################全域變數######################
+# 每一幀的輸入（一個位元組）
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_LAUNCH = 4
+
+# 檢查碼的內容：分數、關卡、幀數、打掉的磚塊數、底板位置、球數
+CHECKSUM_HEADER = struct.Struct("<qIIIdI")
+
+
+######################物件類別######################
+
+
+class VersusPlayer(GameState):
+    """
+    對戰中一個玩家的一局遊戲\n
+    \n
+    和一般的 GameState 相同，只是底板與發射球由 input_bits 控制，\n
+    不讀取鍵盤；不記錄分數資料庫，也不使用共用的下一關預先準備器\n
+    （兩局同時進行，過關時各自用模擬中的亂數建立下一關）。\n
+    \n
+    屬性:\n
+    input_bits (int): 這一幀的輸入（INPUT_LEFT、INPUT_RIGHT、INPUT_LAUNCH）\n
+    """
+
+    def __init__(self, endless=False):
+        """
+        參數:\n
+        endless (bool): 是否為無盡模式\n
+        """
+        self.input_bits = 0
+        super().__init__(endless=endless, store=None, prefetch=False)
+
+    def handle_continuous_input(self):
+        """依照這一幀的輸入移動底板、發射黏在底板上的球"""
+        if self.game_over:
+            return
+        bits = self.input_bits
+        if bits & INPUT_LEFT:
+            self.paddle.move_left(self.world_width)
+        if bits & INPUT_RIGHT:
+            self.paddle.move_right(self.world_width)
+        if bits & INPUT_LAUNCH:
+            for ball in self.balls:
+                if ball.stuck:
+                    ball.launch()
+
+    def draw(self, surface):
+        """繪製遊戲畫面（遊戲結束時只顯示最後得分，對戰中不能重新開始）"""
+        if not self.game_over:
+            super().draw(surface)
+            return
+        surface.fill(COLORS["BLACK"])
+        text = utils.render_text(self.font_large, "GAME OVER", COLORS["RED"])
+        surface.blit(
+            text, text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 30))
+        )
+        score_text = utils.render_text(
+            self.font, f"Final Score: {self.score}", COLORS["WHITE"]
+        )
+        surface.blit(
+            score_text,
+            score_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 10)),
+        )
+
+
+class VersusMatch:
+    """
+    一場雙人對戰的模擬（RollbackSession 的模擬物件）\n
+    \n
+    屬性:\n
+    seed (int): 這一場的亂數種子（開對戰的一方決定）\n
+    players (list): 兩個玩家的 VersusPlayer\n
+    frame (int): 已經模擬的幀數\n
+    \n
+    使用範例:\n
+    match = VersusMatch(seed)\n
+    match.step((left_bits, right_bits))\n
+    state = match.save()\n
+    match.load(state)\n
+    """
+
+    def __init__(self, seed, endless=False):
+        """
+        參數:\n
+        seed (int): 亂數種子\n
+        endless (bool): 是否為無盡模式\n
+        """
+        self.seed = seed
+        self.clock = rollback.get_clock()
+        self.frame = 0
+        saved = random.getstate()
+        random.seed(seed)
+        self.clock.seek(0)
+        self.players = [VersusPlayer(endless) for _ in range(2)]
+        self._rng = random.getstate()
+        random.setstate(saved)
+
+    @property
+    def finished(self):
+        """兩個玩家是否都已經遊戲結束"""
+        return all(player.game_over for player in self.players)
+
+    def winner(self):
+        """
+        回傳分數比較高的玩家編號\n
+        \n
+        回傳:\n
+        int: 玩家編號，平手時為 None\n
+        """
+        first, second = (player.score for player in self.players)
+        if first == second:
+            return None
+        return 0 if first > second else 1
+
+    def step(self, inputs):
+        """
+        模擬一幀\n
+        \n
+        參數:\n
+        inputs (tuple): 每個玩家這一幀的輸入\n
+        """
+        saved = random.getstate()
+        random.setstate(self._rng)
+        self.frame += 1
+        self.clock.seek(self.frame)
+        for player, bits in zip(self.players, inputs):
+            player.input_bits = bits
+            player.update()
+        self._rng = random.getstate()
+        random.setstate(saved)
+
+    def save(self):
+        """
+        建立快照\n
+        \n
+        回傳:\n
+        tuple: 交給 load() 的快照\n
+        """
+        return (
+            self.frame,
+            self._rng,
+            [rollback.snapshot(player) for player in self.players],
+        )
+
+    def load(self, state):
+        """
+        恢復快照\n
+        \n
+        參數:\n
+        state (tuple): save() 回傳的快照\n
+        """
+        self.frame, self._rng, games = state
+        for player, saved in zip(self.players, games):
+            rollback.restore(player, saved)
+        self.clock.seek(self.frame)
+
+    def checksum(self):
+        """
+        回傳目前狀態的檢查碼（兩台電腦比對是否同步）\n
+        \n
+        回傳:\n
+        int: CRC32\n
+        """
+        crc = 0
+        for player in self.players:
+            crc = zlib.crc32(
+                CHECKSUM_HEADER.pack(
+                    player.score,
+                    player.level,
+                    player.frames,
+                    player.bricks_destroyed,
+                    player.paddle.x,
+                    len(player.balls),
+                ),
+                crc,
+            )
+            positions = [value for ball in player.balls for value in (ball.x, ball.y)]
+            crc = zlib.crc32(struct.pack(f"<{len(positions)}d", *positions), crc)
+        return crc
+
+
+######################定義函式區######################
+
+
+def read_input(keys=None):
+    """
+    從鍵盤讀取這一幀的輸入\n
+    \n
+    參數:\n
+    keys: pygame.key.get_pressed() 的結果，預設現在讀取\n
+    \n
+    回傳:\n
+    int: 輸入位元\n
+    """
+    if keys is None:
+        keys = pygame.key.get_pressed()
+    bits = 0
+    if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+        bits |= INPUT_LEFT
+    if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+        bits |= INPUT_RIGHT
+    if keys[pygame.K_UP] or keys[pygame.K_SPACE]:
+        bits |= INPUT_LAUNCH
+    return bits
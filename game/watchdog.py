@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+慢幀監視模組
+
+監視主迴圈每一幀的耗時，超過預算（例如兩倍的 FPS 週期）時，
+自動把各階段耗時、物件數量、當時的遊戲進度與監視執行緒抓到的
+呼叫堆疊寫入會自動輪替的本機記錄檔，讓機台上偶發的卡頓也能事後分析。
+"""
+
+######################載入套件######################
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+import pygame
+
+######################導入設定######################
+from config import WATCHDOG_CONFIG, FPS
+
+######################導入遊戲模組######################
+from .profiler import count_entities, frame_phase_targets, wrap_method
+
+######################物件類別######################
+
+
+class FrameWatchdog:
+    """
+    慢幀監視器\n
+    \n
+    作為主迴圈的 frame hook 使用（begin_frame / end_frame）。\n
+    監視執行緒會定期檢查目前這一幀已經跑了多久，一旦超過預算就\n
+    抓下主執行緒當下的呼叫堆疊，這樣就算卡在某個函數裡也能看到是哪裡。\n
+    幀結束後如果確實超時，整理好的報告會交給監視執行緒寫進記錄檔，\n
+    不會在已經很慢的那一幀再增加磁碟 I/O。\n
+    \n
+    屬性:\n
+    budget (float): 一幀的時間預算（秒）\n
+    frame (int): 已完成的幀數\n
+    slow_frames (int): 超過預算的幀數\n
+    log_path (str): 記錄檔路徑\n
+    \n
+    使用範例:\n
+    watchdog = FrameWatchdog()\n
+    watchdog.attach(game)\n
+    watchdog.start()\n
+    game.frame_hooks.append(watchdog)\n
+    """
+
+    def __init__(self, budget=None, log_path=None, sample_interval=None):
+        """
+        初始化監視器\n
+        \n
+        參數:\n
+        budget (float): 時間預算（秒），預設為設定檔倍數乘上 FPS 週期\n
+        log_path (str): 記錄檔路徑，預設使用設定檔中的值\n
+        sample_interval (float): 監視執行緒檢查間隔（秒）\n
+        """
+        self.budget = budget or WATCHDOG_CONFIG["BUDGET_FACTOR"] / FPS
+        self.log_path = log_path or WATCHDOG_CONFIG["LOG_PATH"]
+        self.sample_interval = (
+            sample_interval or WATCHDOG_CONFIG["SAMPLE_INTERVAL_MS"] / 1000.0
+        )
+
+        self.frame = 0
+        self.slow_frames = 0
+        self.phases = {}
+        self._wrapped = []
+
+        # 主執行緒與監視執行緒共用的狀態
+        self._main_thread_id = threading.main_thread().ident
+        self._frame_start = None
+        self._stack_sample = None  # (幀編號, 堆疊文字)
+        self._reports = deque()
+        self._stopping = False
+        self._thread = None
+        self._logger = None
+
+    def attach(self, game):
+        """
+        替一幀中的各個階段加上計時，作為慢幀報告的耗時明細\n
+        \n
+        參數:\n
+        game (BreakoutGame): 遊戲主物件\n
+        """
+        phases = self.phases
+        for owner, attr, phase in frame_phase_targets(game):
+            phases[phase] = 0.0
+
+            def record(start, end, phase=phase):
+                phases[phase] += end - start
+
+            wrap_method(owner, attr, record)
+            self._wrapped.append((owner, attr))
+
+    def start(self):
+        """建立記錄檔並啟動監視執行緒"""
+        if self._thread is not None:
+            return
+        self._logger = _create_logger(self.log_path)
+        self._thread = threading.Thread(
+            target=self._monitor, name="FrameWatchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """停止監視執行緒並移除計時包裝"""
+        for owner, attr in reversed(self._wrapped):
+            try:
+                delattr(owner, attr)
+            except AttributeError:
+                pass
+        self._wrapped = []
+
+        if self._thread is not None:
+            self._stopping = True
+            self._thread.join()
+            self._thread = None
+        if self._logger is not None:
+            for handler in list(self._logger.handlers):
+                handler.close()
+                self._logger.removeHandler(handler)
+            self._logger = None
+
+    ######################幀生命週期（主執行緒）######################
+
+    def begin_frame(self):
+        """在每一幀開始時呼叫"""
+        for phase in self.phases:
+            self.phases[phase] = 0.0
+        self._frame_start = time.perf_counter()
+
+    def end_frame(self, game):
+        """
+        在每一幀結束時呼叫，超過預算就產生報告\n
+        \n
+        參數:\n
+        game (BreakoutGame): 遊戲主物件\n
+        """
+        start = self._frame_start
+        self._frame_start = None
+        frame = self.frame
+        self.frame += 1
+        if start is None:
+            return
+
+        elapsed = time.perf_counter() - start
+        if elapsed <= self.budget:
+            return
+
+        self.slow_frames += 1
+        sample = self._stack_sample
+        stack = sample[1] if sample and sample[0] == frame else None
+        state = game.game_state
+        self._reports.append(
+            {
+                "frame": frame,
+                "elapsed": elapsed,
+                "phases": dict(self.phases),
+                "entities": count_entities(state),
+                "position": game_position(state, frame),
+                "stack": stack,
+            }
+        )
+
+    ######################監視執行緒######################
+
+    def _monitor(self):
+        """監視執行緒：在超時的幀中抓堆疊，並把報告寫入記錄檔"""
+        while not self._stopping:
+            time.sleep(self.sample_interval)
+
+            start = self._frame_start
+            frame = self.frame
+            sample = self._stack_sample
+            if (
+                start is not None
+                and time.perf_counter() - start > self.budget
+                and (sample is None or sample[0] != frame)
+            ):
+                main_frame = sys._current_frames().get(self._main_thread_id)
+                if main_frame is not None:
+                    stack = "".join(traceback.format_stack(main_frame))
+                    self._stack_sample = (frame, stack)
+
+            while self._reports:
+                self._write_report(self._reports.popleft())
+
+        while self._reports:
+            self._write_report(self._reports.popleft())
+
+    def _write_report(self, report):
+        """把一筆慢幀報告格式化並寫入記錄檔"""
+        lines = [
+            f"slow frame #{report['frame']}: {report['elapsed'] * 1000:.2f} ms "
+            f"(budget {self.budget * 1000:.2f} ms)"
+        ]
+        phases = sorted(report["phases"].items(), key=lambda item: -item[1])
+        lines.append(
+            "  phases: "
+            + ", ".join(f"{name}={seconds * 1000:.2f}ms" for name, seconds in phases)
+        )
+        lines.append(
+            "  entities: "
+            + ", ".join(f"{name}={count}" for name, count in report["entities"].items())
+        )
+        lines.append(
+            "  position: "
+            + ", ".join(f"{name}={value}" for name, value in report["position"].items())
+        )
+        if report["stack"]:
+            lines.append("  stack sample (main thread):")
+            lines.extend(
+                "    " + line for line in report["stack"].rstrip().splitlines()
+            )
+        else:
+            lines.append("  stack sample: (frame finished before the monitor sampled)")
+        self._logger.warning("\n".join(lines))
+
+
+######################定義函式區######################
+
+
+def game_position(game_state, frame):
+    """
+    回傳目前的遊戲進度，用來對照回放或重現問題\n
+    \n
+    參數:\n
+    game_state (GameState): 遊戲狀態\n
+    frame (int): 主迴圈的幀編號\n
+    \n
+    回傳:\n
+    dict: 幀編號、遊戲時間、關卡、分數與狀態\n
+    """
+    return {
+        "frame": frame,
+        "ticks_ms": pygame.time.get_ticks(),
+        "level": game_state.level,
+        "score": game_state.score,
+        "state": game_state.state,
+    }
+
+
+def _create_logger(path):
+    """建立寫入輪替記錄檔的 logger"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    logger = logging.getLogger("breakout.watchdog")
+    for handler in list(logger.handlers):
+        handler.close()
+        logger.removeHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=WATCHDOG_CONFIG["MAX_BYTES"],
+        backupCount=WATCHDOG_CONFIG["BACKUP_COUNT"],
+        encoding="utf-8",
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(handler)
+    return logger
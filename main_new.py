@@ -12,6 +12,14 @@ import os
 ######################導入遊戲模組######################
 from config import *
 from game.game_logic import GameState
+from game.latency import FramePacer, InputLatency
+from game.profiler import ProfileCapture, capture_frames_from_environment
+from game import assets
+from game import audio
+from game import prefetch
+from game import savegame
+from game import scores
+from game import utils
 
 ######################物件類別######################
 
@@ -28,10 +36,12 @@ class BreakoutGame:
     \n
     屬性:\n
     screen (pygame.Surface): 主遊戲視窗\n
-    clock (pygame.time.Clock): 用於控制遊戲 FPS 的時鐘\n
+    clock (pygame.time.Clock): 啟動 pygame 計時器的時鐘\n
+    pacer (FramePacer): 控制每一幀開始的時間（FPS 與晚取樣）\n
+    input_latency (InputLatency): 事件的時間戳記與輸入到畫面的延遲\n
     game_state (GameState): 遊戲狀態管理物件\n
-    font (pygame.font.Font): 一般文字字體\n
-    large_font (pygame.font.Font): 大標題字體\n
+    font (pygame.font.Font): 一般文字字體（第一次使用時才載入）\n
+    large_font (pygame.font.Font): 大標題字體（第一次使用時才載入）\n
     \n
     使用範例:\n
     game = BreakoutGame()\n
@@ -43,33 +53,173 @@ class BreakoutGame:
         初始化遊戲系統\n
         \n
         執行步驟：\n
-        1. 初始化 Pygame 系統\n
-        2. 創建遊戲視窗並設定標題\n
-        3. 設定 FPS 控制時鐘\n
-        4. 創建遊戲狀態管理物件\n
-        5. 載入遊戲所需字體\n
+        1. 只初始化需要的 Pygame 子系統（視窗、字體）\n
+        2. 建立資源索引，在背景執行緒預載字體與圖片，\n
+           並在背景執行緒初始化混音器並載入音效\n
+        3. 創建遊戲視窗並設定標題\n
+        4. 設定 FPS 控制時鐘\n
+        5. 創建遊戲狀態管理物件\n
+        \n
+        字體在第一次繪製文字時才載入，不佔用啟動時間。\n
         """
-        # 啟動 Pygame 系統，讓我們可以使用圖形和聲音功能
-        pygame.init()
+        # 只啟動需要的子系統，不用 pygame.init() 把搖桿等用不到的子系統
+        # 全部初始化；混音器開啟音效裝置很慢，交給背景執行緒
+        pygame.display.init()
+        pygame.font.init()
+        # 資源管理器先開始預載，音效執行緒也透過它讀取音效檔
+        self.assets = assets.get_manager()
+        self.assets.start()
+        audio.start()
 
         # 創建遊戲視窗，大小根據設定檔決定
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.screen = self.create_window()
         pygame.display.set_caption("敲磚塊遊戲 v2.0")
 
-        # 設定時鐘來控制遊戲跑多快，避免電腦太快讓遊戲跑太快
+        # 建立時鐘會啟動計時器，pygame.time.get_ticks() 才會開始計時
         self.clock = pygame.time.Clock()
+        # 每一幀開始的時間改由節奏控制器決定：晚取樣時等到畫面快要送出前才讀取輸入，
+        # 等待時順便替事件記下時間，畫面送出後統計輸入到畫面的延遲
+        self.pacer = FramePacer()
+        self.input_latency = InputLatency()
 
-        # 創建遊戲狀態物件，用來管理所有遊戲邏輯
-        self.game_state = GameState()
+        # 分數資料庫：背景執行緒開啟資料庫並載入排行榜，每局結束時整批寫入
+        self.score_store = None
+        if SCORES_CONFIG["ENABLED"]:
+            self.score_store = scores.get_store()
+            self.score_store.start()
 
-        # 載入字體，如果載入失敗就用系統預設字體
-        try:
-            self.font = pygame.font.Font(None, 36)
-            self.large_font = pygame.font.Font(None, 72)
-        except:
-            # 如果找不到字體檔案，就用系統的 arial 字體
-            self.font = pygame.font.SysFont("arial", 36)
-            self.large_font = pygame.font.SysFont("arial", 72)
+        # 創建遊戲狀態物件，用來管理所有遊戲邏輯
+        self.game_state = GameState(store=self.score_store)
+
+        # 滑鼠操作底板時把游標藏起來；relative 模式（軌跡球、旋鈕）鎖住游標，
+        # 移到視窗邊緣也能繼續讀到移動量
+        if INPUT_CONFIG["MOUSE_CONTROL"] is not None:
+            pygame.mouse.set_visible(False)
+            if INPUT_CONFIG["MOUSE_CONTROL"] == "relative":
+                pygame.event.set_grab(True)
+                pygame.mouse.get_rel()  # 丟掉啟動前累積的移動量
+
+        # 上次關閉時還在進行的一局（例如機台重新開機），從存檔繼續
+        if SAVE_CONFIG["RESUME_ON_START"]:
+            try:
+                if savegame.load_game(self.game_state):
+                    print(f"💾 從存檔繼續第 {self.game_state.level} 關")
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 無法讀取存檔: {e}")
+
+        # 畫面錄製器（QA 回放用），只有在設定開啟時才建立
+        self.recorder = None
+        if RECORDER_CONFIG["ENABLED"]:
+            from game.recorder import FrameRecorder
+
+            self.recorder = FrameRecorder()
+            self.recorder.start()
+
+        # 每幀開始與結束時要通知的工具
+        # 資源管理器在幀結束時轉換新載入圖片的像素格式，並記錄幀中途的同步讀檔
+        self.frame_hooks = [self.assets]
+        # 背景準備好的下一關也在幀結束時轉換圖層的像素格式
+        self.prefetcher = prefetch.get_prefetcher()
+        self.frame_hooks.append(self.prefetcher)
+
+        # 效能分析覆蓋層，只有在除錯模式才掛上計時包裝（關閉時沒有任何額外成本）
+        self.profiler = None
+        self.debug_overlay = None
+        if GAME_CONFIG["SHOW_DEBUG_INFO"]:
+            from game.profiler import FrameProfiler, DebugOverlay
+
+            self.profiler = FrameProfiler()
+            self.profiler.attach(self)
+            self.debug_overlay = DebugOverlay(self.profiler, latency=self.input_latency)
+            self.frame_hooks.append(self.profiler)
+
+        # 時間軸追蹤，記錄每個階段與遊戲事件
+        self.tracer = None
+        if TRACE_CONFIG["ENABLED"]:
+            from game.trace import TraceWriter
+
+            self.tracer = TraceWriter()
+            self.tracer.start()
+            self.tracer.attach(self)
+            self.frame_hooks.append(self.tracer)
+
+        # 慢幀監視，超過時間預算的幀會自動寫進輪替記錄檔
+        self.watchdog = None
+        if WATCHDOG_CONFIG["ENABLED"]:
+            from game.watchdog import FrameWatchdog
+
+            self.watchdog = FrameWatchdog()
+            self.watchdog.attach(self)
+            self.watchdog.start()
+            self.frame_hooks.append(self.watchdog)
+
+        # 記憶體追蹤，逐幀統計各子系統的記憶體配置
+        self.memory_tracker = None
+        if MEMTRACK_CONFIG["ENABLED"]:
+            from game.memtrack import MemoryTracker
+
+            self.memory_tracker = MemoryTracker()
+            self.memory_tracker.start()
+            self.memory_tracker.attach(self.game_state, self)
+            self.frame_hooks.append(self.memory_tracker)
+
+        # 觀戰串流：機台旁的觀戰螢幕透過本機 socket 接收每一幀的變化
+        self.spectator = None
+        if SPECTATOR_CONFIG["ENABLED"]:
+            from game.spectator import SpectatorServer
+
+            self.spectator = SpectatorServer()
+            if self.spectator.start():
+                self.spectator.attach(self.game_state)
+                self.frame_hooks.append(self.spectator)
+                print(f"📺 觀戰串流：{self.spectator.address}")
+            else:
+                self.spectator = None
+
+        # 垃圾回收策略：遊戲中不讓自動回收打斷，改在安全的時間點回收
+        # 放在最後一個 frame hook，幀結束時其他工具都處理完了才判斷空閒時間
+        self.gc_policy = None
+        if GC_CONFIG["ENABLED"]:
+            from game.gcpolicy import GCPolicy
+
+            self.gc_policy = GCPolicy()
+            self.gc_policy.attach(self.game_state)
+            self.gc_policy.start()
+            self.frame_hooks.append(self.gc_policy)
+
+        # cProfile 擷取器：按 F9 或設定環境變數後記錄接下來 N 幀
+        self.profile_capture = ProfileCapture()
+        startup_frames = capture_frames_from_environment()
+        if startup_frames:
+            self.profile_capture.request(startup_frames)
+
+    def create_window(self):
+        """
+        建立遊戲視窗\n
+        \n
+        開啟垂直同步時，畫面送出會等到螢幕更新（需要 SCALED 模式）；\n
+        顯示驅動不支援時改用一般的視窗。\n
+        \n
+        回傳:\n
+        pygame.Surface: 主遊戲視窗\n
+        """
+        size = (WINDOW_WIDTH, WINDOW_HEIGHT)
+        if INPUT_CONFIG["VSYNC"]:
+            try:
+                return pygame.display.set_mode(size, pygame.SCALED, vsync=1)
+            except pygame.error as e:
+                print(f"⚠️ 無法開啟垂直同步: {e}")
+        return pygame.display.set_mode(size)
+
+    @property
+    def font(self):
+        """一般文字字體"""
+        return utils.get_font(36)
+
+    @property
+    def large_font(self):
+        """大標題字體"""
+        return utils.get_font(72)
 
     def handle_events(self):
         """
@@ -81,8 +231,8 @@ class BreakoutGame:
         回傳:\n
         bool: True 表示遊戲應該繼續執行，False 表示使用者想要退出\n
         """
-        # 檢查所有發生的事件（滑鼠點擊、按鍵等）
-        for event in pygame.event.get():
+        # 檢查所有發生的事件（滑鼠點擊、按鍵等），等待時已經取出的事件也在裡面
+        for event in self.input_latency.take():
             if event.type == pygame.QUIT:
                 # 使用者點了視窗右上角的 X 按鈕，想要關閉遊戲
                 return False
@@ -119,8 +269,18 @@ class BreakoutGame:
         # 繪製使用者介面（分數等資訊）
         self.draw_ui()
 
+        # 除錯模式下在最上層畫出效能分析覆蓋層
+        if self.debug_overlay:
+            self.debug_overlay.draw(self.screen)
+
         # 把所有畫好的內容顯示到螢幕上
+        self.flip()
+
+    def flip(self):
+        """把畫好的畫面送到螢幕上，並記錄這一幀輸入到畫面的延遲"""
+        self.pacer.flipping()
         pygame.display.flip()
+        self.input_latency.presented(self.pacer.presented())
 
     def draw_ui(self):
         """
@@ -130,8 +290,8 @@ class BreakoutGame:
         目前只顯示分數在右上角，與原版 main.py 保持一致\n
         """
         # 產生分數文字，白色字體
-        score_text = self.font.render(
-            f"Score: {self.game_state.score}", True, COLORS["WHITE"]
+        score_text = utils.render_text(
+            self.font, f"Score: {self.game_state.score}", COLORS["WHITE"]
         )
         # 計算要放在右上角的位置
         score_rect = score_text.get_rect()
@@ -144,10 +304,11 @@ class BreakoutGame:
         執行遊戲主迴圈\n
         \n
         這是遊戲的心臟，會一直重複執行直到遊戲結束：\n
-        1. 處理使用者輸入\n
-        2. 更新遊戲狀態\n
-        3. 繪製畫面\n
-        4. 控制 FPS 避免跑太快\n
+        1. 等到這一幀該開始的時間，控制 FPS 避免跑太快\n
+           （晚取樣時等到畫面快要送出前才開始，輸入延遲較短）\n
+        2. 處理使用者輸入\n
+        3. 更新遊戲狀態\n
+        4. 繪製畫面\n
         \n
         異常處理:\n
         - KeyboardInterrupt: 使用者按 Ctrl+C 中斷\n
@@ -159,8 +320,13 @@ class BreakoutGame:
         print("=" * 40)
         print("控制說明:")
         print("  ← → 或 A D: 移動球拍")
+        if INPUT_CONFIG["MOUSE_CONTROL"] is not None:
+            print("  滑鼠: 移動球拍，左鍵發射球")
         print("  SPACE: 暫停/繼續")
         print("  R: 重新開始")
+        print("  F5 / F8: 存檔 / 讀取存檔")
+        print("  F6: 切換輔助模式")
+        print("  F9: 擷取效能分析資料")
         print("  ESC: 退出遊戲")
         print("=" * 40)
 
@@ -170,6 +336,21 @@ class BreakoutGame:
         try:
             # 遊戲主迴圈，會一直重複執行直到遊戲結束
             while running:
+                # 等到這一幀該開始的時間（晚取樣時盡量接近畫面送出），
+                # 等待時每隔一小段時間取出事件並記下時間
+                self.pacer.wait(self.input_latency.collect)
+
+                # 玩家按了 F9，從這一幀開始擷取效能分析資料
+                if self.game_state.profile_requested:
+                    self.game_state.profile_requested = False
+                    self.profile_capture.request()
+                if self.profile_capture.armed:
+                    self.profile_capture.begin_frame()
+
+                # 通知除錯工具新一幀開始
+                for hook in self.frame_hooks:
+                    hook.begin_frame()
+
                 # 處理使用者的輸入（按鍵、滑鼠等）
                 running = self.handle_events()
 
@@ -179,8 +360,15 @@ class BreakoutGame:
                 # 把所有東西畫到螢幕上
                 self.draw()
 
-                # 控制遊戲速度，讓遊戲以固定 FPS 執行
-                self.clock.tick(FPS)
+                # 把剛畫好的畫面交給背景錄製器（佇列滿了會自動丟幀）
+                if self.recorder:
+                    self.recorder.capture(self.screen)
+
+                for hook in self.frame_hooks:
+                    hook.end_frame(self)
+
+                if self.profile_capture.armed:
+                    self.profile_capture.end_frame()
 
         except KeyboardInterrupt:
             # 使用者按 Ctrl+C 想要強制結束遊戲
@@ -203,6 +391,97 @@ class BreakoutGame:
         確保程式乾淨地結束不會留下垃圾\n
         """
         print("🧹 清理遊戲資源...")
+        # 回報輸入到畫面的延遲（包含設定的螢幕延遲）
+        latency = self.input_latency.stats()
+        if latency["count"]:
+            print(
+                f"⏱️ 輸入延遲：{latency['count']} 個輸入，p50 {latency['p50']:.0f} ms、"
+                f"p90 {latency['p90']:.0f} ms、p99 {latency['p99']:.0f} ms"
+                f"（{'晚取樣' if self.pacer.late else '一般取樣'}，"
+                f"{self.pacer.missed} 幀比預計晚送出）"
+            )
+        # 停止慢幀監視並寫完剩餘的報告
+        if self.watchdog:
+            self.watchdog.stop()
+            if self.watchdog.slow_frames:
+                print(
+                    f"🐢 共有 {self.watchdog.slow_frames} 幀超過時間預算，"
+                    f"詳見 {self.watchdog.log_path}"
+                )
+        # 恢復原本的垃圾回收設定，並回報遊戲中途被自動回收打斷的次數
+        if self.gc_policy:
+            self.gc_policy.stop()
+            summary = self.gc_policy.summary()
+            print(
+                f"♻️ 垃圾回收：遊戲中途自動回收 {summary['midplay_pauses']} 次"
+                f"（最長 {summary['max_midplay_ms']:.2f}ms）"
+            )
+        # 關閉觀戰串流
+        if self.spectator:
+            self.spectator.stop()
+            spectator_stats = self.spectator.stats()
+            print(
+                f"📺 觀戰串流：{spectator_stats['frames']} 幀、"
+                f"{spectator_stats['keyframes']} 個關鍵幀，"
+                f"送出 {spectator_stats['sent_bytes'] / 1024:.1f} KB"
+            )
+        # 停止下一關的背景準備，並回報過關時還要等背景執行緒的次數
+        self.prefetcher.stop()
+        if self.prefetcher.stalls:
+            print(f"🧱 關卡：過關時等待背景準備 {self.prefetcher.stalls} 次")
+        # 停止音效執行緒
+        audio.stop()
+        # 停止資源預載，並回報遊戲中途的同步讀檔（應該永遠是 0）
+        self.assets.stop()
+        asset_stats = self.assets.stats()
+        if asset_stats["frame_path_loads"] or asset_stats["stalls"]:
+            print(
+                f"📦 資源：幀中途同步讀檔 {asset_stats['frame_path_loads']} 次，"
+                f"等待預載 {asset_stats['stalls']} 次"
+            )
+        # 匯出記憶體追蹤結果
+        if self.memory_tracker:
+            path = self.memory_tracker.export()
+            self.memory_tracker.stop()
+            print(f"🧠 記憶體追蹤結果已寫入 {path}")
+        # 把時間軸剩餘的事件寫完
+        if self.tracer:
+            self.tracer.close()
+            print(f"🧭 時間軸已寫入 {self.tracer.path}")
+        # 等待錄製器把剩餘的畫面寫完，並回報丟棄的幀數
+        if self.recorder:
+            stats = self.recorder.stop()
+            print(
+                f"🎬 錄影已儲存到 {stats['output_dir']}"
+                f"（寫出 {stats['written']} 幀，丟棄 {stats['dropped']} 幀）"
+            )
+        # 遊戲進行中關閉時存檔，下次啟動從同一個畫面繼續；
+        # 已經結束的一局把舊存檔刪掉
+        resumable = False
+        if SAVE_CONFIG["SAVE_ON_QUIT"]:
+            if self.game_state.game_over:
+                try:
+                    savegame.delete_save()
+                except OSError as e:
+                    print(f"⚠️ 無法刪除舊存檔: {e}")
+            else:
+                try:
+                    size = savegame.save_game(self.game_state)
+                    resumable = True
+                    print(f"💾 遊戲已存檔（{size} 位元組）")
+                except OSError as e:
+                    print(f"⚠️ 無法存檔: {e}")
+        # 記錄玩到一半就離開的這一局（存檔繼續的這一局等真正結束時才記錄），
+        # 並等背景執行緒把分數寫完
+        if self.score_store:
+            if self.game_state.score > 0 and not resumable:
+                self.game_state.end_session("quit")
+            self.score_store.stop()
+            store_stats = self.score_store.stats()
+            print(
+                f"🏆 分數紀錄：寫入 {store_stats['written']} 局"
+                f"（{store_stats['batches']} 次交易，失敗 {store_stats['failed']} 局）"
+            )
         # 關閉 Pygame 系統，釋放所有資源
         pygame.quit()
         print("👋 感謝遊玩！")
@@ -227,9 +506,9 @@ def main():
     回傳:\n
     int: 程式退出碼，0 表示成功，1 表示失敗\n
     """
-    # 檢查 Pygame 是否正確安裝，這是遊戲運行的基礎
+    # 檢查 Pygame 是否正確安裝，這是遊戲運行的基礎（只初始化視窗子系統）
     try:
-        pygame.init()
+        pygame.display.init()
         print("✅ Pygame 已正確載入")
     except Exception as e:
         print(f"❌ Pygame 載入失敗: {e}")
@@ -258,6 +537,6 @@ def main():
 
 ######################主程式######################
 
-# 直接呼叫主函數，不使用 if __name__ == "__main__" 慣例
-exit_code = main()
-sys.exit(exit_code)
+# 只有直接執行時才啟動遊戲，讓啟動效能測試等工具可以匯入這個模組
+if __name__ == "__main__":
+    sys.exit(main())
@@ -65,12 +65,15 @@ setup(
     entry_points={
         "console_scripts": [
             "breakout-game=main_new:main",
+            "breakout-spectator=spectator:main",
+            "breakout-versus=versus:main",
         ],
     },
     include_package_data=True,
     package_data={
         "": ["*.md", "*.txt", "*.yml", "*.yaml"],
         "assets": ["images/*", "sounds/*"],
+        "levels": ["*.json"],
         "docs": ["*.md", "*.rst"],
     },
     project_urls={
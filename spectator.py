@@ -0,0 +1,171 @@
+"""
+敲磚塊遊戲 - 觀戰程式
+
+連線到同一台機器上的遊戲（設定檔 SPECTATOR_CONFIG 開啟觀戰串流），
+重建並畫出正在進行的這一局，給機台旁邊的觀戰螢幕使用。
+遊戲還沒開始或斷線時會顯示等待畫面，並自動重新連線。
+
+使用方式:
+    python spectator.py                      # 使用設定檔中的位址
+    python spectator.py --port 47046         # 指定 TCP 連接埠
+    python spectator.py --unix /tmp/breakout.sock
+"""
+
+######################載入套件######################
+import argparse
+import sys
+
+import pygame
+
+######################導入遊戲模組######################
+from config import *
+from game.spectator import SpectatorClient, SpectatorView, stream_address
+from game import prefetch
+from game import utils
+
+######################物件類別######################
+
+
+class SpectatorApp:
+    """
+    觀戰程式主類別\n
+    \n
+    每一幀把收到的訊息依序套用到重建的遊戲狀態，再用和遊戲相同的\n
+    GameState.draw() 畫出畫面；來不及畫的幀也會套用（每一幀的差異都\n
+    需要），只是不會畫出來。\n
+    \n
+    屬性:\n
+    screen (pygame.Surface): 觀戰視窗\n
+    clock (pygame.time.Clock): 控制 FPS 的時鐘\n
+    client (SpectatorClient): 和遊戲的連線\n
+    view (SpectatorView): 重建的遊戲狀態\n
+    \n
+    使用範例:\n
+    app = SpectatorApp()\n
+    app.run()\n
+    """
+
+    def __init__(self, address=None):
+        """
+        參數:\n
+        address: 遊戲端的位址，預設使用設定檔中的值\n
+        """
+        pygame.display.init()
+        pygame.font.init()
+        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        pygame.display.set_caption("敲磚塊遊戲 v2.0 - 觀戰")
+        self.clock = pygame.time.Clock()
+
+        self.view = SpectatorView()
+        self.client = SpectatorClient(address)
+        self.client.start()
+
+    @property
+    def font(self):
+        """一般文字字體"""
+        return utils.get_font(36)
+
+    def handle_events(self):
+        """
+        處理視窗事件\n
+        \n
+        回傳:\n
+        bool: False 表示要關閉觀戰程式\n
+        """
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                return False
+        return True
+
+    def update(self):
+        """套用這一幀之前收到的所有訊息"""
+        for message in self.client.take():
+            if message is None:
+                # 連線中斷，等重新連線後的關鍵幀
+                self.view.reset()
+                continue
+            try:
+                self.view.apply(message)
+            except ValueError as e:
+                print(f"⚠️ 無法套用觀戰資料: {e}")
+                self.view.reset()
+
+    def draw(self):
+        """畫出重建的遊戲畫面，還沒同步時顯示等待畫面"""
+        self.screen.fill(COLORS["BLACK"])
+        if self.view.synced:
+            game = self.view.game
+            game.draw(self.screen)
+            score_text = utils.render_text(
+                self.font, f"Score: {game.score}", COLORS["WHITE"]
+            )
+            score_rect = score_text.get_rect()
+            score_rect.topright = (WINDOW_WIDTH - 10, 10)
+            self.screen.blit(score_text, score_rect)
+        else:
+            text = utils.render_text(self.font, "Waiting for game...", COLORS["WHITE"])
+            self.screen.blit(
+                text, text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
+            )
+        pygame.display.flip()
+
+    def run(self):
+        """執行觀戰主迴圈，直到關閉視窗或按 ESC"""
+        print(f"📺 觀戰程式啟動，連線到 {self.client.address}")
+        try:
+            while self.handle_events():
+                self.update()
+                self.draw()
+                self.clock.tick(FPS)
+        except KeyboardInterrupt:
+            print("\n👋 觀戰程式被使用者中斷")
+        finally:
+            self.cleanup()
+
+    def cleanup(self):
+        """關閉連線並釋放資源"""
+        self.client.stop()
+        prefetch.get_prefetcher().stop()
+        print(
+            f"📺 共收到 {self.client.received} 則訊息"
+            f"（{self.client.received_bytes / 1024:.1f} KB，"
+            f"關鍵幀 {self.view.keyframes} 個）"
+        )
+        pygame.quit()
+
+
+######################定義函式區######################
+
+
+def main(argv=None):
+    """
+    觀戰程式進入點\n
+    \n
+    回傳:\n
+    int: 程式退出碼\n
+    """
+    parser = argparse.ArgumentParser(description="敲磚塊遊戲觀戰程式")
+    parser.add_argument("--host", help="遊戲所在的主機（預設為設定檔中的值）")
+    parser.add_argument("--port", type=int, help="TCP 連接埠")
+    parser.add_argument("--unix", help="Unix socket 路徑")
+    args = parser.parse_args(argv)
+
+    address = stream_address()
+    if args.unix:
+        address = args.unix
+    elif args.host or args.port:
+        address = (
+            args.host or SPECTATOR_CONFIG["HOST"],
+            args.port or SPECTATOR_CONFIG["PORT"],
+        )
+
+    SpectatorApp(address).run()
+    return 0
+
+
+######################主程式######################
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+敲磚塊遊戲 - 雙人對戰
+
+兩個玩家各自打自己的一局（同一個亂數種子，關卡完全相同），比誰的分數高。
+兩邊只透過 UDP 交換每一幀的輸入；對手的輸入還沒送到時先沿用他上一幀的
+輸入繼續玩，送到之後發現猜錯了，就倒回那一幀用正確的輸入重新模擬
+（見 game/rollback.py）。
+
+使用方式:
+    python versus.py --host                  # 開對戰，等待對手加入
+    python versus.py --join 192.168.1.20     # 加入對手開的對戰
+    python versus.py --host --endless        # 無盡模式
+    python versus.py --host 0.0.0.0 --port 47048
+"""
+
+######################載入套件######################
+import argparse
+import sys
+
+import pygame
+
+######################導入遊戲模組######################
+from config import *
+from game.netplay import NetplayPeer
+from game.rollback import RollbackSession, get_clock
+from game.versus import VersusMatch, read_input
+from game import audio
+from game import utils
+
+######################物件類別######################
+
+
+class VersusApp:
+    """
+    雙人對戰程式主類別\n
+    \n
+    每一幀先收對手的輸入（猜錯時在 advance() 裡回溯），讀取本機的輸入並\n
+    模擬一幀，再把輸入送給對手。兩個玩家的畫面各自畫在一張和視窗一樣大\n
+    的畫布上，縮小一半左右並排顯示，本機玩家在左邊。\n
+    \n
+    屬性:\n
+    screen (pygame.Surface): 對戰視窗\n
+    clock (pygame.time.Clock): 控制 FPS 的時鐘\n
+    peer (NetplayPeer): 和對手的連線\n
+    match (VersusMatch): 對戰的模擬（連線之後才建立）\n
+    session (RollbackSession): 輸入與回溯的狀態（連線之後才建立）\n
+    \n
+    使用範例:\n
+    app = VersusApp(("127.0.0.1", 47048), host=True)\n
+    app.run()\n
+    """
+
+    def __init__(self, address=None, host=False, endless=False):
+        """
+        參數:\n
+        address (tuple): 開對戰時等待的位址，加入時為對手的位址\n
+        host (bool): 是否為開對戰的一方\n
+        endless (bool): 開對戰時是否使用無盡模式\n
+        """
+        pygame.display.init()
+        pygame.font.init()
+        audio.start()
+        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        pygame.display.set_caption("敲磚塊遊戲 v2.0 - 雙人對戰")
+        self.clock = pygame.time.Clock()
+
+        # 遊戲用的時間改成由幀數決定，兩台電腦的模擬才會相同
+        self.frame_clock = get_clock()
+        self.frame_clock.install()
+
+        self.peer = NetplayPeer(address, host=host, endless=endless)
+        self.match = None
+        self.session = None
+        # 每個玩家的畫布（畫好之後再縮小）
+        self.canvases = [
+            pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT)) for _ in range(2)
+        ]
+
+    @property
+    def font(self):
+        """一般文字字體"""
+        return utils.get_font(28)
+
+    @property
+    def large_font(self):
+        """大標題字體"""
+        return utils.get_font(56)
+
+    def handle_events(self):
+        """
+        處理視窗事件\n
+        \n
+        回傳:\n
+        bool: False 表示要關閉對戰程式\n
+        """
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                return False
+        return True
+
+    def update(self):
+        """收對手的輸入、模擬一幀並送出本機的輸入"""
+        peer = self.peer
+        peer.poll(self.session)
+        if self.session is None:
+            if peer.state != "playing":
+                return
+            # 連線成功：兩邊用同樣的種子與設定開始
+            self.match = VersusMatch(peer.seed, peer.endless)
+            self.session = RollbackSession(
+                self.match,
+                peer.local,
+                delay=peer.delay,
+                max_rollback=peer.max_rollback,
+            )
+            print(
+                f"🎮 對戰開始（玩家 {peer.local + 1}，種子 {peer.seed}，"
+                f"{'無盡模式' if peer.endless else '一般模式'}）"
+            )
+        if peer.state == "playing":
+            self.session.advance(read_input())
+        peer.send_inputs(self.session)
+
+    def draw(self):
+        """畫出兩個玩家的畫面與對戰資訊"""
+        self.screen.fill(COLORS["BLACK"])
+        if self.match is None:
+            if self.peer.host:
+                message = f"Waiting for opponent on port {self.peer.address[1]}..."
+            else:
+                message = f"Connecting to {self.peer.address[0]}..."
+            if self.peer.state == "closed":
+                message = "Connection failed"
+            text = utils.render_text(self.font, message, COLORS["WHITE"])
+            self.screen.blit(
+                text, text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
+            )
+            pygame.display.flip()
+            return
+
+        # 本機玩家在左邊，對手在右邊
+        half = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+        top = (WINDOW_HEIGHT - half[1]) // 2
+        order = (self.peer.local, self.peer.remote_player)
+        for column, player in enumerate(order):
+            canvas = self.canvases[player]
+            canvas.fill(COLORS["BLACK"])
+            game = self.match.players[player]
+            game.draw(canvas)
+            left = column * half[0]
+            self.screen.blit(pygame.transform.smoothscale(canvas, half), (left, top))
+            label = "You" if column == 0 else "Opponent"
+            text = utils.render_text(
+                self.font, f"{label}: {game.score}", COLORS["WHITE"]
+            )
+            self.screen.blit(text, (left + 10, top - text.get_height() - 8))
+        pygame.draw.line(
+            self.screen,
+            COLORS["WHITE"],
+            (half[0], top),
+            (half[0], top + half[1] - 1),
+        )
+
+        self.draw_hud(top + half[1] + 10)
+        pygame.display.flip()
+
+    def draw_hud(self, y):
+        """
+        畫出連線狀態與對戰結果\n
+        \n
+        參數:\n
+        y (int): 文字的起始 Y 座標\n
+        """
+        stats = self.session.stats()
+        line = (
+            f"Ping {self.peer.rtt_ms:.0f} ms  "
+            f"Rollbacks {stats['rollbacks']}  Stalls {stats['stalls']}"
+        )
+        if self.peer.desynced:
+            line += "  DESYNC"
+        text = utils.render_text(self.font, line, COLORS["WHITE"])
+        self.screen.blit(text, (10, y))
+
+        result = None
+        if self.match.finished:
+            winner = self.match.winner()
+            if winner is None:
+                result = "Draw!"
+            elif winner == self.peer.local:
+                result = "You win!"
+            else:
+                result = "You lose!"
+        elif self.peer.state == "closed":
+            result = "Opponent left"
+        if result:
+            text = utils.render_text(self.large_font, result, COLORS["YELLOW"])
+            self.screen.blit(text, text.get_rect(midtop=(WINDOW_WIDTH // 2, y + 30)))
+
+    def run(self):
+        """執行對戰主迴圈，直到關閉視窗或按 ESC"""
+        if not self.peer.start():
+            self.cleanup()
+            return 1
+        if self.peer.host:
+            print(f"🎮 開對戰，等待對手連到 {self.peer.address}")
+        else:
+            print(f"🎮 加入 {self.peer.address} 的對戰")
+        try:
+            while self.handle_events():
+                self.update()
+                self.draw()
+                self.clock.tick(FPS)
+        except KeyboardInterrupt:
+            print("\n👋 對戰被使用者中斷")
+        finally:
+            self.cleanup()
+        return 0
+
+    def cleanup(self):
+        """通知對手、恢復時鐘並釋放資源"""
+        self.peer.close()
+        self.frame_clock.uninstall()
+        if self.session:
+            stats = self.session.stats()
+            peer_stats = self.peer.stats()
+            print(
+                f"🎮 對戰 {self.session.frame} 幀：回溯 {stats['rollbacks']} 次"
+                f"（共 {stats['rollback_frames']} 幀，最久 {stats['max_rollback_ms']:.2f} ms），"
+                f"等待對手 {stats['stalls']} 幀"
+            )
+            print(
+                f"📶 連線：送出 {peer_stats['packets_sent']} 個封包"
+                f"（{peer_stats['bytes_sent'] / 1024:.1f} KB），"
+                f"收到 {peer_stats['packets_received']} 個，"
+                f"來回 {peer_stats['rtt_ms']:.0f} ms"
+            )
+        audio.stop()
+        pygame.quit()
+
+
+######################定義函式區######################
+
+
+def main(argv=None):
+    """
+    雙人對戰進入點\n
+    \n
+    回傳:\n
+    int: 程式退出碼\n
+    """
+    parser = argparse.ArgumentParser(description="敲磚塊遊戲雙人對戰")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument(
+        "--host",
+        nargs="?",
+        const=VERSUS_CONFIG["HOST"],
+        metavar="ADDRESS",
+        help="開對戰並在這個位址等待（預設為設定檔中的值）",
+    )
+    mode.add_argument("--join", metavar="HOST", help="加入這台主機開的對戰")
+    parser.add_argument("--port", type=int, default=VERSUS_CONFIG["PORT"])
+    parser.add_argument(
+        "--endless", action="store_true", help="使用無盡模式（開對戰的一方決定）"
+    )
+    args = parser.parse_args(argv)
+
+    if args.host is not None:
+        app = VersusApp((args.host, args.port), host=True, endless=args.endless)
+    else:
+        app = VersusApp((args.join, args.port))
+    return app.run()
+
+
+######################主程式######################
+
+if __name__ == "__main__":
+    sys.exit(main())